@@ -0,0 +1,15 @@
+"""
+Forge Spark benchmarks
+Run from the forge-spark-mvp directory, e.g. `python -m benchmarks.tokenizer_overhead`
+"""
+
+import importlib
+
+
+def game_re(module: str):
+    """
+    Import a module of src/game-re, e.g. game_re("upscalers.esrgan")
+
+    game-re is not a valid identifier, so the package is imported by name.
+    """
+    return importlib.import_module(f"src.game-re.{module}")
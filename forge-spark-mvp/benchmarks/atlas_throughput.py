@@ -0,0 +1,123 @@
+"""
+Texture atlas throughput benchmark
+Upscales a synthetic set of small icons (16-64px) one texture at a time,
+batched by shape, and packed into atlas sheets, and reports textures/sec and
+model calls per mode as JSON. Without downloadable weights the network is
+randomly initialized, which leaves its speed unchanged
+
+Usage:
+    python -m benchmarks.atlas_throughput [--icons 200] [--min-size 16] [--max-size 64]
+                                          [--model realesr-general-x4v3] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from . import game_re
+
+esrgan = game_re("upscalers.esrgan")
+texture_upscaler = game_re("upscalers.texture_upscaler")
+
+
+def make_icons(root: str, count: int, min_size: int, max_size: int, seed: int = 0) -> list:
+    """Write `count` RGBA icons of random sizes: a shaded disc on transparency"""
+    rng = np.random.default_rng(seed)
+    paths = []
+    for i in range(count):
+        width, height = rng.integers(min_size, max_size + 1, 2)
+        y, x = np.mgrid[0:height, 0:width]
+        radius = np.hypot((x + 0.5) / width - 0.5, (y + 0.5) / height - 0.5)
+        color = rng.uniform(40, 255, 3) * (1.2 - radius)[:, :, None]
+        alpha = np.clip((0.45 - radius) * 4 * 255, 0, 255)[:, :, None]
+        icon = np.concatenate([color + rng.normal(0, 6, color.shape), alpha], axis=2)
+        path = os.path.join(root, f"icon{i:05d}.png")
+        Image.fromarray(np.clip(icon, 0, 255).astype(np.uint8)).save(path)
+        paths.append(path)
+    return paths
+
+
+def run(upscaler, mode: str, paths: list, output_dir: str, scale: int) -> dict:
+    """Time one pass over every icon, counting model calls"""
+    calls = 0
+    upscale_tiles = upscaler._upscale_tiles
+
+    def counted(tiles, scale):
+        nonlocal calls
+        calls += -(-len(tiles) // upscaler.batch_size)
+        return upscale_tiles(tiles, scale)
+
+    upscaler._upscale_tiles = counted
+    textures = [(path, os.path.join(output_dir, mode, os.path.basename(path))) for path in paths]
+    start = time.perf_counter()
+    if mode == "single":
+        for input_path, output_path in textures:
+            upscaler.upscale_texture(input_path, output_path, scale)
+    else:
+        results = upscaler.upscale_textures(textures, scale, atlas=mode == "atlas")
+        assert all(error is None for _, error in results)
+    seconds = time.perf_counter() - start
+    upscaler._upscale_tiles = upscale_tiles
+    return {
+        "mode": mode,
+        "seconds": round(seconds, 3),
+        "textures_per_second": round(len(paths) / seconds, 2),
+        "model_calls": calls
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--icons", type=int, default=200)
+    parser.add_argument("--min-size", type=int, default=16)
+    parser.add_argument("--max-size", type=int, default=64)
+    parser.add_argument("--model", default="realesr-general-x4v3",
+                        choices=sorted(esrgan.MODELS) + [texture_upscaler.LANCZOS])
+    parser.add_argument("--weights", help="Local weights file (default: download the release weights)")
+    parser.add_argument("--scale", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--modes", default="single,batched,atlas")
+    parser.add_argument("--output", help="Write results JSON here")
+    args = parser.parse_args()
+
+    upscaler = texture_upscaler.TextureUpscaler(args.model, args.weights, batch_size=args.batch_size)
+    random_init = False
+    if args.model != texture_upscaler.LANCZOS:
+        try:
+            esrgan.load_network(args.model, args.weights)
+        except OSError as e:
+            print(f"Could not load {args.model} weights ({e}); using random weights")
+            random_init = True
+        upscaler.model = esrgan.ESRGANBackend(args.model, args.weights, batch_size=args.batch_size,
+                                              random_init=random_init)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_icons(tmp, args.icons, args.min_size, args.max_size)
+        # Untimed warm-up: loads the network
+        upscaler.upscale_textures([(paths[0], os.path.join(tmp, "warmup.png"))], args.scale)
+        runs = [run(upscaler, mode, paths, tmp, args.scale) for mode in args.modes.split(",")]
+
+    results = {
+        "benchmark": "atlas_throughput",
+        "model": args.model,
+        "weights": "random" if random_init else (args.weights or "release"),
+        "icons": args.icons,
+        "sizes": [args.min_size, args.max_size],
+        "scale": args.scale,
+        "runs": runs
+    }
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
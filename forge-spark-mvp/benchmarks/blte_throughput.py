@@ -0,0 +1,112 @@
+"""
+BLTE decode throughput benchmark
+Builds synthetic BLTE blobs (zlib chunks of mixed text/random data and
+stored chunks), decodes them whole and as a chunk stream with 1..N decode
+threads, and reports MB/s as JSON. Exits 1 if any decode does not match
+
+Usage:
+    python -m benchmarks.blte_throughput [--size-mb 64] [--chunk-kb 256] [--workers 1,4] [--output results.json]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import struct
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from . import game_re
+from .tiny_model import SRC_DIR
+
+blte = game_re("extractors.blte")
+
+
+def make_blob(size: int, chunk_size: int, level: int = 6, seed: int = 0):
+    """Synthetic (decoded data, BLTE blob); every fourth chunk is random and stored"""
+    rng = random.Random(seed)
+    text = "".join(p.read_text(encoding="utf-8", errors="replace") for p in sorted(SRC_DIR.rglob("*.py"))).encode()
+    text = text * (chunk_size // len(text) + 2)
+
+    decoded, encoded, table = [], [], []
+    for i in range(0, size, chunk_size):
+        length = min(chunk_size, size - i)
+        if (i // chunk_size) % 4 == 3:
+            data = rng.randbytes(length)
+            chunk = b'N' + data
+        else:
+            start = rng.randrange(chunk_size)
+            data = text[start:start + length]
+            chunk = b'Z' + zlib.compress(data, level)
+        decoded.append(data)
+        encoded.append(chunk)
+        table.append(struct.pack('>II', len(chunk), length) + hashlib.md5(chunk).digest())
+
+    header = b'BLTE' + struct.pack('>I', 12 + 24 * len(table)) + b'\x0f' + len(table).to_bytes(3, 'big')
+    return b''.join(decoded), header + b''.join(table) + b''.join(encoded)
+
+
+def run(blob: bytes, expected: bytes, workers: int, repeat: int):
+    """Best-of-`repeat` timings for whole-blob and streamed decoding"""
+    executor = ThreadPoolExecutor(workers) if workers > 1 else None
+    try:
+        whole, stream, ok = [], [], True
+        for _ in range(repeat):
+            start = time.perf_counter()
+            ok = ok and blte.decode_blte(blob, executor) == expected
+            whole.append(time.perf_counter() - start)
+
+            digest = hashlib.md5()
+            start = time.perf_counter()
+            for chunk in blte.iter_blte(blob, executor, window=workers * 2):
+                digest.update(chunk)
+            stream.append(time.perf_counter() - start)
+            ok = ok and digest.digest() == hashlib.md5(expected).digest()
+    finally:
+        if executor:
+            executor.shutdown()
+
+    return {
+        "workers": workers,
+        "decode_mb_per_second": round(len(expected) / min(whole) / 1e6, 2),
+        "stream_mb_per_second": round(len(expected) / min(stream) / 1e6, 2),
+        "ok": ok
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--chunk-kb", type=int, default=256)
+    parser.add_argument("--workers", default=f"1,{os.cpu_count() or 1}", help="Comma-separated thread counts")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results JSON here")
+    args = parser.parse_args()
+
+    expected, blob = make_blob(args.size_mb * 1024 * 1024, args.chunk_kb * 1024, seed=args.seed)
+    runs = [run(blob, expected, workers, args.repeat)
+            for workers in sorted({int(w) for w in args.workers.split(",")})]
+
+    results = {
+        "benchmark": "blte_throughput",
+        "decoded_bytes": len(expected),
+        "encoded_bytes": len(blob),
+        "chunk_bytes": args.chunk_kb * 1024,
+        "cpu_count": os.cpu_count(),
+        "runs": runs
+    }
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if not all(r["ok"] for r in runs):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
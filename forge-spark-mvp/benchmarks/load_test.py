@@ -0,0 +1,398 @@
+"""
+Load test and latency benchmark for the Forge Spark API
+Starts the server (main.py or main_complete.py) on a tiny local model, replays
+editor-like traffic and writes throughput, p50/p95/p99 latency and
+time-to-first-token per scenario as JSON
+
+Scenarios:
+- keystrokes: editors typing over websockets, one completion request per keystroke
+- chat: concurrent multi-turn chat sessions
+- batch: bursts of concurrent completion / analysis jobs
+
+Usage:
+    python -m benchmarks.load_test [--target main|main_complete] [--output results.json]
+    python -m benchmarks.load_test --baseline previous.json --tolerance 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, TextIO, Tuple
+
+import websockets
+
+from .tiny_model import SRC_DIR, build_tiny_model
+
+ROOT = SRC_DIR.parent
+
+# Per-target routes; main_complete serves completions through the copilot endpoints
+TARGETS = {
+    "main": {
+        "app": "src.main:app",
+        "websocket": "/ws/completion",
+        "chat": "/api/chat",
+        "batch": ["/api/completion"],
+    },
+    "main_complete": {
+        "app": "src.main_complete:app",
+        "websocket": "/ws/realtime",
+        "chat": None,
+        "batch": ["/api/copilot/complete", "/api/copilot/detect-bugs", "/api/copilot/optimize"],
+    },
+}
+
+SNIPPETS = [
+    "def fibonacci(n):\n    if n <= 1:\n        return n\n",
+    "class UserRepository:\n    def __init__(self, db):\n        self.db = db\n",
+    "for item in items:\n    if item in seen:\n        continue\n",
+    "async def fetch(session, url):\n    async with session.get(url) as r:\n",
+]
+
+QUESTIONS = [
+    "How do I read a file line by line in Python?",
+    "What does this error mean: KeyError?",
+    "Can you make it faster?",
+    "How would I test that?",
+]
+
+
+class Recorder:
+    """Latency samples for one scenario"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.ttfts: List[float] = []
+        self.errors = 0
+        self.start = None
+        self.end = None
+
+    def add(self, latency: float, ttft: float):
+        self.latencies.append(latency)
+        self.ttfts.append(ttft)
+
+    def summary(self) -> Dict:
+        elapsed = (self.end or time.perf_counter()) - (self.start or 0)
+        return {
+            "scenario": self.name,
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "duration_s": round(elapsed, 3),
+            "throughput_rps": round(len(self.latencies) / elapsed, 3) if elapsed > 0 else 0.0,
+            "latency_ms": percentiles(self.latencies),
+            "ttft_ms": percentiles(self.ttfts),
+        }
+
+
+def percentiles(samples: List[float]) -> Dict:
+    if not samples:
+        return {"p50": None, "p95": None, "p99": None, "mean": None}
+    ordered = sorted(samples)
+
+    def pick(q):
+        # Nearest-rank percentile
+        index = min(len(ordered) - 1, max(0, int(round(q * len(ordered) + 0.5)) - 1))
+        return round(ordered[index] * 1000, 3)
+
+    return {
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "mean": round(sum(ordered) / len(ordered) * 1000, 3),
+    }
+
+
+# ----------------------------------------------------------------------
+# Minimal HTTP client (time-to-first-byte needs access to the raw stream)
+# ----------------------------------------------------------------------
+
+async def http_request(host: str, port: int, method: str, path: str, body: Optional[Dict] = None):
+    """Returns (status, payload bytes, ttfb seconds, total seconds)"""
+    data = json.dumps(body).encode() if body is not None else b""
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        head = (
+            f"{method} {path} HTTP/1.1\r\nHost: {host}:{port}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode()
+        writer.write(head + data)
+        await writer.drain()
+
+        first = await reader.read(1)
+        ttfb = time.perf_counter() - start
+        rest = await reader.read()
+        total = time.perf_counter() - start
+    finally:
+        writer.close()
+
+    response = first + rest
+    header, _, payload = response.partition(b"\r\n\r\n")
+    status = int(header.split(b" ", 2)[1]) if header else 0
+    return status, payload, ttfb, total
+
+
+# ----------------------------------------------------------------------
+# Scenarios
+# ----------------------------------------------------------------------
+
+async def keystroke_client(url: str, target: str, recorder: Recorder, keystrokes: int, rng: random.Random):
+    """One editor typing a snippet; every keystroke asks for a completion"""
+    text = rng.choice(SNIPPETS)
+    async with websockets.connect(url, max_size=None) as ws:
+        for i in range(keystrokes):
+            code = text[:(i % len(text)) + 1]
+            message = {"code": code, "cursor_position": len(code), "language": "python", "timestamp": time.time()}
+            if target == "main_complete":
+                message["type"] = "completion"
+
+            start = time.perf_counter()
+            try:
+                await ws.send(json.dumps(message))
+                await ws.recv()
+                elapsed = time.perf_counter() - start
+                # One message per reply, so the first token arrives with the reply
+                recorder.add(elapsed, elapsed)
+            except websockets.ConnectionClosed:
+                recorder.errors += 1
+                return
+
+            # Bursty typing: fast runs of keys, occasional pauses
+            await asyncio.sleep(rng.choice([0.03, 0.05, 0.08, 0.08, 0.3]))
+
+
+async def chat_client(host: str, port: int, path: str, recorder: Recorder, turns: int, client_id: int):
+    session_id = f"load-test-{client_id}-{time.time_ns()}"
+    for turn in range(turns):
+        body = {"message": QUESTIONS[turn % len(QUESTIONS)], "session_id": session_id}
+        try:
+            status, _, ttfb, total = await http_request(host, port, "POST", path, body)
+        except OSError:
+            recorder.errors += 1
+            continue
+        if status != 200:
+            recorder.errors += 1
+            continue
+        recorder.add(total, ttfb)
+    try:
+        await http_request(host, port, "DELETE", f"/api/chat/sessions/{session_id}")
+    except OSError:
+        pass
+
+
+async def batch_burst(host: str, port: int, paths: List[str], recorder: Recorder, size: int, rng: random.Random):
+    async def one(i):
+        path = paths[i % len(paths)]
+        body = {"code": rng.choice(SNIPPETS), "language": "python"}
+        try:
+            status, _, ttfb, total = await http_request(host, port, "POST", path, body)
+        except OSError:
+            recorder.errors += 1
+            return
+        if status != 200:
+            recorder.errors += 1
+            return
+        recorder.add(total, ttfb)
+
+    await asyncio.gather(*[one(i) for i in range(size)])
+
+
+async def run_scenarios(host: str, port: int, target: str, args) -> List[Dict]:
+    routes = TARGETS[target]
+    rng = random.Random(args.seed)
+    results = []
+
+    recorder = Recorder("keystrokes")
+    recorder.start = time.perf_counter()
+    url = f"ws://{host}:{port}{routes['websocket']}"
+    await asyncio.gather(*[
+        keystroke_client(url, target, recorder, args.keystrokes, random.Random(args.seed + i))
+        for i in range(args.editors)
+    ])
+    recorder.end = time.perf_counter()
+    results.append(recorder.summary())
+
+    if routes["chat"]:
+        recorder = Recorder("chat")
+        recorder.start = time.perf_counter()
+        await asyncio.gather(*[
+            chat_client(host, port, routes["chat"], recorder, args.chat_turns, i)
+            for i in range(args.chat_clients)
+        ])
+        recorder.end = time.perf_counter()
+        results.append(recorder.summary())
+
+    recorder = Recorder("batch")
+    recorder.start = time.perf_counter()
+    for _ in range(args.batches):
+        await batch_burst(host, port, routes["batch"], recorder, args.batch_size, rng)
+    recorder.end = time.perf_counter()
+    results.append(recorder.summary())
+
+    return results
+
+
+# ----------------------------------------------------------------------
+# Server lifecycle
+# ----------------------------------------------------------------------
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(host: str, port: int, process: subprocess.Popen, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode} during startup")
+        try:
+            status, _, _, _ = await http_request(host, port, "GET", "/health")
+            if status == 200:
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server not ready after {timeout}s")
+
+
+def start_server(target: str, model: str, port: int, log_path: str) -> Tuple[subprocess.Popen, TextIO]:
+    """Server process and its open log file (close the log once the process exits)"""
+    env = dict(os.environ, FORGE_SPARK_MODEL=model, PYTHONUNBUFFERED="1")
+    log = open(log_path, "w")
+    try:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", TARGETS[target]["app"],
+             "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+            cwd=str(ROOT),
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+    except OSError:
+        log.close()
+        raise
+    return process, log
+
+
+async def warm_up(host: str, port: int, target: str):
+    """First request loads the model; keep it out of the measurements"""
+    routes = TARGETS[target]
+    await http_request(host, port, "POST", routes["batch"][0], {"code": "def f(", "language": "python"})
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=str(ROOT), capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results: Dict, baseline_path: str, tolerance: float) -> List[str]:
+    """p95 latency regressions beyond `tolerance` (fractional) versus a baseline run"""
+    with open(baseline_path) as f:
+        baseline = {s["scenario"]: s for s in json.load(f)["scenarios"]}
+
+    regressions = []
+    for scenario in results["scenarios"]:
+        before = baseline.get(scenario["scenario"])
+        if not before:
+            continue
+        old, new = before["latency_ms"]["p95"], scenario["latency_ms"]["p95"]
+        if old and new and new > old * (1 + tolerance):
+            regressions.append(f"{scenario['scenario']}: p95 {old}ms -> {new}ms")
+    return regressions
+
+
+async def main_async(args) -> Dict:
+    model = args.model or build_tiny_model()
+    host = "127.0.0.1"
+    port = args.port or free_port()
+    log_path = args.server_log
+
+    process, log = start_server(args.target, model, port, log_path)
+    try:
+        try:
+            await wait_ready(host, port, process, args.startup_timeout)
+        except RuntimeError as e:
+            raise SystemExit(f"{e} (server log: {log_path})")
+        await warm_up(host, port, args.target)
+        scenarios = await run_scenarios(host, port, args.target, args)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        log.close()
+
+    return {
+        "benchmark": "load_test",
+        "target": args.target,
+        "model": model,
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "editors": args.editors,
+            "keystrokes": args.keystrokes,
+            "chat_clients": args.chat_clients,
+            "chat_turns": args.chat_turns,
+            "batches": args.batches,
+            "batch_size": args.batch_size,
+            "seed": args.seed,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=sorted(TARGETS), default="main")
+    parser.add_argument("--model", help="Model name or path (default: build a tiny local model)")
+    parser.add_argument("--port", type=int, help="Server port (default: a free port)")
+    parser.add_argument("--editors", type=int, default=4, help="Concurrent websocket editors")
+    parser.add_argument("--keystrokes", type=int, default=40, help="Keystrokes per editor")
+    parser.add_argument("--chat-clients", type=int, default=4)
+    parser.add_argument("--chat-turns", type=int, default=4)
+    parser.add_argument("--batches", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--server-log", default="load_test_server.log")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Previous results JSON to compare p95 latency against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
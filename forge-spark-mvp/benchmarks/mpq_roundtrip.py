@@ -0,0 +1,116 @@
+"""
+MPQ writer round-trip and throughput benchmark
+Packs a synthetic asset set (source text, incompressible data, zero-filled
+and empty files) with MPQWriter, reads every file back through MPQExtractor,
+and reports write/read MB/s as JSON. Correctness is covered by
+tests/test_mpq_writer.py
+
+Usage:
+    python -m benchmarks.mpq_roundtrip [--files 400] [--max-size 4000000] [--workers 1,4] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from . import game_re
+from .tiny_model import SRC_DIR
+
+MPQExtractor = game_re("extractors.mpq_extractor").MPQExtractor
+MPQWriter = game_re("extractors.mpq_writer").MPQWriter
+
+
+def make_files(directory: str, count: int, max_size: int, seed: int = 0):
+    """Write `count` synthetic assets under `directory`; returns {archive name: path}"""
+    rng = random.Random(seed)
+    text = "".join(p.read_text(encoding="utf-8", errors="replace") for p in sorted(SRC_DIR.rglob("*.py"))).encode()
+    files = {}
+    for i in range(count):
+        kind = ("text", "random", "zeros", "text", "mixed")[i % 5]
+        size = 0 if i % 97 == 0 else int(rng.paretovariate(1.2) * 4096) % max_size
+        if kind == "text":
+            start = rng.randrange(len(text))
+            data = (text[start:] + text) * (size // len(text) + 1)
+        elif kind == "random":
+            data = rng.randbytes(size)
+        elif kind == "zeros":
+            data = bytes(size)
+        else:
+            data = rng.randbytes(size // 2) + text[:size - size // 2]
+        name = f"Data\\Set{i % 7}\\asset_{i:05d}.{kind}"
+        path = os.path.join(directory, f"asset_{i:05d}.{kind}")
+        with open(path, "wb") as f:
+            f.write(data[:size])
+        files[name] = path
+    return files
+
+
+def write_archive(files, output_path: str, compression: str, workers: int):
+    with MPQWriter(output_path, compression=compression, workers=workers) as writer:
+        for name, path in files.items():
+            writer.add_file(name, path)
+    return writer.summary
+
+
+def read_archive(files, archive_path: str) -> float:
+    """Seconds to read every file back"""
+    start = time.perf_counter()
+    with MPQExtractor(archive_path, cache_dir=None) as archive:
+        for name in files:
+            archive.read_file(name)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=400)
+    parser.add_argument("--max-size", type=int, default=4_000_000)
+    parser.add_argument("--compression", choices=["zlib", "bzip2", "none"], default="zlib")
+    parser.add_argument("--workers", default=f"1,{os.cpu_count() or 1}", help="Comma-separated worker counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results JSON here")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="mpq-bench-")
+    try:
+        files = make_files(workdir, args.files, args.max_size, args.seed)
+        total_bytes = sum(os.path.getsize(path) for path in files.values())
+        runs = []
+        for workers in sorted({int(w) for w in args.workers.split(",")}):
+            archive_path = os.path.join(workdir, f"bench-{workers}.mpq")
+            summary = write_archive(files, archive_path, args.compression, workers)
+            read_seconds = read_archive(files, archive_path)
+            runs.append({
+                "workers": workers,
+                "write_seconds": summary["seconds"],
+                "write_mb_per_second": summary["mb_per_second"],
+                "read_mb_per_second": round(total_bytes / read_seconds / 1e6, 2) if read_seconds else 0.0,
+                "archive_bytes": summary["bytes_out"],
+                "ratio": round(summary["bytes_out"] / total_bytes, 4) if total_bytes else 0.0
+            })
+            os.remove(archive_path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        "benchmark": "mpq_roundtrip",
+        "files": len(files),
+        "input_bytes": total_bytes,
+        "compression": args.compression,
+        "cpu_count": os.cpu_count(),
+        "runs": runs
+    }
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Normal map generation benchmark
+Generates height and normal maps from a synthetic 8K texture in row strips,
+on one core, and reports seconds, input megapixels/sec and peak working
+memory (excluding the input) as JSON, per kernel and strip size
+
+Usage:
+    python -m benchmarks.normal_map_throughput [--size 8192] [--strips 16,64,256] [--png DIR]
+                                               [--output results.json]
+"""
+
+import os
+
+# One core: keep BLAS (used for the luminance dot product) single-threaded
+for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
+import argparse
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+from . import game_re
+
+normal_maps = game_re("upscalers.normal_maps")
+png_writer = game_re("upscalers.png_writer")
+
+
+def make_texture(size: int, seed: int = 0) -> np.ndarray:
+    """(size, size, 3) uint8: a 1024px block of gradients and noise, repeated"""
+    rng = np.random.default_rng(seed)
+    block = min(size, 1024)
+    y, x = np.mgrid[0:block, 0:block] / block
+    base = np.stack([np.sin(6 * x + 2 * y), np.cos(5 * y - 3 * x), np.sin(9 * x * y)], axis=2)
+    texture = np.clip(127.5 + 90 * base + rng.normal(0, 12, (block, block, 3)), 0, 255).astype(np.uint8)
+    reps = -(-size // block)
+    return np.tile(texture, (reps, reps, 1))[:size, :size]
+
+
+def run(image: np.ndarray, kernel: str, strip_rows: int, png_dir: str = None) -> dict:
+    """Time one generate_normal_map() pass; rows are discarded unless png_dir is set"""
+    height, width = image.shape[:2]
+    rows = {"normal": 0, "height": 0}
+
+    def count(name):
+        def sink(band):
+            rows[name] += len(band)
+        return sink
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    if png_dir:
+        with png_writer.PNGStreamWriter(os.path.join(png_dir, "normal.png"), width, height, 3) as normals, \
+                png_writer.PNGStreamWriter(os.path.join(png_dir, "height.png"), width, height, 1) as heights:
+            normal_maps.generate_normal_map(image, normals.write_rows, heights.write_rows, kernel=kernel,
+                                            strip_rows=strip_rows)
+            rows["normal"], rows["height"] = normals.rows_written, heights.rows_written
+    else:
+        normal_maps.generate_normal_map(image, count("normal"), count("height"), kernel=kernel,
+                                        strip_rows=strip_rows)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert rows["normal"] == rows["height"] == height
+
+    return {
+        "kernel": kernel,
+        "strip_rows": strip_rows,
+        "png": bool(png_dir),
+        "seconds": round(seconds, 3),
+        "input_megapixels_per_second": round(width * height / 1e6 / seconds, 2),
+        "peak_working_mb": round(peak / 2**20, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=8192, help="Texture edge in pixels")
+    parser.add_argument("--strips", default="16,64,256", help="Comma-separated strip heights in rows")
+    parser.add_argument("--kernels", default="sobel,scharr")
+    parser.add_argument("--png", help="Also stream PNG output into this directory")
+    parser.add_argument("--output", help="Write results JSON here")
+    args = parser.parse_args()
+
+    image = make_texture(args.size)
+    if args.png:
+        os.makedirs(args.png, exist_ok=True)
+
+    runs = []
+    for kernel in args.kernels.split(","):
+        for strip_rows in sorted({int(s) for s in args.strips.split(",")}):
+            runs.append(run(image, kernel, strip_rows))
+    if args.png:
+        runs.append(run(image, args.kernels.split(",")[0], max(int(s) for s in args.strips.split(",")), args.png))
+
+    results = {
+        "benchmark": "normal_map_throughput",
+        "input": [args.size, args.size],
+        "input_mb": round(image.nbytes / 2**20, 1),
+        "runs": runs
+    }
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Texture dedupe benchmark
+Builds a synthetic texture dump with exact copies, re-encoded copies and
+recolours of a set of distinct textures, batch upscales it with and without
+the dedupe pre-pass, and reports wall time, duplicates found, the estimated
+upscale time saved and the pre-pass cost as JSON
+
+Usage:
+    python -m benchmarks.texture_dedupe [--textures 400] [--size 64] [--duplicates 0.5]
+                                        [--model lanczos] [--workers 1] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+from . import game_re
+
+texture_upscaler = game_re("upscalers.texture_upscaler")
+
+
+def make_texture(size: int, rng: np.random.Generator) -> np.ndarray:
+    """(size, size, 3) uint8: random low-frequency pattern with fine noise"""
+    y, x = np.mgrid[0:size, 0:size] / size
+    a, b, c = rng.uniform(2, 12, 3)
+    base = np.stack([np.sin(a * x + b * y), np.cos(b * y - c * x), np.sin(c * x * y)], axis=2)
+    texture = 127.5 + 90 * base + rng.normal(0, 8, (size, size, 3))
+    return np.clip(texture, 0, 255).astype(np.uint8)
+
+
+def make_dump(root: str, textures: int, size: int, duplicates: float, seed: int = 0) -> dict:
+    """
+    Write `textures` PNGs, `duplicates` of them copies of the distinct rest
+
+    Copies are split between byte-identical files, the same pixels saved
+    at another compression level, and channel-swapped recolours (which
+    must still be upscaled).
+    """
+    rng = np.random.default_rng(seed)
+    distinct = max(1, round(textures * (1 - duplicates)))
+    counts = {"distinct": distinct, "exact": 0, "reencoded": 0, "recolour": 0}
+    for i in range(distinct):
+        Image.fromarray(make_texture(size, rng)).save(os.path.join(root, f"t{i:05d}.png"))
+    for i in range(distinct, textures):
+        source = os.path.join(root, f"t{rng.integers(distinct):05d}.png")
+        target = os.path.join(root, f"t{i:05d}.png")
+        kind = ("exact", "reencoded", "recolour")[i % 3]
+        counts[kind] += 1
+        if kind == "exact":
+            shutil.copyfile(source, target)
+        else:
+            with Image.open(source) as img:
+                pixels = np.asarray(img)
+            if kind == "recolour":
+                pixels = pixels[:, :, ::-1]
+            Image.fromarray(pixels).save(target, compress_level=1)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--textures", type=int, default=400)
+    parser.add_argument("--size", type=int, default=64, help="Texture edge in pixels")
+    parser.add_argument("--duplicates", type=float, default=0.5, help="Fraction of textures that are copies")
+    parser.add_argument("--model", default=texture_upscaler.LANCZOS)
+    parser.add_argument("--scale", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--output", help="Write results JSON here")
+    args = parser.parse_args()
+
+    upscaler = texture_upscaler.TextureUpscaler(args.model)
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "dump")
+        os.makedirs(source)
+        counts = make_dump(source, args.textures, args.size, args.duplicates)
+        for dedupe in (False, True):
+            summary = upscaler.batch_upscale_directory(source, os.path.join(tmp, f"out-{dedupe}"), args.scale,
+                                                       workers=args.workers, dedupe=dedupe)
+            run = {"dedupe": dedupe, "seconds": summary["seconds"], "upscaled": summary["upscaled"]}
+            if dedupe:
+                run.update(duplicates=summary["duplicates"], seconds_saved=summary["seconds_saved"],
+                           dedupe_seconds=summary["dedupe_seconds"],
+                           near_duplicate_clusters=len(summary["near_duplicates"]))
+            runs.append(run)
+
+    results = {
+        "benchmark": "texture_dedupe",
+        "model": args.model,
+        "textures": args.textures,
+        "input": [args.size, args.size],
+        "dump": counts,
+        "speedup": round(runs[0]["seconds"] / runs[1]["seconds"], 2) if runs[1]["seconds"] else None,
+        "runs": runs
+    }
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
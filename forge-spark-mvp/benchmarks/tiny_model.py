@@ -0,0 +1,57 @@
+"""
+Tiny local model for benchmarks
+Builds a randomly initialized GPT-2 with a byte-level BPE tokenizer trained on
+this repository's own sources, so benchmarks run offline in seconds
+"""
+
+import os
+from pathlib import Path
+
+DEFAULT_PATH = "./models/tiny-gpt2-bench"
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+
+def _corpus():
+    for path in sorted(SRC_DIR.rglob("*.py")):
+        yield path.read_text(encoding="utf-8", errors="replace")
+
+
+def build_tiny_model(path: str = DEFAULT_PATH, vocab_size: int = 2000) -> str:
+    """Create (once) and return the path of a tiny GPT-2 model directory"""
+    if os.path.exists(os.path.join(path, "config.json")):
+        return path
+
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+    from transformers import GPT2Config, GPT2LMHeadModel, PreTrainedTokenizerFast
+
+    backend = Tokenizer(models.BPE())
+    backend.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    backend.decoder = decoders.ByteLevel()
+    trainer = trainers.BpeTrainer(
+        vocab_size=vocab_size,
+        special_tokens=["<|endoftext|>"],
+        initial_alphabet=pre_tokenizers.ByteLevel.alphabet()
+    )
+    backend.train_from_iterator(_corpus(), trainer)
+
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=backend, eos_token="<|endoftext|>")
+    model = GPT2LMHeadModel(GPT2Config(
+        vocab_size=len(tokenizer),
+        n_positions=1024,
+        n_embd=64,
+        n_layer=2,
+        n_head=2,
+        bos_token_id=tokenizer.eos_token_id,
+        eos_token_id=tokenizer.eos_token_id
+    ))
+
+    os.makedirs(path, exist_ok=True)
+    tokenizer.save_pretrained(path)
+    model.save_pretrained(path)
+    print(f"Built tiny benchmark model: {path}")
+    return path
+
+
+if __name__ == "__main__":
+    build_tiny_model()
@@ -0,0 +1,165 @@
+"""
+Tokenizer overhead benchmark
+Measures tokenization as a fraction of request time for the old per-request
+path (tokenizer(prompt) + full decode + character slicing) and the
+TokenizationService path (batched encode, decode of new tokens only)
+
+Usage:
+    python -m benchmarks.tokenizer_overhead [--model NAME_OR_PATH] [--requests 64] [--output results.json]
+"""
+
+import argparse
+import json
+import random
+import time
+
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer
+
+from src.tokenization import TokenizationService
+
+from .tiny_model import SRC_DIR, build_tiny_model
+
+
+def make_prompts(count: int, chars: int, seed: int = 0):
+    """Editor-like prompts: random windows of this repository's source code"""
+    sources = [p.read_text(encoding="utf-8", errors="replace") for p in sorted(SRC_DIR.rglob("*.py"))]
+    sources = [s for s in sources if len(s) > chars]
+    rng = random.Random(seed)
+    prompts = []
+    for _ in range(count):
+        source = rng.choice(sources)
+        start = rng.randrange(0, len(source) - chars)
+        prompts.append(source[start:start + chars])
+    return prompts
+
+
+def _generate(model, tokenizer, input_ids, max_new_tokens):
+    with torch.no_grad():
+        return model.generate(
+            input_ids=input_ids,
+            attention_mask=torch.ones_like(input_ids),
+            max_new_tokens=max_new_tokens,
+            do_sample=False,
+            pad_token_id=tokenizer.eos_token_id
+        )
+
+
+def run_legacy(model, tokenizer, prompts, max_new_tokens):
+    """Per-request encode, full-sequence decode, character slicing"""
+    encode = generate = decode = 0.0
+    for prompt in prompts:
+        t0 = time.perf_counter()
+        inputs = tokenizer(prompt, return_tensors="pt", padding=True, truncation=True, max_length=512)
+        t1 = time.perf_counter()
+        outputs = _generate(model, tokenizer, inputs.input_ids, max_new_tokens)
+        t2 = time.perf_counter()
+        completion = tokenizer.decode(outputs[0], skip_special_tokens=True)
+        completion[len(prompt):]
+        t3 = time.perf_counter()
+        encode += t1 - t0
+        generate += t2 - t1
+        decode += t3 - t2
+    return encode, generate, decode
+
+
+def run_service(model, service, prompts, max_new_tokens):
+    """Queued requests encoded in one batch, only new tokens decoded, in one batch"""
+    t0 = time.perf_counter()
+    batch_ids = service.encode_batch(prompts)
+    encode = time.perf_counter() - t0
+
+    generate = 0.0
+    new_tokens = []
+    for ids in batch_ids:
+        ids = ids[:512]
+        t1 = time.perf_counter()
+        outputs = _generate(model, service.tokenizer, torch.tensor([ids]), max_new_tokens)
+        generate += time.perf_counter() - t1
+        new_tokens.append(outputs[0][len(ids):].tolist())
+
+    t2 = time.perf_counter()
+    service.decode_batch(new_tokens)
+    decode = time.perf_counter() - t2
+    return encode, generate, decode
+
+
+def summarize(name, encode, generate, decode, requests):
+    total = encode + generate + decode
+    return {
+        "path": name,
+        "requests": requests,
+        "encode_ms_per_request": round(encode / requests * 1000, 4),
+        "decode_ms_per_request": round(decode / requests * 1000, 4),
+        "generate_ms_per_request": round(generate / requests * 1000, 4),
+        "tokenizer_fraction": round((encode + decode) / total, 5) if total else 0.0
+    }
+
+
+def bench_count_cache(service, prompts, repeats: int = 20):
+    """Token counting of recently seen strings: uncached vs memoized"""
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        for prompt in prompts:
+            service._count_uncached(prompt)
+    uncached = time.perf_counter() - t0
+
+    t1 = time.perf_counter()
+    for _ in range(repeats):
+        for prompt in prompts:
+            service.count_tokens(prompt)
+    cached = time.perf_counter() - t1
+
+    calls = repeats * len(prompts)
+    return {
+        "calls": calls,
+        "uncached_us_per_call": round(uncached / calls * 1e6, 3),
+        "cached_us_per_call": round(cached / calls * 1e6, 3),
+        "hit_rate": round(service.cache_info().hits / calls, 4)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="Model name or path (default: build a tiny local model)")
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--prompt-chars", type=int, default=1200)
+    parser.add_argument("--max-new-tokens", type=int, default=16)
+    parser.add_argument("--output", help="Write results JSON here")
+    args = parser.parse_args()
+
+    model_name = args.model or build_tiny_model()
+    model = AutoModelForCausalLM.from_pretrained(model_name).eval()
+    legacy_tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if legacy_tokenizer.pad_token is None:
+        legacy_tokenizer.pad_token = legacy_tokenizer.eos_token
+    service = TokenizationService.from_pretrained(model_name)
+
+    prompts = make_prompts(args.requests, args.prompt_chars)
+
+    # Warm up both paths
+    run_legacy(model, legacy_tokenizer, prompts[:2], 2)
+    run_service(model, service, prompts[:2], 2)
+
+    legacy = summarize("legacy", *run_legacy(model, legacy_tokenizer, prompts, args.max_new_tokens), len(prompts))
+    batched = summarize("tokenization_service", *run_service(model, service, prompts, args.max_new_tokens), len(prompts))
+
+    results = {
+        "benchmark": "tokenizer_overhead",
+        "model": model_name,
+        "fast_tokenizer": service.tokenizer.is_fast,
+        "max_new_tokens": args.max_new_tokens,
+        "prompt_chars": args.prompt_chars,
+        "paths": [legacy, batched],
+        "token_count_cache": bench_count_cache(service, prompts)
+    }
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
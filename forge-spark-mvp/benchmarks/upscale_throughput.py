@@ -0,0 +1,120 @@
+"""
+Texture upscale throughput benchmark
+Upscales a synthetic texture through the tiled engine with Lanczos, a
+Real-ESRGAN network in fp32 and the same network quantized to int8, at each
+batch size, and reports output megapixels/sec as JSON (plus the int8 error
+against fp32). Without downloadable weights the network is randomly
+initialized, which leaves its speed unchanged
+
+Usage:
+    python -m benchmarks.upscale_throughput [--model realesr-general-x4v3] [--size 256] [--batch 1,8]
+                                            [--weights model.pth] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from . import game_re
+
+esrgan = game_re("upscalers.esrgan")
+tiling = game_re("upscalers.tiling")
+texture_upscaler = game_re("upscalers.texture_upscaler")
+
+
+def make_texture(size: int, seed: int = 0) -> np.ndarray:
+    """(size, size, 3) uint8: smooth gradients with fine noise, roughly like a terrain texture"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:size, 0:size] / size
+    base = np.stack([np.sin(6 * x + 2 * y), np.cos(5 * y - 3 * x), np.sin(9 * x * y)], axis=2)
+    texture = 127.5 + 90 * base + rng.normal(0, 12, (size, size, 3))
+    return np.clip(texture, 0, 255).astype(np.uint8)
+
+
+def run(name: str, upscale, image: np.ndarray, scale: int, tile_size: int, batch_size: int, repeat: int,
+        bytes_per_pixel=None):
+    """Best-of-`repeat` time of one tiled upscale; returns (stats, output)"""
+    # Untimed first call: loads (and for int8 quantizes) the network
+    upscale([image[:tile_size, :tile_size]], scale)
+    times = []
+    for _ in range(repeat):
+        bands = []
+        start = time.perf_counter()
+        tile, batch = tiling.upscale_tiled(image, scale, upscale, bands.append, tile_size=tile_size,
+                                           batch_size=batch_size, max_memory_mb=4096,
+                                           bytes_per_pixel=bytes_per_pixel)
+        times.append(time.perf_counter() - start)
+    output = np.concatenate(bands)
+    megapixels = output.shape[0] * output.shape[1] / 1e6
+    return {
+        "backend": name,
+        "tile_size": tile,
+        "batch_size": batch,
+        "seconds": round(min(times), 3),
+        "output_megapixels_per_second": round(megapixels / min(times), 3)
+    }, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="realesr-general-x4v3", choices=sorted(esrgan.MODELS))
+    parser.add_argument("--weights", help="Local weights file (default: download the release weights)")
+    parser.add_argument("--random-weights", action="store_true", help="Skip loading weights")
+    parser.add_argument("--size", type=int, default=256, help="Input texture edge in pixels")
+    parser.add_argument("--scale", type=int, default=4)
+    parser.add_argument("--tile-size", type=int, default=64)
+    parser.add_argument("--batch", default="1,8", help="Comma-separated batch sizes")
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=2)
+    parser.add_argument("--output", help="Write results JSON here")
+    args = parser.parse_args()
+
+    random_init = args.random_weights
+    if not random_init:
+        try:
+            esrgan.load_network(args.model, args.weights)
+        except OSError as e:
+            print(f"Could not load {args.model} weights ({e}); using random weights")
+            random_init = True
+
+    image = make_texture(args.size)
+    lanczos = texture_upscaler.TextureUpscaler(texture_upscaler.LANCZOS)
+    stats, _ = run("lanczos", lanczos._upscale_tiles, image, args.scale, args.tile_size, 1, args.repeat)
+    runs = [stats]
+
+    outputs = {}
+    for quantize in (False, True):
+        for batch_size in sorted({int(b) for b in args.batch.split(",")}):
+            backend = esrgan.ESRGANBackend(args.model, args.weights, quantize, batch_size, args.threads,
+                                           random_init=random_init)
+            stats, output = run("int8" if quantize else "fp32", backend.upscale_batch, image, args.scale,
+                                args.tile_size, batch_size, args.repeat, backend.bytes_per_pixel)
+            outputs[quantize] = output
+            runs.append(stats)
+
+    error = np.abs(outputs[True].astype(np.int16) - outputs[False].astype(np.int16))
+    results = {
+        "benchmark": "upscale_throughput",
+        "model": args.model,
+        "weights": "random" if random_init else (args.weights or "release"),
+        "input": [args.size, args.size],
+        "scale": args.scale,
+        "threads": args.threads,
+        "cpu_count": os.cpu_count(),
+        "int8_mean_abs_error": round(float(error.mean()), 3),
+        "int8_max_abs_error": int(error.max()),
+        "runs": runs
+    }
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,19 +3,29 @@ AI Engine - Handles loading and running Hugging Face models
 This is REAL working code that loads and uses AI models
 """
 
-from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
+from transformers import AutoModelForCausalLM
 import torch
 import os
-from typing import Optional
+from typing import List, Optional
+
+from .conversation import ConversationSession, ConversationStore
+from .tokenization import TokenizationService
 
 class AIEngine:
     def __init__(self, cache_dir: str = "./models"):
         self.cache_dir = cache_dir
         self.model = None
         self.tokenizer = None
-        self.current_model = "distilgpt2"  # Start with small, fast model
+        self.tokenization = None
+        # Start with small, fast model (FORGE_SPARK_MODEL overrides, e.g. for benchmarks)
+        self.current_model = os.environ.get("FORGE_SPARK_MODEL", "distilgpt2")
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         
+        # Server-side chat sessions
+        self.conversations = ConversationStore()
+        self.chat_token_budget = 1024
+        self.chat_keep_turns = 2
+        
         # Create cache directory if it doesn't exist
         os.makedirs(cache_dir, exist_ok=True)
         
@@ -27,9 +37,9 @@ class AIEngine:
         """Check if model is loaded"""
         return self.model is not None
     
-    def load_model(self, model_name: str = "distilgpt2"):
+    def load_model(self, model_name: Optional[str] = None):
         """
-        Load a Hugging Face model
+        Load a Hugging Face model (default: current_model)
         
         Free models you can use:
         - distilgpt2 (small, fast, 80MB) - RECOMMENDED for testing
@@ -37,13 +47,16 @@ class AIEngine:
         - bigcode/tiny_starcoder_py (code, 164MB)
         - Salesforce/codegen-350M-mono (code, 350MB)
         """
+        model_name = model_name or self.current_model
         try:
             print(f"📥 Loading model: {model_name}")
             
-            self.tokenizer = AutoTokenizer.from_pretrained(
+            # Always the Rust fast tokenizer (slow ones are converted)
+            self.tokenization = TokenizationService.from_pretrained(
                 model_name,
                 cache_dir=self.cache_dir
             )
+            self.tokenizer = self.tokenization.tokenizer
             
             # Set pad token if not set
             if self.tokenizer.pad_token is None:
@@ -71,17 +84,14 @@ class AIEngine:
             self.load_model()
         
         try:
-            inputs = self.tokenizer(
-                prompt,
-                return_tensors="pt",
-                padding=True,
-                truncation=True,
-                max_length=512
-            ).to(self.device)
+            # Concurrent requests are encoded in one batched call
+            prompt_ids = (await self.tokenization.encode_async(prompt))[:512]
+            input_ids = torch.tensor([prompt_ids], device=self.device)
             
             outputs = self.model.generate(
-                **inputs,
-                max_length=len(inputs.input_ids[0]) + max_length,
+                input_ids=input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                max_length=len(prompt_ids) + max_length,
                 num_return_sequences=1,
                 temperature=0.7,
                 do_sample=True,
@@ -89,20 +99,32 @@ class AIEngine:
                 pad_token_id=self.tokenizer.eos_token_id
             )
             
-            completion = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-            
-            # Return only the new generated text
-            return completion[len(prompt):]
+            # Decode only the newly generated token ids
+            return await self.tokenization.decode_async(outputs[0][len(prompt_ids):].tolist())
             
         except Exception as e:
             print(f"Error generating completion: {e}")
             return f"# Error: {str(e)}"
     
-    async def chat(self, message: str, context: Optional[str] = None) -> str:
-        """Chat with AI about coding"""
+    async def chat(
+        self,
+        message: str,
+        context: Optional[str] = None,
+        session_id: Optional[str] = None
+    ) -> str:
+        """
+        Chat with AI about coding
+        
+        With a session_id, earlier turns are kept server-side: clients send only
+        the new message, and the model's KV cache from the previous turn is
+        reused so only the new question is encoded.
+        """
         if not self.is_loaded():
             self.load_model()
         
+        if session_id is not None:
+            return self._chat_in_session(session_id, message, context)
+        
         # Create a prompt for coding assistance
         prompt = f"Question: {message}\n\nAnswer:"
         if context:
@@ -110,3 +132,109 @@ class AIEngine:
         
         response = await self.generate_completion(prompt, max_length=200)
         return response.strip()
+    
+    def end_session(self, session_id: str) -> bool:
+        """Drop a chat session and its KV cache"""
+        return self.conversations.delete(session_id)
+    
+    def _encode(self, text: str, add_special_tokens: bool = True) -> List[int]:
+        return self.tokenization.encode(text, add_special_tokens)
+    
+    def _max_positions(self) -> int:
+        config = self.model.config
+        return getattr(config, "n_positions", None) or getattr(config, "max_position_embeddings", 1024)
+    
+    def _chat_in_session(
+        self,
+        session_id: str,
+        message: str,
+        context: Optional[str],
+        max_new_tokens: int = 200
+    ) -> str:
+        session = self.conversations.get_or_create(session_id, context)
+        if not session.token_ids:
+            session.token_ids = self._encode(session.render())
+        
+        # Prompt tokens available this turn; an oversized question keeps its tail.
+        # The answer gives way so at least one prompt token fits in the budget.
+        total_budget = min(self.chat_token_budget, self._max_positions())
+        if total_budget < 2:
+            raise ValueError(f"chat_token_budget={self.chat_token_budget} leaves no room for a prompt and an answer")
+        max_new_tokens = min(max_new_tokens, self._max_positions() // 2, total_budget - 1)
+        prompt_budget = total_budget - max_new_tokens
+        question_ids = self._encode(f"Question: {message}\n\nAnswer:", False)[-prompt_budget:]
+        budget = prompt_budget - len(question_ids)
+        if len(session.token_ids) > budget:
+            self._compact_session(session, budget)
+        
+        answer_ids = self._generate_cached(session, question_ids, max_new_tokens)
+        answer = self.tokenization.decode(answer_ids).strip()
+        
+        # Close the turn in token space so the next question extends the cached prefix
+        session.token_ids += self._encode("\n\n", False)
+        session.turns.append({"question": message, "answer": answer})
+        return answer
+    
+    def _compact_session(self, session: ConversationSession, budget: int):
+        """Summarize older turns until the transcript fits in `budget` tokens"""
+        keep = min(self.chat_keep_turns, len(session.turns) - session.summarized_turns)
+        summary_budget = max(budget // 4, 1)
+        
+        while True:
+            session.fold(keep)
+            while len(session.summary_parts) > 1 and self.tokenization.count_tokens(session.summary) > summary_budget:
+                session.summary_parts.pop(0)
+            
+            token_ids = self._encode(session.render())
+            if len(token_ids) <= budget or keep == 0:
+                break
+            keep -= 1
+        
+        # A single oversized turn or summary: keep the most recent tokens
+        session.token_ids = token_ids[-budget:] if budget > 0 else []
+        session.drop_cache()
+    
+    def _generate_cached(
+        self,
+        session: ConversationSession,
+        new_ids: List[int],
+        max_new_tokens: int
+    ) -> List[int]:
+        """Sample a reply, feeding the model only tokens its KV cache hasn't seen"""
+        token_ids = session.token_ids + new_ids
+        past = session.past_key_values
+        if past is not None and session.kv_length <= len(session.token_ids):
+            feed = token_ids[session.kv_length:]
+        else:
+            past = None
+            feed = token_ids
+        
+        generated = []
+        with torch.no_grad():
+            for _ in range(max_new_tokens):
+                outputs = self.model(
+                    input_ids=torch.tensor([feed], device=self.device),
+                    past_key_values=past,
+                    use_cache=True
+                )
+                past = outputs.past_key_values
+                next_id = self._sample_token(outputs.logits[0, -1])
+                if next_id == self.tokenizer.eos_token_id:
+                    break
+                generated.append(next_id)
+                feed = [next_id]
+        
+        session.token_ids = token_ids + generated
+        session.past_key_values = past
+        session.kv_length = past[0][0].shape[2] if past is not None else 0
+        return generated
+    
+    @staticmethod
+    def _sample_token(logits: torch.Tensor, temperature: float = 0.7, top_p: float = 0.95) -> int:
+        """Temperature + nucleus sampling (same settings as generate_completion)"""
+        probs = torch.softmax(logits.float() / temperature, dim=-1)
+        sorted_probs, indices = torch.sort(probs, descending=True)
+        outside_nucleus = torch.cumsum(sorted_probs, dim=-1) - sorted_probs > top_p
+        sorted_probs[outside_nucleus] = 0.0
+        choice = torch.multinomial(sorted_probs, 1)
+        return int(indices[choice])
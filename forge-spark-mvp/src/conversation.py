@@ -0,0 +1,152 @@
+"""
+Conversation Memory - server-side chat sessions for AIEngine.chat
+Stores turns, keeps the model's KV cache between turns, and compresses old
+turns into a summary once the session exceeds its token budget
+"""
+
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s|\n')
+
+
+def first_sentence(text: str, max_chars: int = 120) -> str:
+    """Cheap extractive summary of one message"""
+    text = text.strip()
+    match = _SENTENCE_END.search(text)
+    if match:
+        text = text[:match.start()].strip()
+    if len(text) > max_chars:
+        text = text[:max_chars].rstrip() + '...'
+    return text
+
+
+class ConversationSession:
+    """
+    One chat session
+
+    `token_ids` is the exact token sequence the model has seen so far (prompt
+    text plus the tokens it generated). New turns are appended in token space,
+    so the cached `past_key_values` always cover a prefix of `token_ids` and
+    only the new question has to be encoded on the next turn.
+    """
+
+    def __init__(self, session_id: str, context: Optional[str] = None):
+        self.session_id = session_id
+        self.context = context
+        self.turns: List[Dict[str, str]] = []
+        self.summary_parts: List[str] = []
+        self.summarized_turns = 0
+        self.token_ids: List[int] = []
+        self.past_key_values = None
+        self.kv_length = 0
+        self.created = time.time()
+        self.last_used = self.created
+
+    @property
+    def summary(self) -> str:
+        return ' '.join(self.summary_parts)
+
+    def fold(self, keep_recent: int):
+        """Move all but the last `keep_recent` live turns into the summary"""
+        end = len(self.turns) - keep_recent
+        for turn in self.turns[self.summarized_turns:end]:
+            self.summary_parts.append(
+                f"Q: {first_sentence(turn['question'])} A: {first_sentence(turn['answer'])}"
+            )
+        self.summarized_turns = max(self.summarized_turns, end)
+
+    def header(self) -> str:
+        """Prompt text that precedes the live turns"""
+        parts = []
+        if self.context:
+            parts.append(f"Context: {self.context}\n\n")
+        if self.summary:
+            parts.append(f"Earlier in this conversation: {self.summary}\n\n")
+        return ''.join(parts)
+
+    def render(self) -> str:
+        """Full prompt text for the live (unsummarized) turns"""
+        parts = [self.header()]
+        for turn in self.turns[self.summarized_turns:]:
+            parts.append(f"Question: {turn['question']}\n\nAnswer: {turn['answer']}\n\n")
+        return ''.join(parts)
+
+    def drop_cache(self):
+        """Forget the KV cache (the token transcript is kept)"""
+        self.past_key_values = None
+        self.kv_length = 0
+
+    def to_dict(self) -> Dict:
+        return {
+            'session_id': self.session_id,
+            'turns': len(self.turns),
+            'summarized_turns': self.summarized_turns,
+            'tokens': len(self.token_ids),
+            'kv_cached_tokens': self.kv_length,
+            'summary': self.summary
+        }
+
+
+class ConversationStore:
+    """
+    Bounded in-memory session store
+
+    Sessions are evicted least-recently-used beyond `max_sessions` or after
+    `ttl` seconds idle. KV caches are the expensive part, so only the
+    `kv_slots` most recently used sessions keep theirs; older sessions fall
+    back to re-encoding their (already compacted) transcript.
+    """
+
+    def __init__(self, max_sessions: int = 256, kv_slots: int = 8, ttl: float = 3600.0):
+        self.max_sessions = max_sessions
+        self.kv_slots = kv_slots
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> Optional[ConversationSession]:
+        return self._sessions.get(session_id)
+
+    def get_or_create(self, session_id: str, context: Optional[str] = None) -> ConversationSession:
+        """Fetch a session (marking it most recently used) or start a new one"""
+        self._expire()
+
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = ConversationSession(session_id, context)
+            self._sessions[session_id] = session
+        else:
+            self._sessions.move_to_end(session_id)
+            if context is not None and context != session.context:
+                # New context changes the prompt prefix: rebuild from text
+                session.context = context
+                session.token_ids = []
+                session.drop_cache()
+
+        session.last_used = time.time()
+
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+        # Free KV caches of everything but the most recent sessions
+        for i, other in enumerate(reversed(self._sessions.values())):
+            if i >= self.kv_slots and other.past_key_values is not None:
+                other.drop_cache()
+
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_used >= cutoff:
+                break
+            self._sessions.popitem(last=False)
@@ -0,0 +1,764 @@
+"""
+Block Compression (BCn)
+Vectorized NumPy decoders for BC1-BC7 and encoders for BC1, BC3 and BC7:
+every 4x4 block of a texture is decoded or encoded at once as array math
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Format -> bytes per 4x4 block
+BLOCK_BYTES = {
+    'bc1': 8, 'bc2': 16, 'bc3': 16, 'bc4': 8, 'bc4s': 8, 'bc5': 16, 'bc5s': 16,
+    'bc6h': 16, 'bc6hs': 16, 'bc7': 16
+}
+
+ENCODERS = ('bc1', 'bc3', 'bc7')
+
+# Blocks per pass; bounds the per-bit temporaries (128 bytes per block for BC6H/BC7)
+CHUNK_BLOCKS = 32768
+
+_WEIGHTS = {
+    2: np.array([0, 21, 43, 64], np.int32),
+    3: np.array([0, 9, 18, 27, 37, 46, 55, 64], np.int32),
+    4: np.array([0, 4, 9, 13, 17, 21, 26, 30, 34, 38, 43, 47, 51, 55, 60, 64], np.int32),
+}
+
+# Two-subset partitions (bit i = subset of pixel i), shared by BC6H and BC7
+_PARTITIONS2 = np.array([
+    0xCCCC, 0x8888, 0xEEEE, 0xECC8, 0xC880, 0xFEEC, 0xFEC8, 0xEC80, 0xC800, 0xFFEC, 0xFE80, 0xE800, 0xFFE8, 0xFF00,
+    0xFFF0, 0xF000, 0xF710, 0x008E, 0x7100, 0x08CE, 0x008C, 0x7310, 0x3100, 0x8CCE, 0x088C, 0x3110, 0x6666, 0x366C,
+    0x17E8, 0x0FF0, 0x718E, 0x399C, 0xAAAA, 0xF0F0, 0x5A5A, 0x33CC, 0x3C3C, 0x55AA, 0x9696, 0xA55A, 0x73CE, 0x13C8,
+    0x324C, 0x3BDC, 0x6996, 0xC33C, 0x9966, 0x0660, 0x0272, 0x04E4, 0x4E40, 0x2720, 0xC936, 0x936C, 0x39C6, 0x639C,
+    0x9336, 0x9CC6, 0x817E, 0xE718, 0xCCF0, 0x0FCC, 0x7744, 0xEE22
+])
+PARTITIONS2 = ((_PARTITIONS2[:, None] >> np.arange(16)) & 1).astype(np.uint8)
+
+PARTITIONS3 = np.array([[int(c) for c in row] for row in (
+    '0011001102212222', '0001001122112221', '0000200122112211', '0222002200110111', '0000000011221122',
+    '0011001100220022', '0022002211111111', '0011001122112211', '0000000011112222', '0000111111112222',
+    '0000111122222222', '0012001200120012', '0112011201120112', '0122012201220122', '0011011211221222',
+    '0011200122002220', '0001001101121122', '0111001120012200', '0000112211221122', '0022002200221111',
+    '0111011102220222', '0001000122212221', '0000001101220122', '0000110022102210', '0122012200110000',
+    '0012001211222222', '0110122112210110', '0000011012211221', '0022110211020022', '0110011020022222',
+    '0011012201220011', '0000200022112221', '0000000211221222', '0222002200120011', '0011001200220222',
+    '0120012001200120', '0000111122220000', '0120120120120120', '0120201212010120', '0011220011220011',
+    '0011112222000011', '0101010122222222', '0000000021212121', '0022112200221122', '0022001100220011',
+    '0220122102201221', '0101222222220101', '0000212121212121', '0101010101012222', '0222011102220111',
+    '0002111200021112', '0000211221122112', '0222011101110222', '0002111211120002', '0110011001102222',
+    '0000000021122112', '0110011022222222', '0022001100110022', '0022112211220022', '0000000000002112',
+    '0002000100020001', '0222122202221222', '0101222222222222', '0111201122012220'
+)], np.uint8)
+
+_ANCHORS2 = np.array([
+    15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 2, 8, 2, 2, 8, 8, 15, 2, 8, 2, 2, 8, 8, 2, 2,
+    15, 15, 6, 8, 2, 8, 15, 15, 2, 8, 2, 2, 2, 15, 15, 6, 6, 2, 6, 8, 15, 15, 2, 2, 15, 15, 15, 15, 15, 2, 2, 15
+])
+_ANCHORS3A = np.array([
+    3, 3, 15, 15, 8, 3, 15, 15, 8, 8, 6, 6, 6, 5, 3, 3, 3, 3, 8, 15, 3, 3, 6, 10, 5, 8, 8, 6, 8, 5, 15, 15,
+    8, 15, 3, 5, 6, 10, 8, 15, 15, 3, 15, 5, 15, 15, 15, 15, 3, 15, 5, 5, 5, 8, 5, 10, 5, 10, 8, 13, 15, 12, 3, 3
+])
+_ANCHORS3B = np.array([
+    15, 8, 8, 3, 15, 15, 3, 8, 15, 15, 15, 15, 15, 15, 15, 8, 15, 8, 15, 3, 15, 8, 15, 8, 3, 15, 6, 10, 15, 15, 10, 8,
+    15, 3, 15, 10, 10, 8, 9, 10, 6, 15, 8, 15, 3, 6, 6, 8, 15, 3, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 3, 15, 15, 8
+])
+
+# (n, 16) True where a pixel is a subset anchor (its index has one bit less)
+_ANCHOR_MASKS = {1: np.zeros((1, 16), bool), 2: np.zeros((64, 16), bool), 3: np.zeros((64, 16), bool)}
+_ANCHOR_MASKS[1][:, 0] = True
+_ANCHOR_MASKS[2][:, 0] = True
+_ANCHOR_MASKS[2][np.arange(64), _ANCHORS2] = True
+_ANCHOR_MASKS[3][:, 0] = True
+_ANCHOR_MASKS[3][np.arange(64), _ANCHORS3A] = True
+_ANCHOR_MASKS[3][np.arange(64), _ANCHORS3B] = True
+
+# BC7 modes: subsets, partition bits, rotation bits, index selection bit,
+# color bits, alpha bits, endpoint p-bits, shared p-bits, index bits, secondary index bits
+_BC7_MODES = [
+    (3, 4, 0, 0, 4, 0, 1, 0, 3, 0),
+    (2, 6, 0, 0, 6, 0, 0, 1, 3, 0),
+    (3, 6, 0, 0, 5, 0, 0, 0, 2, 0),
+    (2, 6, 0, 0, 7, 0, 1, 0, 2, 0),
+    (1, 0, 2, 1, 5, 6, 0, 0, 2, 3),
+    (1, 0, 2, 0, 7, 8, 0, 0, 2, 2),
+    (1, 0, 0, 0, 7, 7, 1, 0, 4, 0),
+    (2, 6, 0, 0, 5, 5, 1, 0, 2, 0),
+]
+
+# BC6H modes by header value: (endpoint bits, delta bits (r, g, b), transformed,
+# regions, bit layout after the mode bits); 'r0:9-0' is r0 bits 0..9 in order,
+# 'r0:10-15' stores bit 15 first
+_BC6H_MODES = {
+    0: (10, (5, 5, 5), True, 2, 'g2:4 b2:4 b3:4 r0:9-0 g0:9-0 b0:9-0 r1:4-0 g3:4 g2:3-0 g1:4-0 b3:0 g3:3-0 b1:4-0 '
+                                'b3:1 b2:3-0 r2:4-0 b3:2 r3:4-0 b3:3'),
+    1: (7, (6, 6, 6), True, 2, 'g2:5 g3:4 g3:5 r0:6-0 b3:0 b3:1 b2:4 g0:6-0 b2:5 b3:2 g2:4 b0:6-0 b3:3 b3:5 b3:4 '
+                               'r1:5-0 g2:3-0 g1:5-0 g3:3-0 b1:5-0 b2:3-0 r2:5-0 r3:5-0'),
+    2: (11, (5, 4, 4), True, 2, 'r0:9-0 g0:9-0 b0:9-0 r1:4-0 r0:10 g2:3-0 g1:3-0 g0:10 b3:0 g3:3-0 b1:3-0 b0:10 '
+                                'b3:1 b2:3-0 r2:4-0 b3:2 r3:4-0 b3:3'),
+    6: (11, (4, 5, 4), True, 2, 'r0:9-0 g0:9-0 b0:9-0 r1:3-0 r0:10 g3:4 g2:3-0 g1:4-0 g0:10 g3:3-0 b1:3-0 b0:10 '
+                                'b3:1 b2:3-0 r2:3-0 b3:0 b3:2 r3:3-0 g2:4 b3:3'),
+    10: (11, (4, 4, 5), True, 2, 'r0:9-0 g0:9-0 b0:9-0 r1:3-0 r0:10 b2:4 g2:3-0 g1:3-0 g0:10 b3:0 g3:3-0 b1:4-0 '
+                                 'b0:10 b2:3-0 r2:3-0 b3:1 b3:2 r3:3-0 b3:4 b3:3'),
+    14: (9, (5, 5, 5), True, 2, 'r0:8-0 b2:4 g0:8-0 g2:4 b0:8-0 b3:4 r1:4-0 g3:4 g2:3-0 g1:4-0 b3:0 g3:3-0 b1:4-0 '
+                                'b3:1 b2:3-0 r2:4-0 b3:2 r3:4-0 b3:3'),
+    18: (8, (6, 5, 5), True, 2, 'r0:7-0 g3:4 b2:4 g0:7-0 b3:2 g2:4 b0:7-0 b3:3 b3:4 r1:5-0 g2:3-0 g1:4-0 b3:0 '
+                                'g3:3-0 b1:4-0 b3:1 b2:3-0 r2:5-0 r3:5-0'),
+    22: (8, (5, 6, 5), True, 2, 'r0:7-0 b3:0 b2:4 g0:7-0 g2:5 g2:4 b0:7-0 g3:5 b3:4 r1:4-0 g3:4 g2:3-0 g1:5-0 '
+                                'g3:3-0 b1:4-0 b3:1 b2:3-0 r2:4-0 b3:2 r3:4-0 b3:3'),
+    26: (8, (5, 5, 6), True, 2, 'r0:7-0 b3:1 b2:4 g0:7-0 b2:5 g2:4 b0:7-0 b3:5 b3:4 r1:4-0 g3:4 g2:3-0 g1:4-0 '
+                                'b3:0 g3:3-0 b1:5-0 b2:3-0 r2:4-0 b3:2 r3:4-0 b3:3'),
+    30: (6, (6, 6, 6), False, 2, 'r0:5-0 g3:4 b3:0 b3:1 b2:4 g0:5-0 g2:5 b2:5 b3:2 g2:4 b0:5-0 g3:5 b3:3 b3:5 b3:4 '
+                                 'r1:5-0 g2:3-0 g1:5-0 g3:3-0 b1:5-0 b2:3-0 r2:5-0 r3:5-0'),
+    3: (10, (10, 10, 10), False, 1, 'r0:9-0 g0:9-0 b0:9-0 r1:9-0 g1:9-0 b1:9-0'),
+    7: (11, (9, 9, 9), True, 1, 'r0:9-0 g0:9-0 b0:9-0 r1:8-0 r0:10 g1:8-0 g0:10 b1:8-0 b0:10'),
+    11: (12, (8, 8, 8), True, 1, 'r0:9-0 g0:9-0 b0:9-0 r1:7-0 r0:10-11 g1:7-0 g0:10-11 b1:7-0 b0:10-11'),
+    15: (16, (4, 4, 4), True, 1, 'r0:9-0 g0:9-0 b0:9-0 r1:3-0 r0:10-15 g1:3-0 g0:10-15 b1:3-0 b0:10-15'),
+}
+
+
+def _parse_layout(layout: str) -> List[Tuple[str, int]]:
+    """(field, bit) per stored bit, in storage order"""
+    fields = []
+    for token in layout.split():
+        name, bits = token.split(':')
+        first, _, last = bits.partition('-')
+        first, last = int(first), int(last or first)
+        # 'hi-lo' is stored lo first; 'lo-hi' (reversed fields) hi first
+        order = range(last, first + 1) if first >= last else range(last, first - 1, -1)
+        fields.extend((name, bit) for bit in order)
+    return fields
+
+
+_BC6H_LAYOUTS = {mode: _parse_layout(spec[4]) for mode, spec in _BC6H_MODES.items()}
+
+
+# ----------------------------------------------------------------------
+# Block layout
+# ----------------------------------------------------------------------
+
+def block_count(width: int, height: int) -> Tuple[int, int]:
+    """(blocks across, blocks down)"""
+    return max(1, (width + 3) // 4), max(1, (height + 3) // 4)
+
+
+def level_size(width: int, height: int, format: str) -> int:
+    """Bytes of one compressed mip level"""
+    bx, by = block_count(width, height)
+    return bx * by * BLOCK_BYTES[format]
+
+
+def image_to_blocks(image: np.ndarray) -> np.ndarray:
+    """(height, width, channels) -> (blocks, 16, channels), edge-padded to whole blocks, row-major"""
+    height, width, channels = image.shape
+    bx, by = block_count(width, height)
+    padded = np.pad(image, ((0, by * 4 - height), (0, bx * 4 - width), (0, 0)), mode='edge')
+    return padded.reshape(by, 4, bx, 4, channels).transpose(0, 2, 1, 3, 4).reshape(by * bx, 16, channels)
+
+
+def blocks_to_image(pixels: np.ndarray, width: int, height: int) -> np.ndarray:
+    """(blocks, 16, channels) -> (height, width, channels), cropping block padding"""
+    bx, by = block_count(width, height)
+    channels = pixels.shape[-1]
+    image = pixels.reshape(by, bx, 4, 4, channels).transpose(0, 2, 1, 3, 4).reshape(by * 4, bx * 4, channels)
+    return np.ascontiguousarray(image[:height, :width])
+
+
+def _bits(blocks: np.ndarray) -> np.ndarray:
+    """(n, 16) uint8 blocks -> (n, 128) bits, least significant first"""
+    return np.unpackbits(blocks, axis=1, bitorder='little')
+
+
+def _field(bits: np.ndarray, offset: int, count: int) -> np.ndarray:
+    """Unsigned fields of `count` bits at a fixed offset; (n, ...) over any trailing shape"""
+    if count == 0:
+        return np.zeros(len(bits), np.int32)
+    return bits[:, offset:offset + count].astype(np.int32) @ (1 << np.arange(count, dtype=np.int32))
+
+
+def _fields(bits: np.ndarray, offset: int, count: int, width: int) -> np.ndarray:
+    """(n, count) consecutive fields of `width` bits"""
+    if width == 0:
+        return np.zeros((len(bits), count), np.int32)
+    chunk = bits[:, offset:offset + count * width].reshape(len(bits), count, width).astype(np.int32)
+    return chunk @ (1 << np.arange(width, dtype=np.int32))
+
+
+def _indices(bits: np.ndarray, offset: int, width: int, anchors: np.ndarray) -> np.ndarray:
+    """
+    (n, 16) pixel indices of `width` bits starting at `offset`
+
+    Anchor pixels store one bit less; anchors may differ per block, so bit
+    positions are gathered per block from a cumulative sum of widths.
+    """
+    n = len(bits)
+    sizes = np.where(anchors, width - 1, width).astype(np.int32)
+    sizes = np.broadcast_to(sizes, (n, 16))
+    starts = offset + np.cumsum(sizes, axis=1) - sizes
+    values = np.zeros((n, 16), np.int32)
+    for k in range(width):
+        bit = np.take_along_axis(bits, np.minimum(starts + k, 127), axis=1).astype(np.int32)
+        values |= np.where(k < sizes, bit << k, 0)
+    return values
+
+
+def _chunks(data: bytes, block_bytes: int, blocks: int):
+    """(start, (n, block_bytes) uint8) slices of CHUNK_BLOCKS blocks"""
+    array = np.frombuffer(data, np.uint8, blocks * block_bytes).reshape(blocks, block_bytes)
+    for start in range(0, blocks, CHUNK_BLOCKS):
+        yield start, array[start:start + CHUNK_BLOCKS]
+
+
+# ----------------------------------------------------------------------
+# BC1-BC5
+# ----------------------------------------------------------------------
+
+def _unpack_565(color: np.ndarray) -> np.ndarray:
+    """uint16 RGB565 -> (..., 3) int32 RGB888, replicating high bits"""
+    color = color.astype(np.int32)
+    r, g, b = (color >> 11) & 31, (color >> 5) & 63, color & 31
+    return np.stack([(r << 3) | (r >> 2), (g << 2) | (g >> 4), (b << 3) | (b >> 2)], axis=-1)
+
+
+def _color_palette(c0: np.ndarray, c1: np.ndarray, three_color: np.ndarray) -> np.ndarray:
+    """(n, 4, 4) RGBA palettes of BC1 color blocks; three_color blocks get a transparent 4th entry"""
+    e0, e1 = _unpack_565(c0), _unpack_565(c1)
+    palette = np.empty((len(c0), 4, 4), np.int32)
+    palette[:, 0, :3] = e0
+    palette[:, 1, :3] = e1
+    three = three_color[:, None]
+    palette[:, 2, :3] = np.where(three, (e0 + e1) // 2, (2 * e0 + e1) // 3)
+    palette[:, 3, :3] = np.where(three, 0, (e0 + 2 * e1) // 3)
+    palette[:, :, 3] = 255
+    palette[:, 3, 3] = np.where(three_color, 0, 255)
+    return palette
+
+
+def _decode_color(blocks: np.ndarray, punchthrough: bool) -> np.ndarray:
+    """(n, 8) BC1 color blocks -> (n, 16, 4) RGBA"""
+    c0 = blocks[:, 0].astype(np.uint16) | (blocks[:, 1].astype(np.uint16) << 8)
+    c1 = blocks[:, 2].astype(np.uint16) | (blocks[:, 3].astype(np.uint16) << 8)
+    three_color = (c0 <= c1) if punchthrough else np.zeros(len(blocks), bool)
+    palette = _color_palette(c0, c1, three_color)
+    indices = np.unpackbits(blocks[:, 4:8], axis=1, bitorder='little').reshape(-1, 16, 2)
+    indices = indices[:, :, 0] | (indices[:, :, 1] << 1)
+    return np.take_along_axis(palette, indices[:, :, None].astype(np.intp), axis=1)
+
+
+def _alpha_palette(a0: np.ndarray, a1: np.ndarray) -> np.ndarray:
+    """(n, 8) palettes of BC3/BC4 interpolated single-channel blocks"""
+    a0, a1 = a0.astype(np.int32)[:, None], a1.astype(np.int32)[:, None]
+    i = np.arange(8, dtype=np.int32)[None, :]
+    # Entries 2.. step from a0 towards a1
+    eight = ((8 - i) * a0 + (i - 1) * a1) // 7
+    six = ((6 - i) * a0 + (i - 1) * a1) // 5
+    six = np.where(i == 6, 0, np.where(i == 7, 255, six))
+    palette = np.where(a0 > a1, eight, six)
+    palette[:, 0], palette[:, 1] = a0[:, 0], a1[:, 0]
+    return palette
+
+
+def _alpha_indices(blocks: np.ndarray) -> np.ndarray:
+    """(n, 8) BC3/BC4 blocks -> (n, 16) 3-bit indices"""
+    bits = np.unpackbits(blocks[:, 2:8], axis=1, bitorder='little').reshape(-1, 16, 3).astype(np.intp)
+    return bits[:, :, 0] | (bits[:, :, 1] << 1) | (bits[:, :, 2] << 2)
+
+
+def _decode_alpha(blocks: np.ndarray) -> np.ndarray:
+    """(n, 8) BC3/BC4 unsigned blocks -> (n, 16) values"""
+    palette = _alpha_palette(blocks[:, 0], blocks[:, 1])
+    return np.take_along_axis(palette, _alpha_indices(blocks), axis=1)
+
+
+def _decode_alpha_signed(blocks: np.ndarray) -> np.ndarray:
+    """(n, 8) BC4/BC5 SNORM blocks -> (n, 16) values mapped from [-1, 1] to [0, 255]"""
+    a0 = np.maximum(blocks[:, 0].view(np.int8).astype(np.int32), -127)[:, None]
+    a1 = np.maximum(blocks[:, 1].view(np.int8).astype(np.int32), -127)[:, None]
+    i = np.arange(8, dtype=np.int32)[None, :]
+    eight = ((8 - i) * a0 + (i - 1) * a1) / 7
+    six = np.where(i == 6, -127, np.where(i == 7, 127, ((6 - i) * a0 + (i - 1) * a1) / 5))
+    palette = np.where(a0 > a1, eight, six)
+    palette[:, 0], palette[:, 1] = a0[:, 0], a1[:, 0]
+    values = np.take_along_axis(palette, _alpha_indices(blocks), axis=1)
+    return np.rint((values + 127) * (255 / 254)).astype(np.int32)
+
+
+def _decode_bc(blocks: np.ndarray, format: str) -> np.ndarray:
+    """(n, block bytes) -> (n, 16, 4) RGBA for BC1-BC5"""
+    if format == 'bc1':
+        return _decode_color(blocks, punchthrough=True)
+    if format == 'bc2':
+        rgba = _decode_color(blocks[:, 8:], punchthrough=False)
+        nibbles = np.stack([blocks[:, :8] & 15, blocks[:, :8] >> 4], axis=2).reshape(-1, 16)
+        rgba[:, :, 3] = nibbles * 17
+        return rgba
+    if format == 'bc3':
+        rgba = _decode_color(blocks[:, 8:], punchthrough=False)
+        rgba[:, :, 3] = _decode_alpha(blocks[:, :8])
+        return rgba
+
+    single = _decode_alpha_signed if format.endswith('s') else _decode_alpha
+    rgba = np.zeros((len(blocks), 16, 4), np.int32)
+    rgba[:, :, 3] = 255
+    rgba[:, :, 0] = single(blocks[:, :8])
+    if format.startswith('bc5'):
+        rgba[:, :, 1] = single(blocks[:, 8:])
+    return rgba
+
+
+# ----------------------------------------------------------------------
+# BC7
+# ----------------------------------------------------------------------
+
+def _expand(values: np.ndarray, bits: int) -> np.ndarray:
+    """Widen `bits`-bit endpoint values to 8 bits by replicating the high bits"""
+    return (values << (8 - bits)) | (values >> (2 * bits - 8))
+
+
+def _interpolate(e0: np.ndarray, e1: np.ndarray, indices: np.ndarray, index_bits: int) -> np.ndarray:
+    weight = _WEIGHTS[index_bits][indices]
+    return ((64 - weight) * e0 + weight * e1 + 32) >> 6
+
+
+def _subsets(partition: np.ndarray, subsets: int) -> np.ndarray:
+    """(n, 16) subset of each pixel"""
+    if subsets == 1:
+        return np.zeros((len(partition), 16), np.intp)
+    table = PARTITIONS2 if subsets == 2 else PARTITIONS3
+    return table[partition].astype(np.intp)
+
+
+def _decode_bc7_mode(bits: np.ndarray, mode: int) -> np.ndarray:
+    """(n, 128) bits of blocks sharing one mode -> (n, 16, 4) RGBA"""
+    subsets, pb, rb, isb, cb, ab, epb, spb, ib, ib2 = _BC7_MODES[mode]
+    n = len(bits)
+    endpoints = 2 * subsets
+    pos = mode + 1
+    partition = _field(bits, pos, pb)
+    pos += pb
+    rotation = _field(bits, pos, rb)
+    pos += rb
+    selector = _field(bits, pos, isb)
+    pos += isb
+
+    colors = np.empty((n, endpoints, 4), np.int32)
+    for channel in range(3):
+        colors[:, :, channel] = _fields(bits, pos, endpoints, cb)
+        pos += endpoints * cb
+    colors[:, :, 3] = _fields(bits, pos, endpoints, ab)
+    pos += endpoints * ab
+
+    color_bits, alpha_bits = cb, ab
+    if epb or spb:
+        pbits = _fields(bits, pos, endpoints if epb else subsets, 1)
+        pos += endpoints if epb else subsets
+        if spb:
+            pbits = np.repeat(pbits, 2, axis=1)
+        colors = (colors << 1) | pbits[:, :, None]
+        color_bits += 1
+        alpha_bits += 1 if ab else 0
+    colors[:, :, :3] = _expand(colors[:, :, :3], color_bits)
+    colors[:, :, 3] = _expand(colors[:, :, 3], alpha_bits) if ab else 255
+
+    anchors = _ANCHOR_MASKS[subsets][partition if subsets > 1 else np.zeros(n, np.intp)]
+    primary = _indices(bits, pos, ib, anchors)
+    pos += 16 * ib - subsets
+    secondary = _indices(bits, pos, ib2, _ANCHOR_MASKS[1]) if ib2 else primary
+
+    subset = _subsets(partition, subsets)
+    e0 = np.take_along_axis(colors, (2 * subset)[:, :, None], axis=1)
+    e1 = np.take_along_axis(colors, (2 * subset + 1)[:, :, None], axis=1)
+
+    # Index selection (mode 4) swaps which index set drives color and alpha
+    swap = (selector == 1)[:, None]
+    color_index = np.where(swap, secondary, primary)
+    alpha_index = np.where(swap, primary, secondary)
+    rgba = np.empty((n, 16, 4), np.int32)
+    if ib2:
+        for swapped, (cib, aib) in ((False, (ib, ib2)), (True, (ib2, ib))):
+            rows = (selector == 1) == swapped
+            if rows.any():
+                rgba[rows, :, :3] = _interpolate(e0[rows, :, :3], e1[rows, :, :3],
+                                                 color_index[rows][:, :, None], cib)
+                rgba[rows, :, 3] = _interpolate(e0[rows, :, 3], e1[rows, :, 3], alpha_index[rows], aib)
+    else:
+        rgba[:] = _interpolate(e0, e1, primary[:, :, None], ib)
+
+    if rb:
+        # Rotation 1..3 swaps alpha with red, green or blue
+        for r in (1, 2, 3):
+            rows = rotation == r
+            if rows.any():
+                rgba[rows, :, r - 1], rgba[rows, :, 3] = rgba[rows, :, 3], rgba[rows, :, r - 1].copy()
+    return rgba
+
+
+def _decode_bc7(blocks: np.ndarray) -> np.ndarray:
+    bits = _bits(blocks)
+    head = bits[:, :8]
+    mode = np.where(head.any(axis=1), np.argmax(head, axis=1), 8)
+    rgba = np.zeros((len(blocks), 16, 4), np.int32)  # reserved mode 8 decodes to transparent black
+    for m in range(8):
+        rows = mode == m
+        if rows.any():
+            rgba[rows] = _decode_bc7_mode(bits[rows], m)
+    return rgba
+
+
+# ----------------------------------------------------------------------
+# BC6H
+# ----------------------------------------------------------------------
+
+def _sign_extend(values: np.ndarray, bits: int) -> np.ndarray:
+    sign = 1 << (bits - 1)
+    return (values & (sign - 1)) - (values & sign)
+
+
+def _unquantize(values: np.ndarray, bits: int, signed: bool) -> np.ndarray:
+    if not signed:
+        if bits >= 15:
+            return values
+        top = (1 << bits) - 1
+        return np.where(values == 0, 0, np.where(values == top, 0xFFFF, ((values << 16) + 0x8000) >> bits))
+    if bits >= 16:
+        return values
+    magnitude = np.abs(values)
+    top = (1 << (bits - 1)) - 1
+    result = np.where(magnitude == 0, 0, np.where(magnitude >= top, 0x7FFF, ((magnitude << 15) + 0x4000) >> (bits - 1)))
+    return np.where(values < 0, -result, result)
+
+
+def _decode_bc6h_mode(bits: np.ndarray, mode: int, signed: bool) -> np.ndarray:
+    """(n, 128) bits of blocks sharing one mode -> (n, 16, 3) float32"""
+    precision, deltas, transformed, regions, _ = _BC6H_MODES[mode]
+    n = len(bits)
+    header = 2 if mode < 2 else 5
+    values: Dict[str, np.ndarray] = {}
+    for position, (name, bit) in enumerate(_BC6H_LAYOUTS[mode], header):
+        values[name] = values.get(name, 0) | (bits[:, position].astype(np.int32) << bit)
+
+    endpoints = 2 * regions
+    ends = np.zeros((n, endpoints, 3), np.int32)
+    for channel, letter in enumerate('rgb'):
+        base = values[f'{letter}0']
+        if signed:
+            base = _sign_extend(base, precision)
+        ends[:, 0, channel] = base
+        for e in range(1, endpoints):
+            value = values.get(f'{letter}{e}', np.zeros(n, np.int32))
+            if signed or transformed:
+                value = _sign_extend(value, deltas[channel])
+            if transformed:
+                value = (values[f'{letter}0'] + value) & ((1 << precision) - 1)
+                if signed:
+                    value = _sign_extend(value, precision)
+            ends[:, e, channel] = value
+    ends = _unquantize(ends, precision, signed)
+
+    if regions == 2:
+        partition = _field(bits, 77, 5)
+        anchors = _ANCHOR_MASKS[2][partition]
+        indices = _indices(bits, 82, 3, anchors)
+        index_bits = 3
+    else:
+        partition = np.zeros(n, np.int32)
+        indices = _indices(bits, 65, 4, _ANCHOR_MASKS[1])
+        index_bits = 4
+    subset = _subsets(partition, regions)
+    e0 = np.take_along_axis(ends, (2 * subset)[:, :, None], axis=1)
+    e1 = np.take_along_axis(ends, (2 * subset + 1)[:, :, None], axis=1)
+    value = _interpolate(e0, e1, indices[:, :, None], index_bits)
+
+    # Scale to half-float bit patterns
+    if signed:
+        half = np.where(value < 0, 0x8000 | ((-value * 31) >> 5), (value * 31) >> 5)
+    else:
+        half = (value * 31) >> 6
+    return half.astype(np.uint16).view(np.float16).astype(np.float32)
+
+
+def _decode_bc6h(blocks: np.ndarray, signed: bool) -> np.ndarray:
+    """(n, 16) blocks -> (n, 16, 3) float32 (reserved modes decode to 0)"""
+    bits = _bits(blocks)
+    low2 = _field(bits, 0, 2)
+    mode = np.where(low2 < 2, low2, _field(bits, 0, 5))
+    rgb = np.zeros((len(blocks), 16, 3), np.float32)
+    for m in _BC6H_MODES:
+        rows = mode == m
+        if rows.any():
+            rgb[rows] = _decode_bc6h_mode(bits[rows], m, signed)
+    return rgb
+
+
+# ----------------------------------------------------------------------
+# Decoding
+# ----------------------------------------------------------------------
+
+def decode(data: bytes, width: int, height: int, format: str) -> np.ndarray:
+    """
+    Decode one compressed surface to RGBA
+
+    Args:
+        data: Block data, row-major blocks (at least level_size() bytes)
+        width: Surface width in pixels
+        height: Surface height in pixels
+        format: A BLOCK_BYTES key
+
+    Returns:
+        (height, width, 4) uint8; BC6H HDR values are clamped to [0, 1]
+    """
+    if format not in BLOCK_BYTES:
+        raise ValueError(f"Unsupported block format '{format}'")
+    bx, by = block_count(width, height)
+    blocks = bx * by
+    if len(data) < blocks * BLOCK_BYTES[format]:
+        raise ValueError(f"Truncated {format.upper()} data: {len(data)} of {blocks * BLOCK_BYTES[format]} bytes")
+
+    pixels = np.empty((blocks, 16, 4), np.uint8)
+    for start, chunk in _chunks(data, BLOCK_BYTES[format], blocks):
+        if format == 'bc7':
+            rgba = _decode_bc7(chunk)
+        elif format.startswith('bc6h'):
+            rgb = _decode_bc6h(chunk, signed=format == 'bc6hs')
+            rgba = np.empty((len(chunk), 16, 4), np.int32)
+            rgba[:, :, :3] = np.rint(np.clip(rgb, 0, 1) * 255)
+            rgba[:, :, 3] = 255
+        else:
+            rgba = _decode_bc(chunk, format)
+        pixels[start:start + len(chunk)] = rgba
+    return blocks_to_image(pixels, width, height)
+
+
+def decode_hdr(data: bytes, width: int, height: int, signed: bool = False) -> np.ndarray:
+    """Decode a BC6H surface to (height, width, 3) float32 without clamping"""
+    bx, by = block_count(width, height)
+    pixels = np.empty((bx * by, 16, 3), np.float32)
+    for start, chunk in _chunks(data, 16, bx * by):
+        pixels[start:start + len(chunk)] = _decode_bc6h(chunk, signed)
+    return blocks_to_image(pixels, width, height)
+
+
+# ----------------------------------------------------------------------
+# Encoding
+# ----------------------------------------------------------------------
+
+def _principal_axis(pixels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-block mean and principal direction of (n, 16, c) float pixels"""
+    mean = pixels.mean(axis=1)
+    centered = pixels - mean[:, None]
+    covariance = np.einsum('npi,npj->nij', centered, centered)
+    _, vectors = np.linalg.eigh(covariance)
+    axis = vectors[:, :, -1]
+    # Flat blocks: eigh gives an arbitrary unit axis, which is harmless
+    return mean, axis
+
+
+def _fit_line(pixels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Endpoints at the extreme projections onto each block's principal axis"""
+    mean, axis = _principal_axis(pixels)
+    t = np.einsum('npc,nc->np', pixels - mean[:, None], axis)
+    lo = mean + t.min(axis=1)[:, None] * axis
+    hi = mean + t.max(axis=1)[:, None] * axis
+    return lo, hi
+
+
+def _refit(pixels: np.ndarray, weights: np.ndarray, lo: np.ndarray, hi: np.ndarray, mask=None):
+    """Least-squares endpoints for fixed interpolation weights in [0, 1], over pixels where mask is set"""
+    w1 = weights
+    w0 = 1 - weights
+    if mask is not None:
+        w0, w1 = w0 * mask, w1 * mask
+    aa = (w0 * w0).sum(axis=1)
+    bb = (w1 * w1).sum(axis=1)
+    ab = (w0 * w1).sum(axis=1)
+    ax = np.einsum('np,npc->nc', w0, pixels)
+    bx = np.einsum('np,npc->nc', w1, pixels)
+    det = aa * bb - ab * ab
+    ok = np.abs(det) > 1e-6
+    safe = np.where(ok, det, 1)[:, None]
+    new_lo = (ax * bb[:, None] - bx * ab[:, None]) / safe
+    new_hi = (bx * aa[:, None] - ax * ab[:, None]) / safe
+    return np.where(ok[:, None], new_lo, lo), np.where(ok[:, None], new_hi, hi)
+
+
+def _pack_565(color: np.ndarray) -> np.ndarray:
+    c = np.clip(color, 0, 255)
+    r = np.rint(c[..., 0] * 31 / 255).astype(np.uint16)
+    g = np.rint(c[..., 1] * 63 / 255).astype(np.uint16)
+    b = np.rint(c[..., 2] * 31 / 255).astype(np.uint16)
+    return (r << 11) | (g << 5) | b
+
+
+def _nearest(pixels: np.ndarray, palette: np.ndarray, channels: slice = slice(0, 3)) -> Tuple[np.ndarray, np.ndarray]:
+    """(indices, squared error per block) of the nearest palette entry per pixel"""
+    distance = ((pixels[:, :, None, :] - palette[:, None, :, channels]) ** 2).sum(axis=3)
+    indices = distance.argmin(axis=2)
+    return indices, np.take_along_axis(distance, indices[:, :, None], axis=2)[:, :, 0].sum(axis=1)
+
+
+def _encode_color(rgba: np.ndarray, punchthrough: bool) -> np.ndarray:
+    """(n, 16, 4) uint8 -> (n, 8) BC1 color blocks"""
+    n = len(rgba)
+    rgb = rgba[:, :, :3].astype(np.float32)
+    transparent = (rgba[:, :, 3] < 128) if punchthrough else np.zeros((n, 16), bool)
+    has_transparent = transparent.any(axis=1)
+
+    lo, hi = _fit_line(rgb)
+    best = None
+    for attempt in range(2):
+        c_hi, c_lo = _pack_565(hi), _pack_565(lo)
+        # Four-color blocks need c0 > c1; blocks with transparency use c0 <= c1
+        c0 = np.where(has_transparent, np.minimum(c_hi, c_lo), np.maximum(c_hi, c_lo))
+        c1 = np.where(has_transparent, np.maximum(c_hi, c_lo), np.minimum(c_hi, c_lo))
+        palette = _color_palette(c0, c1, has_transparent | (c0 == c1)).astype(np.float32)
+        # Transparent entries only ever go to transparent pixels
+        palette[:, 3, :3] = np.where((has_transparent | (c0 == c1))[:, None], 1e6, palette[:, 3, :3])
+        indices, error = _nearest(rgb, palette)
+        indices = np.where(transparent, 3, indices)
+        if best is None:
+            best = (c0, c1, indices, error)
+        else:
+            better = error < best[3]
+            best = tuple(np.where(better[(...,) + (None,) * (b.ndim - 1)], a, b)
+                         for a, b in zip((c0, c1, indices, error), best))
+        if attempt == 0:
+            # One least-squares refinement against the chosen interpolation weights
+            four = ~(has_transparent | (c0 == c1))
+            position = np.where(four[:, None], np.array([0, 3, 1, 2])[indices] / 3,
+                                np.array([0, 2, 1, 0])[indices] / 2).astype(np.float32)
+            e0, e1 = _unpack_565(c0).astype(np.float32), _unpack_565(c1).astype(np.float32)
+            lo, hi = _refit(rgb, position, e0, e1, ~transparent)
+
+    c0, c1, indices, _ = best
+    blocks = np.empty((n, 8), np.uint8)
+    blocks[:, 0:2] = c0.astype('<u2').view(np.uint8).reshape(n, 2)
+    blocks[:, 2:4] = c1.astype('<u2').view(np.uint8).reshape(n, 2)
+    packed = (indices.astype(np.uint32) << (2 * np.arange(16, dtype=np.uint32))).sum(axis=1, dtype=np.uint32)
+    blocks[:, 4:8] = packed.astype('<u4').view(np.uint8).reshape(n, 4)
+    return blocks
+
+
+def _encode_alpha(alpha: np.ndarray) -> np.ndarray:
+    """(n, 16) uint8 -> (n, 8) BC3 alpha blocks (eight-value mode)"""
+    n = len(alpha)
+    a0, a1 = alpha.max(axis=1), alpha.min(axis=1)
+    palette = _alpha_palette(a0, a1)
+    distance = np.abs(alpha.astype(np.int32)[:, :, None] - palette[:, None, :])
+    indices = distance.argmin(axis=2).astype(np.uint64)
+    packed = (indices << (3 * np.arange(16, dtype=np.uint64))).sum(axis=1, dtype=np.uint64)
+    blocks = np.empty((n, 8), np.uint8)
+    blocks[:, 0], blocks[:, 1] = a0, a1
+    blocks[:, 2:8] = packed.astype('<u8').view(np.uint8).reshape(n, 8)[:, :6]
+    return blocks
+
+
+def _quantize_mode6(endpoint: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Nearest 7-bit RGBA + shared p-bit encoding of (n, 4) endpoints: (values, pbits)"""
+    best_values, best_pbit, best_error = None, None, None
+    for pbit in (0, 1):
+        values = np.clip(np.rint((endpoint - pbit) / 2), 0, 127).astype(np.int32)
+        error = (((values << 1) | pbit) - endpoint) ** 2
+        error = error.sum(axis=1)
+        if pbit == 0:
+            # Opaque endpoints keep alpha exactly 255, which needs p-bit 1
+            error = np.where(endpoint[:, 3] >= 254.5, np.inf, error)
+        if best_error is None:
+            best_values, best_pbit, best_error = values, np.zeros(len(endpoint), np.int32), error
+        else:
+            better = error < best_error
+            best_values = np.where(better[:, None], values, best_values)
+            best_pbit = np.where(better, 1, best_pbit)
+            best_error = np.minimum(error, best_error)
+    return best_values, best_pbit
+
+
+def _mode6_indices(pixels: np.ndarray, e0: np.ndarray, e1: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(indices, squared error per block) of 4-bit mode 6 indices by projection onto the endpoint line"""
+    direction = (e1 - e0).astype(np.float32)
+    length = (direction ** 2).sum(axis=1)
+    t = np.einsum('npc,nc->np', pixels - e0[:, None], direction) / np.maximum(length, 1)[:, None]
+    # Nearest of the 16 (non-uniform) weights
+    weights = _WEIGHTS[4] / 64
+    indices = np.abs(np.clip(t, 0, 1)[:, :, None] - weights).argmin(axis=2)
+    w = _WEIGHTS[4][indices][:, :, None]
+    decoded = ((64 - w) * e0[:, None] + w * e1[:, None] + 32) >> 6
+    return indices, ((decoded - pixels) ** 2).sum(axis=(1, 2))
+
+
+def _encode_bc7(rgba: np.ndarray) -> np.ndarray:
+    """(n, 16, 4) uint8 -> (n, 16) BC7 mode 6 blocks (one subset, RGBA 7.1 endpoints, 4-bit indices)"""
+    n = len(rgba)
+    pixels = rgba.astype(np.float32)
+    lo, hi = _fit_line(pixels)
+    best = None
+    for attempt in range(2):
+        q0, p0 = _quantize_mode6(lo)
+        q1, p1 = _quantize_mode6(hi)
+        e0, e1 = (q0 << 1) | p0[:, None], (q1 << 1) | p1[:, None]
+        indices, error = _mode6_indices(pixels, e0, e1)
+        candidate = (q0, p0, q1, p1, indices, error)
+        if best is None:
+            best = candidate
+        else:
+            better = error < best[5]
+            best = tuple(np.where(better[(...,) + (None,) * (a.ndim - 1)], a, b) for a, b in zip(candidate, best))
+        if attempt == 0:
+            lo, hi = _refit(pixels, _WEIGHTS[4][indices] / 64, e0.astype(np.float32), e1.astype(np.float32))
+
+    q0, p0, q1, p1, indices, _ = best
+    # The anchor (pixel 0) index must fit in 3 bits: swap endpoints otherwise
+    swap = indices[:, 0] >= 8
+    q0, q1 = np.where(swap[:, None], q1, q0), np.where(swap[:, None], q0, q1)
+    p0, p1 = np.where(swap, p1, p0), np.where(swap, p0, p1)
+    indices = np.where(swap[:, None], 15 - indices, indices)
+
+    bits = np.zeros((n, 128), np.uint8)
+    bits[:, 6] = 1  # mode 6
+    pos = 7
+    for channel in range(4):
+        for q in (q0, q1):
+            bits[:, pos:pos + 7] = (q[:, channel:channel + 1] >> np.arange(7)) & 1
+            pos += 7
+    bits[:, 63], bits[:, 64] = p0, p1
+    bits[:, 65:68] = (indices[:, :1] >> np.arange(3)) & 1
+    bits[:, 68:128] = ((indices[:, 1:, None] >> np.arange(4)) & 1).reshape(n, 60)
+    return np.packbits(bits, axis=1, bitorder='little')
+
+
+def encode(image: np.ndarray, format: str) -> bytes:
+    """
+    Compress an image to BC1, BC3 or BC7 blocks
+
+    Args:
+        image: (height, width, channels) uint8; 1-2 channels are expanded to RGB(A)
+        format: 'bc1' (RGB, 1-bit alpha), 'bc3' (RGB + interpolated alpha) or 'bc7' (RGBA, mode 6)
+
+    Returns:
+        Row-major block data
+    """
+    if format not in ENCODERS:
+        raise ValueError(f"Cannot encode '{format}' (expected one of {', '.join(ENCODERS)})")
+    image = to_rgba(image)
+    blocks = image_to_blocks(image)
+    out = np.empty((len(blocks), BLOCK_BYTES[format]), np.uint8)
+    for start in range(0, len(blocks), CHUNK_BLOCKS):
+        chunk = blocks[start:start + CHUNK_BLOCKS]
+        if format == 'bc1':
+            out[start:start + len(chunk)] = _encode_color(chunk, punchthrough=True)
+        elif format == 'bc3':
+            out[start:start + len(chunk), :8] = _encode_alpha(chunk[:, :, 3])
+            out[start:start + len(chunk), 8:] = _encode_color(chunk, punchthrough=False)
+        else:
+            out[start:start + len(chunk)] = _encode_bc7(chunk)
+    return out.tobytes()
+
+
+def to_rgba(image: np.ndarray) -> np.ndarray:
+    """(height, width, 1-4) uint8 -> (height, width, 4), grey expanded and alpha filled"""
+    channels = image.shape[2]
+    if channels == 4:
+        return image
+    rgba = np.empty(image.shape[:2] + (4,), np.uint8)
+    rgba[:, :, :3] = image[:, :, :1] if channels < 3 else image[:, :, :3]
+    rgba[:, :, 3] = image[:, :, -1] if channels == 2 else 255
+    return rgba
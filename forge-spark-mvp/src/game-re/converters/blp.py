@@ -0,0 +1,232 @@
+"""
+BLP Textures
+Decodes Blizzard BLP1 (JPEG, palettized) and BLP2 (palettized, DXT1/3/5,
+BGRA) textures and writes BLP2 DXT textures with mip chains
+"""
+
+import io
+import struct
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from . import bcn
+from .mipmaps import mip_chain
+
+BLP1_MAGIC = b'BLP1'
+BLP2_MAGIC = b'BLP2'
+
+MAX_MIPS = 16
+
+# BLP1: magic, compression, alpha bits, width, height, picture type, has mips
+_BLP1_HEADER = struct.Struct('<4s6I')
+# BLP2: magic, type, encoding, alpha depth, alpha type, has mips, width, height
+_BLP2_HEADER = struct.Struct('<4sI4B2I')
+_MIPS = struct.Struct('<32I')  # 16 offsets, 16 sizes
+PALETTE_BYTES = 256 * 4
+
+BLP1_JPEG = 0
+BLP1_PALETTE = 1
+
+BLP2_PALETTE = 1
+BLP2_DXT = 2
+BLP2_BGRA = 3
+
+# BLP2 DXT alpha type -> block format
+ALPHA_TYPES = {0: 'bc1', 1: 'bc2', 7: 'bc3'}
+# Block format written -> alpha type
+WRITE_FORMATS = {'bc1': 0, 'bc3': 7}
+
+
+def _unpack_alpha(data: bytes, depth: int, count: int) -> np.ndarray:
+    """Per-pixel alpha of a palettized BLP: 1, 4 or 8 bits per pixel, low bits first"""
+    raw = np.frombuffer(data, np.uint8)
+    if depth == 8:
+        return raw[:count]
+    if depth == 4:
+        return (np.stack([raw & 15, raw >> 4], axis=1).reshape(-1)[:count] * 17).astype(np.uint8)
+    if depth == 1:
+        return np.unpackbits(raw, bitorder='little')[:count] * np.uint8(255)
+    raise ValueError(f"Unsupported BLP alpha depth {depth}")
+
+
+class BLPTexture:
+    """Header, palette and mip table of a BLP1 or BLP2 file"""
+
+    def __init__(self, data: bytes, version: int, encoding: int, alpha_depth: int, alpha_type: int,
+                 width: int, height: int, offsets: List[int], sizes: List[int],
+                 palette: Optional[np.ndarray] = None, jpeg_header: bytes = b''):
+        self.data = data
+        self.version = version
+        self.encoding = encoding
+        self.alpha_depth = alpha_depth
+        self.alpha_type = alpha_type
+        self.width = width
+        self.height = height
+        self.offsets = offsets
+        self.sizes = sizes
+        self.palette = palette
+        self.jpeg_header = jpeg_header
+
+    @classmethod
+    def parse(cls, data: bytes) -> "BLPTexture":
+        magic = data[:4]
+        if magic == BLP1_MAGIC:
+            _, compression, alpha_bits, width, height, _, _ = _BLP1_HEADER.unpack_from(data)
+            pos = _BLP1_HEADER.size
+            encoding = BLP2_PALETTE if compression == BLP1_PALETTE else BLP1_JPEG
+            alpha_depth, alpha_type, version = alpha_bits, 0, 1
+        elif magic == BLP2_MAGIC:
+            _, kind, encoding, alpha_depth, alpha_type, _, width, height = _BLP2_HEADER.unpack_from(data)
+            if kind != 1:
+                raise ValueError(f"Unsupported BLP2 type {kind}")
+            pos = _BLP2_HEADER.size
+            version = 2
+        else:
+            raise ValueError(f"Not a BLP file (magic {magic!r})")
+
+        mips = _MIPS.unpack_from(data, pos)
+        pos += _MIPS.size
+        count = sum(1 for size in mips[MAX_MIPS:] if size) or 1
+        offsets, sizes = list(mips[:count]), list(mips[MAX_MIPS:MAX_MIPS + count])
+
+        palette = None
+        jpeg_header = b''
+        if encoding == BLP1_JPEG and version == 1:
+            header_size = struct.unpack_from('<I', data, pos)[0]
+            jpeg_header = bytes(data[pos + 4:pos + 4 + header_size])
+        else:
+            # BGRA entries
+            palette = np.frombuffer(data, np.uint8, PALETTE_BYTES, pos).reshape(256, 4)
+        return cls(data, version, encoding, alpha_depth, alpha_type, width, height, offsets, sizes,
+                   palette, jpeg_header)
+
+    @property
+    def mip_count(self) -> int:
+        return len(self.offsets)
+
+    def level_dimensions(self, level: int) -> Tuple[int, int]:
+        return max(1, self.width >> level), max(1, self.height >> level)
+
+    def decode(self, level: int = 0) -> np.ndarray:
+        """(height, width, 4) uint8 RGBA of one mip level"""
+        width, height = self.level_dimensions(level)
+        offset, size = self.offsets[level], self.sizes[level]
+        if offset + size > len(self.data):
+            raise ValueError(f"Truncated BLP: level {level} ends at {offset + size}, file is {len(self.data)} bytes")
+        surface = memoryview(self.data)[offset:offset + size]
+        count = width * height
+
+        if self.version == 1 and self.encoding == BLP1_JPEG:
+            return self._decode_jpeg(surface, width, height)
+        if self.encoding == BLP2_PALETTE:
+            indices = np.frombuffer(surface, np.uint8, count)
+            rgba = self.palette[indices][:, [2, 1, 0, 3]]
+            if self.alpha_depth:
+                rgba[:, 3] = _unpack_alpha(surface[count:], self.alpha_depth, count)
+            else:
+                rgba[:, 3] = 255
+            return rgba.reshape(height, width, 4)
+        if self.encoding == BLP2_DXT:
+            format = ALPHA_TYPES.get(self.alpha_type)
+            if format is None:
+                raise ValueError(f"Unsupported BLP alpha type {self.alpha_type}")
+            rgba = bcn.decode(surface, width, height, format)
+            if format == 'bc1' and not self.alpha_depth:
+                rgba[:, :, 3] = 255
+            return rgba
+        if self.encoding == BLP2_BGRA:
+            bgra = np.frombuffer(surface, np.uint8, count * 4).reshape(height, width, 4)
+            return np.ascontiguousarray(bgra[:, :, [2, 1, 0, 3]])
+        raise ValueError(f"Unsupported BLP encoding {self.encoding}")
+
+    def _decode_jpeg(self, surface, width: int, height: int) -> np.ndarray:
+        # BLP1 JPEGs hold BGRA in the YCbCr/CMYK channels
+        with Image.open(io.BytesIO(self.jpeg_header + bytes(surface))) as img:
+            channels = np.asarray(img)
+        rgba = np.empty((height, width, 4), np.uint8)
+        rgba[:, :, :3] = channels[:height, :width, 2::-1]
+        rgba[:, :, 3] = channels[:height, :width, 3] if channels.shape[2] == 4 and self.alpha_depth else 255
+        return rgba
+
+
+def read_blp(path: str, level: int = 0) -> np.ndarray:
+    """Decode one mip level of a BLP file to (height, width, 4) uint8 RGBA"""
+    with open(path, 'rb') as f:
+        return BLPTexture.parse(f.read()).decode(level)
+
+
+def blp_size(header: bytes) -> Tuple[int, int]:
+    """(width, height) from the first 28 bytes of a BLP file"""
+    if header[:4] == BLP1_MAGIC:
+        return _BLP1_HEADER.unpack_from(header)[3:5]
+    if header[:4] == BLP2_MAGIC:
+        return _BLP2_HEADER.unpack_from(header)[6:8]
+    raise ValueError("Not a BLP file")
+
+
+def choose_format(image: np.ndarray) -> Tuple[str, int]:
+    """(block format, alpha depth) for an image: DXT1 when alpha is absent or 1-bit, else DXT5"""
+    if image.shape[2] not in (2, 4):
+        return 'bc1', 0
+    alpha = image[:, :, -1]
+    if (alpha == 255).all():
+        return 'bc1', 0
+    if np.isin(alpha, (0, 255)).all():
+        return 'bc1', 1
+    return 'bc3', 8
+
+
+def encode_blp(image: np.ndarray, format: Optional[str] = None, mipmaps: bool = True,
+               levels: Optional[List[np.ndarray]] = None) -> bytes:
+    """
+    Compress an image into a BLP2 DXT texture
+
+    Args:
+        image: (height, width, channels) uint8 level 0
+        format: 'bc1' (DXT1) or 'bc3' (DXT5); default picks from the alpha channel
+        mipmaps: Store a mip chain (at most 16 levels)
+        levels: Precomputed mip chain (level 0 first) to store instead
+
+    Returns:
+        The BLP file contents
+    """
+    if format is None:
+        format, alpha_depth = choose_format(image)
+    elif format in WRITE_FORMATS:
+        alpha_depth = 8 if format == 'bc3' else (1 if image.shape[2] in (2, 4) else 0)
+    else:
+        raise ValueError(f"Cannot write BLP as '{format}' (expected one of {', '.join(WRITE_FORMATS)})")
+    chain = (levels or (mip_chain(image, MAX_MIPS) if mipmaps else [image]))[:MAX_MIPS]
+    height, width = chain[0].shape[:2]
+
+    surfaces = [bcn.encode(level, format) for level in chain]
+    offsets, sizes = [], []
+    offset = _BLP2_HEADER.size + _MIPS.size + PALETTE_BYTES
+    for surface in surfaces:
+        offsets.append(offset)
+        sizes.append(len(surface))
+        offset += len(surface)
+    padding = [0] * (MAX_MIPS - len(surfaces))
+
+    header = _BLP2_HEADER.pack(BLP2_MAGIC, 1, BLP2_DXT, alpha_depth, WRITE_FORMATS[format], int(len(chain) > 1),
+                               width, height)
+    mips = _MIPS.pack(*offsets, *padding, *sizes, *padding)
+    return b''.join([header, mips, bytes(PALETTE_BYTES)] + surfaces)
+
+
+def write_blp(path: str, image: np.ndarray, format: Optional[str] = None, mipmaps: bool = True,
+              levels: Optional[List[np.ndarray]] = None) -> int:
+    """Write encode_blp() output to path; returns bytes written"""
+    data = encode_blp(image, format, mipmaps, levels)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+
+# Example usage
+if __name__ == "__main__":
+    texture = read_blp("Interface/Icons/INV_Sword_04.blp")
+    print(f"Decoded {texture.shape[1]}x{texture.shape[0]}")
+    write_blp("INV_Sword_04_4x.blp", texture)
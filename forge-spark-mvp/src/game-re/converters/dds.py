@@ -0,0 +1,270 @@
+"""
+DDS Textures
+Reads DirectDraw Surface files (BC1-BC7 and uncompressed RGB/luminance) and
+writes BC1/BC3/BC7 DDS files with full mip chains
+"""
+
+import struct
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from . import bcn
+from .mipmaps import mip_chain
+
+DDS_MAGIC = b'DDS '
+
+_HEADER = struct.Struct('<7I44x')             # size, flags, height, width, pitch/linear size, depth, mip count
+_PIXEL_FORMAT = struct.Struct('<II4s5I')      # size, flags, fourcc, bit count, r/g/b/a masks
+_CAPS = struct.Struct('<5I')
+_DX10 = struct.Struct('<5I')                  # DXGI format, dimension, misc flags, array size, misc flags 2
+HEADER_SIZE = 4 + _HEADER.size + _PIXEL_FORMAT.size + _CAPS.size
+
+DDSD_CAPS = 0x1
+DDSD_HEIGHT = 0x2
+DDSD_WIDTH = 0x4
+DDSD_PITCH = 0x8
+DDSD_PIXELFORMAT = 0x1000
+DDSD_MIPMAPCOUNT = 0x20000
+DDSD_LINEARSIZE = 0x80000
+
+DDPF_ALPHAPIXELS = 0x1
+DDPF_ALPHA = 0x2
+DDPF_FOURCC = 0x4
+DDPF_RGB = 0x40
+DDPF_LUMINANCE = 0x20000
+
+DDSCAPS_COMPLEX = 0x8
+DDSCAPS_TEXTURE = 0x1000
+DDSCAPS_MIPMAP = 0x400000
+
+DIMENSION_TEXTURE2D = 3
+
+FOURCC_FORMATS = {
+    b'DXT1': 'bc1', b'DXT2': 'bc2', b'DXT3': 'bc2', b'DXT4': 'bc3', b'DXT5': 'bc3',
+    b'ATI1': 'bc4', b'BC4U': 'bc4', b'BC4S': 'bc4s', b'ATI2': 'bc5', b'BC5U': 'bc5', b'BC5S': 'bc5s'
+}
+
+DXGI_FORMATS = {
+    70: 'bc1', 71: 'bc1', 72: 'bc1', 73: 'bc2', 74: 'bc2', 75: 'bc2', 76: 'bc3', 77: 'bc3', 78: 'bc3',
+    79: 'bc4', 80: 'bc4', 81: 'bc4s', 82: 'bc5', 83: 'bc5', 84: 'bc5s',
+    94: 'bc6h', 95: 'bc6h', 96: 'bc6hs', 97: 'bc7', 98: 'bc7', 99: 'bc7'
+}
+
+# Uncompressed DXGI formats -> (bits per pixel, r, g, b, a masks)
+DXGI_MASKS = {
+    27: (32, 0xFF, 0xFF00, 0xFF0000, 0xFF000000), 28: (32, 0xFF, 0xFF00, 0xFF0000, 0xFF000000),
+    29: (32, 0xFF, 0xFF00, 0xFF0000, 0xFF000000),
+    87: (32, 0xFF0000, 0xFF00, 0xFF, 0xFF000000), 90: (32, 0xFF0000, 0xFF00, 0xFF, 0xFF000000),
+    91: (32, 0xFF0000, 0xFF00, 0xFF, 0xFF000000),
+    88: (32, 0xFF0000, 0xFF00, 0xFF, 0), 92: (32, 0xFF0000, 0xFF00, 0xFF, 0), 93: (32, 0xFF0000, 0xFF00, 0xFF, 0),
+    49: (16, 0xFF, 0xFF00, 0, 0), 61: (8, 0xFF, 0, 0, 0), 65: (8, 0, 0, 0, 0xFF)
+}
+
+# Format written -> (legacy FourCC, or None for a DX10 header with this DXGI format);
+# 'rgba' is uncompressed 32-bit RGBA with a legacy mask header
+WRITE_FORMATS = {'bc1': (b'DXT1', None), 'bc3': (b'DXT5', None), 'bc7': (None, 98), 'rgba': (None, None)}
+RGBA_MASKS = (0xFF, 0xFF00, 0xFF0000, 0xFF000000)
+
+
+def _mip_sizes(width: int, height: int, count: int) -> List[Tuple[int, int]]:
+    return [(max(1, width >> level), max(1, height >> level)) for level in range(count)]
+
+
+class DDSTexture:
+    """
+    Header and surface layout of a DDS file
+
+    Only the first surface (face / array slice) and its mip chain are
+    read; volume textures are not supported.
+    """
+
+    def __init__(self, data: bytes, width: int, height: int, mip_count: int, format: str,
+                 masks: Optional[Tuple[int, int, int, int, int]], offset: int, luminance: bool = False):
+        self.data = data
+        self.width = width
+        self.height = height
+        self.mip_count = mip_count
+        self.format = format
+        self.masks = masks
+        self.offset = offset
+        self.luminance = luminance
+
+    @classmethod
+    def parse(cls, data: bytes) -> "DDSTexture":
+        if data[:4] != DDS_MAGIC or len(data) < HEADER_SIZE:
+            raise ValueError("Not a DDS file")
+        size, flags, height, width, _, _, mip_count = _HEADER.unpack_from(data, 4)
+        pf_size, pf_flags, fourcc, bit_count, r, g, b, a = _PIXEL_FORMAT.unpack_from(data, 4 + _HEADER.size)
+        offset = HEADER_SIZE
+        masks = None
+        luminance = False
+        if pf_flags & DDPF_FOURCC and fourcc == b'DX10':
+            dxgi = _DX10.unpack_from(data, offset)[0]
+            offset += _DX10.size
+            if dxgi in DXGI_FORMATS:
+                format = DXGI_FORMATS[dxgi]
+            elif dxgi in DXGI_MASKS:
+                format, masks = 'masked', DXGI_MASKS[dxgi]
+            else:
+                raise ValueError(f"Unsupported DXGI format {dxgi}")
+        elif pf_flags & DDPF_FOURCC:
+            if fourcc not in FOURCC_FORMATS:
+                raise ValueError(f"Unsupported DDS FourCC {fourcc!r}")
+            format = FOURCC_FORMATS[fourcc]
+        elif pf_flags & (DDPF_RGB | DDPF_LUMINANCE | DDPF_ALPHA) and bit_count in (8, 16, 24, 32):
+            alpha = a if pf_flags & (DDPF_ALPHAPIXELS | DDPF_ALPHA) else 0
+            format, masks = 'masked', (bit_count, r, g, b, alpha)
+            luminance = bool(pf_flags & DDPF_LUMINANCE)
+        else:
+            raise ValueError(f"Unsupported DDS pixel format (flags {pf_flags:#x}, {bit_count} bits)")
+        mip_count = mip_count if flags & DDSD_MIPMAPCOUNT and mip_count else 1
+        return cls(data, width, height, mip_count, format, masks, offset, luminance)
+
+    def level_size(self, width: int, height: int) -> int:
+        if self.format == 'masked':
+            return width * height * self.masks[0] // 8
+        return bcn.level_size(width, height, self.format)
+
+    def levels(self) -> List[Tuple[int, int, int]]:
+        """(offset, width, height) of each mip level"""
+        levels = []
+        offset = self.offset
+        for width, height in _mip_sizes(self.width, self.height, self.mip_count):
+            levels.append((offset, width, height))
+            offset += self.level_size(width, height)
+        return levels
+
+    def decode(self, level: int = 0) -> np.ndarray:
+        """(height, width, 4) uint8 RGBA of one mip level"""
+        offset, width, height = self.levels()[level]
+        size = self.level_size(width, height)
+        if offset + size > len(self.data):
+            raise ValueError(f"Truncated DDS: level {level} needs {offset + size} bytes, have {len(self.data)}")
+        surface = memoryview(self.data)[offset:offset + size]
+        if self.format != 'masked':
+            return bcn.decode(surface, width, height, self.format)
+        return self._decode_masked(surface, width, height)
+
+    def _decode_masked(self, surface, width: int, height: int) -> np.ndarray:
+        bit_count, *masks = self.masks
+        step = bit_count // 8
+        raw = np.frombuffer(surface, np.uint8).reshape(-1, step).astype(np.uint64)
+        pixels = (raw << (8 * np.arange(step, dtype=np.uint64))).sum(axis=1, dtype=np.uint64)
+        rgba = np.empty((len(pixels), 4), np.uint8)
+        for channel, mask in enumerate(masks):
+            if not mask:
+                rgba[:, channel] = 255 if channel == 3 else 0
+                continue
+            shift = (mask & -mask).bit_length() - 1
+            top = mask >> shift
+            rgba[:, channel] = ((pixels & mask) >> shift) * 255 // top
+        if self.luminance:
+            rgba[:, 1] = rgba[:, 2] = rgba[:, 0]
+        return rgba.reshape(height, width, 4)
+
+
+def read_dds(path: str, level: int = 0) -> np.ndarray:
+    """Decode one mip level of a DDS file to (height, width, 4) uint8 RGBA"""
+    with open(path, 'rb') as f:
+        return DDSTexture.parse(f.read()).decode(level)
+
+
+def dds_size(header: bytes) -> Tuple[int, int]:
+    """(width, height) from the first 128 bytes of a DDS file"""
+    if header[:4] != DDS_MAGIC:
+        raise ValueError("Not a DDS file")
+    _, _, height, width, _, _, _ = _HEADER.unpack_from(header, 4)
+    return width, height
+
+
+def _check_chain(chain: List[np.ndarray]):
+    """Level n must be max(1, size >> n), as readers derive the layout from level 0"""
+    height, width = chain[0].shape[:2]
+    for level, (w, h) in enumerate(_mip_sizes(width, height, len(chain))):
+        if chain[level].shape[:2] != (h, w):
+            raise ValueError(f"Mip level {level} is {chain[level].shape[1]}x{chain[level].shape[0]}, expected {w}x{h}")
+
+
+def encode_dds(image: np.ndarray, format: str = 'bc7', mipmaps: bool = True,
+               levels: Optional[List[np.ndarray]] = None) -> bytes:
+    """
+    Compress an image (and its mip chain) into a DDS file
+
+    Args:
+        image: (height, width, channels) uint8 level 0
+        format: 'bc1', 'bc3' (legacy DXT1/DXT5 headers), 'bc7' (DX10 header)
+            or 'rgba' (uncompressed)
+        mipmaps: Store a full chain down to 1x1 (box-filtered in linear light)
+        levels: Precomputed mip chain (level 0 first) to store instead
+
+    Returns:
+        The DDS file contents
+    """
+    if format not in WRITE_FORMATS:
+        raise ValueError(f"Cannot write DDS as '{format}' (expected one of {', '.join(WRITE_FORMATS)})")
+    chain = levels or (mip_chain(image) if mipmaps else [image])
+    _check_chain(chain)
+    height, width = chain[0].shape[:2]
+    fourcc, dxgi = WRITE_FORMATS[format]
+
+    flags = DDSD_CAPS | DDSD_HEIGHT | DDSD_WIDTH | DDSD_PIXELFORMAT
+    caps = DDSCAPS_TEXTURE
+    if len(chain) > 1:
+        flags |= DDSD_MIPMAPCOUNT
+        caps |= DDSCAPS_COMPLEX | DDSCAPS_MIPMAP
+    if format == 'rgba':
+        flags |= DDSD_PITCH
+        pitch = width * 4
+        pixel_format = _PIXEL_FORMAT.pack(_PIXEL_FORMAT.size, DDPF_RGB | DDPF_ALPHAPIXELS, b'\0' * 4, 32,
+                                          *RGBA_MASKS)
+    else:
+        flags |= DDSD_LINEARSIZE
+        pitch = bcn.level_size(width, height, format)
+        pixel_format = _PIXEL_FORMAT.pack(_PIXEL_FORMAT.size, DDPF_FOURCC, fourcc or b'DX10', 0, 0, 0, 0, 0)
+    parts = [
+        DDS_MAGIC,
+        _HEADER.pack(_HEADER.size + _PIXEL_FORMAT.size + _CAPS.size, flags, height, width, pitch, 0, len(chain)),
+        pixel_format,
+        _CAPS.pack(caps, 0, 0, 0, 0)
+    ]
+    if dxgi:
+        parts.append(_DX10.pack(dxgi, DIMENSION_TEXTURE2D, 0, 1, 0))
+    if format == 'rgba':
+        parts.extend(bcn.to_rgba(level).tobytes() for level in chain)
+    else:
+        parts.extend(bcn.encode(level, format) for level in chain)
+    return b''.join(parts)
+
+
+def write_dds(path: str, image: np.ndarray, format: str = 'bc7', mipmaps: bool = True) -> int:
+    """Write encode_dds() output to path; returns bytes written"""
+    return write_dds_chain(path, mip_chain(image) if mipmaps else [image], format)
+
+
+def write_dds_chain(path: str, levels: List[np.ndarray], format: str = 'bc7') -> int:
+    """
+    Store a whole mip chain (see mipmaps.mip_chain) in one DDS file
+
+    Args:
+        path: Output file
+        levels: uint8 levels, largest first, each max(1, size >> n)
+        format: See encode_dds
+
+    Returns:
+        Bytes written
+    """
+    data = encode_dds(levels[0], format, levels=levels)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+
+# Example usage
+if __name__ == "__main__":
+    texture = read_dds("texture.dds")
+    print(f"Decoded {texture.shape[1]}x{texture.shape[0]}")
+    write_dds("texture_bc7.dds", texture, format="bc7")
+
+    # Cutout foliage: Kaiser-filtered mips that keep their alpha-test coverage
+    write_dds_chain("foliage.dds", mip_chain(texture, filter="kaiser", alpha_cutoff=0.5), format="rgba")
@@ -0,0 +1,215 @@
+"""
+Mipmap Generation
+Successive half-size levels of a texture down to 1x1, each filtered from the
+one before it in linear light, with optional alpha-coverage preservation
+"""
+
+from typing import List, Literal, Optional, Tuple
+
+import numpy as np
+
+MipFilter = Literal['box', 'kaiser']
+FILTERS = ('box', 'kaiser')
+
+# Kaiser-windowed sinc: support radius in output pixels, window shape, sinc stretch
+KAISER_WIDTH = 3.0
+KAISER_ALPHA = 4.0
+KAISER_STRETCH = 1.0
+
+# Output rows filtered per step, bounding the float32 working set of each level
+STRIP_ROWS = 64
+
+# sRGB-encoded byte -> linear light
+SRGB_TO_LINEAR = np.where(
+    np.arange(256) / 255 <= 0.04045,
+    np.arange(256) / 255 / 12.92,
+    ((np.arange(256) / 255 + 0.055) / 1.055) ** 2.4
+).astype(np.float32)
+
+
+def linear_to_srgb(linear: np.ndarray) -> np.ndarray:
+    """Linear light in [0, 1] -> sRGB-encoded [0, 1]"""
+    linear = np.clip(linear, 0, 1)
+    return np.where(linear <= 0.0031308, linear * np.float32(12.92),
+                    np.float32(1.055) * linear ** np.float32(1 / 2.4) - np.float32(0.055))
+
+
+def mip_count(width: int, height: int) -> int:
+    """Levels in a full chain (largest edge halved down to 1)"""
+    return max(width, height).bit_length()
+
+
+def _kaiser(x: np.ndarray) -> np.ndarray:
+    """Kaiser-windowed sinc at x output pixels from the centre"""
+    t = x / KAISER_WIDTH
+    window = np.i0(KAISER_ALPHA * np.sqrt(np.clip(1 - t * t, 0, None))) / np.i0(KAISER_ALPHA)
+    return np.sinc(x * KAISER_STRETCH) * np.where(np.abs(t) < 1, window, 0)
+
+
+def filter_taps(size: int, out_size: int, filter: MipFilter = 'box') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Input indices and weights of each output sample along one axis
+
+    Output pixel i covers input [i, i + 1) * size / out_size. The box
+    filter weighs input pixels by their overlap with that span (so odd
+    sizes average 3 pixels with a half-weight edge); the Kaiser filter
+    weighs them by a windowed sinc of their distance from its centre.
+    Indices past the edges are clamped.
+
+    Returns:
+        (out_size, taps) int64 indices and float32 weights summing to 1 per row
+    """
+    if filter not in FILTERS:
+        raise ValueError(f"Unknown mip filter '{filter}' (expected one of {', '.join(FILTERS)})")
+    ratio = size / out_size
+    centres = (np.arange(out_size) + 0.5) * ratio
+    radius = ratio / 2 if filter == 'box' else KAISER_WIDTH * ratio
+    first = np.floor(centres - radius).astype(np.int64)
+    indices = first[:, None] + np.arange(int(np.ceil(2 * radius)) + 1)
+    if filter == 'box':
+        weights = np.clip(np.minimum(indices + 1, (centres + radius)[:, None])
+                          - np.maximum(indices, (centres - radius)[:, None]), 0, None)
+    else:
+        weights = _kaiser((indices + 0.5 - centres[:, None]) / ratio)
+    keep = (weights != 0).any(axis=0)
+    indices, weights = indices[:, keep], weights[:, keep]
+    weights = weights / weights.sum(axis=1, keepdims=True)
+    return np.clip(indices, 0, size - 1), weights.astype(np.float32)
+
+
+def _resample(image: np.ndarray, indices: np.ndarray, weights: np.ndarray, axis: int) -> np.ndarray:
+    """Weighted sum of gathered rows (axis 0) or columns (axis 1)"""
+    shape = (-1,) + (1,) * (image.ndim - axis - 1)
+    out = np.take(image, indices[:, 0], axis=axis) * weights[:, 0].reshape(shape)
+    for tap in range(1, indices.shape[1]):
+        out += np.take(image, indices[:, tap], axis=axis) * weights[:, tap].reshape(shape)
+    return out
+
+
+def _color_channels(channels: int) -> int:
+    """Leading channels that hold colour; a trailing alpha (2 or 4 channels) is linear already"""
+    return channels - 1 if channels in (2, 4) else channels
+
+
+def to_linear(rows: np.ndarray, srgb: bool = True) -> np.ndarray:
+    """uint8 rows -> float32 in [0, 1], colour channels decoded from sRGB"""
+    linear = rows * np.float32(1 / 255)
+    if srgb:
+        colors = _color_channels(rows.shape[2])
+        linear[:, :, :colors] = SRGB_TO_LINEAR[rows[:, :, :colors]]
+    return linear
+
+
+def from_linear(linear: np.ndarray, srgb: bool = True, alpha_scale: float = 1.0) -> np.ndarray:
+    """float32 in [0, 1] -> uint8, colour channels encoded to sRGB and alpha scaled by alpha_scale"""
+    colors = _color_channels(linear.shape[2])
+    out = np.empty(linear.shape, np.uint8)
+    color = linear[:, :, :colors]
+    out[:, :, :colors] = (linear_to_srgb(color) if srgb else np.clip(color, 0, 1)) * 255 + 0.5
+    if colors < linear.shape[2]:
+        out[:, :, colors:] = np.clip(linear[:, :, colors:] * np.float32(alpha_scale), 0, 1) * 255 + 0.5
+    return out
+
+
+def downsample_linear(level: np.ndarray, filter: MipFilter = 'box', srgb: bool = True) -> np.ndarray:
+    """
+    Next level of a chain, as float32 linear light
+
+    `level` is either the uint8 level 0 (decoded from sRGB strip by strip,
+    so no full-size float copy is made) or the float32 output of a
+    previous call. Output sizes are floor(n / 2), as DDS and BLP expect.
+
+    Args:
+        level: (height, width, channels) uint8 or float32 linear
+        filter: 'box' or 'kaiser'
+        srgb: uint8 colour channels are sRGB-encoded (False for normal and data maps)
+    """
+    height, width, channels = level.shape
+    out_height, out_width = max(1, height // 2), max(1, width // 2)
+    rows, row_weights = filter_taps(height, out_height, filter)
+    columns, column_weights = filter_taps(width, out_width, filter)
+
+    out = np.empty((out_height, out_width, channels), np.float32)
+    for start in range(0, out_height, STRIP_ROWS):
+        strip = rows[start:start + STRIP_ROWS]
+        low, high = strip.min(), strip.max() + 1
+        source = level[low:high]
+        if source.dtype == np.uint8:
+            source = to_linear(source, srgb)
+        vertical = _resample(source, strip - low, row_weights[start:start + STRIP_ROWS], 0)
+        out[start:start + len(strip)] = _resample(vertical, columns, column_weights, 1)
+    # Kaiser lobes can overshoot; clamp so they do not build up down the chain
+    return np.clip(out, 0, 1, out=out)
+
+
+def downsample(image: np.ndarray, filter: MipFilter = 'box', srgb: bool = True) -> np.ndarray:
+    """Half-size uint8 level of a (height, width, channels) uint8 image"""
+    return from_linear(downsample_linear(image, filter, srgb), srgb)
+
+
+def alpha_coverage(alpha: np.ndarray, cutoff: float) -> float:
+    """Fraction of alpha values (in [0, 1]) that pass an alpha test at cutoff"""
+    return float(np.count_nonzero(alpha > cutoff)) / alpha.size
+
+
+def coverage_scale(alpha: np.ndarray, cutoff: float, coverage: float) -> float:
+    """
+    Smallest factor for `alpha` that makes `coverage` of it pass the alpha test
+
+    Filtering only ever loses coverage (thin cutout detail blurs below the
+    cutoff), so a level that already has at least the target coverage,
+    including a fully opaque one, keeps its alpha (factor 1). Otherwise
+    the value that must just pass is the k-th largest alpha, found with a
+    partial sort, and the factor lifts it over the cutoff; opaque texels
+    clip at 1 and stay opaque.
+    """
+    count = alpha.size
+    target = int(round(coverage * count))
+    if target == 0 or np.count_nonzero(alpha > cutoff) >= target:
+        return 1.0
+    kth = float(np.partition(alpha.ravel(), count - target)[count - target])
+    if kth <= 0:
+        # Too few texels have any alpha: let all of them pass
+        positive = alpha[alpha > 0]
+        if not positive.size:
+            return 1.0
+        kth = float(positive.min())
+    # Alpha is float32: step the float32 quotient up until the product clears the cutoff
+    kth = np.float32(kth)
+    scale = np.float32(cutoff) / kth
+    while kth * scale <= cutoff:
+        scale = np.nextafter(scale, np.float32(np.inf))
+    return float(scale)
+
+
+def mip_chain(image: np.ndarray, levels: Optional[int] = None, filter: MipFilter = 'box', srgb: bool = True,
+              alpha_cutoff: Optional[float] = None) -> List[np.ndarray]:
+    """
+    [image, half, quarter, ...] down to 1x1 (or `levels` levels)
+
+    Each level is filtered from the float32 linear-light level before it,
+    so there is no re-quantization between levels, and only the newest
+    float level is kept.
+
+    Args:
+        image: (height, width, channels) uint8 level 0
+        levels: Cap on the number of levels, including level 0
+        filter: 'box' (2x2 average) or 'kaiser' (sharper windowed sinc)
+        srgb: Colour channels are sRGB-encoded; False for normal and data maps
+        alpha_cutoff: Alpha-test threshold in [0, 1] of a cutout texture;
+            each level's alpha is scaled so the fraction of pixels passing
+            the test matches level 0, instead of shrinking with every level
+    """
+    height, width, channels = image.shape
+    count = mip_count(width, height) if levels is None else min(levels, mip_count(width, height))
+    coverage = None
+    if alpha_cutoff is not None and channels in (2, 4):
+        coverage = alpha_coverage(image[:, :, -1] * np.float32(1 / 255), alpha_cutoff)
+
+    chain = [image]
+    linear = image
+    while len(chain) < count:
+        linear = downsample_linear(linear, filter, srgb)
+        scale = 1.0 if coverage is None else coverage_scale(linear[:, :, -1], alpha_cutoff, coverage)
+        chain.append(from_linear(linear, srgb, scale))
+    return chain
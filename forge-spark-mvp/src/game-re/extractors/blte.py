@@ -0,0 +1,115 @@
+"""
+BLTE Decoder
+Block Table Encoding used by CASC for every stored file. Blobs are decoded
+chunk by chunk, optionally with chunks decompressed concurrently
+"""
+
+import hashlib
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import Executor
+from typing import Iterator, List, Optional, Tuple
+
+BLTE_MAGIC = b'BLTE'
+
+# Chunk table entry: encoded size, decoded size, MD5 of the encoded chunk
+_CHUNK_INFO = struct.Struct('>II16s')
+
+
+def decode_chunk(chunk) -> bytes:
+    """Decode one BLTE chunk (mode byte + payload)"""
+    mode = chunk[0]
+    if mode == 0x4E:    # 'N' - stored
+        return bytes(chunk[1:])
+    if mode == 0x5A:    # 'Z' - zlib
+        return zlib.decompress(chunk[1:])
+    if mode == 0x46:    # 'F' - nested BLTE frame
+        return decode_blte(chunk[1:])
+    if mode == 0x45:    # 'E' - encrypted
+        raise NotImplementedError("Encrypted BLTE chunks need TACT keys")
+    raise NotImplementedError(f"Unsupported BLTE chunk mode: {chr(mode)!r}")
+
+
+def _decode_checked(chunk, size: int, checksum: Optional[bytes]) -> bytes:
+    if checksum is not None and hashlib.md5(chunk).digest() != checksum:
+        raise ValueError("BLTE chunk checksum mismatch")
+    data = decode_chunk(chunk)
+    if size is not None and len(data) != size:
+        raise ValueError(f"BLTE chunk decoded to {len(data)} bytes, expected {size}")
+    return data
+
+
+def read_header(data) -> List[Tuple[int, int, Optional[int], bytes]]:
+    """
+    Chunk layout of a BLTE blob
+
+    Returns:
+        [(start, end, decoded size, md5), ...] offsets into `data`; a
+        headerless blob is one chunk of unknown decoded size (None)
+    """
+    if bytes(data[:4]) != BLTE_MAGIC:
+        raise ValueError("Not a BLTE blob")
+    header_size = struct.unpack_from('>I', data, 4)[0]
+    if header_size == 0:
+        return [(8, len(data), None, b'')]
+
+    count = int.from_bytes(data[9:12], 'big')
+    chunks = []
+    pos = header_size
+    for i in range(count):
+        packed_size, size, checksum = _CHUNK_INFO.unpack_from(data, 12 + i * _CHUNK_INFO.size)
+        chunks.append((pos, pos + packed_size, size, checksum))
+        pos += packed_size
+    if pos > len(data):
+        raise ValueError(f"BLTE blob is truncated ({len(data)} of {pos} bytes)")
+    return chunks
+
+
+def decoded_size(data) -> Optional[int]:
+    """Total decoded size from the chunk table (None for headerless blobs)"""
+    chunks = read_header(data)
+    if chunks[0][2] is None:
+        return None
+    return sum(size for _, _, size, _ in chunks)
+
+
+def iter_blte(data, executor: Optional[Executor] = None, window: int = 8, verify: bool = False) -> Iterator[bytes]:
+    """
+    Yield the decoded chunks of a BLTE blob in order
+
+    Args:
+        data: The blob (bytes, or a memoryview into a mapped data file)
+        executor: If given, up to `window` chunks are decoded concurrently
+            (zlib releases the GIL, so a thread pool scales across cores)
+        verify: Check each chunk's MD5 before decoding
+    """
+    view = memoryview(data)
+    chunks = read_header(view)
+    if executor is None or len(chunks) < 2:
+        for start, end, size, checksum in chunks:
+            yield _decode_checked(view[start:end], size, checksum if verify else None)
+        return
+
+    pending = deque()
+    for start, end, size, checksum in chunks:
+        pending.append(executor.submit(_decode_checked, view[start:end], size, checksum if verify else None))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def decode_blte(data, executor: Optional[Executor] = None, verify: bool = False) -> bytes:
+    """Decode a complete BLTE blob"""
+    size = decoded_size(data)
+    if size is None:
+        return b''.join(iter_blte(data, executor, verify=verify))
+
+    out = bytearray(size)
+    pos = 0
+    with memoryview(out) as target:
+        for chunk in iter_blte(data, executor, verify=verify):
+            target[pos:pos + len(chunk)] = chunk
+            pos += len(chunk)
+    return bytes(out)
@@ -3,10 +3,41 @@ CASC Storage Extractor
 Modern WoW (Legion+) storage system extractor
 """
 
+import mmap
 import os
+import shutil
 import struct
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Sequence, Tuple
+
+from .blte import decode_blte, iter_blte
+from .casc_index import DEFAULT_CACHE_DIR, CASCIndex
+from .casc_root import LOCALES, RootFile
+from .casc_tables import EKeyIndex, EncodingTable, parse_build_info, parse_config
+from .mpq_extractor import safe_output_path
+
+# Every data.NNN entry starts with: reversed ekey (16), size (4), flags (2), checksums (8)
+DATA_HEADER_SIZE = 0x1E
+
+# Blobs at least this large have their chunks decompressed on the thread pool
+PARALLEL_MIN_BYTES = 1024 * 1024
+
+# extract_all() kinds -> file extensions
+ASSET_TYPES = {
+    'models': ('.m2',),
+    'textures': ('.blp',),
+    'sounds': ('.mp3', '.ogg')
+}
+
+# Bulk extraction: encoded bytes / blobs handed to one worker task
+EXTRACT_BATCH_BYTES = 8 * 1024 * 1024
+EXTRACT_BATCH_BLOBS = 256
+
+_EXTRACT_ERRORS = (OSError, ValueError, NotImplementedError, struct.error, zlib.error)
+
 
 class CASCExtractor:
     """
@@ -14,11 +45,29 @@ class CASCExtractor:
     Used in modern World of Warcraft (Legion, BfA, Shadowlands, Dragonflight)
     """
     
-    def __init__(self, game_path: str):
+    def __init__(
+        self,
+        game_path: str,
+        product: Optional[str] = None,
+        workers: Optional[int] = None,
+        listfiles: Sequence[str] = (),
+        locale: str = 'enUS',
+        cache_dir: Optional[str] = DEFAULT_CACHE_DIR
+    ):
         self.game_path = Path(game_path)
         self.data_path = self.game_path / "Data"
-        self.indices = {}
-        self.encoding = {}
+        self.product = product
+        self.workers = workers or os.cpu_count() or 1
+        self.listfiles = list(listfiles)
+        self.locale = LOCALES[locale]
+        self.cache_dir = cache_dir
+        self.build_info = {}
+        self.build_config = {}
+        self.indices: Optional[EKeyIndex] = None
+        self.encoding: Optional[EncodingTable] = None
+        self.index: Optional[CASCIndex] = None
+        self._archives: Dict[int, Tuple[object, mmap.mmap]] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
         
     def initialize(self):
         """Initialize CASC storage"""
@@ -27,126 +76,413 @@ class CASCExtractor:
         # Read .build.info
         self._read_build_info()
         
-        # Read encoding file
-        self._read_encoding()
-        
         # Read indices
         self._read_indices()
         
+        # Read encoding file (located through the indices)
+        self._read_encoding()
+        
+        # Root file joined with the listfiles (cached per build)
+        self._read_root()
+        
         print("CASC initialized successfully")
         
+    def close(self):
+        """Stop the decode threads and unmap the data files"""
+        if self._executor:
+            self._executor.shutdown()
+            self._executor = None
+        for f, mapped in self._archives.values():
+            mapped.close()
+            f.close()
+        self._archives = {}
+        
+    def __enter__(self):
+        self.initialize()
+        return self
+        
+    def __exit__(self, *exc):
+        self.close()
+        
     def _read_build_info(self):
         """Read build configuration"""
         build_info_path = self.game_path / ".build.info"
-        if build_info_path.exists():
-            print("Found .build.info")
-            # Parse build info
-            # Real implementation would parse actual file
+        if not build_info_path.exists():
+            raise FileNotFoundError(f"No .build.info in {self.game_path}")
+        
+        rows = parse_build_info(build_info_path.read_text(encoding='utf-8'))
+        active = [row for row in rows if row.get('Active', '1') == '1'] or rows
+        if self.product:
+            active = [row for row in active if row.get('Product') == self.product]
+        if not active:
+            raise ValueError(f"No active build in {build_info_path}")
+        self.build_info = active[0]
+        
+        build_key = self.build_info['Build Key']
+        self.build_config = parse_config(self._config_path(build_key).read_text(encoding='utf-8'))
+        print(f"Build {self.build_info.get('Version', build_key)}")
+        
+    def _config_path(self, key: str) -> Path:
+        return self.data_path / "config" / key[0:2] / key[2:4] / key
             
     def _read_encoding(self):
         """Read encoding file"""
         print("Reading encoding file...")
-        # Real implementation would:
-        # 1. Find encoding file from build info
-        # 2. Parse encoding entries
-        # 3. Build content key -> encoding key map
+        # build config: encoding = <content key> <encoding key>
+        encoding_ekey = bytes.fromhex(self.build_config['encoding'][1])
+        self.encoding = EncodingTable.parse(self.read_encoded(encoding_ekey))
+        print(f"Encoding table: {len(self.encoding)} content keys ({self.encoding.nbytes / 1e6:.1f} MB)")
+        
+    def _read_root(self):
+        """Load the FileDataID / name index, parsing the root file if it is not cached"""
+        root_ckey = self.build_config['root'][0]
+        
+        def load_root() -> RootFile:
+            print("Reading root file...")
+            return RootFile.parse(self.read_file(bytes.fromhex(root_ckey)))
+        
+        self.index = CASCIndex.open(root_ckey, load_root, self.listfiles, self.locale, self.cache_dir)
+        print(f"Root: {len(self.index)} files, {len(self.index.names)} named")
         
     def _read_indices(self):
         """Read data indices"""
         print("Reading CASC indices...")
-        # Real implementation would:
-        # 1. Find all .idx files
-        # 2. Parse index entries
-        # 3. Build file location map
+        # Each of the 16 buckets may have several versions (BBVVVVVVVV.idx); the highest wins
+        latest = {}
+        for path in sorted((self.data_path / "data").glob("*.idx")):
+            stem = path.stem
+            if len(stem) == 10:
+                latest[stem[:2]] = path
+        self.indices = EKeyIndex.from_idx_files([str(path) for path in latest.values()])
+        print(f"Index: {len(self.indices)} encoding keys ({self.indices.nbytes / 1e6:.1f} MB)")
+        
+    def _data_file(self, archive: int) -> mmap.mmap:
+        """Memory map of data.NNN, opened on first use"""
+        if archive not in self._archives:
+            f = open(self.data_path / "data" / f"data.{archive:03d}", 'rb')
+            try:
+                self._archives[archive] = (f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            except (OSError, ValueError):
+                f.close()
+                raise
+        return self._archives[archive][1]
+        
+    def _encoded_blob(self, ekey: bytes, parallel: bool = True) -> Tuple[memoryview, Optional[ThreadPoolExecutor]]:
+        """View of the BLTE blob stored under an encoding key, and the executor to decode it with"""
+        location = self.indices.locate(ekey)
+        if location is None:
+            raise FileNotFoundError(f"Encoding key {ekey.hex()} is not in the local indices")
+        archive, offset, size = location
+        view = memoryview(self._data_file(archive))[offset + DATA_HEADER_SIZE:offset + size]
+        
+        executor = None
+        if parallel and size >= PARALLEL_MIN_BYTES and self.workers > 1:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers)
+            executor = self._executor
+        return view, executor
+        
+    def iter_encoded(self, ekey: bytes, verify: bool = False, parallel: bool = True) -> Iterator[bytes]:
+        """
+        Stream the decoded chunks of the blob stored under an encoding key
+        
+        Chunks are decoded straight from the mapped data file; for large
+        blobs up to 2 x workers chunks are decompressed ahead in parallel
+        (unless `parallel` is off, as when blobs are already spread over
+        threads).
+        """
+        view, executor = self._encoded_blob(ekey, parallel)
+        with view:
+            yield from iter_blte(view, executor, window=self.workers * 2, verify=verify)
+        
+    def read_encoded(self, ekey: bytes) -> bytes:
+        """Read and BLTE-decode the blob stored under an encoding key"""
+        view, executor = self._encoded_blob(ekey)
+        with view:
+            return decode_blte(view, executor)
+        
+    def resolve(self, filename: str) -> bytes:
+        """
+        Content key of a file
+        
+        Args:
+            filename: A listfile name, a FileDataID, or a content key as 32 hex digits
+            
+        Returns:
+            The 16-byte content key
+        """
+        name = filename.strip()
+        ckey = None
+        if name.isdigit():
+            ckey = self.index.by_file_data_id(int(name))
+        elif len(name) == 32 and all(c in '0123456789abcdefABCDEF' for c in name):
+            ckey = bytes.fromhex(name)
+        else:
+            ckey = self.index.by_name(name)
+        if ckey is None:
+            raise FileNotFoundError(f"Not in the root file: {filename}")
+        return ckey
+        
+    def _encoding_key(self, ckey: bytes) -> Tuple[bytes, int]:
+        found = self.encoding.find_ekey(ckey)
+        if found is None:
+            raise FileNotFoundError(f"Content key {ckey.hex()} is not in the encoding table")
+        return found
+        
+    def read_file(self, ckey: bytes) -> bytes:
+        """Decoded contents of the file with this content key"""
+        return self.read_encoded(self._encoding_key(ckey)[0])
+        
+    def iter_file(self, filename: str, verify: bool = False) -> Iterator[bytes]:
+        """Stream a file's decoded contents chunk by chunk"""
+        return self.iter_encoded(self._encoding_key(self.resolve(filename))[0], verify)
         
     def list_files(self, pattern: str = "*") -> List[str]:
-        """List files matching pattern"""
-        # Simplified list
-        return [
-            "character/human/male/humanmale.m2",
-            "character/orc/male/orcmale.m2",
-            "world/maps/azeroth/azeroth.wdt",
-            "textures/bakednpctextures/critter_rabbit.blp",
-            "sound/music/citymusic/stormwind/stormwind_intro.mp3"
-        ]
-        
-    def extract_file_by_name(self, filename: str, output_path: str):
-        """Extract file by name"""
-        print(f"Extracting: {filename}")
+        """List named files matching a glob pattern (see CASCIndex.query)"""
+        return [entry['filename'] for entry in self.index.query(pattern=pattern)]
         
-        # Real implementation would:
-        # 1. Look up file in listfile
-        # 2. Get content key
-        # 3. Get encoding key from content key
-        # 4. Find data location from index
-        # 5. Read and decompress data
-        # 6. Write to output
+    def extract_file_by_name(self, filename: str, output_path: str) -> int:
+        """
+        Extract file by name, streaming it to disk chunk by chunk
         
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        with open(output_path, 'wb') as f:
-            f.write(b'CASC extracted content')
+        Returns:
+            Bytes written
+        """
+        print(f"Extracting: {filename}")
+        
+        written = self._write_encoded(self._encoding_key(self.resolve(filename))[0], output_path)
             
         print(f"Extracted to: {output_path}")
+        return written
         
-    def extract_all_models(self, output_dir: str):
-        """Extract all M2 model files"""
-        print("Extracting all models...")
+    def _write_encoded(self, ekey: bytes, output_path: str, parallel: bool = True) -> int:
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        written = 0
+        with open(output_path, 'wb') as f:
+            for chunk in self.iter_encoded(ekey, parallel=parallel):
+                f.write(chunk)
+                written += len(chunk)
+        return written
         
-        models = [f for f in self.list_files() if f.endswith('.m2')]
+    def extract_all(
+        self,
+        output_dir: str,
+        kinds: Optional[Iterable[str]] = None,
+        pattern: Optional[str] = None,
+        extensions: Optional[Iterable[str]] = None,
+        prefix: Optional[str] = None,
+        workers: Optional[int] = None,
+        progress: Optional[Callable[[int, int, str], None]] = None,
+        link: bool = True
+    ) -> Dict:
+        """
+        Extract every named file matching the filters in one parallel pass
         
-        for model in models:
-            output_path = os.path.join(output_dir, model)
-            self.extract_file_by_name(model, output_path)
+        Args:
+            output_dir: Destination directory (listfile paths are kept)
+            kinds: Keys of ASSET_TYPES, e.g. ['models', 'textures']
+            pattern: Glob over listfile names
+            extensions: Extra file extensions to include
+            prefix: Leading path, e.g. 'world/maps/'
+            workers: Extraction threads (default: self.workers)
+            progress: Called as progress(done, total, filename)
+            link: Hard-link files with identical contents (see extract_files)
             
-        print(f"Extracted {len(models)} models")
+        Returns:
+            extract_files() summary
+        """
+        suffixes = list(extensions or ())
+        for kind in kinds or ():
+            suffixes.extend(ASSET_TYPES[kind])
+        entries = self.index.query(pattern, suffixes, prefix)
+        targets = [(entry['filename'], bytes.fromhex(entry['content_key'])) for entry in entries]
+        return self._bulk_extract(targets, output_dir, workers, progress, link)
         
-    def extract_all_textures(self, output_dir: str):
-        """Extract all BLP texture files"""
-        print("Extracting all textures...")
+    def extract_files(
+        self,
+        files: Iterable[str],
+        output_dir: str,
+        workers: Optional[int] = None,
+        progress: Optional[Callable[[int, int, str], None]] = None,
+        link: bool = True
+    ) -> Dict:
+        """
+        Bulk-extract files, decoding each distinct blob once
         
-        textures = [f for f in self.list_files() if f.endswith('.blp')]
+        Requested files are grouped by encoding key: each blob is decoded
+        into its first destination, and the other destinations are
+        hard-linked to it (copied where links are unsupported, or always
+        with link=False, since linked files share their contents on disk).
+        Blobs are ordered by (data archive, offset) and handed to a thread
+        pool in contiguous batches, so reads through data.NNN stay sequential.
         
-        for texture in textures:
-            output_path = os.path.join(output_dir, texture)
-            self.extract_file_by_name(texture, output_path)
+        Args:
+            files: Names, FileDataIDs or hex content keys (see resolve())
+            output_dir: Destination directory
+            workers: Extraction threads (default: self.workers)
+            progress: Called as progress(done, total, filename)
+            link: Hard-link duplicates instead of copying them
             
-        print(f"Extracted {len(textures)} textures")
+        Returns:
+            Summary: files, failed, errors, bytes, bytes_decoded,
+            bytes_deduplicated, unique_blobs, workers, seconds, mb_per_second
+        """
+        targets = []
+        errors = {}
+        for filename in files:
+            try:
+                targets.append((filename, self.resolve(filename)))
+            except FileNotFoundError as e:
+                errors[filename] = str(e)
+        summary = self._bulk_extract(targets, output_dir, workers, progress, link)
+        summary['files'] += len(errors)
+        summary['failed'] += len(errors)
+        summary['errors'].update(errors)
+        return summary
         
-    def extract_all_sounds(self, output_dir: str):
-        """Extract all audio files"""
-        print("Extracting all sounds...")
+    def _bulk_extract(self, targets: List[Tuple[str, bytes]], output_dir: str, workers: Optional[int],
+                      progress: Optional[Callable[[int, int, str], None]], link: bool) -> Dict:
+        workers = workers or self.workers
+        start = time.perf_counter()
+        errors = {}
+        batches = self._plan_extraction(targets, output_dir, errors)
+        blobs = sum(len(batch) for batch in batches)
+        print(f"Extracting {len(targets)} files ({blobs} unique blobs) with {workers} threads...")
         
-        sounds = [f for f in self.list_files() if f.endswith(('.mp3', '.ogg'))]
+        done = len(errors)
+        totals = {'bytes': 0, 'bytes_decoded': 0, 'bytes_deduplicated': 0}
+        pool = ThreadPoolExecutor(workers) if workers > 1 else None
+        try:
+            links = [link] * len(batches)
+            results = pool.map(self._extract_batch, batches, links) if pool else map(self._extract_batch, batches, links)
+            for batch_results in results:
+                for filename, size, error, duplicate in batch_results:
+                    if error:
+                        errors[filename] = error
+                    else:
+                        totals['bytes'] += size
+                        totals['bytes_deduplicated' if duplicate else 'bytes_decoded'] += size
+                    done += 1
+                    if progress:
+                        progress(done, len(targets), filename)
+        finally:
+            if pool:
+                pool.shutdown()
+        seconds = time.perf_counter() - start
         
-        for sound in sounds:
-            output_path = os.path.join(output_dir, sound)
-            self.extract_file_by_name(sound, output_path)
+        print(f"Extracted {len(targets) - len(errors)} files ({len(errors)} failed), "
+              f"{totals['bytes_deduplicated'] / 1e6:.1f} MB deduplicated")
+        return {
+            'files': len(targets),
+            'failed': len(errors),
+            'errors': errors,
+            **totals,
+            'unique_blobs': blobs,
+            'workers': workers,
+            'seconds': round(seconds, 3),
+            'mb_per_second': round(totals['bytes'] / seconds / 1e6, 2) if seconds else 0.0
+        }
+        
+    def _plan_extraction(self, targets: List[Tuple[str, bytes]], output_dir: str, errors: Dict) -> List[List]:
+        """
+        Group targets by encoding key and batch the blobs in archive order
+        
+        Returns:
+            Batches of ((archive, offset, size), ekey, [(filename, path), ...])
+        """
+        groups: Dict[bytes, List[Tuple[str, str]]] = {}
+        for filename, ckey in targets:
+            try:
+                path = safe_output_path(output_dir, filename)
+                ekey = self._encoding_key(ckey)[0]
+            except _EXTRACT_ERRORS as e:
+                errors[filename] = str(e)
+                continue
+            groups.setdefault(ekey, []).append((filename, path))
+        
+        blobs = []
+        for ekey, destinations in groups.items():
+            location = self.indices.locate(ekey)
+            if location is None:
+                for filename, _ in destinations:
+                    errors[filename] = f"Encoding key {ekey.hex()} is not in the local indices"
+                continue
+            # Map data files here, not concurrently from the workers
+            self._data_file(location[0])
+            blobs.append((location, ekey, destinations))
+        blobs.sort(key=lambda blob: blob[0][:2])
+        
+        batches, batch, batch_bytes = [], [], 0
+        for blob in blobs:
+            batch.append(blob)
+            batch_bytes += blob[0][2]
+            if batch_bytes >= EXTRACT_BATCH_BYTES or len(batch) >= EXTRACT_BATCH_BLOBS:
+                batches.append(batch)
+                batch, batch_bytes = [], 0
+        if batch:
+            batches.append(batch)
+        return batches
+        
+    def _extract_batch(self, batch: List, link: bool) -> List[Tuple[str, int, Optional[str], bool]]:
+        """Worker: decode each blob once; returns (filename, bytes, error, deduplicated) per destination"""
+        results = []
+        for _, ekey, destinations in batch:
+            first_name, first_path = destinations[0]
+            try:
+                # Never write through an old hard link into another file
+                if os.path.lexists(first_path):
+                    os.remove(first_path)
+                size = self._write_encoded(ekey, first_path, parallel=False)
+            except _EXTRACT_ERRORS as e:
+                results.extend((filename, 0, str(e), False) for filename, _ in destinations)
+                continue
+            results.append((first_name, size, None, False))
             
-        print(f"Extracted {len(sounds)} sounds")
+            for filename, path in destinations[1:]:
+                try:
+                    if path != first_path:
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        if os.path.lexists(path):
+                            os.remove(path)
+                        self._duplicate(first_path, path, link)
+                    results.append((filename, size, None, True))
+                except OSError as e:
+                    results.append((filename, 0, str(e), False))
+        return results
+        
+    @staticmethod
+    def _duplicate(source: str, destination: str, link: bool):
+        if link:
+            try:
+                os.link(source, destination)
+                return
+            except OSError:
+                pass
+        shutil.copyfile(source, destination)
         
     def get_file_info(self, filename: str) -> Dict:
         """Get file information"""
+        ckey = self.resolve(filename)
+        ekey, size = self._encoding_key(ckey)
+        location = self.indices.locate(ekey)
         return {
             'filename': filename,
-            'size': 12345,
-            'compressed_size': 8192,
-            'content_key': '0123456789ABCDEF',
-            'encoding_key': 'FEDCBA9876543210'
+            'size': size,
+            'compressed_size': location[2] - DATA_HEADER_SIZE if location else None,
+            'content_key': ckey.hex(),
+            'encoding_key': ekey.hex()
         }
 
 
 # Example usage
 if __name__ == "__main__":
-    # Extract from WoW installation
-    extractor = CASCExtractor("C:/Program Files/World of Warcraft/")
-    extractor.initialize()
-    
-    # List all files
-    files = extractor.list_files()
-    print(f"Found {len(files)} files")
-    
-    # Extract all models
-    extractor.extract_all_models("output/models/")
-    
-    # Extract all textures
-    extractor.extract_all_textures("output/textures/")
+    # Extract from WoW installation, naming files with a community listfile
+    with CASCExtractor("C:/Program Files/World of Warcraft/", listfiles=["listfile.csv"]) as extractor:
+        # List all files
+        files = extractor.list_files()
+        print(f"Found {len(files)} files")
+        
+        # Extract all models and textures in one pass
+        extractor.extract_all("output/", kinds=["models", "textures"])
@@ -0,0 +1,266 @@
+"""
+CASC Name Index
+Root file joined with a community listfile: FileDataID -> content key for
+every file, sorted names for extension/prefix/glob queries, persisted on disk
+"""
+
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import struct
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from .casc_root import LOCALE_ENUS, RootFile, name_hash
+from .mpq_index import normalize_name
+
+INDEX_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("FORGE_SPARK_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "forge-spark")),
+    "casc-index"
+)
+
+_INDEX_MAGIC = b'FSCI'
+_INDEX_HEADER = struct.Struct('<4sIIII')  # magic, version, files, named files, names bytes
+_WILDCARD = re.compile(r'[*?\[]')
+
+
+def parse_listfile(text: str) -> List[tuple]:
+    """
+    (FileDataID or None, name) pairs of a listfile
+
+    Community listfiles are 'fdid;path' lines; plain 'path' lines are
+    resolved through the root's name hashes instead.
+    """
+    entries = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        fdid, sep, name = line.partition(';')
+        if sep and fdid.isdigit():
+            entries.append((int(fdid), name))
+        else:
+            entries.append((None, line))
+    return entries
+
+
+def _file_signature(path: str) -> List:
+    st = os.stat(path)
+    return [os.path.abspath(path), st.st_size, st.st_mtime_ns]
+
+
+class CASCIndex:
+    """
+    One content key per FileDataID, plus the names a listfile gives them
+
+    File IDs are a sorted uint32 column with a parallel (n, 16) content key
+    array. Names are sorted by normalized key (case-insensitive, '/' equals
+    '\\') with the row of their file ID, so a prefix narrows a query to a
+    contiguous range and extension/glob filters apply in the same pass.
+    """
+
+    def __init__(self, file_data_ids: np.ndarray, ckeys: np.ndarray, names: List[str], name_rows: np.ndarray):
+        self.file_data_ids = file_data_ids
+        self.ckeys = ckeys
+        self.names = names
+        self.keys = [normalize_name(name) for name in names]
+        self.name_rows = name_rows
+
+    @classmethod
+    def open(cls, root_key: str, load_root: Callable[[], RootFile], listfiles: Sequence[str] = (),
+             locale: int = LOCALE_ENUS, cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> "CASCIndex":
+        """
+        Load the cached index for this root and listfiles, building it if stale
+
+        Args:
+            root_key: Content key of the root file (identifies the build)
+            load_root: Reads and parses the root file; only called on a cache miss
+        """
+        signature = {
+            'version': INDEX_VERSION,
+            'root': root_key,
+            'locale': locale,
+            'listfiles': [_file_signature(path) for path in listfiles]
+        }
+        path = None
+        if cache_dir:
+            digest = hashlib.sha1(json.dumps(signature, sort_keys=True).encode()).hexdigest()
+            path = os.path.join(cache_dir, digest + '.index')
+            if os.path.exists(path):
+                try:
+                    return cls.load(path)
+                except (OSError, ValueError, struct.error) as e:
+                    print(f"Rebuilding CASC index ({e})")
+
+        index = cls.build(load_root(), listfiles, locale)
+        if path:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                index.save(path)
+            except OSError as e:
+                print(f"Could not cache CASC index: {e}")
+        return index
+
+    @classmethod
+    def build(cls, root: RootFile, listfiles: Sequence[str] = (), locale: int = LOCALE_ENUS) -> "CASCIndex":
+        """Join listfile names to the root's records for `locale`"""
+        fdids, ckeys, hashes = root.select(locale)
+
+        by_name: Dict[str, tuple] = {}   # normalized name -> (name, row)
+        unresolved = []
+        for listfile in listfiles:
+            with open(listfile, encoding='utf-8', errors='replace') as f:
+                entries = parse_listfile(f.read())
+            ids = np.array([fdid if fdid is not None else 0xFFFFFFFF for fdid, _ in entries], np.uint64)
+            rows = np.minimum(fdids.searchsorted(ids), max(len(fdids) - 1, 0))
+            found = (fdids[rows] == ids) if len(fdids) else np.zeros(len(ids), bool)
+            for (fdid, name), row, hit in zip(entries, rows.tolist(), found.tolist()):
+                if fdid is None:
+                    unresolved.append(name)
+                elif hit:
+                    by_name.setdefault(normalize_name(name), (name, row))
+
+        if unresolved:
+            # Path-only listfile lines: match the root's Jenkins96 name hashes
+            order = np.argsort(hashes, kind='stable')
+            sorted_hashes = hashes[order]
+            for name in unresolved:
+                value = np.uint64(name_hash(name))
+                i = int(sorted_hashes.searchsorted(value))
+                if i < len(sorted_hashes) and sorted_hashes[i] == value:
+                    by_name.setdefault(normalize_name(name), (name, int(order[i])))
+
+        names = [by_name[key] for key in sorted(by_name)]
+        print(f"Indexed {len(fdids)} files, {len(names)} named")
+        return cls(fdids, np.ascontiguousarray(ckeys), [name for name, _ in names],
+                   np.array([row for _, row in names], np.uint32))
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def save(self, path: str):
+        """Write the index atomically (header, little-endian columns, names)"""
+        names = '\n'.join(self.names).encode('utf-8', 'surrogateescape')
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, INDEX_VERSION, len(self.file_data_ids), len(self.names),
+                                       len(names)))
+            f.write(self.file_data_ids.astype('<u4').tobytes())
+            f.write(self.ckeys.tobytes())
+            f.write(self.name_rows.astype('<u4').tobytes())
+            f.write(names)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "CASCIndex":
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, count, named, names_len = _INDEX_HEADER.unpack_from(data)
+        if magic != _INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"Not a CASC index: {path}")
+
+        pos = _INDEX_HEADER.size
+        fdids = np.frombuffer(data, '<u4', count, pos).astype(np.uint32)
+        pos += 4 * count
+        ckeys = np.frombuffer(data, np.uint8, 16 * count, pos).reshape(count, 16)
+        pos += 16 * count
+        name_rows = np.frombuffer(data, '<u4', named, pos).astype(np.uint32)
+        pos += 4 * named
+        names = data[pos:pos + names_len].decode('utf-8', 'surrogateescape').split('\n') if named else []
+        if len(names) != named:
+            raise ValueError(f"Corrupt CASC index: {path}")
+        return cls(fdids, ckeys, names, name_rows)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.file_data_ids)
+
+    def __contains__(self, name: str) -> bool:
+        return self._position(name) is not None
+
+    def _position(self, name: str) -> Optional[int]:
+        key = normalize_name(name)
+        i = bisect_left(self.keys, key)
+        return i if i < len(self.keys) and self.keys[i] == key else None
+
+    def _row(self, file_data_id: int) -> Optional[int]:
+        i = int(self.file_data_ids.searchsorted(file_data_id))
+        return i if i < len(self.file_data_ids) and self.file_data_ids[i] == file_data_id else None
+
+    def entry(self, i: int) -> Dict:
+        row = int(self.name_rows[i])
+        return {
+            'filename': self.names[i],
+            'file_data_id': int(self.file_data_ids[row]),
+            'content_key': self.ckeys[row].tobytes().hex()
+        }
+
+    def by_file_data_id(self, file_data_id: int) -> Optional[bytes]:
+        """Content key of a FileDataID"""
+        row = self._row(file_data_id)
+        return None if row is None else self.ckeys[row].tobytes()
+
+    def by_name(self, name: str) -> Optional[bytes]:
+        """Content key of a named file"""
+        i = self._position(name)
+        return None if i is None else self.ckeys[self.name_rows[i]].tobytes()
+
+    def query(
+        self,
+        pattern: Optional[str] = None,
+        extensions: Optional[Iterable[str]] = None,
+        prefix: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Named entries matching every given filter, in one pass
+
+        Args:
+            pattern: Shell-style glob ('*' also crosses directories)
+            extensions: File extensions, e.g. ['.m2', '.blp']
+            prefix: Leading path, e.g. 'world/maps/'
+
+        The literal head of the pattern and the prefix narrow the scan to a
+        sorted range; extension and glob checks run on that range only.
+        """
+        literal = normalize_name(prefix or '')
+        match = None
+        if pattern:
+            key = normalize_name(pattern)
+            wildcard = _WILDCARD.search(key)
+            head = key[:wildcard.start()] if wildcard else key
+            if not (head.startswith(literal) or literal.startswith(head)):
+                return []
+            literal = max(literal, head, key=len)
+            match = re.compile(fnmatch.translate(key), re.DOTALL).match
+        suffixes = tuple(normalize_name(ext if ext.startswith('.') else '.' + ext) for ext in extensions or ())
+
+        keys = self.keys
+        lo = bisect_left(keys, literal)
+        hi = bisect_right(keys, literal + '\U0010ffff') if literal else len(keys)
+        return [
+            self.entry(i) for i in range(lo, hi)
+            if (not suffixes or keys[i].endswith(suffixes)) and (match is None or match(keys[i]))
+        ]
+
+    def glob(self, pattern: str) -> List[Dict]:
+        return self.query(pattern=pattern)
+
+
+# Example usage
+if __name__ == "__main__":
+    with open("root.bin", "rb") as f:
+        root = RootFile.parse(f.read())
+    index = CASCIndex.build(root, ["listfile.csv"])
+
+    models = index.query(prefix="character/", extensions=[".m2"])
+    print(f"{len(models)} character models, {len(index)} files in root")
@@ -0,0 +1,188 @@
+"""
+CASC Root File
+Parses the root manifest (FileDataID / name hash -> content key) into NumPy
+columns, and implements the Jenkins96 name hash it is keyed by
+"""
+
+import struct
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .mpq_index import normalize_name
+
+# Locale flags (root block header)
+LOCALE_ALL = 0xFFFFFFFF
+LOCALE_ENUS = 0x2
+LOCALES = {
+    'enUS': 0x2, 'koKR': 0x4, 'frFR': 0x10, 'deDE': 0x20, 'zhCN': 0x40, 'esES': 0x80,
+    'zhTW': 0x100, 'enGB': 0x200, 'esMX': 0x1000, 'ruRU': 0x2000, 'ptBR': 0x4000,
+    'itIT': 0x8000, 'ptPT': 0x10000
+}
+
+# Content flags (root block header)
+CONTENT_LOW_VIOLENCE = 0x80
+CONTENT_NO_NAME_HASH = 0x10000000
+
+_MFST_MAGIC = b'TSFM'
+_MASK = 0xFFFFFFFF
+
+
+def _rot(x: int, k: int) -> int:
+    return ((x << k) | (x >> (32 - k))) & _MASK
+
+
+def _mix(a: int, b: int, c: int) -> Tuple[int, int, int]:
+    a = ((a - c) & _MASK) ^ _rot(c, 4)
+    c = (c + b) & _MASK
+    b = ((b - a) & _MASK) ^ _rot(a, 6)
+    a = (a + c) & _MASK
+    c = ((c - b) & _MASK) ^ _rot(b, 8)
+    b = (b + a) & _MASK
+    a = ((a - c) & _MASK) ^ _rot(c, 16)
+    c = (c + b) & _MASK
+    b = ((b - a) & _MASK) ^ _rot(a, 19)
+    a = (a + c) & _MASK
+    c = ((c - b) & _MASK) ^ _rot(b, 4)
+    b = (b + a) & _MASK
+    return a, b, c
+
+
+def _final(a: int, b: int, c: int) -> Tuple[int, int, int]:
+    c = ((c ^ b) - _rot(b, 14)) & _MASK
+    a = ((a ^ c) - _rot(c, 11)) & _MASK
+    b = ((b ^ a) - _rot(a, 25)) & _MASK
+    c = ((c ^ b) - _rot(b, 16)) & _MASK
+    a = ((a ^ c) - _rot(c, 4)) & _MASK
+    b = ((b ^ a) - _rot(a, 14)) & _MASK
+    c = ((c ^ b) - _rot(b, 24)) & _MASK
+    return a, b, c
+
+
+def hashlittle2(data: bytes, pc: int = 0, pb: int = 0) -> Tuple[int, int]:
+    """Bob Jenkins' lookup3 hashlittle2; returns (pc, pb)"""
+    length = len(data)
+    a = b = c = (0xDEADBEEF + length + pc) & _MASK
+    c = (c + pb) & _MASK
+    if length == 0:
+        return c, b
+
+    # Zero-padding the tail adds the same as lookup3's byte-wise switch
+    padded = data + b'\0' * (-length % 12)
+    words = struct.unpack(f'<{len(padded) // 4}I', padded)
+    for i in range(0, len(words) - 3, 3):
+        a = (a + words[i]) & _MASK
+        b = (b + words[i + 1]) & _MASK
+        c = (c + words[i + 2]) & _MASK
+        a, b, c = _mix(a, b, c)
+    a = (a + words[-3]) & _MASK
+    b = (b + words[-2]) & _MASK
+    c = (c + words[-1]) & _MASK
+    a, b, c = _final(a, b, c)
+    return c, b
+
+
+def name_hash(name: str) -> int:
+    """Root name hash of a file path (Jenkins96 over the normalized name)"""
+    pc, pb = hashlittle2(normalize_name(name).encode('utf-8'))
+    return (pc << 32) | pb
+
+
+class RootFile:
+    """
+    Every (FileDataID, name hash, content key) record of a root file
+
+    Columns are parallel NumPy arrays; a FileDataID appears once per locale
+    or content variant it ships in.
+    """
+
+    def __init__(self, file_data_ids: np.ndarray, ckeys: np.ndarray, name_hashes: np.ndarray,
+                 locales: np.ndarray, content_flags: np.ndarray):
+        self.file_data_ids = file_data_ids
+        self.ckeys = ckeys
+        self.name_hashes = name_hashes
+        self.locales = locales
+        self.content_flags = content_flags
+
+    def __len__(self) -> int:
+        return len(self.file_data_ids)
+
+    @classmethod
+    def parse(cls, data) -> "RootFile":
+        """Parse a legacy (pre-8.2) or MFST root file"""
+        data = memoryview(data)
+        mfst = bytes(data[:4]) == _MFST_MAGIC
+        version = 0
+        pos = 0
+        named_optional = False
+        if mfst:
+            header_size, header_version = struct.unpack_from('<II', data, 4)
+            if header_size < 0x100 and header_version in (1, 2):
+                version = header_version
+                total, named = struct.unpack_from('<II', data, 12)
+                pos = header_size
+            else:
+                total, named = header_size, header_version
+                pos = 12
+            named_optional = total != named
+
+        parts: List[Tuple[np.ndarray, ...]] = []
+        while pos < len(data):
+            if version >= 2:
+                count, locale, flags1, flags2, flags3 = struct.unpack_from('<IIIIB', data, pos)
+                content = flags1 | flags2 | (flags3 << 17)
+                pos += 17
+            else:
+                count, content, locale = struct.unpack_from('<III', data, pos)
+                pos += 12
+
+            deltas = np.frombuffer(data, '<i4', count, pos).astype(np.int64)
+            pos += 4 * count
+            # Each ID is the previous one + 1 + delta, restarting at 0 every block
+            fdids = (np.cumsum(deltas + 1) - 1).astype(np.uint32)
+
+            if mfst:
+                ckeys = np.frombuffer(data, np.uint8, 16 * count, pos).reshape(count, 16)
+                pos += 16 * count
+                if named_optional and content & CONTENT_NO_NAME_HASH:
+                    hashes = np.zeros(count, np.uint64)
+                else:
+                    hashes = np.frombuffer(data, '<u8', count, pos).astype(np.uint64)
+                    pos += 8 * count
+            else:
+                records = np.frombuffer(data, np.uint8, 24 * count, pos).reshape(count, 24)
+                ckeys = records[:, :16]
+                hashes = records[:, 16:].copy().view('<u8').ravel().astype(np.uint64)
+                pos += 24 * count
+
+            parts.append((fdids, ckeys, hashes, np.full(count, locale, np.uint32),
+                          np.full(count, content, np.uint32)))
+
+        if not parts:
+            empty = np.zeros(0, np.uint32)
+            return cls(empty, np.zeros((0, 16), np.uint8), np.zeros(0, np.uint64), empty, empty)
+        return cls(*(np.concatenate(column) for column in zip(*parts)))
+
+    def select(self, locale: int = LOCALE_ENUS) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        One record per FileDataID for a locale
+
+        Records are filtered to `locale`, and among the rest the first
+        non-low-violence variant wins.
+
+        Returns:
+            (file data ids ascending, content keys, name hashes)
+        """
+        keep = (self.locales & np.uint32(locale)) != 0
+        fdids = self.file_data_ids[keep]
+        order = np.lexsort(((self.content_flags[keep] & CONTENT_LOW_VIOLENCE) != 0, fdids))
+        fdids = fdids[order]
+        first = np.ones(len(fdids), bool)
+        first[1:] = fdids[1:] != fdids[:-1]
+        rows = np.flatnonzero(keep)[order][first]
+        return fdids[first], self.ckeys[rows], self.name_hashes[rows]
+
+    def find(self, file_data_id: int, locale: int = LOCALE_ALL) -> Optional[bytes]:
+        """Content key of a FileDataID (linear scan; use CASCIndex for repeated lookups)"""
+        rows = np.flatnonzero((self.file_data_ids == file_data_id) & ((self.locales & np.uint32(locale)) != 0))
+        return bytes(self.ckeys[rows[0]]) if len(rows) else None
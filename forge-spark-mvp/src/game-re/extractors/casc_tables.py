@@ -0,0 +1,213 @@
+"""
+CASC Tables
+Parsers for .build.info, config files, .idx indices and the encoding file.
+Keys live in sorted NumPy columns (binary search) rather than dicts of bytes
+"""
+
+import struct
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# .idx (version 7) header, after which entries start on a 16-byte boundary
+_IDX_HEADER = struct.Struct('<IIHBBBBBBQ')
+
+# Encoding file header (big-endian)
+_ENCODING_HEADER = struct.Struct('>2sBBBHHIIBI')
+
+
+def parse_build_info(text: str) -> List[Dict[str, str]]:
+    """Rows of a .build.info file ('Name!TYPE:size|...' header, '|'-separated rows)"""
+    lines = [line for line in text.splitlines() if line.strip() and not line.startswith('#')]
+    if not lines:
+        return []
+    columns = [column.split('!', 1)[0] for column in lines[0].split('|')]
+    return [dict(zip(columns, line.split('|'))) for line in lines[1:]]
+
+
+def parse_config(text: str) -> Dict[str, List[str]]:
+    """'key = value value ...' lines of a build or CDN config"""
+    config = {}
+    for line in text.splitlines():
+        if '=' not in line or line.lstrip().startswith('#'):
+            continue
+        key, value = line.split('=', 1)
+        config[key.strip()] = value.split()
+    return config
+
+
+def _uint_column(rows: np.ndarray, start: int, width: int, byteorder: str = 'big') -> np.ndarray:
+    """Unsigned integer (up to 8 bytes) stored in bytes [start, start + width) of each row"""
+    padded = np.zeros((len(rows), 8), np.uint8)
+    if byteorder == 'big':
+        padded[:, 8 - width:] = rows[:, start:start + width]
+        return padded.view('>u8').ravel().astype(np.uint64)
+    padded[:, :width] = rows[:, start:start + width]
+    return padded.view('<u8').ravel().astype(np.uint64)
+
+
+def _key_columns(rows: np.ndarray, start: int, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Split keys into big-endian (first 8 bytes, remaining bytes) uint64 columns"""
+    hi = _uint_column(rows, start, 8)
+    lo = _uint_column(rows, start + 8, size - 8) << np.uint64(8 * (16 - size))
+    return hi, lo
+
+
+def _key_scalars(key: bytes, size: int) -> Tuple[np.uint64, np.uint64]:
+    key = bytes(key[:size]).ljust(16, b'\0')
+    return np.uint64(int.from_bytes(key[:8], 'big')), np.uint64(int.from_bytes(key[8:], 'big'))
+
+
+class KeyTable:
+    """
+    Fixed-width keys (up to 16 bytes) sorted as two uint64 columns, with
+    parallel value columns
+
+    A lookup is one binary search over the high column, so millions of keys
+    cost about 16 bytes each plus their values, instead of a dict of bytes.
+    Duplicate keys keep their first occurrence.
+    """
+
+    def __init__(self, key_size: int, hi: np.ndarray, lo: np.ndarray, **columns: np.ndarray):
+        ascending = (hi[1:] > hi[:-1]) | ((hi[1:] == hi[:-1]) & (lo[1:] >= lo[:-1]))
+        if not ascending.all():
+            # Stable, so the first of several equal keys stays first
+            order = np.lexsort((lo, hi))
+            hi, lo = hi[order], lo[order]
+            columns = {name: column[order] for name, column in columns.items()}
+        keep = np.ones(len(hi), bool)
+        keep[1:] = (hi[1:] != hi[:-1]) | (lo[1:] != lo[:-1])
+        self.key_size = key_size
+        self.hi = hi[keep]
+        self.lo = lo[keep]
+        self.columns = {name: column[keep] for name, column in columns.items()}
+
+    def __len__(self) -> int:
+        return len(self.hi)
+
+    @property
+    def nbytes(self) -> int:
+        return self.hi.nbytes + self.lo.nbytes + sum(column.nbytes for column in self.columns.values())
+
+    def find(self, key: bytes) -> Optional[int]:
+        """Row of `key` (only its first key_size bytes are used), or None"""
+        hi, lo = _key_scalars(key, self.key_size)
+        i = int(self.hi.searchsorted(hi))
+        while i < len(self.hi) and self.hi[i] == hi:
+            if self.lo[i] == lo:
+                return i
+            i += 1
+        return None
+
+    def key(self, row: int) -> bytes:
+        key = int(self.hi[row]).to_bytes(8, 'big') + int(self.lo[row]).to_bytes(8, 'big')
+        return key[:self.key_size]
+
+
+class EKeyIndex(KeyTable):
+    """Encoding key (9-byte prefix) -> (data.NNN archive, offset, encoded size), from the .idx files"""
+
+    KEY_SIZE = 9
+
+    @staticmethod
+    def parse_idx(data) -> Dict[str, np.ndarray]:
+        """Columns of one version-7 .idx file"""
+        (header_hash_size, _, version, _, _, size_bytes, offset_bytes,
+         key_bytes, offset_bits, _) = _IDX_HEADER.unpack_from(data)
+        if version != 7:
+            raise ValueError(f"Unsupported .idx version {version}")
+
+        pos = (8 + header_hash_size + 0x0F) & ~0x0F
+        entries_size = struct.unpack_from('<I', data, pos)[0]
+        entry_size = key_bytes + offset_bytes + size_bytes
+        count = min(entries_size, len(data) - pos - 8) // entry_size
+        rows = np.frombuffer(data, np.uint8, count=count * entry_size, offset=pos + 8).reshape(count, entry_size)
+
+        hi, lo = _key_columns(rows, 0, key_bytes)
+        location = _uint_column(rows, key_bytes, offset_bytes)
+        return {
+            'hi': hi,
+            'lo': lo,
+            'archive': (location >> np.uint64(offset_bits)).astype(np.uint16),
+            'offset': (location & np.uint64((1 << offset_bits) - 1)).astype(np.uint32),
+            'size': _uint_column(rows, key_bytes + offset_bytes, size_bytes, 'little').astype(np.uint32)
+        }
+
+    @classmethod
+    def from_idx_files(cls, paths: Sequence[str]) -> "EKeyIndex":
+        parts = []
+        for path in paths:
+            with open(path, 'rb') as f:
+                parts.append(cls.parse_idx(f.read()))
+        if not parts:
+            raise FileNotFoundError("No .idx files found")
+        merged = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+        return cls(cls.KEY_SIZE, merged.pop('hi'), merged.pop('lo'), **merged)
+
+    def locate(self, ekey: bytes) -> Optional[Tuple[int, int, int]]:
+        """(archive number, offset, encoded size) of an encoding key"""
+        row = self.find(ekey)
+        if row is None:
+            return None
+        return (int(self.columns['archive'][row]), int(self.columns['offset'][row]),
+                int(self.columns['size'][row]))
+
+
+class EncodingTable(KeyTable):
+    """Content key -> (encoding key, decoded size), from the encoding file's CE pages"""
+
+    KEY_SIZE = 16
+    ekey_size = 16
+
+    @classmethod
+    def parse(cls, data) -> "EncodingTable":
+        (magic, _, ckey_size, ekey_size, page_kb, _, page_count, _, _,
+         espec_size) = _ENCODING_HEADER.unpack_from(data)
+        if magic != b'EN':
+            raise ValueError("Not a CASC encoding file")
+
+        page_size = page_kb * 1024
+        pos = _ENCODING_HEADER.size + espec_size + page_count * (ckey_size + 16)
+        pages = np.frombuffer(data, np.uint8, count=page_count * page_size, offset=pos).reshape(page_count, page_size)
+        entry_size = 1 + 5 + ckey_size + ekey_size
+
+        rows = cls._entry_rows(pages, entry_size, ckey_size, ekey_size)
+
+        ckey_hi, ckey_lo = _key_columns(rows, 6, ckey_size)
+        ekey_hi, ekey_lo = _key_columns(rows, 6 + ckey_size, ekey_size)
+        table = cls(ckey_size, ckey_hi, ckey_lo, ekey_hi=ekey_hi, ekey_lo=ekey_lo, size=_uint_column(rows, 1, 5))
+        table.ekey_size = ekey_size
+        return table
+
+    @staticmethod
+    def _entry_rows(pages: np.ndarray, entry_size: int, ckey_size: int, ekey_size: int) -> np.ndarray:
+        """
+        (key count, size, ckey, first ekey) rows of all CE pages
+
+        Nearly every entry has exactly one encoding key, so most pages are a
+        plain (entries, entry_size) array followed by zero padding; those are
+        sliced out in one vectorized step. Pages holding multi-key entries
+        are walked entry by entry.
+        """
+        per_page = pages.shape[1] // entry_size
+        fixed = pages[:, :per_page * entry_size].reshape(len(pages), per_page, entry_size)
+        counts = fixed[:, :, 0]
+        single = counts == 1
+        # Regular page: a run of single-key entries, then only padding
+        regular = ~((counts > 1).any(axis=1) | (single[:, 1:] & ~single[:, :-1]).any(axis=1))
+
+        rows = [fixed[regular][single[regular]]]
+        for page in pages[~regular]:
+            pos = 0
+            while pos + entry_size <= len(page) and page[pos]:
+                rows.append(page[pos:pos + entry_size][None])
+                pos += 1 + 5 + ckey_size + ekey_size * int(page[pos])
+        return np.concatenate(rows)
+
+    def find_ekey(self, ckey: bytes) -> Optional[Tuple[bytes, int]]:
+        """(encoding key, decoded size) of a content key"""
+        row = self.find(ckey)
+        if row is None:
+            return None
+        ekey = int(self.columns['ekey_hi'][row]).to_bytes(8, 'big') + int(self.columns['ekey_lo'][row]).to_bytes(8, 'big')
+        return ekey[:self.ekey_size], int(self.columns['size'][row])
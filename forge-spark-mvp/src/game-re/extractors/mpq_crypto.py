@@ -0,0 +1,126 @@
+"""
+MPQ Cryptography
+Storm crypt table, filename hashing and table/sector encryption
+"""
+
+import sys
+from array import array
+
+# hash_string() hash types
+HASH_TABLE_OFFSET = 0
+HASH_NAME_A = 1
+HASH_NAME_B = 2
+HASH_FILE_KEY = 3
+
+MASK32 = 0xFFFFFFFF
+
+
+def _build_crypt_table() -> list:
+    """The 0x500-entry Storm crypt table (computed once per process, at import)"""
+    table = [0] * 0x500
+    seed = 0x00100001
+    for index1 in range(0x100):
+        index2 = index1
+        for _ in range(5):
+            seed = (seed * 125 + 3) % 0x2AAAAB
+            temp1 = (seed & 0xFFFF) << 0x10
+            seed = (seed * 125 + 3) % 0x2AAAAB
+            temp2 = seed & 0xFFFF
+            table[index2] = temp1 | temp2
+            index2 += 0x100
+    return table
+
+
+CRYPT_TABLE = _build_crypt_table()
+
+# Upper-case + forward slashes as backslashes, as Storm normalizes names
+_NORMALIZE = bytes.maketrans(
+    b'abcdefghijklmnopqrstuvwxyz/',
+    b'ABCDEFGHIJKLMNOPQRSTUVWXYZ\\'
+)
+
+
+def hash_string(name: str, hash_type: int) -> int:
+    """Storm string hash of a file name"""
+    table = CRYPT_TABLE
+    offset = hash_type << 8
+    seed1 = 0x7FED7FED
+    seed2 = 0xEEEEEEEE
+    for ch in name.encode('utf-8', 'surrogateescape').translate(_NORMALIZE):
+        seed1 = (table[offset + ch] ^ (seed1 + seed2)) & MASK32
+        seed2 = (ch + seed1 + seed2 + (seed2 << 5) + 3) & MASK32
+    return seed1
+
+
+def table_key(name: str) -> int:
+    """Decryption key of the hash/block tables ('(hash table)', '(block table)')"""
+    return hash_string(name, HASH_FILE_KEY)
+
+
+def file_key(filename: str, offset: int = 0, file_size: int = 0, fix_key: bool = False) -> int:
+    """Decryption key of an encrypted file (hashed from its base name)"""
+    basename = filename.replace('/', '\\').rsplit('\\', 1)[-1]
+    key = hash_string(basename, HASH_FILE_KEY)
+    if fix_key:
+        key = ((key + offset) ^ file_size) & MASK32
+    return key
+
+
+def _to_words(data) -> array:
+    words = array('I')
+    words.frombytes(data)
+    if sys.byteorder == 'big':
+        words.byteswap()
+    return words
+
+
+def _from_words(words: array) -> bytes:
+    if sys.byteorder == 'big':
+        words = array('I', words)
+        words.byteswap()
+    return words.tobytes()
+
+
+def decrypt_words(words: array, key: int) -> array:
+    """Decrypt a uint32 array in place and return it"""
+    table = CRYPT_TABLE
+    seed2 = 0xEEEEEEEE
+    for i in range(len(words)):
+        seed2 = (seed2 + table[0x400 + (key & 0xFF)]) & MASK32
+        value = words[i] ^ ((key + seed2) & MASK32)
+        words[i] = value
+        key = (((~key << 0x15) + 0x11111111) & MASK32) | (key >> 0x0B)
+        seed2 = (value + seed2 + (seed2 << 5) + 3) & MASK32
+    return words
+
+
+def encrypt_words(words: array, key: int) -> array:
+    """Encrypt a uint32 array in place and return it"""
+    table = CRYPT_TABLE
+    seed2 = 0xEEEEEEEE
+    for i in range(len(words)):
+        seed2 = (seed2 + table[0x400 + (key & 0xFF)]) & MASK32
+        value = words[i]
+        words[i] = value ^ ((key + seed2) & MASK32)
+        key = (((~key << 0x15) + 0x11111111) & MASK32) | (key >> 0x0B)
+        seed2 = (value + seed2 + (seed2 << 5) + 3) & MASK32
+    return words
+
+
+def encrypt_table(words: array, key: int) -> bytes:
+    """Encrypted little-endian bytes of a hash or block table (words are not modified)"""
+    return _from_words(encrypt_words(array('I', words), key))
+
+
+def decrypt_table(data, key: int) -> array:
+    """Decrypt a hash or block table into a uint32 array"""
+    return decrypt_words(_to_words(data), key)
+
+
+def decrypt_bytes(data, key: int) -> bytes:
+    """Decrypt sector data; a trailing partial word is stored in the clear"""
+    whole = len(data) & ~3
+    if not whole:
+        return bytes(data)
+    plain = _from_words(decrypt_words(_to_words(data[:whole]), key))
+    return plain + bytes(data[whole:])
@@ -3,118 +3,688 @@ MPQ Archive Extractor
 Real implementation for extracting Blizzard MPQ archives (WoW, StarCraft, Diablo)
 """
 
+import bz2
+import hashlib
+import lzma
+import mmap
+import os
 import struct
+import time
+import traceback
 import zlib
-import os
-from typing import List, Dict, BinaryIO
+from array import array
+from itertools import accumulate
+from multiprocessing import Pool
+from typing import Callable, List, Dict, BinaryIO, Optional, Tuple
 from pathlib import Path
 
+from .mpq_crypto import (
+    HASH_NAME_A, HASH_NAME_B, HASH_TABLE_OFFSET,
+    decrypt_bytes, decrypt_table, file_key, hash_string, table_key,
+)
+from .pkware import explode
+
+# Block table flags
+MPQ_FILE_IMPLODE = 0x00000100
+MPQ_FILE_COMPRESS = 0x00000200
+MPQ_FILE_ENCRYPTED = 0x00010000
+MPQ_FILE_FIX_KEY = 0x00020000
+MPQ_FILE_SINGLE_UNIT = 0x01000000
+MPQ_FILE_DELETE_MARKER = 0x02000000
+MPQ_FILE_SECTOR_CRC = 0x04000000
+MPQ_FILE_EXISTS = 0x80000000
+
+# Hash table block index markers
+HASH_ENTRY_EMPTY = 0xFFFFFFFF
+HASH_ENTRY_DELETED = 0xFFFFFFFE
+
+# Sector compression masks
+MPQ_COMPRESSION_ZLIB = 0x02
+MPQ_COMPRESSION_PKWARE = 0x08
+MPQ_COMPRESSION_BZIP2 = 0x10
+MPQ_COMPRESSION_LZMA = 0x12
+
+LISTFILE_NAME = "(listfile)"
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("FORGE_SPARK_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "forge-spark")),
+    "mpq-tables"
+)
+
+_TABLE_CACHE_MAGIC = b'FSMT'
+
+# extract_all() scheduling: small files are batched per worker task, files
+# larger than EXTRACT_SPLIT_BYTES are split into sector ranges decoded in parallel
+EXTRACT_BATCH_BYTES = 4 * 1024 * 1024
+EXTRACT_BATCH_FILES = 256
+EXTRACT_SPLIT_BYTES = 8 * 1024 * 1024
+EXTRACT_PART_BYTES = 2 * 1024 * 1024
+
+# Failures of a single file that should not abort extract_all()
+_EXTRACT_ERRORS = (OSError, ValueError, IndexError, NotImplementedError, struct.error, zlib.error, lzma.LZMAError)
+
+# MPQ header: v1 fields, then the v2 64-bit table position extension
+_HEADER_V1 = struct.Struct('<4sIIHHIIII')
+_HEADER_V2 = struct.Struct('<4sIIHHIIIIQHH')
+
+
+def decompress_sector(data: bytes, expected_size: int, flags: int) -> bytes:
+    """Decompress one sector (or single-unit file) of a compressed block"""
+    if flags & MPQ_FILE_IMPLODE:
+        return explode(data, expected_size)
+
+    mask = data[0]
+    data = data[1:]
+    if mask == MPQ_COMPRESSION_LZMA:
+        # Filter byte (always 0), then an .lzma header: 5 property bytes + 64-bit size
+        if data[0] != 0:
+            raise ValueError(f"Unsupported MPQ LZMA filter: {data[0]}")
+        return lzma.decompress(data[1:], format=lzma.FORMAT_ALONE)
+    unsupported = mask & ~(MPQ_COMPRESSION_BZIP2 | MPQ_COMPRESSION_PKWARE | MPQ_COMPRESSION_ZLIB)
+    if unsupported:
+        raise NotImplementedError(f"Unsupported MPQ compression mask: 0x{mask:02x}")
+    if mask & MPQ_COMPRESSION_BZIP2:
+        data = bz2.decompress(data)
+    if mask & MPQ_COMPRESSION_PKWARE:
+        data = explode(data, None if mask & MPQ_COMPRESSION_ZLIB else expected_size)
+    if mask & MPQ_COMPRESSION_ZLIB:
+        data = zlib.decompress(data)
+    return data
+
+
+# name_hash() bits that form a lookup key (hashA, hashB, locale); the hash table index sits above them
+_KEY_BITS = 80
+_KEY_MASK = (1 << _KEY_BITS) - 1
+
+
+def name_hash(filename: str) -> int:
+    """
+    Storm hashes of a file name packed for find_block_by_hash()
+
+    hashA/hashB form the lookup key (locale bits zero); the hash table
+    index hash above them gives the slot Storm's probe starts from.
+    """
+    return ((hash_string(filename, HASH_TABLE_OFFSET) << _KEY_BITS) | (hash_string(filename, HASH_NAME_A) << 48)
+            | (hash_string(filename, HASH_NAME_B) << 16))
+
+
+def parse_listfile(text: str) -> List[str]:
+    """Unique names of a listfile, in order ('name;extra' lines are allowed)"""
+    names = []
+    seen = set()
+    for line in text.splitlines():
+        name = line.split(';', 1)[0].strip()
+        if name and name not in seen:
+            seen.add(name)
+            names.append(name)
+    return names
+
+
+def safe_output_path(output_dir: str, filename: str) -> str:
+    """Map an archive name ('a\\b.txt') under output_dir, refusing to escape it"""
+    parts = [p for p in filename.replace('\\', '/').split('/') if p not in ('', '.')]
+    if not parts or '..' in parts or ':' in parts[0]:
+        raise ValueError(f"Unsafe archive path: {filename}")
+    return os.path.join(output_dir, *parts)
+
+
 class MPQExtractor:
     """
     MPQ Archive Extractor
     Supports Blizzard MPQ format (all versions)
+    
+    The decrypted hash table is turned into a dict keyed by the
+    (hashA, hashB, locale) triple, so finding a file is a single O(1) lookup.
+    Decrypted tables are cached on disk (keyed by path, size and mtime) so
+    re-opening a large archive skips decryption.
     """
     
     MPQ_MAGIC = b'MPQ\x1a'
+    MPQ_USER_DATA_MAGIC = b'MPQ\x1b'
     
-    def __init__(self, mpq_path: str):
+    def __init__(self, mpq_path: str, cache_dir: Optional[str] = DEFAULT_CACHE_DIR):
         self.mpq_path = mpq_path
+        self.cache_dir = cache_dir
         self.file = None
+        self._mmap = None
+        self._view = None
         self.header = {}
-        self.hash_table = []
-        self.block_table = []
+        self.archive_offset = 0
+        self.hash_table = array('I')   # 4 words per entry: hashA, hashB, locale|platform<<16, block
+        self.block_table = array('I')  # 4 words per entry: offset, packed size, size, flags
+        self.block_offset_hi = array('H')
+        self._lookup = {}
+        self._empty_before = array('I')
+        self._listfile = None
         
     def open(self):
-        """Open MPQ archive"""
+        """Open MPQ archive (memory-mapped: only the pages that are touched get read)"""
         self.file = open(self.mpq_path, 'rb')
-        self._parse_header()
-        self._read_hash_table()
-        self._read_block_table()
+        try:
+            self._mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.close()
+            raise ValueError(f"Not a valid MPQ archive: {self.mpq_path}")
+        self._view = memoryview(self._mmap)
+        try:
+            self._parse_header()
+            if not self._load_cached_tables():
+                self._read_hash_table()
+                self._read_block_table()
+                self._store_cached_tables()
+            self._build_lookup()
+        except Exception as e:
+            # Slices of the view held by the failed frames would keep the mmap from closing
+            traceback.clear_frames(e.__traceback__)
+            self.close()
+            raise
         
     def close(self):
         """Close MPQ archive"""
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
         if self.file:
             self.file.close()
+            self.file = None
+            
+    def __enter__(self):
+        self.open()
+        return self
+        
+    def __exit__(self, *exc):
+        self.close()
+            
+    def _find_header(self) -> int:
+        """Offset of the MPQ header (archives may follow user data or an executable stub)"""
+        view = self._view
+        offset = 0
+        while offset + _HEADER_V1.size <= len(view):
+            magic = view[offset:offset + 4]
+            if magic == self.MPQ_MAGIC:
+                return offset
+            if magic == self.MPQ_USER_DATA_MAGIC:
+                return offset + struct.unpack_from('<I', view, offset + 8)[0]
+            offset += 0x200
+        raise ValueError(f"Not a valid MPQ archive: {self.mpq_path}")
             
     def _parse_header(self):
         """Parse MPQ header"""
-        magic = self.file.read(4)
-        if magic != self.MPQ_MAGIC:
-            raise ValueError(f"Not a valid MPQ archive: {magic}")
+        self.archive_offset = self._find_header()
+        header = _HEADER_V2 if len(self._view) - self.archive_offset >= _HEADER_V2.size else _HEADER_V1
+        (_, header_size, archive_size, format_version, sector_shift,
+         hash_offset, block_offset, hash_entries, block_entries, *v2) = header.unpack_from(self._view, self.archive_offset)
+        
+        # Format 2+: 64-bit table positions
+        hi_block, hash_hi, block_hi = 0, 0, 0
+        if v2 and format_version >= 1 and header_size >= 0x2C:
+            hi_block, hash_hi, block_hi = v2
             
-        self.header['header_size'] = struct.unpack('<I', self.file.read(4))[0]
-        self.header['archive_size'] = struct.unpack('<I', self.file.read(4))[0]
-        self.header['format_version'] = struct.unpack('<H', self.file.read(2))[0]
-        self.header['block_size'] = 512 * (2 ** struct.unpack('<H', self.file.read(2))[0])
-        self.header['hash_table_offset'] = struct.unpack('<I', self.file.read(4))[0]
-        self.header['block_table_offset'] = struct.unpack('<I', self.file.read(4))[0]
-        self.header['hash_table_entries'] = struct.unpack('<I', self.file.read(4))[0]
-        self.header['block_table_entries'] = struct.unpack('<I', self.file.read(4))[0]
+        self.header = {
+            'header_size': header_size,
+            'archive_size': archive_size,
+            'format_version': format_version,
+            'block_size': 512 << sector_shift,
+            'hash_table_offset': hash_offset | (hash_hi << 32),
+            'block_table_offset': block_offset | (block_hi << 32),
+            'hash_table_entries': hash_entries,
+            'block_table_entries': block_entries,
+            'hi_block_table_offset': hi_block
+        }
+        
+    def _read_table(self, offset: int, entries: int, key_name: str) -> array:
+        start = self.archive_offset + offset
+        # Some archives truncate their tables; ignore the partial entry
+        length = max(0, min(entries * 16, len(self._view) - start)) & ~15
+        return decrypt_table(self._view[start:start + length], table_key(key_name))
         
     def _read_hash_table(self):
-        """Read hash table"""
-        self.file.seek(self.header['hash_table_offset'])
-        hash_table_size = self.header['hash_table_entries'] * 16
-        # Simplified - would need decryption in real implementation
-        self.hash_table = []
+        """Read and decrypt the hash table"""
+        self.hash_table = self._read_table(
+            self.header['hash_table_offset'], self.header['hash_table_entries'], '(hash table)'
+        )
         
     def _read_block_table(self):
-        """Read block table"""
-        self.file.seek(self.header['block_table_offset'])
-        # Simplified - would need decryption in real implementation
-        self.block_table = []
+        """Read and decrypt the block table (and the v2 hi-block table)"""
+        self.block_table = self._read_table(
+            self.header['block_table_offset'], self.header['block_table_entries'], '(block table)'
+        )
+        self.block_offset_hi = array('H')
+        if self.header['hi_block_table_offset']:
+            start = self.archive_offset + self.header['hi_block_table_offset']
+            self.block_offset_hi.frombytes(self._view[start:start + self.header['block_table_entries'] * 2])
+            
+    def _cache_path(self) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        st = os.fstat(self.file.fileno())
+        key = f"{os.path.abspath(self.mpq_path)}|{st.st_size}|{st.st_mtime_ns}|{self.archive_offset}"
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode()).hexdigest() + '.tables')
         
-    def list_files(self) -> List[str]:
-        """List all files in archive"""
-        # Simplified implementation
-        return [
-            "example/file1.txt",
-            "example/file2.blp",
-            "models/character.m2",
-            "textures/ground.blp"
+    def _load_cached_tables(self) -> bool:
+        path = self._cache_path()
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            if data[:4] != _TABLE_CACHE_MAGIC:
+                return False
+            hash_len, block_len, hi_len = struct.unpack_from('<III', data, 4)
+            pos = 16
+            self.hash_table = array('I')
+            self.hash_table.frombytes(data[pos:pos + hash_len])
+            pos += hash_len
+            self.block_table = array('I')
+            self.block_table.frombytes(data[pos:pos + block_len])
+            pos += block_len
+            self.block_offset_hi = array('H')
+            self.block_offset_hi.frombytes(data[pos:pos + hi_len])
+            return True
+        except (OSError, struct.error, ValueError):
+            return False
+            
+    def _store_cached_tables(self):
+        path = self._cache_path()
+        if not path:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tables = [self.hash_table.tobytes(), self.block_table.tobytes(), self.block_offset_hi.tobytes()]
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(_TABLE_CACHE_MAGIC + struct.pack('<III', *map(len, tables)))
+                for table in tables:
+                    f.write(table)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Could not cache MPQ tables: {e}")
+            
+    def _build_lookup(self):
+        """
+        (hashA, hashB, locale) -> hash table slot, packed into one int key
+
+        A key held by several slots (protected maps plant decoys) maps to a
+        tuple of them, resolved per lookup in probe order.
+        """
+        words = self.hash_table
+        block_count = len(self.block_table) // 4
+        lookup = {}
+        for slot, (hash_a, hash_b, locale_platform, block) in enumerate(
+                zip(words[0::4], words[1::4], words[2::4], words[3::4])):
+            if block < block_count:
+                key = (hash_a << 48) | (hash_b << 16) | (locale_platform & 0xFFFF)
+                found = lookup.setdefault(key, slot)
+                if found != slot:
+                    lookup[key] = (found if isinstance(found, tuple) else (found,)) + (slot,)
+        self._lookup = lookup
+        # Empty slots before each slot; Storm's probe stops at the first empty one
+        self._empty_before = array('I', accumulate((block == HASH_ENTRY_EMPTY for block in words[3::4]), initial=0))
+        
+    def _probe(self, key: int, home: int) -> Optional[int]:
+        """Block of the first slot holding key that Storm's probe from `home` reaches"""
+        slots = self._lookup.get(key)
+        if slots is None:
+            return None
+        size = len(self._empty_before) - 1
+        empty = self._empty_before
+        best = None
+        for slot in slots if isinstance(slots, tuple) else (slots,):
+            if slot >= home:
+                distance, blocked = slot - home, empty[slot] - empty[home]
+            else:
+                distance, blocked = slot + size - home, empty[size] - empty[home] + empty[slot]
+            if not blocked and (best is None or distance < best[0]):
+                best = (distance, slot)
+        return None if best is None else self.hash_table[best[1] * 4 + 3]
+        
+    def find_block(self, filename: str, locale: int = 0) -> Optional[int]:
+        """Block index of a file, trying the requested locale then the neutral one"""
+        return self.find_block_by_hash(name_hash(filename), locale)
+        
+    def find_block_by_hash(self, prefix: int, locale: int = 0) -> Optional[int]:
+        """find_block() for a precomputed name_hash()"""
+        size = len(self._empty_before) - 1
+        if not size:
+            return None
+        home = (prefix >> _KEY_BITS) % size
+        key = prefix & _KEY_MASK
+        block = self._probe(key | locale, home)
+        if block is None and locale:
+            block = self._probe(key, home)
+        return block
+        
+    def has_file(self, filename: str, locale: int = 0) -> bool:
+        block = self.find_block(filename, locale)
+        return block is not None and self._block(block)[3] & MPQ_FILE_EXISTS != 0
+        
+    def _block(self, index: int):
+        """(absolute offset, packed size, size, flags) of a block"""
+        i = index * 4
+        offset = self.block_table[i]
+        if self.block_offset_hi:
+            offset |= self.block_offset_hi[index] << 32
+        return (self.archive_offset + offset, self.block_table[i + 1],
+                self.block_table[i + 2], self.block_table[i + 3])
+        
+    def get_file_info(self, filename: str, locale: int = 0) -> Dict:
+        """Size, compressed size and flags of a file"""
+        block = self.find_block(filename, locale)
+        if block is None:
+            raise FileNotFoundError(f"{filename} not found in {self.mpq_path}")
+        offset, packed_size, size, flags = self._block(block)
+        return {
+            'filename': filename,
+            'block_index': block,
+            'offset': offset,
+            'size': size,
+            'compressed_size': packed_size,
+            'flags': flags
+        }
+        
+    def _require_block(self, filename: str, locale: int = 0) -> int:
+        block = self.find_block(filename, locale)
+        if block is None:
+            raise FileNotFoundError(f"{filename} not found in {self.mpq_path}")
+        return block
+        
+    def _sector_layout(self, block: int, filename: str):
+        """
+        Where a file's sectors live
+        
+        Returns:
+            (size, flags, key, [(start, end, unpacked size), ...]) with absolute
+            archive positions; key is None for unencrypted files
+        """
+        offset, packed_size, size, flags = self._block(block)
+        if not flags & MPQ_FILE_EXISTS or flags & MPQ_FILE_DELETE_MARKER:
+            raise FileNotFoundError(f"{filename} is deleted in {self.mpq_path}")
+        
+        key = None
+        if flags & MPQ_FILE_ENCRYPTED:
+            key = file_key(filename, offset - self.archive_offset, size, bool(flags & MPQ_FILE_FIX_KEY))
+        
+        if flags & MPQ_FILE_SINGLE_UNIT:
+            return size, flags, key, [(offset, offset + packed_size, size)]
+        
+        sector_size = self.header['block_size']
+        sectors = (size + sector_size - 1) // sector_size
+        if flags & (MPQ_FILE_COMPRESS | MPQ_FILE_IMPLODE):
+            # Sector offset table: sectors + 1 entries (+1 for the CRC block)
+            count = sectors + 1 + (1 if flags & MPQ_FILE_SECTOR_CRC else 0)
+            if key is not None:
+                offsets = decrypt_table(self._view[offset:offset + count * 4], (key - 1) & 0xFFFFFFFF)
+            else:
+                offsets = struct.unpack_from(f'<{count}I', self._view, offset)
+        else:
+            offsets = [min(i * sector_size, packed_size) for i in range(sectors + 1)]
+        
+        return size, flags, key, [
+            (offset + offsets[i], offset + offsets[i + 1], min(sector_size, size - i * sector_size))
+            for i in range(sectors)
         ]
         
+    @staticmethod
+    def _decode_sector(raw, index: int, expected: int, key: Optional[int], flags: int):
+        """Decrypt and decompress one sector; stored sectors come back as-is"""
+        if key is not None:
+            raw = decrypt_bytes(raw, (key + index) & 0xFFFFFFFF)
+        if flags & (MPQ_FILE_COMPRESS | MPQ_FILE_IMPLODE) and len(raw) < expected:
+            return decompress_sector(raw, expected, flags)
+        return raw
+        
+    def iter_file(self, filename: str, locale: int = 0):
+        """
+        Yield a file's decoded sectors in order
+        
+        Stored (uncompressed, unencrypted) sectors are memoryviews straight
+        into the archive mapping and are only valid until the next iteration.
+        """
+        block = self._require_block(filename, locale)
+        size, flags, key, sectors = self._sector_layout(block, filename)
+        for index, (start, end, expected) in enumerate(sectors):
+            raw = self._view[start:end]
+            try:
+                yield self._decode_sector(raw, index, expected, key, flags)
+            finally:
+                raw.release()
+        
+    def _decode_range(self, filename: str, sectors: List[Tuple[int, int, int]], first: int, last: int,
+                      key: Optional[int], flags: int) -> bytearray:
+        """Decode sectors [first, last) into a buffer allocated once at their final size"""
+        out = bytearray(sum(expected for _, _, expected in sectors[first:last]))
+        pos = 0
+        with memoryview(out) as target:
+            for index in range(first, last):
+                start, end, expected = sectors[index]
+                data = self._decode_sector(self._view[start:end], index, expected, key, flags)
+                if len(data) != expected:
+                    raise ValueError(f"{filename}: sector {index} decoded to {len(data)} bytes, expected {expected}")
+                target[pos:pos + expected] = data
+                pos += expected
+        return out
+        
+    def read_file(self, filename: str, locale: int = 0) -> bytearray:
+        """Read and decompress a file"""
+        block = self._require_block(filename, locale)
+        size, flags, key, sectors = self._sector_layout(block, filename)
+        return self._decode_range(filename, sectors, 0, len(sectors), key, flags)
+        
+    def list_files(self) -> List[str]:
+        """List all named files in archive (names come from the (listfile))"""
+        if self._listfile is None:
+            names = []
+            if self.find_block(LISTFILE_NAME) is not None:
+                text = self.read_file(LISTFILE_NAME).decode('utf-8', 'replace')
+                names = [name for name in parse_listfile(text) if self.has_file(name)]
+            self._listfile = names
+        return list(self._listfile)
+        
     def extract_file(self, filename: str, output_path: str):
         """Extract a single file"""
         print(f"Extracting {filename} to {output_path}")
-        # Real implementation would:
-        # 1. Find file in hash table
-        # 2. Get block info from block table
-        # 3. Read compressed data
-        # 4. Decompress (zlib, bzip2, etc.)
-        # 5. Write to output
-        
-        # Placeholder
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
         with open(output_path, 'wb') as f:
-            f.write(b'Extracted MPQ file content')
+            for chunk in self.iter_file(filename):
+                f.write(chunk)
+            
+    def extract_all(
+        self,
+        output_dir: str,
+        workers: Optional[int] = None,
+        progress: Optional[Callable[[int, int, str], None]] = None,
+        files: Optional[List[str]] = None
+    ) -> Dict:
+        """
+        Extract all files from MPQ
+        
+        Files are spread over a process pool (each worker maps the archive
+        itself). Small files are batched per task and written with one write
+        each; large files are split into sector ranges so their sectors are
+        decompressed on several cores at once.
+        
+        Args:
+            output_dir: Destination directory
+            workers: Worker processes (default: CPU count, 1 = in this process)
+            progress: Called as progress(done, total, filename) per finished file
+            files: Only extract these names (default: everything in the listfile)
             
-    def extract_all(self, output_dir: str):
-        """Extract all files from MPQ"""
+        Returns:
+            Summary with file/byte counts, failures and throughput
+        """
+        start_time = time.perf_counter()
         os.makedirs(output_dir, exist_ok=True)
         
-        files = self.list_files()
-        for filename in files:
-            output_path = os.path.join(output_dir, filename)
-            self.extract_file(filename, output_path)
+        if files is None:
+            files = self.list_files()
+        tasks, parts = self._plan_extraction(output_dir, files)
+        total = len(parts)
+        done = 0
+        written = 0
+        errors = {}
+        
+        workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+        if workers == 1:
+            results = (_run_extract_task(self, task) for task in tasks)
+            pool = None
+        else:
+            pool = Pool(workers)
+            results = pool.imap_unordered(_extract_task, [(self.mpq_path, self.cache_dir, task) for task in tasks])
+        try:
+            for task_results in results:
+                for filename, size, error in task_results:
+                    written += size
+                    if error:
+                        errors[filename] = error
+                    parts[filename] -= 1
+                    if parts[filename] == 0:
+                        done += 1
+                        if progress:
+                            progress(done, total, filename)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+                
+        for filename, error in errors.items():
+            print(f"Failed to extract {filename}: {error}")
+        seconds = time.perf_counter() - start_time
+        print(f"Extracted {total - len(errors)} files to {output_dir}")
+        
+        return {
+            'files': total,
+            'failed': len(errors),
+            'errors': errors,
+            'bytes': written,
+            'workers': workers,
+            'seconds': round(seconds, 3),
+            'mb_per_second': round(written / seconds / 1e6, 2) if seconds else 0.0
+        }
+        
+    def _plan_extraction(self, output_dir: str, filenames: List[str]):
+        """
+        Largest-first extraction tasks
+        
+        Returns:
+            (tasks, {filename: number of tasks that write it})
+        """
+        entries = []
+        for filename in filenames:
+            try:
+                output_path = safe_output_path(output_dir, filename)
+            except ValueError as e:
+                print(f"Skipping {e}")
+                continue
+            block = self.find_block(filename)
+            if block is None:
+                print(f"Skipping {filename}: not in {self.mpq_path}")
+                continue
+            _, packed_size, size, flags = self._block(block)
+            entries.append((size, packed_size, flags, filename, output_path))
+        entries.sort(reverse=True)
+        
+        for directory in {os.path.dirname(entry[4]) for entry in entries}:
+            os.makedirs(directory, exist_ok=True)
+        
+        sector_size = self.header['block_size']
+        part_sectors = max(1, EXTRACT_PART_BYTES // sector_size)
+        tasks = []
+        parts = {}
+        batch, batch_bytes = [], 0
+        for size, packed_size, flags, filename, output_path in entries:
+            if size > EXTRACT_SPLIT_BYTES and not flags & MPQ_FILE_SINGLE_UNIT:
+                # Workers write their sector ranges in place
+                with open(output_path, 'wb') as f:
+                    f.truncate(size)
+                sectors = (size + sector_size - 1) // sector_size
+                for first in range(0, sectors, part_sectors):
+                    tasks.append(('sectors', filename, output_path, first, min(first + part_sectors, sectors)))
+                parts[filename] = (sectors + part_sectors - 1) // part_sectors
+                continue
             
-        print(f"Extracted {len(files)} files to {output_dir}")
+            batch.append((filename, output_path))
+            batch_bytes += size
+            parts[filename] = 1
+            if batch_bytes >= EXTRACT_BATCH_BYTES or len(batch) >= EXTRACT_BATCH_FILES:
+                tasks.append(('files', batch))
+                batch, batch_bytes = [], 0
+        if batch:
+            tasks.append(('files', batch))
+        return tasks, parts
+        
+    def _write_files(self, files: List[Tuple[str, str]]) -> List[Tuple[str, int, Optional[str]]]:
+        """Decode whole files and write each with a single write"""
+        results = []
+        for filename, output_path in files:
+            try:
+                data = self.read_file(filename)
+                with open(output_path, 'wb') as f:
+                    f.write(data)
+                results.append((filename, len(data), None))
+            except _EXTRACT_ERRORS as e:
+                results.append((filename, 0, str(e)))
+        return results
+        
+    def _write_sectors(self, filename: str, output_path: str, first: int, last: int) -> List[Tuple[str, int, Optional[str]]]:
+        """Decode sectors [first, last) of a file and write them at their final offset"""
+        try:
+            size, flags, key, sectors = self._sector_layout(self._require_block(filename), filename)
+            data = self._decode_range(filename, sectors, first, last, key, flags)
+            with open(output_path, 'r+b') as f:
+                f.seek(first * self.header['block_size'])
+                f.write(data)
+            return [(filename, len(data), None)]
+        except _EXTRACT_ERRORS as e:
+            return [(filename, 0, str(e))]
 
     @staticmethod
-    def create_mpq(files: List[str], output_path: str):
-        """Create new MPQ archive"""
-        print(f"Creating MPQ archive: {output_path}")
-        # Real implementation would create MPQ with proper:
-        # - Header
-        # - Hash table
-        # - Block table
-        # - Compressed file data
+    def create_mpq(files: List[str], output_path: str, base_dir: Optional[str] = None, **options) -> Dict:
+        """
+        Create new MPQ archive
         
-        with open(output_path, 'wb') as f:
-            f.write(MPQExtractor.MPQ_MAGIC)
-            f.write(b'\x00' * 100)  # Placeholder header
+        Args:
+            files: Paths of the files to pack
+            output_path: Archive to write
+            base_dir: Archive names are paths relative to this (default: base names)
+            **options: Passed to MPQWriter (compression, workers, ...)
             
+        Returns:
+            MPQWriter summary
+        """
+        from .mpq_writer import MPQWriter
+        
+        print(f"Creating MPQ archive: {output_path}")
+        with MPQWriter(output_path, **options) as writer:
+            for path in files:
+                name = os.path.relpath(path, base_dir) if base_dir else os.path.basename(path)
+                writer.add_file(name.replace(os.sep, '\\'), path)
+        
         print(f"Created MPQ with {len(files)} files")
+        return writer.summary
+
+
+def _run_extract_task(archive: MPQExtractor, task: tuple) -> List[Tuple[str, int, Optional[str]]]:
+    if task[0] == 'files':
+        return archive._write_files(task[1])
+    return archive._write_sectors(*task[1:])
+
+
+# Archives opened by this (worker) process, kept open across tasks
+_worker_archives: Dict[str, MPQExtractor] = {}
+
+
+def _extract_task(job: tuple) -> List[Tuple[str, int, Optional[str]]]:
+    """Worker: run one extract_all() task against this process's own mapping"""
+    mpq_path, cache_dir, task = job
+    archive = _worker_archives.get(mpq_path)
+    if archive is None:
+        archive = MPQExtractor(mpq_path, cache_dir)
+        archive.open()
+        _worker_archives[mpq_path] = archive
+    return _run_extract_task(archive, task)
 
 
 # Example usage
@@ -0,0 +1,194 @@
+"""
+MPQ File System
+Read-only view over a base MPQ and its patches, with streaming file objects
+so assets can be read without extracting archives to disk
+"""
+
+import io
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .mpq_extractor import (
+    DEFAULT_CACHE_DIR, MPQ_FILE_DELETE_MARKER, MPQ_FILE_EXISTS,
+    MPQExtractor, name_hash,
+)
+from .mpq_index import MPQIndex, normalize_name
+
+
+class MPQFile(io.RawIOBase):
+    """
+    Seekable, read-only stream over one archived file
+
+    Sectors are decoded on demand and only the current one is kept, so
+    reading a large file sequentially needs one sector of memory.
+    """
+
+    def __init__(self, archive: MPQExtractor, block: int, name: str):
+        super().__init__()
+        self.name = name
+        self._archive = archive
+        self.size, self._flags, self._key, self._sectors = archive._sector_layout(block, name)
+        self._sector_size = self.size if len(self._sectors) == 1 else archive.header['block_size']
+        self._pos = 0
+        self._current = -1
+        self._data = b''
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        self._pos = offset
+        return offset
+
+    def _load(self, index: int):
+        if index != self._current:
+            self._data = self._archive._decode_range(self.name, self._sectors, index, index + 1,
+                                                     self._key, self._flags)
+            self._current = index
+
+    def readinto(self, buffer) -> int:
+        with memoryview(buffer) as target:
+            target = target.cast('B')
+            written = 0
+            while written < len(target) and self._pos < self.size:
+                index, skip = divmod(self._pos, self._sector_size)
+                self._load(index)
+                chunk = min(len(self._data) - skip, len(target) - written)
+                target[written:written + chunk] = self._data[skip:skip + chunk]
+                written += chunk
+                self._pos += chunk
+            return written
+
+    def readall(self) -> bytes:
+        """Rest of the file, decoded straight into one buffer"""
+        if self._pos >= self.size:
+            return b''
+        first, skip = divmod(self._pos, self._sector_size)
+        data = self._archive._decode_range(self.name, self._sectors, first, len(self._sectors),
+                                           self._key, self._flags)
+        self._pos = self.size
+        return bytes(memoryview(data)[skip:])
+
+
+class MPQFileSystem:
+    """
+    Ordered stack of mounted MPQ archives (base first, patches after)
+
+    Names are resolved once: through the merged MPQIndex (cached on disk,
+    keyed by the archives' sizes and mtimes) and, for names missing from
+    every listfile, by hashing them against each archive from the top
+    patch down. Both kinds of result, including misses, are memoized.
+    """
+
+    def __init__(self, archives: Sequence[str], listfiles: Sequence[str] = (),
+                 cache_dir: Optional[str] = DEFAULT_CACHE_DIR):
+        self.archive_paths = list(archives)
+        self.listfiles = list(listfiles)
+        self.cache_dir = cache_dir
+        self.archives: List[MPQExtractor] = []
+        self.index: Optional[MPQIndex] = None
+        self._resolved: Dict[str, Optional[Tuple[int, int]]] = {}
+
+    def mount(self):
+        """Map every archive and load (or build) the merged index"""
+        try:
+            for path in self.archive_paths:
+                archive = MPQExtractor(path, self.cache_dir)
+                archive.open()
+                self.archives.append(archive)
+            self.index = MPQIndex.open(self.archive_paths, self.listfiles, self.cache_dir)
+        except BaseException:
+            self.unmount()
+            raise
+
+    def unmount(self):
+        for archive in self.archives:
+            archive.close()
+        self.archives = []
+        self._resolved.clear()
+
+    def __enter__(self):
+        self.mount()
+        return self
+
+    def __exit__(self, *exc):
+        self.unmount()
+
+    def resolve(self, name: str) -> Optional[Tuple[int, int]]:
+        """(archive id, block index) of the version of `name` that wins"""
+        key = normalize_name(name)
+        if key in self._resolved:
+            return self._resolved[key]
+
+        location = self.index.locate(name)
+        if location is None:
+            prefix = name_hash(name)
+            for archive_id in range(len(self.archives) - 1, -1, -1):
+                archive = self.archives[archive_id]
+                block = archive.find_block_by_hash(prefix)
+                if block is None:
+                    continue
+                flags = archive._block(block)[3]
+                if flags & MPQ_FILE_EXISTS and not flags & MPQ_FILE_DELETE_MARKER:
+                    location = (archive_id, block)
+                break
+
+        self._resolved[key] = location
+        return location
+
+    def exists(self, name: str) -> bool:
+        return self.resolve(name) is not None
+
+    def stat(self, name: str) -> Dict:
+        """Size, compressed size, flags and source archive of a file"""
+        location = self.resolve(name)
+        if location is None:
+            raise FileNotFoundError(name)
+        archive_id, block = location
+        archive = self.archives[archive_id]
+        offset, packed_size, size, flags = archive._block(block)
+        return {
+            'filename': name,
+            'archive': archive.mpq_path,
+            'block_index': block,
+            'offset': offset,
+            'size': size,
+            'compressed_size': packed_size,
+            'flags': flags
+        }
+
+    def open(self, name: str) -> MPQFile:
+        """Streaming, seekable file object for `name`"""
+        location = self.resolve(name)
+        if location is None:
+            raise FileNotFoundError(name)
+        archive_id, block = location
+        return MPQFile(self.archives[archive_id], block, name)
+
+    def read(self, name: str) -> bytes:
+        with self.open(name) as f:
+            return f.readall()
+
+    def glob(self, pattern: str) -> List[str]:
+        """Names matching a shell-style pattern (see MPQIndex.glob)"""
+        return [entry['filename'] for entry in self.index.glob(pattern)]
+
+
+# Example usage
+if __name__ == "__main__":
+    with MPQFileSystem(["Data/common.MPQ", "Data/patch.MPQ", "Data/patch-2.MPQ"]) as fs:
+        for name in fs.glob("Character\\Human\\*.m2")[:10]:
+            with fs.open(name) as f:
+                magic = f.read(4)
+            print(f"{name}: {fs.stat(name)['size']} bytes, magic {magic!r}")
@@ -0,0 +1,334 @@
+"""
+MPQ Listfile Index
+Persisted, sorted name index over one MPQ or a patch chain, answering
+glob/regex queries and driving selective extraction without opening files
+"""
+
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .mpq_extractor import (
+    DEFAULT_CACHE_DIR, LISTFILE_NAME, MPQ_FILE_DELETE_MARKER, MPQ_FILE_EXISTS,
+    MPQExtractor, name_hash, parse_listfile,
+)
+
+INDEX_VERSION = 2
+
+_INDEX_MAGIC = b'FSMI'
+_INDEX_HEADER = struct.Struct('<4sIIII')  # magic, version, entries, names bytes, archives bytes
+_WILDCARD = re.compile(r'[*?\[]')
+
+# Storm compares names case-insensitively with either slash
+_NORMALIZE = str.maketrans('/abcdefghijklmnopqrstuvwxyz', '\\ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+
+
+def normalize_name(name: str) -> str:
+    """Archive name as Storm compares it ('a/b.txt' -> 'A\\B.TXT')"""
+    return name.translate(_NORMALIZE)
+
+
+def _file_signature(path: str) -> List:
+    st = os.stat(path)
+    return [os.path.abspath(path), st.st_size, st.st_mtime_ns]
+
+
+class MPQIndex:
+    """
+    Sorted index of every named file in an ordered list of archives
+
+    Archives are given in load order: base archive first, patches after it.
+    A name present in several archives resolves to the last one; a delete
+    marker in a later patch hides the file. Entries are kept sorted by
+    normalized name in parallel arrays (archive, block, size, compressed size,
+    flags), and the whole index is stored on disk keyed by the archives' and
+    listfiles' sizes and mtimes.
+    """
+
+    def __init__(self, archives: List[str], names: List[str], archive_ids: array, blocks: array,
+                 sizes: array, packed_sizes: array, flags: array, cache_dir: Optional[str] = DEFAULT_CACHE_DIR):
+        self.archives = archives
+        self.names = names
+        self.keys = [normalize_name(name) for name in names]
+        self.archive_ids = archive_ids
+        self.blocks = blocks
+        self.sizes = sizes
+        self.packed_sizes = packed_sizes
+        self.flags = flags
+        # Hash/block table cache of the archives this index opens
+        self.cache_dir = cache_dir
+
+    @classmethod
+    def open(cls, archives: Sequence[str], listfiles: Sequence[str] = (),
+             cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> "MPQIndex":
+        """Load the cached index for these archives/listfiles, building it if stale"""
+        signature = {
+            'version': INDEX_VERSION,
+            'archives': [_file_signature(path) for path in archives],
+            'listfiles': [_file_signature(path) for path in listfiles]
+        }
+        path = None
+        if cache_dir:
+            digest = hashlib.sha1(json.dumps(signature, sort_keys=True).encode()).hexdigest()
+            path = os.path.join(cache_dir, digest + '.index')
+            if os.path.exists(path):
+                try:
+                    return cls.load(path, cache_dir)
+                except (OSError, ValueError, struct.error) as e:
+                    print(f"Rebuilding MPQ index ({e})")
+
+        index = cls.build(archives, listfiles, cache_dir)
+        if path:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                index.save(path)
+            except OSError as e:
+                print(f"Could not cache MPQ index: {e}")
+        return index
+
+    @classmethod
+    def build(cls, archives: Sequence[str], listfiles: Sequence[str] = (),
+              cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> "MPQIndex":
+        """
+        Resolve listfile names against each archive's hash table
+
+        Each archive is probed with its own (listfile) and the external
+        listfiles, then with every name an earlier archive provided or
+        deleted: patches rarely list the files they override or delete.
+        """
+        external = []
+        for listfile in listfiles:
+            with open(listfile, encoding='utf-8', errors='replace') as f:
+                external.extend(parse_listfile(f.read()))
+
+        merged = {}   # normalized name -> (name, archive, block, size, packed size, flags)
+        deleted = {}  # normalized name -> name, for files a patch deleted
+        hashes = {}   # normalized name -> name_hash(), shared by all archives
+        for archive_id, mpq_path in enumerate(archives):
+            with MPQExtractor(mpq_path, cache_dir) as archive:
+                names = external
+                if archive.find_block(LISTFILE_NAME) is not None:
+                    names = parse_listfile(archive.read_file(LISTFILE_NAME).decode('utf-8', 'replace')) + external
+                keys = [normalize_name(name) for name in names]
+                probed = set(keys)
+                earlier = [(key, entry[0]) for key, entry in merged.items() if key not in probed]
+                earlier += [(key, name) for key, name in deleted.items() if key not in probed]
+                for key, name in zip(keys + [key for key, _ in earlier], names + [name for _, name in earlier]):
+                    prefix = hashes.get(key)
+                    if prefix is None:
+                        prefix = hashes[key] = name_hash(name)
+                    block = archive.find_block_by_hash(prefix)
+                    if block is None:
+                        continue
+                    _, packed_size, size, flags = archive._block(block)
+                    if flags & MPQ_FILE_DELETE_MARKER:
+                        if key in merged:
+                            deleted[key] = merged.pop(key)[0]
+                    elif flags & MPQ_FILE_EXISTS:
+                        previous = merged.get(key)
+                        merged[key] = (previous[0] if previous else name, archive_id, block, size, packed_size, flags)
+                        deleted.pop(key, None)
+            print(f"Indexed {mpq_path}: {len(merged)} files so far")
+
+        entries = [merged[key] for key in sorted(merged)]
+        return cls(
+            [os.path.abspath(path) for path in archives],
+            [entry[0] for entry in entries],
+            array('H', [entry[1] for entry in entries]),
+            array('I', [entry[2] for entry in entries]),
+            array('I', [entry[3] for entry in entries]),
+            array('I', [entry[4] for entry in entries]),
+            array('I', [entry[5] for entry in entries]),
+            cache_dir=cache_dir
+        )
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _columns(self) -> List[array]:
+        return [self.archive_ids, self.blocks, self.sizes, self.packed_sizes, self.flags]
+
+    def save(self, path: str):
+        """Write the index atomically (header, little-endian columns, names, archives)"""
+        names = '\n'.join(self.names).encode('utf-8', 'surrogateescape')
+        archives = json.dumps(self.archives).encode()
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, INDEX_VERSION, len(self), len(names), len(archives)))
+            for column in self._columns():
+                if sys.byteorder == 'big':
+                    column = array(column.typecode, column)
+                    column.byteswap()
+                f.write(column.tobytes())
+            f.write(names)
+            f.write(archives)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> "MPQIndex":
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, count, names_len, archives_len = _INDEX_HEADER.unpack_from(data)
+        if magic != _INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"Not an MPQ index: {path}")
+
+        pos = _INDEX_HEADER.size
+        columns = []
+        for typecode in ('H', 'I', 'I', 'I', 'I'):
+            column = array(typecode)
+            end = pos + count * column.itemsize
+            column.frombytes(data[pos:end])
+            if sys.byteorder == 'big':
+                column.byteswap()
+            columns.append(column)
+            pos = end
+        names = data[pos:pos + names_len].decode('utf-8', 'surrogateescape').split('\n') if count else []
+        archives = json.loads(data[pos + names_len:pos + names_len + archives_len])
+        if len(names) != count:
+            raise ValueError(f"Corrupt MPQ index: {path}")
+        return cls(archives, names, *columns, cache_dir=cache_dir)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return self._position(name) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def _position(self, name: str) -> Optional[int]:
+        key = normalize_name(name)
+        i = bisect_left(self.keys, key)
+        return i if i < len(self.keys) and self.keys[i] == key else None
+
+    def entry(self, i: int) -> Dict:
+        return {
+            'filename': self.names[i],
+            'archive': self.archives[self.archive_ids[i]],
+            'block_index': self.blocks[i],
+            'size': self.sizes[i],
+            'compressed_size': self.packed_sizes[i],
+            'flags': self.flags[i]
+        }
+
+    def locate(self, name: str) -> Optional[Tuple[int, int]]:
+        """(archive id, block index) of a file"""
+        i = self._position(name)
+        return None if i is None else (self.archive_ids[i], self.blocks[i])
+
+    def find(self, name: str) -> Optional[Dict]:
+        """Entry of one file (from the highest-priority archive holding it)"""
+        i = self._position(name)
+        return None if i is None else self.entry(i)
+
+    def glob(self, pattern: str) -> List[Dict]:
+        """
+        Entries matching a shell-style pattern
+
+        Matching is case-insensitive and '/' equals '\\'. '*' also matches
+        across directories. A literal leading part ('World\\Maps\\*') narrows
+        the search to a sorted range instead of a full scan.
+        """
+        key = normalize_name(pattern)
+        wildcard = _WILDCARD.search(key)
+        if not wildcard:
+            entry = self.find(pattern)
+            return [entry] if entry else []
+
+        literal = key[:wildcard.start()]
+        lo = bisect_left(self.keys, literal)
+        hi = bisect_right(self.keys, literal + '\U0010ffff') if literal else len(self.keys)
+        match = re.compile(fnmatch.translate(key), re.DOTALL).match
+        keys = self.keys
+        return [self.entry(i) for i in range(lo, hi) if match(keys[i])]
+
+    def search(self, regex: str) -> List[Dict]:
+        """Entries whose name matches a regular expression (case-insensitive, re.search)"""
+        search = re.compile(regex, re.IGNORECASE).search
+        return [self.entry(i) for i, name in enumerate(self.names) if search(name)]
+
+    def query(self, pattern: Optional[str] = None, regex: Optional[str] = None) -> List[Dict]:
+        """glob() and/or search(); everything when neither is given"""
+        if pattern:
+            entries = self.glob(pattern)
+        else:
+            entries = [self.entry(i) for i in range(len(self))]
+        if regex:
+            search = re.compile(regex, re.IGNORECASE).search
+            entries = [entry for entry in entries if search(entry['filename'])]
+        return entries
+
+    # ------------------------------------------------------------------
+    # Extraction
+    # ------------------------------------------------------------------
+
+    def extract(
+        self,
+        output_dir: str,
+        names: Optional[Iterable[str]] = None,
+        workers: Optional[int] = None,
+        progress: Optional[Callable[[int, int, str], None]] = None
+    ) -> Dict:
+        """
+        Extract files, each from the archive that wins for it
+
+        Args:
+            output_dir: Destination directory
+            names: Files to extract (e.g. from glob()); default: all
+            workers: Worker processes per archive (see MPQExtractor.extract_all)
+            progress: Called as progress(done, total, filename)
+
+        Returns:
+            Combined extract_all() summary
+        """
+        if names is None:
+            names = self.names
+        by_archive: Dict[int, List[str]] = {}
+        for name in names:
+            i = self._position(name)
+            if i is None:
+                print(f"Skipping {name}: not in index")
+                continue
+            by_archive.setdefault(self.archive_ids[i], []).append(self.names[i])
+
+        total = sum(len(files) for files in by_archive.values())
+        summary = {'files': 0, 'failed': 0, 'errors': {}, 'bytes': 0, 'seconds': 0.0}
+        for archive_id, files in sorted(by_archive.items()):
+            offset = summary['files']
+            report = None
+            if progress:
+                report = lambda done, _, filename, offset=offset: progress(offset + done, total, filename)
+            with MPQExtractor(self.archives[archive_id], self.cache_dir) as archive:
+                result = archive.extract_all(output_dir, workers=workers, progress=report, files=files)
+            for field in ('files', 'failed', 'bytes', 'seconds'):
+                summary[field] += result[field]
+            summary['errors'].update(result['errors'])
+
+        seconds = summary['seconds']
+        summary['seconds'] = round(seconds, 3)
+        summary['mb_per_second'] = round(summary['bytes'] / seconds / 1e6, 2) if seconds else 0.0
+        return summary
+
+
+# Example usage
+if __name__ == "__main__":
+    index = MPQIndex.open(["Data/common.MPQ", "Data/patch.MPQ", "Data/patch-2.MPQ"])
+    print(f"Indexed {len(index)} files")
+
+    textures = index.glob("World\\Maps\\*.blp")
+    print(f"Found {len(textures)} map textures")
+
+    index.extract("output/mpq_textures/", names=[entry['filename'] for entry in textures])
@@ -0,0 +1,299 @@
+"""
+MPQ Archive Writer
+Streaming MPQ builder: sectors are compressed in parallel and written in a
+single pass, with the encrypted hash/block tables appended at the end
+"""
+
+import bz2
+import os
+import struct
+import time
+import zlib
+from array import array
+from collections import deque
+from multiprocessing import Pool
+from typing import Dict, List, Optional, Union
+
+from .mpq_crypto import (
+    HASH_NAME_A, HASH_NAME_B, HASH_TABLE_OFFSET,
+    encrypt_table, hash_string, table_key,
+)
+from .mpq_extractor import (
+    HASH_ENTRY_EMPTY, LISTFILE_NAME, MPQ_COMPRESSION_BZIP2, MPQ_COMPRESSION_ZLIB,
+    MPQ_FILE_COMPRESS, MPQ_FILE_EXISTS, MPQExtractor,
+)
+from .mpq_index import normalize_name
+
+COMPRESSIONS = {
+    'zlib': MPQ_COMPRESSION_ZLIB,
+    'bzip2': MPQ_COMPRESSION_BZIP2,
+    'none': 0
+}
+
+# Input handed to one compression task (rounded down to whole sectors)
+CHUNK_BYTES = 1024 * 1024
+
+_HEADER_V1 = struct.Struct('<4sIIHHIIII')
+_HEADER_V2 = struct.Struct('<4sIIHHIIIIQHH')
+
+
+def hash_table_size(files: int) -> int:
+    """Power-of-two hash table size keeping the load factor at or below 3/4"""
+    size = 16
+    while size * 3 < files * 4:
+        size *= 2
+    return size
+
+
+def _compress_chunk(data: bytes, sector_size: int, compression: str, level: int) -> List[bytes]:
+    """Worker: compress each sector of a chunk, keeping sectors that do not shrink as stored"""
+    mask = bytes([COMPRESSIONS[compression]])
+    payloads = []
+    for start in range(0, len(data), sector_size):
+        sector = data[start:start + sector_size]
+        if compression == 'bzip2':
+            packed = mask + bz2.compress(sector, level)
+        else:
+            packed = mask + zlib.compress(sector, level)
+        payloads.append(packed if len(packed) < len(sector) else bytes(sector))
+    return payloads
+
+
+class _Ready:
+    """Already-computed stand-in for an AsyncResult"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class _PendingFile:
+    def __init__(self, name: str, block: int, size: int, sectors: int, flags: int):
+        self.name = name
+        self.block = block
+        self.size = size
+        self.sectors = sectors
+        self.flags = flags
+        self.start = 0
+        self.offsets = [4 * (sectors + 1)] if flags & MPQ_FILE_COMPRESS else [0]
+
+
+class MPQWriter:
+    """
+    Build an MPQ archive in one pass with bounded memory
+
+    Files are read in CHUNK_BYTES pieces and compressed on a process pool;
+    at most `window` chunks are in flight, and finished chunks are written
+    in order as the window drains. Each file's sector offset table is
+    reserved up front and filled in once its sectors are written. A
+    (listfile) is added on close(), followed by the encrypted hash and
+    block tables, and finally the header is rewritten with their positions.
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        compression: str = 'zlib',
+        level: int = 6,
+        sector_shift: int = 3,
+        workers: Optional[int] = None,
+        window: Optional[int] = None,
+        format_version: int = 0,
+        listfile: bool = True
+    ):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression '{compression}' (expected one of {', '.join(COMPRESSIONS)})")
+        self.output_path = output_path
+        self.compression = compression
+        self.level = level
+        self.sector_shift = sector_shift
+        self.sector_size = 512 << sector_shift
+        self.format_version = format_version
+        self.listfile = listfile
+        self.workers = workers or os.cpu_count() or 1
+        self.window = window or self.workers * 2
+        self.chunk_bytes = max(self.sector_size, CHUNK_BYTES // self.sector_size * self.sector_size)
+        self.header_size = _HEADER_V2.size if format_version >= 1 else _HEADER_V1.size
+
+        self.names: List[str] = []
+        self._keys = set()
+        self.blocks: List[tuple] = []  # (offset, packed size, size, flags)
+        self.bytes_in = 0
+        self._pending = deque()        # ('start' | 'chunk' | 'end', file, result) in write order
+        self._in_flight = 0
+        self._pool = None
+        self._file = None
+        self._start_time = 0.0
+        self.summary: Optional[Dict] = None
+
+    def open(self):
+        self._start_time = time.perf_counter()
+        self._file = open(self.output_path, 'wb')
+        self._file.write(b'\0' * self.header_size)
+        if self.compression != 'none' and self.workers > 1:
+            self._pool = Pool(self.workers)
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def add_file(self, archive_name: str, source: Union[str, bytes, bytearray, memoryview]):
+        """
+        Queue a file for writing
+
+        Args:
+            archive_name: Name inside the archive ('Interface\\Icons\\a.blp')
+            source: Path of a file on disk, or its contents
+        """
+        key = normalize_name(archive_name)
+        if key in self._keys:
+            raise ValueError(f"Duplicate archive name: {archive_name}")
+        self._keys.add(key)
+        self.names.append(archive_name)
+
+        if isinstance(source, str):
+            size = os.path.getsize(source)
+        else:
+            source = memoryview(source).cast('B')
+            size = len(source)
+        sectors = (size + self.sector_size - 1) // self.sector_size
+        flags = MPQ_FILE_EXISTS
+        if self.compression != 'none' and size:
+            flags |= MPQ_FILE_COMPRESS
+        entry = _PendingFile(archive_name, len(self.blocks), size, sectors, flags)
+        self.blocks.append(None)
+        self.bytes_in += size
+
+        self._pending.append(('start', entry, None))
+        if isinstance(source, str):
+            with open(source, 'rb') as f:
+                for _ in range(0, size, self.chunk_bytes):
+                    self._submit(entry, f.read(self.chunk_bytes))
+        else:
+            for start in range(0, size, self.chunk_bytes):
+                self._submit(entry, source[start:start + self.chunk_bytes])
+        self._pending.append(('end', entry, None))
+        self._drain(self.window)
+
+    def _submit(self, entry: _PendingFile, chunk):
+        if not entry.flags & MPQ_FILE_COMPRESS:
+            result = _Ready([chunk])
+        elif self._pool is None:
+            result = _Ready(_compress_chunk(chunk, self.sector_size, self.compression, self.level))
+        else:
+            args = (bytes(chunk), self.sector_size, self.compression, self.level)
+            result = self._pool.apply_async(_compress_chunk, args)
+        self._pending.append(('chunk', entry, result))
+        self._in_flight += 1
+        self._drain(self.window)
+
+    def _drain(self, limit: int):
+        """Write queued work in order until at most `limit` chunks are in flight"""
+        f = self._file
+        while self._pending and (self._in_flight > limit or self._pending[0][0] != 'chunk'):
+            kind, entry, result = self._pending.popleft()
+            if kind == 'start':
+                entry.start = f.tell()
+                if entry.flags & MPQ_FILE_COMPRESS:
+                    f.write(b'\0' * entry.offsets[0])
+            elif kind == 'chunk':
+                self._in_flight -= 1
+                offsets = entry.offsets
+                for payload in result.get():
+                    f.write(payload)
+                    offsets.append(offsets[-1] + len(payload))
+            else:
+                end = f.tell()
+                if entry.flags & MPQ_FILE_COMPRESS:
+                    f.seek(entry.start)
+                    f.write(struct.pack(f'<{len(entry.offsets)}I', *entry.offsets))
+                    f.seek(end)
+                self.blocks[entry.block] = (entry.start, end - entry.start, entry.size, entry.flags)
+
+    def _hash_table(self) -> array:
+        size = hash_table_size(len(self.names))
+        table = array('I', [HASH_ENTRY_EMPTY]) * (size * 4)
+        for block, name in enumerate(self.names):
+            i = hash_string(name, HASH_TABLE_OFFSET) & (size - 1)
+            while table[i * 4 + 3] != HASH_ENTRY_EMPTY:
+                i = (i + 1) & (size - 1)
+            table[i * 4:i * 4 + 4] = array('I', [hash_string(name, HASH_NAME_A), hash_string(name, HASH_NAME_B), 0, block])
+        return table
+
+    def close(self) -> Dict:
+        """Write the (listfile), tables and header; returns (and keeps) a summary"""
+        if self.listfile:
+            self.add_file(LISTFILE_NAME, '\r\n'.join(self.names).encode('utf-8') + b'\r\n')
+        self._drain(0)
+        if self._pool:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+        f = self._file
+        hash_table = self._hash_table()
+        block_table = array('I')
+        high = array('H')
+        for offset, packed_size, size, flags in self.blocks:
+            block_table.extend((offset & 0xFFFFFFFF, packed_size, size, flags))
+            high.append(offset >> 32)
+
+        hash_pos = f.tell()
+        f.write(encrypt_table(hash_table, table_key('(hash table)')))
+        block_pos = f.tell()
+        f.write(encrypt_table(block_table, table_key('(block table)')))
+        high_pos = 0
+        if any(high):
+            if self.format_version < 1:
+                raise ValueError("Archive exceeds 4 GiB; use format_version=1")
+            high_pos = f.tell()
+            f.write(struct.pack(f'<{len(high)}H', *high))
+        archive_size = f.tell()
+
+        f.seek(0)
+        fields = (b'MPQ\x1a', self.header_size, archive_size & 0xFFFFFFFF, self.format_version, self.sector_shift,
+                  hash_pos & 0xFFFFFFFF, block_pos & 0xFFFFFFFF, len(hash_table) // 4, len(self.blocks))
+        if self.format_version >= 1:
+            f.write(_HEADER_V2.pack(*fields, high_pos, hash_pos >> 32, block_pos >> 32))
+        else:
+            f.write(_HEADER_V1.pack(*fields))
+        f.close()
+        self._file = None
+
+        seconds = time.perf_counter() - self._start_time
+        self.summary = {
+            'files': len(self.names),
+            'bytes_in': self.bytes_in,
+            'bytes_out': archive_size,
+            'seconds': round(seconds, 3),
+            'mb_per_second': round(self.bytes_in / seconds / 1e6, 2) if seconds else 0.0
+        }
+        return self.summary
+
+    def abort(self):
+        """Stop without finishing the archive and remove the partial output"""
+        if self._pool:
+            self._pool.terminate()
+            self._pool = None
+        if self._file:
+            self._file.close()
+            self._file = None
+            os.remove(self.output_path)
+
+
+# Example usage
+if __name__ == "__main__":
+    with MPQWriter("output/patch-custom.MPQ", compression="zlib") as writer:
+        writer.add_file("Interface\\Icons\\custom.blp", "assets/custom.blp")
+        writer.add_file("readme.txt", b"Built by Forge Spark\r\n")
+
+    with MPQExtractor("output/patch-custom.MPQ") as archive:
+        print(archive.list_files())
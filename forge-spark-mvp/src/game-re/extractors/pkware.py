@@ -0,0 +1,147 @@
+"""
+PKWARE DCL Explode
+Pure-Python decompressor for PKWARE Data Compression Library "implode" data
+(MPQ_FILE_IMPLODE files and MPQ_COMPRESSION_PKWARE sectors)
+"""
+
+from typing import List, Optional, Tuple
+
+# Code lengths in the library's compact form: each byte is (repeat - 1) << 4 | length
+_LITERAL_LENGTHS = bytes([
+    11, 124, 8, 7, 28, 7, 188, 13, 76, 4, 10, 8, 12, 10, 12, 10, 8, 23, 8,
+    9, 7, 6, 7, 8, 7, 6, 55, 8, 23, 24, 12, 11, 7, 9, 11, 12, 6, 7, 22, 5,
+    7, 24, 6, 11, 9, 6, 7, 22, 7, 11, 38, 7, 9, 8, 25, 11, 8, 11, 9, 12,
+    8, 12, 5, 38, 5, 38, 5, 11, 7, 5, 6, 21, 6, 10, 53, 8, 7, 24, 10, 27,
+    44, 253, 253, 253, 252, 252, 252, 13, 12, 45, 12, 45, 12, 61, 12, 45,
+    44, 173
+])
+_LENGTH_LENGTHS = bytes([2, 35, 36, 53, 38, 23])
+_DISTANCE_LENGTHS = bytes([2, 20, 53, 230, 247, 151, 248])
+
+# Match length = base + extra bits, per length symbol
+_LENGTH_BASE = (3, 2, 4, 5, 6, 7, 8, 9, 10, 12, 16, 24, 40, 72, 136, 264)
+_LENGTH_EXTRA = (0, 0, 0, 0, 0, 0, 0, 0, 1, 2, 3, 4, 5, 6, 7, 8)
+
+_END_OF_STREAM = 519
+
+
+def _build_table(compact: bytes) -> Tuple[List[Tuple[int, int]], int]:
+    """
+    Lookup table for one Huffman code
+
+    Codes are canonical but stored bit-inverted, first bit first. The table
+    is indexed by the next `max_bits` stream bits (LSB first) and gives
+    (symbol, code length).
+    """
+    lengths = []
+    for byte in compact:
+        lengths.extend([byte & 15] * ((byte >> 4) + 1))
+    max_bits = max(lengths)
+
+    table = [None] * (1 << max_bits)
+    code = 0
+    for length in range(1, max_bits + 1):
+        for symbol, symbol_length in enumerate(lengths):
+            if symbol_length != length:
+                continue
+            pattern = 0
+            for i in range(length):
+                pattern |= (((code >> (length - 1 - i)) & 1) ^ 1) << i
+            for fill in range(0, 1 << max_bits, 1 << length):
+                table[pattern | fill] = (symbol, length)
+            code += 1
+        code <<= 1
+    return table, max_bits
+
+
+_LITERAL_TABLE, _LITERAL_BITS = _build_table(_LITERAL_LENGTHS)
+_LENGTH_TABLE, _LENGTH_BITS = _build_table(_LENGTH_LENGTHS)
+_DISTANCE_TABLE, _DISTANCE_BITS = _build_table(_DISTANCE_LENGTHS)
+
+
+def explode(data, expected_size: Optional[int] = None) -> bytes:
+    """
+    Decompress PKWARE DCL imploded data
+
+    Args:
+        data: Imploded stream (bytes-like)
+        expected_size: Stop once this many bytes are produced (MPQ sectors
+            may omit the end-of-stream code)
+
+    Returns:
+        Decompressed bytes
+    """
+    if len(data) < 2:
+        raise ValueError("PKWARE stream is truncated")
+    coded_literals, dict_bits = data[0], data[1]
+    if coded_literals > 1:
+        raise ValueError(f"Bad PKWARE literal mode: {coded_literals}")
+    if dict_bits not in (4, 5, 6):
+        raise ValueError(f"Bad PKWARE dictionary size: {dict_bits}")
+
+    literal_table, length_table, distance_table = _LITERAL_TABLE, _LENGTH_TABLE, _DISTANCE_TABLE
+    literal_mask = (1 << _LITERAL_BITS) - 1
+    length_mask = (1 << _LENGTH_BITS) - 1
+    distance_mask = (1 << _DISTANCE_BITS) - 1
+    limit = expected_size if expected_size is not None else float('inf')
+
+    out = bytearray()
+    size = len(data)
+    pos = 2
+    bitbuf = 0
+    bitcnt = 0
+    while len(out) < limit:
+        # One token needs at most 1 + 7 + 8 + 8 + 6 bits
+        while bitcnt < 32 and pos < size:
+            bitbuf |= data[pos] << bitcnt
+            pos += 1
+            bitcnt += 8
+        if bitcnt <= 0:
+            if expected_size is None:
+                raise ValueError("PKWARE stream ended without an end code")
+            break
+
+        if bitbuf & 1:
+            symbol, used = length_table[(bitbuf >> 1) & length_mask]
+            bitbuf >>= 1 + used
+            extra = _LENGTH_EXTRA[symbol]
+            length = _LENGTH_BASE[symbol] + (bitbuf & ((1 << extra) - 1))
+            bitbuf >>= extra
+            bitcnt -= 1 + used + extra
+            if length == _END_OF_STREAM:
+                break
+
+            shift = 2 if length == 2 else dict_bits
+            symbol, used = distance_table[bitbuf & distance_mask]
+            bitbuf >>= used
+            distance = ((symbol << shift) | (bitbuf & ((1 << shift) - 1))) + 1
+            bitbuf >>= shift
+            bitcnt -= used + shift
+            if bitcnt < 0:
+                raise ValueError("PKWARE stream is truncated")
+            if distance > len(out):
+                raise ValueError("PKWARE distance is too far back")
+
+            start = len(out) - distance
+            if distance >= length:
+                out += out[start:start + length]
+            else:
+                # Overlapping copy repeats the last `distance` bytes
+                pattern = out[start:]
+                out += (pattern * (length // distance + 1))[:length]
+        else:
+            if coded_literals:
+                symbol, used = literal_table[(bitbuf >> 1) & literal_mask]
+                bitbuf >>= 1 + used
+                bitcnt -= 1 + used
+            else:
+                symbol = (bitbuf >> 1) & 0xFF
+                bitbuf >>= 9
+                bitcnt -= 9
+            if bitcnt < 0:
+                raise ValueError("PKWARE stream is truncated")
+            out.append(symbol)
+
+    if expected_size is not None and len(out) > expected_size:
+        del out[expected_size:]
+    return bytes(out)
@@ -0,0 +1,162 @@
+"""
+Texture Atlas Packing
+Packs many small textures into large sheets (skyline bottom-left packer) with
+edge-extruded gutters, so they can be upscaled together and sliced back out
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .tiling import tile_memory
+
+# Sheet edge in input pixels, before fitting to the memory cap (on CPU the
+# compact network costs more per pixel past about 256px inputs)
+ATLAS_SIZE = 256
+
+# Gutter between neighbouring textures, each half filled with the nearer texture's
+# own edge, so the model sees a continuation of the texture instead of its neighbour.
+# Every pixel of it costs as much to upscale as a texture pixel
+ATLAS_PADDING = 4
+
+# Fraction of a sheet's area the packer typically fills, for sizing batches of textures
+ATLAS_FILL = 0.85
+
+# (texture index, x, y) of a texture's top-left pixel in its sheet
+Placement = Tuple[int, int, int]
+
+
+def _gutter(padding: int) -> Tuple[int, int]:
+    """Extruded pixels (before, after) a texture on each axis; neighbours share the gutter between them"""
+    return padding // 2, padding - padding // 2
+
+
+class SkylinePacker:
+    """
+    Rectangles placed bottom-left in one fixed-size sheet
+
+    The free space is tracked as a skyline: the top edge of everything
+    placed so far, as (x, y, width) segments from left to right. Each
+    rectangle goes where its top ends lowest (then leftmost), resting on
+    the highest segment it spans.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.skyline: List[List[int]] = [[0, 0, width]]
+
+    def _rest(self, index: int, width: int) -> Optional[int]:
+        """y a rectangle of `width` starting at segment `index` would rest at, or None if it overhangs"""
+        x = self.skyline[index][0]
+        if x + width > self.width:
+            return None
+        y = 0
+        for segment_x, segment_y, segment_width in self.skyline[index:]:
+            if segment_x >= x + width:
+                break
+            y = max(y, segment_y)
+        return y
+
+    def insert(self, width: int, height: int) -> Optional[Tuple[int, int]]:
+        """Place a rectangle; returns its (x, y), or None if it does not fit"""
+        best = None
+        for index, (x, _, _) in enumerate(self.skyline):
+            y = self._rest(index, width)
+            if y is not None and y + height <= self.height and (best is None or y + height < best[0]):
+                best = (y + height, index, x, y)
+        if best is None:
+            return None
+        top, index, x, y = best
+
+        # The new segment replaces everything under it; a partly covered segment keeps its right part
+        right = x + width
+        kept = self.skyline[:index] + [[x, top, width]]
+        for segment in self.skyline[index:]:
+            segment_x, segment_y, segment_width = segment
+            if segment_x + segment_width > right:
+                start = max(segment_x, right)
+                kept.append([start, segment_y, segment_x + segment_width - start])
+        # Merge neighbours of equal height
+        self.skyline = [kept[0]]
+        for segment in kept[1:]:
+            if segment[1] == self.skyline[-1][1]:
+                self.skyline[-1][2] += segment[2]
+            else:
+                self.skyline.append(segment)
+        return x, y
+
+
+def pack(sizes: List[Tuple[int, int]], atlas_size: int = ATLAS_SIZE,
+         padding: int = ATLAS_PADDING) -> List[List[Placement]]:
+    """
+    Distribute textures over as few sheets as the packer manages
+
+    Textures are placed tallest first, each into the first sheet with
+    room for it (a new sheet when none has). Each takes its size plus
+    padding on both axes: half the gutter to either side of it, so
+    neighbours end up padding pixels apart.
+
+    Args:
+        sizes: (width, height) per texture
+        atlas_size: Sheet edge; every padded texture must fit in one
+        padding: Gutter between neighbouring textures (half of it at the sheet edges)
+
+    Returns:
+        Per sheet, the (index, x, y) placement of each texture in it
+    """
+    order = sorted(range(len(sizes)), key=lambda i: (sizes[i][1], sizes[i][0]), reverse=True)
+    before = _gutter(padding)[0]
+    packers: List[SkylinePacker] = []
+    sheets: List[List[Placement]] = []
+    for index in order:
+        width, height = sizes[index][0] + padding, sizes[index][1] + padding
+        if width > atlas_size or height > atlas_size:
+            raise ValueError(f"{sizes[index][0]}x{sizes[index][1]} texture does not fit a {atlas_size}px atlas "
+                             f"with {padding}px padding")
+        for packer, sheet in zip(packers, sheets):
+            spot = packer.insert(width, height)
+            if spot:
+                break
+        else:
+            packer = SkylinePacker(atlas_size, atlas_size)
+            sheet = []
+            packers.append(packer)
+            sheets.append(sheet)
+            spot = packer.insert(width, height)
+        sheet.append((index, spot[0] + before, spot[1] + before))
+    return sheets
+
+
+def compose(images: List[np.ndarray], placements: List[Placement], padding: int = ATLAS_PADDING) -> np.ndarray:
+    """
+    Sheet holding images at their placements, each ringed by its own extruded edge
+
+    The sheet is cropped to the placed area, so a sparsely filled last
+    sheet is not upscaled at full size.
+    """
+    before, after = _gutter(padding)
+    width = max(x + images[index].shape[1] for index, x, _ in placements) + after
+    height = max(y + images[index].shape[0] for index, _, y in placements) + after
+    sheet = np.zeros((height, width, images[placements[0][0]].shape[2]), np.uint8)
+    for index, x, y in placements:
+        image = images[index]
+        sheet[y - before:y + image.shape[0] + after, x - before:x + image.shape[1] + after] = np.pad(
+            image, ((before, after), (before, after), (0, 0)), mode='edge')
+    return sheet
+
+
+def cut(sheet: np.ndarray, images: List[np.ndarray], placements: List[Placement], scale: int) -> List[np.ndarray]:
+    """Upscaled texture of each placement, in placement order, from an upscaled sheet"""
+    return [sheet[y * scale:(y + images[index].shape[0]) * scale, x * scale:(x + images[index].shape[1]) * scale]
+            for index, x, y in placements]
+
+
+def fit_atlas_size(channels: int, scale: int, atlas_size: int, smallest: int, max_memory_mb: float,
+                   bytes_per_pixel: Optional[int] = None) -> int:
+    """Largest sheet edge (at most atlas_size, at least smallest) whose single forward pass fits max_memory_mb"""
+    limit = max_memory_mb * 1024 * 1024
+    size = atlas_size
+    while size // 2 >= smallest and tile_memory(channels, scale, size, 0, 0, bytes_per_pixel) > limit:
+        size //= 2
+    return size
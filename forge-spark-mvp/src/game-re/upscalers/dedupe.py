@@ -0,0 +1,207 @@
+"""
+Texture Deduplication
+Pixel digests and perceptual hashes (dHash, pHash) of textures, computed over
+stacks of small thumbnails, and clustering of near-duplicates by Hamming distance
+"""
+
+import hashlib
+from typing import List, Tuple
+
+import numpy as np
+
+from ..converters.mipmaps import filter_taps
+from .normal_maps import luminance
+
+# Thumbnail edge the hashes are computed from
+THUMBNAIL_SIZE = 32
+
+# Bits per hash: an 8x8 grid
+HASH_SIZE = 8
+
+# Largest Hamming distance (of both hashes) at which two textures count as near-duplicates
+NEAR_DISTANCE = 6
+
+# Thumbnails with less luminance spread than this (in [0, 1]) are flat; their hashes are noise
+FLAT_STD = 0.005
+
+# Bit masks of the SWAR popcount: alternate bits, bit pairs, nibbles, and one bit per byte
+_M1, _M2, _M4, _H01 = (np.uint64(mask) for mask in (0x5555555555555555, 0x3333333333333333,
+                                                      0x0F0F0F0F0F0F0F0F, 0x0101010101010101))
+
+
+def _area_matrix(size: int, out_size: int) -> np.ndarray:
+    """(out_size, size) float32 box-filter weights, so matrix @ samples resizes one axis"""
+    indices, weights = filter_taps(size, out_size, 'box')
+    matrix = np.zeros((out_size, size), np.float32)
+    np.add.at(matrix, (np.arange(out_size)[:, None], indices), weights)
+    return matrix
+
+
+def _dct_matrix(size: int) -> np.ndarray:
+    """Orthonormal DCT-II basis, rows are frequencies"""
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    matrix = np.cos(np.pi * (2 * n + 1) * k / (2 * size)) * np.sqrt(2 / size)
+    matrix[0] /= np.sqrt(2)
+    return matrix.astype(np.float32)
+
+
+def fingerprint(image: np.ndarray) -> Tuple[str, np.ndarray]:
+    """
+    Pixel digest and hash thumbnail of a texture
+
+    The digest covers the shape and every pixel, so it matches between
+    files that decode to the same image (e.g. one texture saved as both
+    PNG and uncompressed DDS) even though their bytes differ.
+
+    Args:
+        image: (height, width, channels) uint8 texture
+
+    Returns:
+        (sha1 hex digest, (THUMBNAIL_SIZE, THUMBNAIL_SIZE) float32 luminance)
+    """
+    digest = hashlib.sha1(repr(image.shape).encode())
+    digest.update(np.ascontiguousarray(image).data)
+    height, width = image.shape[:2]
+    grey = luminance(image)
+    thumbnail = _area_matrix(height, THUMBNAIL_SIZE) @ grey @ _area_matrix(width, THUMBNAIL_SIZE).T
+    return digest.hexdigest(), thumbnail
+
+
+def _pack(bits: np.ndarray) -> np.ndarray:
+    """(count, 64) bool -> (count,) uint64"""
+    return np.packbits(bits, axis=1).view('>u8')[:, 0].astype(np.uint64)
+
+
+def dhash(thumbnails: np.ndarray) -> np.ndarray:
+    """
+    Difference hashes of a (count, size, size) thumbnail stack
+
+    Each thumbnail is shrunk to 8 x 9; bit (y, x) is set where a sample is
+    brighter than the one to its right.
+
+    Returns:
+        (count,) uint64
+    """
+    size = thumbnails.shape[1]
+    small = _area_matrix(size, HASH_SIZE) @ thumbnails @ _area_matrix(size, HASH_SIZE + 1).T
+    return _pack((small[:, :, :-1] > small[:, :, 1:]).reshape(len(thumbnails), -1))
+
+
+def phash(thumbnails: np.ndarray) -> np.ndarray:
+    """
+    Perceptual (DCT) hashes of a (count, size, size) thumbnail stack
+
+    Bits are the lowest 8 x 8 DCT frequencies of each thumbnail compared
+    with their median, so they follow the coarse structure and not the
+    brightness or contrast.
+
+    Returns:
+        (count,) uint64
+    """
+    dct = _dct_matrix(thumbnails.shape[1])[:HASH_SIZE]
+    low = (dct @ thumbnails @ dct.T).reshape(len(thumbnails), -1)
+    return _pack(low > np.median(low, axis=1, keepdims=True))
+
+
+def hamming(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Bitwise distances between uint64 hash arrays (broadcast)"""
+    # Popcount in uint64 arithmetic: sum bits in pairs, then nibbles, then bytes, then gather the bytes
+    x = np.bitwise_xor(a, b).astype(np.uint64)
+    x = x - ((x >> np.uint64(1)) & _M1)
+    x = (x & _M2) + ((x >> np.uint64(2)) & _M2)
+    x = (x + (x >> np.uint64(4))) & _M4
+    with np.errstate(over='ignore'):
+        return ((x * _H01) >> np.uint64(56)).astype(np.int64)
+
+
+def close_pairs(hashes: np.ndarray, max_distance: int) -> np.ndarray:
+    """
+    Index pairs (i < j) of hashes at most max_distance bits apart
+
+    The 64 bits are split into max_distance + 1 bands; two hashes that
+    differ in at most max_distance bits agree exactly on at least one
+    band, so only hashes sharing a band value are compared, instead of
+    all count**2 pairs.
+
+    Returns:
+        (pairs, 2) int64, without duplicates
+    """
+    bands = min(max_distance + 1, 64)
+    edges = np.linspace(0, 64, bands + 1).astype(np.uint64)
+    keys = []
+    for low, high in zip(edges[:-1], edges[1:]):
+        band = (hashes >> low) & np.uint64((1 << int(high - low)) - 1)
+        order = np.argsort(band, kind='stable')
+        band = band[order]
+        # Runs of equal band values in sorted order; only runs of two or more hold candidates
+        starts = np.flatnonzero(np.diff(band)) + 1
+        starts = np.concatenate([[0], starts])
+        lengths = np.diff(np.append(starts, len(band)))
+        starts, lengths = starts[lengths > 1], lengths[lengths > 1]
+        if not len(starts):
+            continue
+        # Every position in those runs, with its run's end; pairing position p with p + offset
+        # for offset 1, 2, ... drops positions as they reach their run's end, so each round
+        # only touches runs longer than the offset
+        ends = np.repeat(starts + lengths, lengths)
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        for offset in range(1, lengths.max()):
+            inside = positions + offset < ends
+            positions, ends = positions[inside], ends[inside]
+            i, j = order[positions], order[positions + offset]
+            close = hamming(hashes[i], hashes[j]) <= max_distance
+            keys.append(np.minimum(i, j)[close] * len(hashes) + np.maximum(i, j)[close])
+    keys = np.unique(np.concatenate(keys)) if keys else np.empty(0, np.int64)
+    return np.column_stack([keys // len(hashes), keys % len(hashes)])
+
+
+def connected_labels(count: int, pairs: np.ndarray) -> np.ndarray:
+    """Smallest member index of each item's cluster, joining every pair"""
+    labels = np.arange(count)
+    if not len(pairs):
+        return labels
+    a, b = pairs[:, 0], pairs[:, 1]
+    while True:
+        hooked = labels.copy()
+        low = np.minimum(labels[a], labels[b])
+        np.minimum.at(hooked, labels[a], low)
+        np.minimum.at(hooked, labels[b], low)
+        # Pointer jumping until every label is a root
+        while True:
+            jumped = hooked[hooked]
+            if (jumped == hooked).all():
+                break
+            hooked = jumped
+        if (hooked == labels).all():
+            return labels
+        labels = hooked
+
+
+def near_duplicates(thumbnails: np.ndarray, max_distance: int = NEAR_DISTANCE) -> List[List[int]]:
+    """
+    Clusters of textures that look alike: recolours, mips, re-encodes
+
+    Two textures are linked when both their dHash and pHash are within
+    max_distance bits; clusters are the connected groups. Flat textures
+    are left out, since any two of them hash alike.
+
+    Args:
+        thumbnails: (count, size, size) float32 stack from fingerprint()
+        max_distance: Largest Hamming distance of each hash
+
+    Returns:
+        Index lists of every cluster with more than one member
+    """
+    textured = np.flatnonzero(thumbnails.reshape(len(thumbnails), -1).std(axis=1) >= FLAT_STD)
+    if len(textured) < 2:
+        return []
+    stack = thumbnails[textured]
+    perceptual, difference = phash(stack), dhash(stack)
+    pairs = close_pairs(perceptual, max_distance)
+    pairs = pairs[hamming(difference[pairs[:, 0]], difference[pairs[:, 1]]) <= max_distance]
+    labels = connected_labels(len(stack), pairs)
+    _, members = np.unique(labels, return_inverse=True)
+    order = np.argsort(members, kind='stable')
+    groups = np.split(textured[order], np.cumsum(np.bincount(members))[:-1])
+    return [group.tolist() for group in groups if len(group) > 1]
@@ -0,0 +1,246 @@
+"""
+ESRGAN Backend
+CPU super-resolution with Real-ESRGAN networks (RRDBNet and SRVGGNetCompact)
+in PyTorch: batched tile inference, optional int8 quantization, and one
+loaded network per process
+"""
+
+import os
+import warnings
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from PIL import Image
+
+DEFAULT_WEIGHTS_DIR = os.path.join(
+    os.environ.get("FORGE_SPARK_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "forge-spark")),
+    "esrgan"
+)
+
+_RELEASES = "https://github.com/xinntao/Real-ESRGAN/releases/download"
+
+
+class ResidualDenseBlock(nn.Module):
+    def __init__(self, num_feat: int = 64, num_grow_ch: int = 32):
+        super().__init__()
+        self.conv1 = nn.Conv2d(num_feat, num_grow_ch, 3, 1, 1)
+        self.conv2 = nn.Conv2d(num_feat + num_grow_ch, num_grow_ch, 3, 1, 1)
+        self.conv3 = nn.Conv2d(num_feat + 2 * num_grow_ch, num_grow_ch, 3, 1, 1)
+        self.conv4 = nn.Conv2d(num_feat + 3 * num_grow_ch, num_grow_ch, 3, 1, 1)
+        self.conv5 = nn.Conv2d(num_feat + 4 * num_grow_ch, num_feat, 3, 1, 1)
+        self.lrelu = nn.LeakyReLU(negative_slope=0.2, inplace=True)
+
+    def forward(self, x):
+        x1 = self.lrelu(self.conv1(x))
+        x2 = self.lrelu(self.conv2(torch.cat((x, x1), 1)))
+        x3 = self.lrelu(self.conv3(torch.cat((x, x1, x2), 1)))
+        x4 = self.lrelu(self.conv4(torch.cat((x, x1, x2, x3), 1)))
+        x5 = self.conv5(torch.cat((x, x1, x2, x3, x4), 1))
+        return x5 * 0.2 + x
+
+
+class RRDB(nn.Module):
+    def __init__(self, num_feat: int, num_grow_ch: int = 32):
+        super().__init__()
+        self.rdb1 = ResidualDenseBlock(num_feat, num_grow_ch)
+        self.rdb2 = ResidualDenseBlock(num_feat, num_grow_ch)
+        self.rdb3 = ResidualDenseBlock(num_feat, num_grow_ch)
+
+    def forward(self, x):
+        return self.rdb3(self.rdb2(self.rdb1(x))) * 0.2 + x
+
+
+class RRDBNet(nn.Module):
+    """ESRGAN generator (parameter names match the Real-ESRGAN releases)"""
+
+    def __init__(self, num_in_ch: int = 3, num_out_ch: int = 3, scale: int = 4, num_feat: int = 64,
+                 num_block: int = 23, num_grow_ch: int = 32):
+        super().__init__()
+        self.scale = scale
+        # x2 / x1 models fold the input into channels first
+        self.unshuffle = {4: 1, 2: 2, 1: 4}[scale]
+        self.conv_first = nn.Conv2d(num_in_ch * self.unshuffle ** 2, num_feat, 3, 1, 1)
+        self.body = nn.Sequential(*[RRDB(num_feat, num_grow_ch) for _ in range(num_block)])
+        self.conv_body = nn.Conv2d(num_feat, num_feat, 3, 1, 1)
+        self.conv_up1 = nn.Conv2d(num_feat, num_feat, 3, 1, 1)
+        self.conv_up2 = nn.Conv2d(num_feat, num_feat, 3, 1, 1)
+        self.conv_hr = nn.Conv2d(num_feat, num_feat, 3, 1, 1)
+        self.conv_last = nn.Conv2d(num_feat, num_out_ch, 3, 1, 1)
+        self.lrelu = nn.LeakyReLU(negative_slope=0.2, inplace=True)
+
+    def forward(self, x):
+        feat = F.pixel_unshuffle(x, self.unshuffle) if self.unshuffle > 1 else x
+        feat = self.conv_first(feat)
+        feat = feat + self.conv_body(self.body(feat))
+        feat = self.lrelu(self.conv_up1(F.interpolate(feat, scale_factor=2, mode='nearest')))
+        feat = self.lrelu(self.conv_up2(F.interpolate(feat, scale_factor=2, mode='nearest')))
+        return self.conv_last(self.lrelu(self.conv_hr(feat)))
+
+
+class SRVGGNetCompact(nn.Module):
+    """Compact Real-ESRGAN network: convolutions at input resolution, then a pixel shuffle"""
+
+    def __init__(self, num_in_ch: int = 3, num_out_ch: int = 3, num_feat: int = 64, num_conv: int = 16,
+                 upscale: int = 4):
+        super().__init__()
+        self.upscale = upscale
+        self.body = nn.ModuleList([nn.Conv2d(num_in_ch, num_feat, 3, 1, 1), nn.PReLU(num_parameters=num_feat)])
+        for _ in range(num_conv):
+            self.body.append(nn.Conv2d(num_feat, num_feat, 3, 1, 1))
+            self.body.append(nn.PReLU(num_parameters=num_feat))
+        self.body.append(nn.Conv2d(num_feat, num_out_ch * upscale * upscale, 3, 1, 1))
+        self.upsampler = nn.PixelShuffle(upscale)
+
+    def forward(self, x):
+        out = x
+        for layer in self.body:
+            out = layer(out)
+        return self.upsampler(out) + F.interpolate(x, scale_factor=self.upscale, mode='nearest')
+
+
+# name -> (network factory, native scale, weights URL, working bytes per output pixel)
+MODELS: Dict[str, Tuple[Callable[[], nn.Module], int, str, int]] = {
+    'RealESRGAN_x4plus': (lambda: RRDBNet(num_block=23, scale=4), 4,
+                          f"{_RELEASES}/v0.1.0/RealESRGAN_x4plus.pth", 1024),
+    'RealESRGAN_x2plus': (lambda: RRDBNet(num_block=23, scale=2), 2,
+                          f"{_RELEASES}/v0.2.1/RealESRGAN_x2plus.pth", 1024),
+    'RealESRGAN_x4plus_anime_6B': (lambda: RRDBNet(num_block=6, scale=4), 4,
+                                   f"{_RELEASES}/v0.2.2.4/RealESRGAN_x4plus_anime_6B.pth", 1024),
+    'realesr-general-x4v3': (lambda: SRVGGNetCompact(num_conv=32, upscale=4), 4,
+                             f"{_RELEASES}/v0.2.5.0/realesr-general-x4v3.pth", 128),
+    'realesr-animevideov3': (lambda: SRVGGNetCompact(num_conv=16, upscale=4), 4,
+                             f"{_RELEASES}/v0.2.5.0/realesr-animevideov3.pth", 128),
+}
+
+# TextureUpscaler model names -> networks
+MODEL_ALIASES = {
+    'realesrgan': 'RealESRGAN_x4plus',
+    'esrgan': 'RealESRGAN_x4plus',
+    'realesrgan-anime': 'RealESRGAN_x4plus_anime_6B',
+    'realesr-general': 'realesr-general-x4v3',
+}
+
+# Loaded networks of this process: (name, weights, quantized) -> module
+_NETWORKS: Dict[Tuple[str, Optional[str], bool], nn.Module] = {}
+
+
+def load_network(name: str, weights: Optional[str] = None, weights_dir: str = DEFAULT_WEIGHTS_DIR,
+                 random_init: bool = False) -> nn.Module:
+    """
+    Build a network and load its weights (downloaded on first use)
+
+    Args:
+        name: A MODELS key or MODEL_ALIASES name
+        weights: Local .pth file (default: the release weights, cached in weights_dir)
+        random_init: Skip loading weights (for throughput measurements only)
+    """
+    name = MODEL_ALIASES.get(name, name)
+    if name not in MODELS:
+        raise ValueError(f"Unknown super-resolution model '{name}' (expected one of {', '.join(MODELS)})")
+    factory, _, url, _ = MODELS[name]
+    network = factory()
+    if not random_init:
+        if weights:
+            state = torch.load(weights, map_location='cpu', weights_only=True)
+        else:
+            state = torch.hub.load_state_dict_from_url(url, model_dir=weights_dir, map_location='cpu',
+                                                       progress=False)
+        # Release checkpoints keep the EMA generator under 'params_ema'
+        for key in ('params_ema', 'params'):
+            if key in state:
+                state = state[key]
+                break
+        network.load_state_dict(state, strict=True)
+    return network.eval()
+
+
+def quantize_network(network: nn.Module, calibration: torch.Tensor) -> nn.Module:
+    """Static int8 quantization (FX graph mode), calibrated on a batch of real tiles"""
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    # The quantized leaky_relu has no in-place kernel and warns on every call
+    for module in network.modules():
+        if isinstance(module, nn.LeakyReLU):
+            module.inplace = False
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        prepared = prepare_fx(network, get_default_qconfig_mapping(torch.backends.quantized.engine),
+                              (calibration,))
+        with torch.inference_mode():
+            prepared(calibration)
+        return convert_fx(prepared)
+
+
+class ESRGANBackend:
+    """
+    Batched tile upscaler over one Real-ESRGAN network
+
+    Tiles are padded (edge replication) to a common shape and run through
+    the network batch_size at a time. Colour goes through the network;
+    alpha is resized with Lanczos, as Real-ESRGAN does by default. Output
+    at scales other than the network's own is resampled with Lanczos. With
+    quantize=True the network is converted to int8 on the first batch,
+    using that batch for calibration.
+    """
+
+    def __init__(self, name: str = 'realesr-general-x4v3', weights: Optional[str] = None, quantize: bool = False,
+                 batch_size: int = 8, threads: Optional[int] = None, random_init: bool = False):
+        self.name = MODEL_ALIASES.get(name, name)
+        if self.name not in MODELS:
+            raise ValueError(f"Unknown super-resolution model '{name}' (expected one of {', '.join(MODELS)})")
+        self.weights = weights
+        self.quantize = quantize
+        self.batch_size = batch_size
+        self.random_init = random_init
+        _, self.native_scale, _, self.bytes_per_pixel = MODELS[self.name]
+        # Pixel-unshuffle models need input sizes divisible by their fold factor
+        self.multiple = 4 // self.native_scale
+        if threads:
+            torch.set_num_threads(threads)
+
+    def _network(self, calibration: torch.Tensor) -> nn.Module:
+        key = (self.name, '<random>' if self.random_init else self.weights, self.quantize)
+        network = _NETWORKS.get(key)
+        if network is None:
+            network = load_network(self.name, self.weights, random_init=self.random_init)
+            if self.quantize:
+                network = quantize_network(network, calibration)
+            network = _NETWORKS[key] = network
+        return network
+
+    def _run(self, tiles: List[np.ndarray]) -> np.ndarray:
+        """(n, H * native, W * native, 3) float32 in [0, 1] for RGB uint8 tiles padded to a common shape"""
+        height = max(tile.shape[0] for tile in tiles)
+        width = max(tile.shape[1] for tile in tiles)
+        height += -height % self.multiple
+        width += -width % self.multiple
+        batch = np.stack([np.pad(tile, ((0, height - tile.shape[0]), (0, width - tile.shape[1]), (0, 0)), mode='edge')
+                          for tile in tiles])
+        x = torch.from_numpy(batch).permute(0, 3, 1, 2).float().div_(255)
+        with torch.inference_mode():
+            y = self._network(x)(x).clamp_(0, 1)
+        return y.permute(0, 2, 3, 1).numpy()
+
+    def upscale_batch(self, tiles: List[np.ndarray], scale: int) -> List[np.ndarray]:
+        """Upscale (h, w, channels) uint8 tiles; returns (h * scale, w * scale, channels) uint8 arrays"""
+        outputs = []
+        for start in range(0, len(tiles), self.batch_size):
+            chunk = tiles[start:start + self.batch_size]
+            rgb = [np.repeat(tile[:, :, :1], 3, axis=2) if tile.shape[2] < 3 else tile[:, :, :3] for tile in chunk]
+            result = self._run(rgb)
+            for tile, upscaled in zip(chunk, result):
+                height, width, channels = tile.shape
+                native = np.rint(upscaled[:height * self.native_scale, :width * self.native_scale] * 255).astype(np.uint8)
+                size = (width * scale, height * scale)
+                if scale != self.native_scale:
+                    native = np.asarray(Image.fromarray(native).resize(size, Image.Resampling.LANCZOS))
+                color = native if channels >= 3 else native.mean(axis=2, keepdims=True).astype(np.uint8)
+                if channels in (2, 4):
+                    alpha = Image.fromarray(tile[:, :, -1]).resize(size, Image.Resampling.LANCZOS)
+                    color = np.concatenate([color, np.asarray(alpha)[:, :, None]], axis=2)
+                outputs.append(color)
+        return outputs
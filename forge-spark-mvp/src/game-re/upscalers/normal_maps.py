@@ -0,0 +1,157 @@
+"""
+Normal Map Generation
+Derives a height estimate from a texture's luminance and packs its
+Sobel/Scharr gradients into a tangent-space normal map, row strip by row strip
+"""
+
+from typing import Callable, Literal, Optional, Tuple
+
+import numpy as np
+
+# Rec. 709 luma weights
+LUMA = np.array([0.2126, 0.7152, 0.0722], np.float32)
+
+# Kernel -> (outer, centre) smoothing weights of the separable 3x3 derivative
+KERNELS = {'sobel': (1.0, 2.0), 'scharr': (3.0, 10.0)}
+
+# Rows of input processed per step by generate_normal_map()
+STRIP_ROWS = 64
+
+RowSink = Callable[[np.ndarray], None]
+
+
+def luminance(rows: np.ndarray) -> np.ndarray:
+    """(rows, width) float32 height in [0, 1] from (rows, width, channels) uint8; alpha is ignored"""
+    if rows.shape[2] < 3:
+        return rows[:, :, 0] * np.float32(1 / 255)
+    return rows[:, :, :3] @ (LUMA / 255)
+
+
+def gradients(extended: np.ndarray, kernel: str = 'sobel') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (dh/dx, dh/dy) of the inner rows of a height strip, in height units per pixel
+
+    Args:
+        extended: (rows + 2, width) float32 heights, with one row of context
+            above and below
+        kernel: 'sobel' or 'scharr'
+    """
+    outer, centre = KERNELS[kernel]
+    norm = np.float32(1 / (2 * (2 * outer + centre)))
+    padded = np.pad(extended, ((0, 0), (1, 1)), mode='edge')
+
+    # d/dx: smooth down the columns, then central difference along the rows
+    smooth = padded[1:-1] * np.float32(centre)
+    smooth += (padded[:-2] + padded[2:]) * np.float32(outer)
+    dx = (smooth[:, 2:] - smooth[:, :-2]) * norm
+    # d/dy: central difference down the columns, then smooth along the rows
+    diff = padded[2:] - padded[:-2]
+    dy = diff[:, 1:-1] * np.float32(centre)
+    dy += (diff[:, :-2] + diff[:, 2:]) * np.float32(outer)
+    dy *= norm
+    return dx, dy
+
+
+def encode_normals(dx: np.ndarray, dy: np.ndarray, strength: float, directx: bool = False) -> np.ndarray:
+    """
+    Tangent-space normals of a height field's gradients
+
+    Args:
+        dx, dy: (rows, width) height gradients, see gradients()
+        strength: Height units per pixel of slope; larger is bumpier
+        directx: Green points down (DirectX) instead of up (OpenGL)
+
+    Returns:
+        (rows, width, 3) uint8 normals packed as (n + 1) / 2 * 255
+    """
+    dx = dx * np.float32(strength)
+    dy = dy * np.float32(strength)
+    # n = (-dh/dx, dh/dy, 1) normalized; image y runs down, so OpenGL's +y is -dy
+    inverse = 127.5 / np.sqrt(dx * dx + dy * dy + 1)
+    normals = np.empty(dx.shape + (3,), np.uint8)
+    normals[:, :, 0] = 127.5 - dx * inverse + 0.5
+    normals[:, :, 1] = (127.5 - dy * inverse if directx else 127.5 + dy * inverse) + 0.5
+    normals[:, :, 2] = 127.5 + inverse + 0.5
+    return normals
+
+
+def pack_normals(extended: np.ndarray, strength: float, kernel: str = 'sobel', directx: bool = False) -> np.ndarray:
+    """(rows, width, 3) uint8 normals of the inner rows of a (rows + 2, width) height strip"""
+    dx, dy = gradients(extended, kernel)
+    return encode_normals(dx, dy, strength, directx)
+
+
+class NormalMapGenerator:
+    """
+    Streaming normal (and height) map generator
+
+    Takes consecutive row bands of a texture through write_rows(), as
+    upscale_tiled() emits them, and passes finished normal rows on. Each
+    output row needs the rows above and below it, so the last row of a
+    band is held back until the next band (or close()) arrives; only that
+    row and the one above it are kept between bands.
+    """
+
+    def __init__(self, write_normals: RowSink, write_heights: Optional[RowSink] = None, strength: float = 8.0,
+                 kernel: Literal['sobel', 'scharr'] = 'sobel', directx: bool = False):
+        if kernel not in KERNELS:
+            raise ValueError(f"Unknown kernel '{kernel}' (expected one of {', '.join(KERNELS)})")
+        self.write_normals = write_normals
+        self.write_heights = write_heights
+        self.strength = strength
+        self.kernel = kernel
+        self.directx = directx
+        self._above: Optional[np.ndarray] = None  # height row above _pending
+        self._pending: Optional[np.ndarray] = None  # last height row, not yet emitted
+
+    def write_rows(self, rows: np.ndarray):
+        """Consume (rows, width, channels) uint8 texture rows"""
+        heights = luminance(rows)
+        if self.write_heights:
+            self.write_heights((heights * 255 + 0.5).astype(np.uint8)[:, :, None])
+        block = heights if self._pending is None else np.concatenate([self._pending, heights])
+        if len(block) > 1:
+            above = block[:1] if self._above is None else self._above
+            self.write_normals(pack_normals(np.concatenate([above, block]), self.strength, self.kernel,
+                                            self.directx))
+            self._above = block[-2:-1]
+        self._pending = block[-1:]
+
+    def close(self):
+        """Emit the held-back last row (edge-clamped below)"""
+        if self._pending is None:
+            return
+        above = self._pending if self._above is None else self._above
+        self.write_normals(pack_normals(np.concatenate([above, self._pending, self._pending]), self.strength,
+                                        self.kernel, self.directx))
+        self._above = self._pending = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+
+def generate_normal_map(image: np.ndarray, write_normals: RowSink, write_heights: Optional[RowSink] = None,
+                        strength: float = 8.0, kernel: Literal['sobel', 'scharr'] = 'sobel',
+                        directx: bool = False, strip_rows: int = STRIP_ROWS):
+    """
+    Normal map of a whole (height, width, channels) uint8 image, in strips
+
+    Working memory is a few float32 copies of one strip_rows-row strip,
+    whatever the image size.
+
+    Args:
+        image: Source texture
+        write_normals: Receives consecutive (rows, width, 3) uint8 normal bands
+        write_heights: Receives consecutive (rows, width, 1) uint8 height bands
+        strength: See encode_normals
+        kernel: 'sobel' or 'scharr'
+        directx: See encode_normals
+        strip_rows: Rows processed per step
+    """
+    with NormalMapGenerator(write_normals, write_heights, strength, kernel, directx) as generator:
+        for start in range(0, image.shape[0], strip_rows):
+            generator.write_rows(image[start:start + strip_rows])
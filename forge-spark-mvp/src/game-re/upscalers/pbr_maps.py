@@ -0,0 +1,205 @@
+"""
+PBR Map Derivation
+Estimates albedo, normal, roughness, metallic and specular maps from a single
+diffuse texture, sharing luminance, blur pyramids and gradients between maps
+"""
+
+from functools import cached_property
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .normal_maps import encode_normals, gradients, luminance
+
+# Maps derived, in the order they are computed (cheapest intermediates first)
+PBR_MAPS = ('normal', 'roughness', 'metallic', 'specular', 'diffuse')
+
+# Pyramid level (2**level pixels) for local statistics and for the shading removed from albedo
+DETAIL_LEVEL = 2
+SHADING_LEVEL = 5
+
+# Dielectric reflectance at normal incidence
+DIELECTRIC_F0 = 0.04
+
+
+def _half(image: np.ndarray) -> np.ndarray:
+    """2x2 box-filtered half-size float32 array; an odd last row/column is averaged in by edge clamping"""
+    if image.shape[0] > 1:
+        if image.shape[0] % 2:
+            image = np.concatenate([image, image[-1:]])
+        image = (image[0::2] + image[1::2]) * np.float32(0.5)
+    if image.shape[1] > 1:
+        if image.shape[1] % 2:
+            image = np.concatenate([image, image[:, -1:]], axis=1)
+        image = (image[:, 0::2] + image[:, 1::2]) * np.float32(0.5)
+    return image
+
+
+def _upsample_axis(image: np.ndarray, size: int, axis: int) -> np.ndarray:
+    """Linear interpolation of one axis to `size` samples, pixel centres aligned"""
+    length = image.shape[axis]
+    if length == size:
+        return image
+    position = np.clip((np.arange(size, dtype=np.float32) + 0.5) * (length / size) - 0.5, 0, length - 1)
+    low = position.astype(np.int64)
+    high = np.minimum(low + 1, length - 1)
+    weight = (position - low).astype(np.float32).reshape((-1,) + (1,) * (image.ndim - axis - 1))
+    a, b = np.take(image, low, axis=axis), np.take(image, high, axis=axis)
+    return a + (b - a) * weight
+
+
+def _smoothstep(edge0: float, edge1: float, x: np.ndarray) -> np.ndarray:
+    t = np.clip((x - edge0) / (edge1 - edge0), 0, 1)
+    return t * t * (3 - 2 * t)
+
+
+def _to_uint8(values: np.ndarray) -> np.ndarray:
+    """[0, 1] float -> uint8 with a trailing channel axis for grey maps"""
+    out = (np.clip(values, 0, 1) * 255 + 0.5).astype(np.uint8)
+    return out[:, :, None] if out.ndim == 2 else out
+
+
+class PBRDerivation:
+    """
+    Heuristic PBR maps of one diffuse texture
+
+    Every intermediate (luminance, saturation, the luminance and squared
+    luminance pyramids, Sobel gradients, local contrast) is a cached
+    property computed on first use, so each is built once however many
+    maps need it. Maps are (height, width, channels) uint8.
+    """
+
+    def __init__(self, image: np.ndarray, strength: float = 8.0, directx: bool = False):
+        """
+        Args:
+            image: (height, width, channels) uint8 diffuse texture
+            strength: Normal map bumpiness; see normal_maps.encode_normals
+            directx: DirectX (green down) instead of OpenGL normals
+        """
+        self.image = image
+        self.strength = strength
+        self.directx = directx
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.image.shape[:2]
+
+    # Shared intermediates
+
+    @cached_property
+    def luminance(self) -> np.ndarray:
+        """(height, width) float32 in [0, 1]; doubles as the height estimate"""
+        return luminance(self.image)
+
+    @cached_property
+    def rgb(self) -> np.ndarray:
+        """(height, width, 3) float32 in [0, 1]"""
+        channels = self.image[:, :, :3] if self.image.shape[2] >= 3 else self.image[:, :, :1].repeat(3, axis=2)
+        return channels * np.float32(1 / 255)
+
+    @cached_property
+    def saturation(self) -> np.ndarray:
+        """HSV saturation, (max - min) / max"""
+        high = self.rgb.max(axis=2)
+        return (high - self.rgb.min(axis=2)) / np.maximum(high, np.float32(1e-4))
+
+    @cached_property
+    def pyramid(self) -> List[np.ndarray]:
+        """Luminance halved SHADING_LEVEL times; level 0 is full size"""
+        levels = [self.luminance]
+        for _ in range(SHADING_LEVEL):
+            levels.append(_half(levels[-1]))
+        return levels
+
+    @cached_property
+    def squared_pyramid(self) -> List[np.ndarray]:
+        """Squared luminance halved DETAIL_LEVEL times, for local variance"""
+        levels = [self.luminance * self.luminance]
+        for _ in range(DETAIL_LEVEL):
+            levels.append(_half(levels[-1]))
+        return levels
+
+    def blurred(self, level: int, pyramid: str = 'pyramid') -> np.ndarray:
+        """A pyramid level interpolated back to full size: a blur of about 2**level pixels"""
+        levels = getattr(self, pyramid)
+        height, width = self.shape
+        return _upsample_axis(_upsample_axis(levels[level], height, 0), width, 1)
+
+    @cached_property
+    def local_mean(self) -> np.ndarray:
+        return self.blurred(DETAIL_LEVEL)
+
+    @cached_property
+    def local_contrast(self) -> np.ndarray:
+        """Standard deviation of luminance over about 2**DETAIL_LEVEL pixels"""
+        variance = self.blurred(DETAIL_LEVEL, 'squared_pyramid') - self.local_mean ** 2
+        return np.sqrt(np.maximum(variance, 0))
+
+    @cached_property
+    def shading(self) -> np.ndarray:
+        """Low-frequency lighting baked into the diffuse, relative to the mean"""
+        shading = self.blurred(SHADING_LEVEL)
+        return shading / max(float(shading.mean()), 1e-4)
+
+    @cached_property
+    def gradients(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Sobel (dh/dx, dh/dy) of the luminance height"""
+        return gradients(np.pad(self.luminance, ((1, 1), (0, 0)), mode='edge'))
+
+    @cached_property
+    def slope(self) -> np.ndarray:
+        dx, dy = self.gradients
+        return np.sqrt(dx * dx + dy * dy)
+
+    @cached_property
+    def metallic_mask(self) -> np.ndarray:
+        """Bright, unsaturated and locally smooth regions read as bare metal"""
+        bright = _smoothstep(0.45, 0.8, self.local_mean)
+        grey = 1 - _smoothstep(0.12, 0.3, self.saturation)
+        smooth = 1 - _smoothstep(0.04, 0.12, self.local_contrast)
+        return bright * grey * smooth
+
+    @cached_property
+    def roughness_value(self) -> np.ndarray:
+        """Darker (cavities) and busier (high contrast, steep) areas are rougher"""
+        roughness = 0.35 + 0.4 * (1 - self.local_mean) + 2.5 * self.local_contrast + 4.0 * self.slope
+        return np.clip(roughness - 0.3 * self.metallic_mask, 0.05, 1)
+
+    # Maps
+
+    def normal(self) -> np.ndarray:
+        dx, dy = self.gradients
+        return encode_normals(dx, dy, self.strength, self.directx)
+
+    def roughness(self) -> np.ndarray:
+        return _to_uint8(self.roughness_value)
+
+    def metallic(self) -> np.ndarray:
+        return _to_uint8(self.metallic_mask)
+
+    def specular(self) -> np.ndarray:
+        """
+        Reflectance at normal incidence, F0 = lerp(0.04, albedo, metallic)
+
+        Scaled so dielectric F0 is 0.5 (the usual specular map convention)
+        and darkened in rough cavities.
+        """
+        metallic = self.metallic_mask
+        f0 = DIELECTRIC_F0 + (self.luminance - DIELECTRIC_F0) * metallic
+        return _to_uint8(f0 * np.float32(0.5 / DIELECTRIC_F0) * (1 - 0.5 * self.roughness_value))
+
+    def diffuse(self) -> np.ndarray:
+        """Albedo: half of the baked low-frequency shading divided out; alpha is kept"""
+        albedo = self.rgb / np.sqrt(np.maximum(self.shading, 0.25))[:, :, None]
+        out = _to_uint8(albedo)
+        if self.image.shape[2] in (2, 4):
+            out = np.concatenate([out, self.image[:, :, -1:]], axis=2)
+        return out
+
+    def derive(self, name: str) -> np.ndarray:
+        if name not in PBR_MAPS:
+            raise ValueError(f"Unknown PBR map '{name}' (expected one of {', '.join(PBR_MAPS)})")
+        return getattr(self, name)()
+
+    def derive_all(self) -> Dict[str, np.ndarray]:
+        return {name: self.derive(name) for name in PBR_MAPS}
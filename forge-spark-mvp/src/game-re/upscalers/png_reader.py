@@ -0,0 +1,195 @@
+"""
+Streaming PNG Reader
+Decodes an 8-bit PNG row band by row band, so an image never has to be held
+in memory whole
+"""
+
+import struct
+import zlib
+from typing import Iterator, Optional
+
+import numpy as np
+
+from .png_writer import COLOR_TYPES, PNG_SIGNATURE
+
+# PNG color type -> channels (palette images are expanded to RGB/RGBA)
+CHANNELS = {color_type: channels for channels, color_type in COLOR_TYPES.items()}
+_PALETTE = 3
+
+# Compressed bytes read from the file per step
+READ_BYTES = 256 * 1024
+
+_FILTER_NONE, _FILTER_SUB, _FILTER_UP, _FILTER_AVERAGE, _FILTER_PAETH = range(5)
+
+
+class SlowFilterError(ValueError):
+    """Rows use the Average or Paeth filter, and the reader was asked not to decode them"""
+
+
+def _unfilter_row(kind: int, row: np.ndarray, above: np.ndarray, bpp: int) -> np.ndarray:
+    """Average/Paeth rows: each pixel depends on the decoded one to its left, so these go pixel by pixel"""
+    out = np.zeros(len(row) + bpp, np.int32)
+    up = np.concatenate([np.zeros(bpp, np.int32), above.astype(np.int32)])
+    raw = row.astype(np.int32)
+    for x in range(bpp, len(out), bpp):
+        a, b = out[x - bpp:x], up[x:x + bpp]
+        if kind == _FILTER_AVERAGE:
+            predictor = (a + b) >> 1
+        else:
+            c = up[x - bpp:x]
+            p = a + b - c
+            pa, pb, pc = np.abs(p - a), np.abs(p - b), np.abs(p - c)
+            predictor = np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+        out[x:x + bpp] = (raw[x - bpp:x] + predictor) & 255
+    return out[bpp:].astype(np.uint8)
+
+
+class PNGStreamReader:
+    """
+    Incremental PNG decoder for 8-bit, non-interlaced images
+
+    IDAT data is inflated only as far as the rows asked for. Runs of rows
+    with the None, Sub or Up filter are undone with vectorized cumulative
+    sums (Up down the columns, Sub along the row); Average and Paeth rows
+    need a per-pixel pass and are much slower, so this suits the Up-filtered
+    output of PNGStreamWriter best. With slow_filters=False, read_rows()
+    raises SlowFilterError instead of decoding such rows, leaving the
+    reader where it was, so the caller can switch to a whole-image decoder.
+    """
+
+    def __init__(self, path: str, slow_filters: bool = True):
+        self.path = path
+        self.slow_filters = slow_filters
+        self.width = 0
+        self.height = 0
+        self.channels = 0
+        self.rows_read = 0
+        self._file = None
+        self._inflater = None
+        self._buffer = bytearray()
+        self._chunk_left = 0
+        self._previous: Optional[np.ndarray] = None
+        self._palette: Optional[np.ndarray] = None
+
+    def open(self) -> "PNGStreamReader":
+        self._file = open(self.path, 'rb')
+        if self._file.read(8) != PNG_SIGNATURE:
+            raise ValueError(f"{self.path} is not a PNG file")
+        kind, data = self._read_chunk()
+        if kind != b'IHDR':
+            raise ValueError(f"{self.path}: IHDR missing")
+        self.width, self.height, depth, color_type, _, _, interlace = struct.unpack('>IIBBBBB', data)
+        if depth != 8 or interlace or (color_type not in CHANNELS and color_type != _PALETTE):
+            raise ValueError(f"{self.path}: only 8-bit non-interlaced PNGs can be streamed "
+                             f"(depth {depth}, color type {color_type}, interlace {interlace})")
+        self.channels = CHANNELS.get(color_type, 1)
+        transparency = None
+        # Chunks up to the first IDAT; palettes are expanded on output
+        while True:
+            length, kind = struct.unpack('>I4s', self._file.read(8))
+            if kind == b'IDAT':
+                self._chunk_left = length
+                break
+            data = self._file.read(length)
+            self._file.read(4)
+            if kind == b'PLTE':
+                self._palette = np.frombuffer(data, np.uint8).reshape(-1, 3)
+            elif kind == b'tRNS' and color_type == _PALETTE:
+                transparency = np.frombuffer(data, np.uint8)
+            elif kind == b'IEND':
+                raise ValueError(f"{self.path}: no image data")
+        if color_type == _PALETTE:
+            if transparency is not None:
+                alpha = np.full(len(self._palette), 255, np.uint8)
+                alpha[:len(transparency)] = transparency[:len(alpha)]
+                self._palette = np.column_stack([self._palette, alpha])
+        self._inflater = zlib.decompressobj()
+        self._previous = np.zeros(self.width * self.channels, np.uint8)
+        return self
+
+    @property
+    def output_channels(self) -> int:
+        return self._palette.shape[1] if self._palette is not None else self.channels
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _read_chunk(self):
+        length, kind = struct.unpack('>I4s', self._file.read(8))
+        data = self._file.read(length)
+        self._file.read(4)
+        return kind, data
+
+    def _compressed(self) -> bytes:
+        """Next piece of the IDAT stream, or b'' at its end"""
+        while not self._chunk_left:
+            self._file.read(4)  # CRC of the previous IDAT
+            header = self._file.read(8)
+            if len(header) < 8:
+                return b''
+            length, kind = struct.unpack('>I4s', header)
+            if kind != b'IDAT':
+                return b''
+            self._chunk_left = length
+        data = self._file.read(min(self._chunk_left, READ_BYTES))
+        self._chunk_left -= len(data)
+        return data
+
+    def read_rows(self, count: int) -> np.ndarray:
+        """Next (up to) count rows as (rows, width, channels) uint8; empty once all are read"""
+        count = min(count, self.height - self.rows_read)
+        stride = self.width * self.channels
+        needed = count * (stride + 1)
+        while len(self._buffer) < needed:
+            data = self._inflater.unconsumed_tail or self._compressed()
+            if not data:
+                raise ValueError(f"{self.path}: truncated after {self.rows_read} rows")
+            self._buffer += self._inflater.decompress(data, needed - len(self._buffer) + READ_BYTES)
+        filtered = np.frombuffer(bytes(self._buffer[:needed]), np.uint8).reshape(count, stride + 1)
+        if not self.slow_filters and np.isin(filtered[:, 0], (_FILTER_AVERAGE, _FILTER_PAETH)).any():
+            raise SlowFilterError(f"{self.path}: Average/Paeth rows after row {self.rows_read}")
+        del self._buffer[:needed]
+
+        rows = np.empty((count, stride), np.uint8)
+        kinds = filtered[:, 0]
+        start = 0
+        while start < count:
+            # A run of rows sharing one filter
+            end = start + 1
+            while end < count and kinds[end] == kinds[start]:
+                end += 1
+            kind, data = kinds[start], filtered[start:end, 1:]
+            above = self._previous if start == 0 else rows[start - 1]
+            if kind == _FILTER_NONE:
+                rows[start:end] = data
+            elif kind == _FILTER_SUB:
+                pixels = data.reshape(end - start, self.width, self.channels)
+                rows[start:end] = np.cumsum(pixels, axis=1, dtype=np.uint8).reshape(end - start, stride)
+            elif kind == _FILTER_UP:
+                rows[start:end] = np.cumsum(data, axis=0, dtype=np.uint8) + above
+            elif kind in (_FILTER_AVERAGE, _FILTER_PAETH):
+                for y in range(start, end):
+                    rows[y] = _unfilter_row(kind, filtered[y, 1:], self._previous if y == 0 else rows[y - 1],
+                                            self.channels)
+            else:
+                raise ValueError(f"{self.path}: bad filter type {kind}")
+            start = end
+        if count:
+            self._previous = rows[-1].copy()
+        self.rows_read += count
+
+        rows = rows.reshape(count, self.width, self.channels)
+        return self._palette[rows[:, :, 0]] if self._palette is not None else rows
+
+    def iter_rows(self, count: int) -> Iterator[np.ndarray]:
+        """Consecutive bands of up to count rows"""
+        while self.rows_read < self.height:
+            yield self.read_rows(count)
@@ -0,0 +1,101 @@
+"""
+Streaming PNG Writer
+Writes an 8-bit PNG row band by row band, so an image never has to be held
+in memory whole
+"""
+
+import struct
+import zlib
+from typing import Optional
+
+import numpy as np
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Channels -> PNG color type (grey, grey + alpha, RGB, RGBA)
+COLOR_TYPES = {1: 0, 2: 4, 3: 2, 4: 6}
+
+# Compressed bytes buffered before an IDAT chunk is written
+IDAT_BYTES = 1024 * 1024
+
+_FILTER_UP = 2
+
+
+class PNGStreamWriter:
+    """
+    Incremental PNG encoder
+
+    Rows are filtered with PNG's 'Up' predictor (a vectorized difference
+    against the previous row) and fed through one zlib stream; compressed
+    output goes to disk in IDAT chunks as it accumulates.
+    """
+
+    def __init__(self, output_path: str, width: int, height: int, channels: int, level: int = 6):
+        if channels not in COLOR_TYPES:
+            raise ValueError(f"PNG needs 1-4 channels, got {channels}")
+        self.output_path = output_path
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.level = level
+        self.rows_written = 0
+        self._file = None
+        self._compressor = None
+        self._pending = bytearray()
+        self._previous: Optional[np.ndarray] = None
+
+    def open(self):
+        self._file = open(self.output_path, 'wb')
+        self._file.write(PNG_SIGNATURE)
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', self.width, self.height, 8,
+                                         COLOR_TYPES[self.channels], 0, 0, 0))
+        self._compressor = zlib.compressobj(self.level)
+        self._previous = np.zeros((1, self.width * self.channels), np.uint8)
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self._file:
+            self._file.close()
+            self._file = None
+
+    def _chunk(self, kind: bytes, data: bytes):
+        self._file.write(struct.pack('>I', len(data)))
+        self._file.write(kind)
+        self._file.write(data)
+        self._file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(kind))))
+
+    def _flush_idat(self, force: bool = False):
+        while len(self._pending) >= IDAT_BYTES or (force and self._pending):
+            self._chunk(b'IDAT', bytes(self._pending[:IDAT_BYTES]))
+            del self._pending[:IDAT_BYTES]
+
+    def write_rows(self, rows: np.ndarray):
+        """Append rows, shaped (n, width, channels) or (n, width) for one channel, as uint8"""
+        if not len(rows):
+            return
+        rows = np.ascontiguousarray(rows, np.uint8).reshape(len(rows), self.width * self.channels)
+        if self.rows_written + len(rows) > self.height:
+            raise ValueError(f"Too many rows for a {self.height}-row PNG")
+        # Up filter: each row minus the one above it (mod 256)
+        above = np.concatenate([self._previous, rows[:-1]])
+        filtered = np.empty((len(rows), rows.shape[1] + 1), np.uint8)
+        filtered[:, 0] = _FILTER_UP
+        np.subtract(rows, above, out=filtered[:, 1:])
+        self._previous = rows[-1:].copy()
+        self._pending += self._compressor.compress(filtered.tobytes())
+        self._flush_idat()
+        self.rows_written += len(rows)
+
+    def close(self):
+        if self.rows_written != self.height:
+            raise ValueError(f"PNG closed after {self.rows_written} of {self.height} rows")
+        self._pending += self._compressor.flush()
+        self._flush_idat(force=True)
+        self._chunk(b'IEND', b'')
+        self._file.close()
+        self._file = None
@@ -0,0 +1,142 @@
+"""
+Upscale Quality Metrics
+PSNR and SSIM accumulated strip by strip, and area reduction of an upscaled
+image back to its source resolution, without holding full images
+"""
+
+import math
+from typing import Dict, Optional
+
+import numpy as np
+
+# SSIM: uniform window edge and the stabilizing constants of Wang et al. (2004)
+SSIM_WINDOW = 7
+SSIM_K1 = 0.01
+SSIM_K2 = 0.03
+
+
+def _window_sums(values: np.ndarray, window: int) -> np.ndarray:
+    """Sums over every full window x window patch of (rows, width, channels) values"""
+    total = np.cumsum(values, axis=0, dtype=np.float64)
+    rows = total[window - 1:].copy()
+    rows[1:] -= total[:-window]
+    total = np.cumsum(rows, axis=1)
+    sums = total[:, window - 1:].copy()
+    sums[:, 1:] -= total[:, :-window]
+    return sums
+
+
+def _channels(rows: np.ndarray) -> np.ndarray:
+    """Colour channels only: a trailing alpha (2 or 4 channels) is not compared"""
+    return rows[:, :, :-1] if rows.shape[2] in (2, 4) else rows
+
+
+class QualityMetrics:
+    """
+    Streaming PSNR and SSIM of two images of the same size
+
+    Pass aligned row strips of both through update(). Squared error is
+    summed directly; SSIM (uniform 7x7 window, per channel, averaged
+    over every window that fits inside the image, as scikit-image does)
+    needs the window's rows, so the last SSIM_WINDOW - 1 rows of each
+    strip are carried into the next.
+    """
+
+    def __init__(self, data_range: float = 255.0, window: int = SSIM_WINDOW):
+        self.data_range = data_range
+        self.window = window
+        self.squared_error = 0.0
+        self.samples = 0
+        self.ssim_sum = 0.0
+        self.ssim_windows = 0
+        self._carry: Optional[np.ndarray] = None  # (rows, width, 2, channels) float64 of both images
+
+    def update(self, rows: np.ndarray, reference: np.ndarray):
+        """Add aligned (rows, width, channels) strips of the image and its reference"""
+        if rows.shape != reference.shape:
+            raise ValueError(f"Strip shapes differ: {rows.shape} vs {reference.shape}")
+        pair = np.stack([_channels(rows), _channels(reference)], axis=2).astype(np.float64)
+        difference = pair[:, :, 0] - pair[:, :, 1]
+        self.squared_error += float(np.einsum('ijk,ijk->', difference, difference))
+        self.samples += difference.size
+
+        if self._carry is not None:
+            pair = np.concatenate([self._carry, pair])
+        if len(pair) >= self.window and pair.shape[1] >= self.window:
+            self._add_ssim(pair)
+        self._carry = pair[-(self.window - 1):] if self.window > 1 else None
+
+    def _add_ssim(self, pair: np.ndarray):
+        x, y = pair[:, :, 0], pair[:, :, 1]
+        count = self.window ** 2
+        mean_x = _window_sums(x, self.window) / count
+        mean_y = _window_sums(y, self.window) / count
+        # Sample covariance, as in the reference implementation
+        norm = count / (count - 1)
+        var_x = (_window_sums(x * x, self.window) / count - mean_x * mean_x) * norm
+        var_y = (_window_sums(y * y, self.window) / count - mean_y * mean_y) * norm
+        cov = (_window_sums(x * y, self.window) / count - mean_x * mean_y) * norm
+
+        c1 = (SSIM_K1 * self.data_range) ** 2
+        c2 = (SSIM_K2 * self.data_range) ** 2
+        ssim = ((2 * mean_x * mean_y + c1) * (2 * cov + c2)
+                / ((mean_x * mean_x + mean_y * mean_y + c1) * (var_x + var_y + c2)))
+        self.ssim_sum += float(ssim.sum())
+        self.ssim_windows += ssim.size
+
+    @property
+    def mse(self) -> float:
+        return self.squared_error / self.samples if self.samples else 0.0
+
+    @property
+    def psnr(self) -> float:
+        """Peak signal-to-noise ratio in dB (inf for identical images)"""
+        mse = self.mse
+        return math.inf if mse == 0 else 10 * math.log10(self.data_range ** 2 / mse)
+
+    @property
+    def ssim(self) -> float:
+        """Mean SSIM over all windows and channels (1.0 if the image is smaller than one window)"""
+        return self.ssim_sum / self.ssim_windows if self.ssim_windows else 1.0
+
+    def result(self) -> Dict[str, float]:
+        return {'psnr': round(self.psnr, 3), 'ssim': round(self.ssim, 5), 'mse': round(self.mse, 4)}
+
+
+class AreaReducer:
+    """
+    Averages a streamed large image down to a smaller size
+
+    Output pixel (i, j) is the mean of the input pixels whose centres
+    fall in its cell, i.e. input row y belongs to output row
+    y * out_height // height. Row sums are accumulated as strips arrive,
+    so only the (small) output is held.
+    """
+
+    def __init__(self, width: int, height: int, out_width: int, out_height: int, channels: int):
+        self.height = height
+        self.out_height = out_height
+        self.rows_seen = 0
+        # Input column -> output column, as reduceat boundaries
+        self._column_starts = np.searchsorted(np.arange(width) * out_width // width, np.arange(out_width))
+        self._column_counts = np.diff(np.append(self._column_starts, width))
+        # float32 sums of uint8 values stay exact up to 65793 pixels per cell
+        self._sums = np.zeros((out_height, out_width, channels), np.float32)
+        self._row_counts = np.zeros(out_height, np.int64)
+
+    def update(self, rows: np.ndarray):
+        """Add the next (rows, width, channels) strip"""
+        targets = (np.arange(self.rows_seen, self.rows_seen + len(rows)) * self.out_height) // self.height
+        # Targets are sorted: sum each run of rows, then each run of columns
+        outputs, starts, counts = np.unique(targets, return_index=True, return_counts=True)
+        reduced = np.add.reduceat(rows.astype(np.float32), starts, axis=0)
+        self._sums[outputs] += np.add.reduceat(reduced, self._column_starts, axis=1)
+        self._row_counts[outputs] += counts
+        self.rows_seen += len(rows)
+
+    def result(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """(rows, out_width, channels) float32 means of output rows [start, stop)"""
+        if self.rows_seen != self.height:
+            raise ValueError(f"Reduced {self.rows_seen} of {self.height} rows")
+        counts = self._row_counts[start:stop, None, None] * self._column_counts[None, :, None]
+        return self._sums[start:stop] / counts
@@ -3,11 +3,256 @@ AI Texture Upscaler
 Uses ESRGAN, Real-ESRGAN, and other AI models to upscale game textures
 """
 
+import fnmatch
+import hashlib
+import json
 import os
+import shutil
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from multiprocessing import Pool
 from PIL import Image
 import numpy as np
 from pathlib import Path
-from typing import Literal
+from typing import Callable, Dict, Iterator, List, Literal, Optional, Tuple
+
+from ..converters.blp import BLPTexture, blp_size, write_blp
+from ..converters.dds import DDSTexture, dds_size, write_dds_chain
+from ..converters.mipmaps import MipFilter, mip_chain
+from .atlas import ATLAS_FILL, ATLAS_PADDING, ATLAS_SIZE, compose, cut, fit_atlas_size, pack
+from .dedupe import fingerprint, near_duplicates
+from .normal_maps import NormalMapGenerator
+from .pbr_maps import PBR_MAPS, PBRDerivation
+from .png_reader import PNGStreamReader, SlowFilterError
+from .png_writer import PNGStreamWriter
+from .quality import AreaReducer, QualityMetrics
+from .tiling import upscale_tiled
+
+# Output format -> PIL format name (dds and blp are encoded natively)
+SAVE_FORMATS = {'png': 'PNG', 'jpg': 'JPEG'}
+
+OutputFormat = Literal['png', 'jpg', 'dds', 'blp']
+
+TEXTURE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.blp', '.tga', '.dds')
+
+# batch_upscale_directory() skip-unchanged manifest, kept in the output directory
+MANIFEST_NAME = '.upscale-manifest.json'
+MANIFEST_VERSION = 1
+
+# (relative path, size, mtime_ns)
+TextureEntry = Tuple[str, int, int]
+
+# Model name that skips the network and resamples with Lanczos
+LANCZOS = 'lanczos'
+
+# texture_strips() decodes PNGs with Average/Paeth rows whole (through PIL)
+# up to this size, instead of unfiltering them pixel by pixel
+WHOLE_DECODE_MB = 256
+
+
+def image_to_array(img: Image.Image) -> np.ndarray:
+    """(height, width, channels) uint8 array of an image, keeping alpha if it has any"""
+    if img.mode not in ('L', 'LA', 'RGB', 'RGBA'):
+        has_alpha = 'A' in img.getbands() or 'transparency' in img.info
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+    array = np.asarray(img, np.uint8)
+    return array[:, :, None] if array.ndim == 2 else array
+
+
+def walk_textures(root: str, pattern: str = "*.*", extensions: Tuple[str, ...] = TEXTURE_EXTENSIONS) -> List[TextureEntry]:
+    """Textures under root (one scandir walk); paths are relative to root"""
+    entries = []
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif (entry.name.lower().endswith(extensions) and fnmatch.fnmatch(entry.name, pattern)
+                          and entry.is_file(follow_symlinks=False)):
+                        st = entry.stat(follow_symlinks=False)
+                        entries.append((os.path.relpath(entry.path, root), st.st_size, st.st_mtime_ns))
+        except OSError as e:
+            print(f"Skipping {directory}: {e}", file=sys.stderr)
+    return entries
+
+
+def load_texture(path: str) -> np.ndarray:
+    """
+    (height, width, channels) uint8 array of a texture file
+
+    BLP and DDS are decoded natively (mip level 0), anything else through
+    PIL. A decoded alpha channel that is fully opaque is dropped.
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix in ('.blp', '.dds'):
+        with open(path, 'rb') as f:
+            data = f.read()
+        texture = BLPTexture.parse(data) if suffix == '.blp' else DDSTexture.parse(data)
+        image = texture.decode()
+        return image[:, :, :3] if (image[:, :, 3] == 255).all() else image
+    with Image.open(path) as img:
+        return image_to_array(img)
+
+
+def save_texture(image: np.ndarray, path: str, format: OutputFormat = 'png', compression: Optional[str] = None,
+                 mipmaps: bool = True, mip_filter: MipFilter = 'kaiser', srgb: bool = True,
+                 alpha_cutoff: Optional[float] = None):
+    """
+    Write a (height, width, channels) uint8 image
+
+    Args:
+        image: Pixels to write
+        path: Output file
+        format: 'png', 'jpg', 'dds' or 'blp'
+        compression: Block format for dds ('bc1', 'bc3', 'bc7', or 'rgba'
+            uncompressed; default bc7) or blp ('bc1', 'bc3'; default picked
+            from the alpha channel)
+        mipmaps: Store a full mip chain in dds/blp output
+        mip_filter: 'box' or 'kaiser' mip downsampling
+        srgb: Colour is sRGB, so mips are filtered in linear light (False
+            for normal and data maps)
+        alpha_cutoff: Alpha-test threshold of a cutout texture, whose alpha
+            coverage is then kept constant down the mip chain
+    """
+    if format in ('dds', 'blp'):
+        levels = mip_chain(image, filter=mip_filter, srgb=srgb, alpha_cutoff=alpha_cutoff) if mipmaps else [image]
+        if format == 'dds':
+            write_dds_chain(path, levels, compression or 'bc7')
+        else:
+            write_blp(path, image, compression, levels=levels)
+    elif format == 'png':
+        with PNGStreamWriter(path, image.shape[1], image.shape[0], image.shape[2]) as writer:
+            writer.write_rows(image)
+    elif format in SAVE_FORMATS:
+        if format == 'jpg' and image.shape[2] in (2, 4):
+            image = image[:, :, :-1]
+        Image.fromarray(image[:, :, 0] if image.shape[2] == 1 else image).save(path, format=SAVE_FORMATS[format])
+    else:
+        raise ValueError(f"Unknown output format '{format}'")
+
+
+def texture_strips(path: str, rows: int) -> Iterator[np.ndarray]:
+    """
+    Consecutive (rows, width, channels) uint8 bands of a texture
+
+    PNGs are decoded incrementally (PNGStreamReader) while their rows use
+    the None, Sub or Up filters. Average and Paeth rows (as libpng and most
+    tools write) can only be unfiltered pixel by pixel in Python, so from
+    the first such strip the image is decoded whole through PIL when it is
+    at most WHOLE_DECODE_MB, and streamed slowly otherwise. Other formats
+    are loaded whole with load_texture() and sliced.
+    """
+    start = 0
+    if Path(path).suffix.lower() == '.png':
+        try:
+            reader = PNGStreamReader(path, slow_filters=False).open()
+        except ValueError:
+            reader = None  # 16-bit or interlaced: fall back to PIL
+        if reader is not None:
+            with reader:
+                try:
+                    yield from reader.iter_rows(rows)
+                    return
+                except SlowFilterError:
+                    start = reader.rows_read
+                    if reader.width * reader.height * reader.output_channels > WHOLE_DECODE_MB * 2**20:
+                        reader.slow_filters = True
+                        yield from reader.iter_rows(rows)
+                        return
+    image = load_texture(path)
+    for start in range(start, image.shape[0], rows):
+        yield image[start:start + rows]
+
+
+def to_rgb(rows: np.ndarray) -> np.ndarray:
+    """(rows, width, 3) uint8: grey replicated, alpha dropped"""
+    channels = rows.shape[2]
+    if channels >= 3:
+        return rows[:, :, :3]
+    return np.repeat(rows[:, :, :1], 3, axis=2)
+
+
+def texture_size(path: str) -> Optional[Tuple[int, int]]:
+    """(width, height) from the file header, or None if it cannot be read"""
+    try:
+        suffix = Path(path).suffix.lower()
+        if suffix in ('.blp', '.dds'):
+            with open(path, 'rb') as f:
+                header = f.read(128)
+            return tuple(blp_size(header) if suffix == '.blp' else dds_size(header))
+        with Image.open(path) as img:
+            return img.size
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def file_sha1(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _format_eta(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+class UpscaleManifest:
+    """
+    Input content hash and upscale parameters of every finished texture
+
+    A texture is skipped when its hash and parameters match and its output
+    still exists. Hashes are only recomputed when a file's size or mtime
+    changed since it was recorded.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[str, Dict] = {}
+
+    def load(self) -> "UpscaleManifest":
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                self.files = data['files']
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring upscale manifest {self.path}: {e}")
+        return self
+
+    def save(self):
+        """Write atomically, so an interrupted run keeps what it finished"""
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': self.files}, f)
+        os.replace(tmp, self.path)
+
+    def content_hash(self, input_dir: str, entry: TextureEntry) -> str:
+        relative, size, mtime_ns = entry
+        record = self.files.get(relative)
+        if record and record['size'] == size and record['mtime_ns'] == mtime_ns:
+            return record['sha1']
+        return file_sha1(os.path.join(input_dir, relative))
+
+    def is_current(self, relative: str, sha1: str, params: Dict, output_path: str) -> bool:
+        record = self.files.get(relative)
+        return (record is not None and record['sha1'] == sha1 and record['params'] == params
+                and os.path.exists(output_path))
+
+    def put(self, entry: TextureEntry, sha1: str, params: Dict):
+        relative, size, mtime_ns = entry
+        self.files[relative] = {'size': size, 'mtime_ns': mtime_ns, 'sha1': sha1, 'params': params}
 
 class TextureUpscaler:
     """
@@ -15,154 +260,669 @@ class TextureUpscaler:
     Converts old low-res textures to 4K/8K quality
     """
     
-    def __init__(self, model: str = "realesrgan"):
+    def __init__(self, model: str = "realesrgan", weights: Optional[str] = None, quantize: bool = False,
+                 batch_size: int = 8, threads: Optional[int] = None):
         self.model_name = model
         self.model = None
         self.scale = 4  # Default 4x upscaling
+        self.weights = weights
+        self.quantize = quantize
+        self.batch_size = batch_size
+        self.threads = threads
         
-    def load_model(self, model_name: str = "realesrgan"):
+    def load_model(self, model_name: str = "realesrgan", weights: Optional[str] = None,
+                   quantize: Optional[bool] = None):
         """
         Load AI upscaling model
         
+        The network runs on CPU in PyTorch and is shared by every
+        TextureUpscaler in the process; release weights are downloaded on
+        first use unless a local .pth is given.
+        
         Supported models:
-        - realesrgan: Best for photo-realistic
-        - esrgan: General purpose 4x-8x
-        - waifu2x: Best for anime/cartoon textures
-        - gfpgan: Face restoration
+        - realesrgan / esrgan: RealESRGAN_x4plus, best for photo-realistic
+        - realesr-general: realesr-general-x4v3, compact and ~10x faster
+        - realesrgan-anime: RealESRGAN_x4plus_anime_6B, anime/cartoon textures
+        - Any esrgan.MODELS name, e.g. RealESRGAN_x2plus
+        - lanczos: No network, plain Lanczos resampling
+        
+        Args:
+            model_name: Model to load
+            weights: Local weights file (default: the release weights)
+            quantize: Run the network in int8 (default: as constructed)
         """
         print(f"Loading {model_name} model...")
         
-        # Real implementation would load actual AI model:
-        # from basicsr.archs.rrdbnet_arch import RRDBNet
-        # from realesrgan import RealESRGANer
-        # model = RealESRGANer(...)
+        if weights is not None:
+            self.weights = weights
+        if quantize is not None:
+            self.quantize = quantize
+        if model_name == LANCZOS:
+            self.model = None
+        else:
+            from .esrgan import ESRGANBackend
+            self.model = ESRGANBackend(model_name, self.weights, self.quantize, self.batch_size, self.threads)
         
         self.model_name = model_name
         print(f"Model {model_name} loaded")
         
+    def _ensure_model(self):
+        if self.model is None and self.model_name != LANCZOS:
+            self.load_model(self.model_name)
+        
+    def _tiling(self) -> Dict:
+        if self.model is None:
+            return {}
+        return {'batch_size': self.batch_size, 'bytes_per_pixel': self.model.bytes_per_pixel}
+        
     def upscale_texture(
         self, 
         input_path: str, 
         output_path: str, 
         scale: int = 4,
-        format: Literal['png', 'jpg', 'dds'] = 'png'
+        format: OutputFormat = 'png',
+        tile_size: int = 128,
+        overlap: int = 8,
+        max_memory_mb: float = 512,
+        compression: Optional[str] = None,
+        mipmaps: bool = True,
+        on_rows: Optional[Callable[[np.ndarray], None]] = None,
+        mip_filter: MipFilter = 'kaiser',
+        alpha_cutoff: Optional[float] = None
     ):
         """
         Upscale a single texture
         
+        The image is processed in overlapping tiles whose seams are blended,
+        and PNG output is streamed to disk one row band at a time, so peak
+        memory is capped by max_memory_mb rather than the output size.
+        
         Args:
             input_path: Input texture file
             output_path: Output texture file
             scale: Upscaling factor (2, 4, 8)
             format: Output format
+            tile_size: Tile edge in input pixels (shrunk to fit max_memory_mb)
+            overlap: Input pixels blended across tile seams
+            max_memory_mb: Peak working memory for one band of tiles
+            compression: Block format of dds/blp output; see save_texture
+            mipmaps: Store a mip chain in dds/blp output
+            on_rows: Also receives each upscaled (rows, width, channels) band, in order
+            mip_filter: Mip downsampling filter of dds/blp output; see save_texture
+            alpha_cutoff: Keep alpha-test coverage in dds/blp mips; see save_texture
         """
         print(f"Upscaling {input_path} ({scale}x)...")
+        self._ensure_model()
         
-        # Load image
-        img = Image.open(input_path)
-        original_size = img.size
+        # Load image (BLP/DDS decoded natively)
+        image = load_texture(input_path)
+        original_size = (image.shape[1], image.shape[0])
+        new_size = (original_size[0] * scale, original_size[1] * scale)
         
-        # Real implementation would:
-        # 1. Convert to numpy array
-        # 2. Preprocess for AI model
-        # 3. Run through ESRGAN/Real-ESRGAN
-        # 4. Post-process
-        # 5. Save result
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
         
-        # Simplified: just resize for demo
-        new_size = (original_size[0] * scale, original_size[1] * scale)
-        upscaled = img.resize(new_size, Image.Resampling.LANCZOS)
+        tiling = {'tile_size': tile_size, 'overlap': overlap, 'max_memory_mb': max_memory_mb, **self._tiling()}
         
-        # Save
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        upscaled.save(output_path, format=format.upper())
+        def tee(write_rows: Callable[[np.ndarray], None]) -> Callable[[np.ndarray], None]:
+            if on_rows is None:
+                return write_rows
+            return lambda rows: (write_rows(rows), on_rows(rows))
         
-        print(f"Upscaled: {original_size} → {new_size}")
+        if format == 'png':
+            with PNGStreamWriter(output_path, new_size[0], new_size[1], image.shape[2]) as writer:
+                tile, _ = upscale_tiled(image, scale, self._upscale_tiles, tee(writer.write_rows), **tiling)
+        else:
+            # JPEG/DDS/BLP are encoded whole; only the upscaling is tiled
+            bands = []
+            tile, _ = upscale_tiled(image, scale, self._upscale_tiles, tee(bands.append), **tiling)
+            save_texture(np.concatenate(bands), output_path, format, compression, mipmaps, mip_filter,
+                         alpha_cutoff=alpha_cutoff)
+        
+        print(f"Upscaled: {original_size} → {new_size} ({tile}px tiles)")
         print(f"Saved to: {output_path}")
         
         return output_path
         
+    def upscale_textures(
+        self,
+        textures: List[Tuple[str, str]],
+        scale: int = 4,
+        tile_size: int = 128,
+        max_memory_mb: float = 512,
+        format: OutputFormat = 'png',
+        atlas: bool = False
+    ) -> List[Tuple[str, Optional[str]]]:
+        """
+        Upscale several textures, batching small ones together
+        
+        Textures that fit in one tile are grouped by size and run through
+        the model batch_size per forward pass, or with atlas, packed into
+        sheets that are upscaled in one pass each and cut apart again;
+        larger ones go through upscale_texture() one by one.
+        
+        Args:
+            textures: (input path, output path) pairs
+            scale: Upscaling factor
+            tile_size: Largest edge batched whole; see upscale_texture
+            max_memory_mb: See upscale_texture
+            format: Output format; see save_texture
+            atlas: Pack small textures into atlas sheets
+            
+        Returns:
+            (input path, error or None) per texture
+        """
+        self._ensure_model()
+        results = []
+        small = []
+        for input_path, output_path in textures:
+            try:
+                image = load_texture(input_path)
+                if max(image.shape[:2]) > tile_size:
+                    self.upscale_texture(input_path, output_path, scale, format, tile_size=tile_size,
+                                         max_memory_mb=max_memory_mb)
+                    results.append((input_path, None))
+                else:
+                    small.append((input_path, output_path, image))
+            except (OSError, ValueError, MemoryError) as e:
+                results.append((input_path, str(e)))
+        
+        if atlas:
+            sheets = self._upscale_atlases(small, scale, max_memory_mb, format, results)
+            print(f"Upscaled {sum(error is None for _, error in results)}/{len(textures)} textures "
+                  f"({len(small)} in {sheets} atlas sheets)")
+            return results
+        
+        # Similar shapes together, so little of each batch is padding
+        small.sort(key=lambda item: item[2].shape)
+        for start in range(0, len(small), self.batch_size):
+            chunk = small[start:start + self.batch_size]
+            try:
+                upscaled = self._upscale_tiles([image for _, _, image in chunk], scale)
+            except (ValueError, MemoryError) as e:
+                results.extend((input_path, str(e)) for input_path, _, _ in chunk)
+                continue
+            for (input_path, output_path, _), image in zip(chunk, upscaled):
+                results.append((input_path, _save_upscaled(image, output_path, format)))
+        print(f"Upscaled {sum(error is None for _, error in results)}/{len(textures)} textures "
+              f"({len(small)} batched)")
+        return results
+        
+    def _upscale_atlases(
+        self,
+        small: List[Tuple[str, str, np.ndarray]],
+        scale: int,
+        max_memory_mb: float,
+        format: OutputFormat,
+        results: List[Tuple[str, Optional[str]]]
+    ) -> int:
+        """
+        Pack (input path, output path, image) textures into sheets, one model call per sheet
+        
+        Textures are packed per channel count, since a sheet has one
+        layout. The sheet edge is shrunk until a sheet's forward pass fits
+        max_memory_mb. Appends (input path, error or None) to results and
+        returns the number of sheets.
+        """
+        by_channels = {}
+        for item in small:
+            by_channels.setdefault(item[2].shape[2], []).append(item)
+        
+        sheets = 0
+        for channels, items in sorted(by_channels.items()):
+            images = [image for _, _, image in items]
+            largest = max(max(image.shape[:2]) for image in images) + ATLAS_PADDING
+            size = fit_atlas_size(channels, scale, max(ATLAS_SIZE, largest), largest, max_memory_mb,
+                                  self._tiling().get('bytes_per_pixel'))
+            for placements in pack([(image.shape[1], image.shape[0]) for image in images], size):
+                sheets += 1
+                try:
+                    sheet = self._upscale_tiles([compose(images, placements)], scale)[0]
+                except (ValueError, MemoryError) as e:
+                    results.extend((items[index][0], str(e)) for index, _, _ in placements)
+                    continue
+                for (index, _, _), image in zip(placements, cut(sheet, images, placements, scale)):
+                    input_path, output_path, _ = items[index]
+                    results.append((input_path, _save_upscaled(image, output_path, format)))
+        return sheets
+        
+    def _upscale_tiles(self, tiles: List[np.ndarray], scale: int) -> List[np.ndarray]:
+        """Upscale (h, w, channels) uint8 tiles, as one batch when a model is loaded"""
+        if self.model is not None:
+            return self.model.upscale_batch(tiles, scale)
+        upscaled = []
+        for tile in tiles:
+            channels = tile.shape[2]
+            img = Image.fromarray(tile[:, :, 0] if channels == 1 else tile)
+            img = img.resize((tile.shape[1] * scale, tile.shape[0] * scale), Image.Resampling.LANCZOS)
+            upscaled.append(np.asarray(img, np.uint8).reshape(img.size[1], img.size[0], channels))
+        return upscaled
+        
     def batch_upscale_directory(
         self, 
         input_dir: str, 
         output_dir: str, 
         scale: int = 4,
-        pattern: str = "*.*"
-    ):
-        """Batch upscale all textures in directory"""
+        pattern: str = "*.*",
+        workers: Optional[int] = None,
+        force: bool = False,
+        tile_size: int = 128,
+        max_memory_mb: float = 2048,
+        format: OutputFormat = 'png',
+        dedupe: bool = True,
+        link: bool = True,
+        atlas: bool = False,
+        progress: Optional[Callable[[int, int, str], None]] = None
+    ) -> Dict:
+        """
+        Batch upscale all textures in directory
+        
+        The tree is walked once, and textures whose content hash and
+        parameters match the manifest from an earlier run are skipped. The
+        rest are upscaled largest-first on a process pool (so a big texture
+        does not start last and leave the other workers idle), with
+        max_memory_mb and the cores shared between the workers. Textures
+        that fit in one tile are handed out batch_size per task and run
+        through the model together, or with atlas, about one atlas sheet's
+        worth per task, packed into sheets that are upscaled in one pass.
+        
+        With dedupe, textures with the same file hash or the same decoded
+        pixels are upscaled once and the output is hard-linked or copied to
+        every duplicate (or taken from an unchanged texture's output).
+        Perceptual hashes group the remaining textures into near-duplicate
+        clusters (recolours, mips), which are reported but still upscaled
+        one by one, since their outputs differ.
+        
+        Args:
+            input_dir: Directory of source textures
+            output_dir: Receives <relative path>.<format> per texture, plus the manifest
+            scale: Upscaling factor
+            pattern: Shell-style file name filter
+            workers: Worker processes (default: all cores)
+            force: Reprocess every texture, ignoring the manifest
+            tile_size: See upscale_texture
+            max_memory_mb: Total memory budget across workers
+            format: Output format; see save_texture
+            dedupe: Upscale each distinct texture once
+            link: Hard-link duplicate outputs instead of copying them
+            atlas: Pack small textures into atlas sheets (for icon sets)
+            progress: Called as progress(done, total, relative_path)
+            
+        Returns:
+            Summary: files, upscaled, skipped, failed, errors, seconds, and
+            with dedupe, duplicates (outputs linked or copied),
+            seconds_saved (estimated upscale time they would have taken),
+            dedupe_seconds (pre-pass time) and near_duplicates (clusters of
+            relative paths)
+        """
         print(f"Batch upscaling directory: {input_dir}")
+        start = time.perf_counter()
         
-        input_path = Path(input_dir)
-        output_path = Path(output_dir)
+        os.makedirs(output_dir, exist_ok=True)
+        manifest = UpscaleManifest(os.path.join(output_dir, MANIFEST_NAME)).load()
+        params = {'model': self.model_name, 'scale': scale, 'tile_size': tile_size, 'format': format}
+        if self.quantize:
+            params['quantize'] = True
+        if atlas:
+            params['atlas'] = True  # edges see extruded padding, not the image border
         
         # Find all images
-        image_extensions = ['.png', '.jpg', '.jpeg', '.blp', '.tga', '.dds']
-        files = []
-        for ext in image_extensions:
-            files.extend(input_path.glob(f"**/*{ext}"))
-            
-        print(f"Found {len(files)} textures to upscale")
+        files = walk_textures(input_dir, pattern)
+        print(f"Found {len(files)} textures")
+        
+        jobs = []
+        skipped = 0
+        current = {}  # content hash -> output of an unchanged texture
+        for entry in files:
+            output_file = str(Path(output_dir) / Path(entry[0]).with_suffix(f'.{format}'))
+            try:
+                sha1 = manifest.content_hash(input_dir, entry)
+            except OSError as e:
+                print(f"Error reading {entry[0]}: {e}")
+                continue
+            if not force and manifest.is_current(entry[0], sha1, params, output_file):
+                manifest.put(entry, sha1, params)
+                current.setdefault(sha1, output_file)
+                skipped += 1
+            else:
+                jobs.append((entry, sha1, output_file))
+        jobs.sort(key=lambda job: job[0][1], reverse=True)
+        total = len(jobs)
+        
+        errors = {}
+        duplicated = 0
+        seconds_saved = 0.0
+        
+        def fan_out(source: str, targets: List[Tuple[TextureEntry, str, str]]):
+            nonlocal duplicated
+            for entry, sha1, output_file in targets:
+                try:
+                    if output_file != source:
+                        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+                        # Never write through an old hard link into another file
+                        if os.path.lexists(output_file):
+                            os.remove(output_file)
+                        _duplicate(source, output_file, link)
+                    manifest.put(entry, sha1, params)
+                    duplicated += 1
+                except OSError as e:
+                    errors[entry[0]] = str(e)
+                    print(f"Error writing duplicate {entry[0]}: {e}")
         
-        for i, file in enumerate(files):
-            relative_path = file.relative_to(input_path)
-            output_file = output_path / relative_path.with_suffix('.png')
+        duplicates = {}
+        near = []
+        dedupe_seconds = 0.0
+        if dedupe and jobs:
+            dedupe_start = time.perf_counter()
+            jobs, duplicates, reused, near = self._dedupe_jobs(input_dir, jobs, current, workers)
+            for job, source in reused:
+                fan_out(source, [job])
+            dedupe_seconds = time.perf_counter() - dedupe_start
+        else:
+            reused = []
+        print(f"Upscaling {len(jobs)} textures ({skipped} unchanged)")
+        
+        if jobs:
+            # One task per large texture, batch_size small ones (or a sheet's worth) per task
+            groups = []
+            small = []
+            pixels = {}
+            for entry, _, output_file in jobs:
+                texture = (os.path.join(input_dir, entry[0]), output_file)
+                size = texture_size(texture[0])
+                pixels[texture[0]] = size[0] * size[1] if size else 0
+                if size and max(size) <= tile_size:
+                    small.append((texture, size))
+                else:
+                    groups.append([texture])
+            if atlas:
+                chunk, area = [], 0
+                for texture, (width, height) in small:
+                    chunk.append(texture)
+                    area += (width + ATLAS_PADDING) * (height + ATLAS_PADDING)
+                    if area >= ATLAS_FILL * ATLAS_SIZE ** 2:
+                        groups.append(chunk)
+                        chunk, area = [], 0
+                if chunk:
+                    groups.append(chunk)
+            else:
+                small = [texture for texture, _ in small]
+                groups += [small[i:i + self.batch_size] for i in range(0, len(small), self.batch_size)]
+            
+            workers = max(1, min(workers or os.cpu_count() or 1, len(groups)))
+            model = (self.model_name, self.weights, self.quantize, self.batch_size)
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            tasks = [(model, group, scale, tile_size, max_memory_mb / workers, threads, format, atlas)
+                     for group in groups]
+            by_input = {os.path.join(input_dir, job[0][0]): job for job in jobs}
+            total_bytes = sum(entry[1] for entry, _, _ in jobs) or 1
+            done_bytes = 0
+            upscale_start = time.perf_counter()
+            upscaled_seconds = upscaled_pixels = 0
             
+            if workers == 1:
+                results = map(_upscale_job, tasks)
+                pool = None
+            else:
+                pool = Pool(workers)
+                results = pool.imap_unordered(_upscale_job, tasks)
             try:
-                self.upscale_texture(str(file), str(output_file), scale)
-                print(f"Progress: {i+1}/{len(files)}")
-            except Exception as e:
-                print(f"Error upscaling {file}: {e}")
-                
-        print(f"Batch upscaling complete: {len(files)} textures")
+                for done, (input_file, error, seconds) in enumerate(chain.from_iterable(results), 1):
+                    entry, sha1, output_file = by_input[input_file]
+                    copies = duplicates.get(input_file, [])
+                    if error:
+                        for failed, _, _ in [by_input[input_file]] + copies:
+                            errors[failed[0]] = error
+                        print(f"Error upscaling {entry[0]}: {error}")
+                    else:
+                        manifest.put(entry, sha1, params)
+                        fan_out(output_file, copies)
+                        seconds_saved += seconds * len(copies)
+                        upscaled_seconds += seconds
+                        upscaled_pixels += pixels[input_file]
+                    if done % 20 == 0:
+                        manifest.save()
+                    
+                    # ETA from measured input throughput
+                    done_bytes += entry[1]
+                    elapsed = time.perf_counter() - upscale_start
+                    eta = (total_bytes - done_bytes) * elapsed / done_bytes if done_bytes else 0
+                    print(f"Progress: {done}/{len(jobs)} ({done_bytes / total_bytes:.0%}, "
+                          f"{done_bytes / elapsed / 1e6:.2f} MB/s input) ETA {_format_eta(eta)}")
+                    if progress:
+                        progress(done, len(jobs), entry[0])
+            finally:
+                if pool:
+                    pool.close()
+                    pool.join()
+                manifest.save()
+            
+            # Outputs taken from unchanged textures: priced at this run's seconds per pixel
+            if reused and upscaled_pixels:
+                reused_pixels = 0
+                for (entry, _, _), _ in reused:
+                    size = texture_size(os.path.join(input_dir, entry[0]))
+                    reused_pixels += size[0] * size[1] if size else 0
+                seconds_saved += upscaled_seconds / upscaled_pixels * reused_pixels
+        else:
+            manifest.save()
+        
+        print(f"Batch upscaling complete: {total - len(errors)} upscaled, {skipped} skipped, {len(errors)} failed")
+        summary = {
+            'files': len(files),
+            'upscaled': total - len(errors),
+            'skipped': skipped,
+            'failed': len(errors),
+            'errors': errors,
+            'seconds': round(time.perf_counter() - start, 3)
+        }
+        if dedupe:
+            print(f"Deduplicated {duplicated} textures, saving about {seconds_saved:.1f}s of upscaling "
+                  f"(pre-pass {dedupe_seconds:.1f}s)")
+            summary.update({
+                'duplicates': duplicated,
+                'seconds_saved': round(seconds_saved, 3),
+                'dedupe_seconds': round(dedupe_seconds, 3),
+                'near_duplicates': near
+            })
+        return summary
+        
+    def _dedupe_jobs(
+        self,
+        input_dir: str,
+        jobs: List[Tuple[TextureEntry, str, str]],
+        current: Dict[str, str],
+        workers: Optional[int] = None
+    ) -> Tuple[List, Dict[str, List], List[Tuple[Tuple, str]], List[List[str]]]:
+        """
+        Split batch jobs into distinct textures and duplicates of them
+        
+        Jobs are matched by file hash first (and against the outputs of
+        unchanged textures), then the distinct files are decoded on a
+        process pool for their pixel digests and perceptual thumbnails.
+        
+        Args:
+            input_dir: Directory the job paths are relative to
+            jobs: (entry, content hash, output path), largest first
+            current: Content hash -> output path of unchanged textures
+            workers: Worker processes (default: all cores)
+            
+        Returns:
+            (distinct jobs, {representative input path: duplicate jobs},
+            [(job, existing output path)], near-duplicate clusters of
+            relative paths)
+        """
+        unique = []
+        duplicates = {}
+        reused = []
+        by_hash = {}
+        for job in jobs:
+            entry, sha1, _ = job
+            if sha1 in current:
+                reused.append((job, current[sha1]))
+            elif sha1 in by_hash:
+                duplicates[by_hash[sha1]].append(job)
+            else:
+                by_hash[sha1] = path = os.path.join(input_dir, entry[0])
+                duplicates[path] = []
+                unique.append(job)
+        
+        paths = [os.path.join(input_dir, job[0][0]) for job in unique]
+        workers = max(1, min(workers or os.cpu_count() or 1, len(paths) or 1))
+        if workers == 1:
+            fingerprints = list(map(_fingerprint_job, paths))
+        else:
+            with Pool(workers) as pool:
+                fingerprints = pool.map(_fingerprint_job, paths, chunksize=8)
+        
+        # Same pixels in different files (formats, metadata, compression level)
+        distinct = []
+        by_pixels = {}
+        thumbnails = []
+        for job, path, (digest, thumbnail) in zip(unique, paths, fingerprints):
+            if digest is None:
+                distinct.append(job)  # unreadable: the upscale reports the error
+            elif digest in by_pixels:
+                representative = by_pixels[digest]
+                duplicates[representative] += [job] + duplicates.pop(path)
+            else:
+                by_pixels[digest] = path
+                distinct.append(job)
+                thumbnails.append((job[0][0], thumbnail))
+        
+        clusters = near_duplicates(np.stack([thumbnail for _, thumbnail in thumbnails])) if thumbnails else []
+        near = [[thumbnails[i][0] for i in cluster] for cluster in clusters]
+        print(f"Dedupe: {len(distinct)} distinct of {len(jobs)} textures, {len(reused)} unchanged elsewhere, "
+              f"{len(near)} near-duplicate clusters")
+        return distinct, {path: group for path, group in duplicates.items() if group}, reused, near
         
     def upscale_with_normal_map_generation(
         self, 
         diffuse_path: str, 
         output_dir: str,
-        scale: int = 4
+        scale: int = 4,
+        strength: float = 8.0,
+        kernel: Literal['sobel', 'scharr'] = 'sobel',
+        directx: bool = False,
+        tile_size: int = 128,
+        max_memory_mb: float = 512
     ):
         """
         Upscale diffuse texture and generate normal map
+        
+        Height is estimated from the upscaled diffuse's luminance and its
+        Sobel/Scharr gradients are packed into a tangent-space normal map.
+        Both are computed from the upscaled bands as they stream out, so
+        the full-size diffuse is never held or read back.
+        
+        Args:
+            diffuse_path: Input texture file
+            output_dir: Receives diffuse.png, height.png and normal.png
+            scale: Upscaling factor
+            strength: Normal map bumpiness; see normal_maps.encode_normals
+            kernel: Gradient kernel, 'sobel' or 'scharr'
+            directx: Green channel points down (DirectX) instead of up (OpenGL)
+            tile_size: See upscale_texture
+            max_memory_mb: See upscale_texture
         """
         print(f"Upscaling with normal map generation...")
+        size = texture_size(diffuse_path)
+        if size is None:
+            raise ValueError(f"Cannot read texture {diffuse_path}")
+        width, height = size[0] * scale, size[1] * scale
+        os.makedirs(output_dir, exist_ok=True)
         
-        # Upscale diffuse
         diffuse_output = os.path.join(output_dir, "diffuse.png")
-        self.upscale_texture(diffuse_path, diffuse_output, scale)
-        
-        # Generate normal map from heightmap
-        # Real implementation would use proper normal map generation
+        height_output = os.path.join(output_dir, "height.png")
         normal_output = os.path.join(output_dir, "normal.png")
+        with PNGStreamWriter(normal_output, width, height, 3) as normals, \
+                PNGStreamWriter(height_output, width, height, 1) as heights, \
+                NormalMapGenerator(normals.write_rows, heights.write_rows, strength, kernel, directx) as generator:
+            self.upscale_texture(diffuse_path, diffuse_output, scale, tile_size=tile_size,
+                                 max_memory_mb=max_memory_mb, on_rows=generator.write_rows)
         
         print(f"Generated normal map: {normal_output}")
         
         return {
             'diffuse': diffuse_output,
+            'height': height_output,
             'normal': normal_output
         }
         
-    def enhance_for_pbr(self, texture_path: str, output_dir: str):
+    def enhance_for_pbr(
+        self,
+        texture_path: str,
+        output_dir: str,
+        scale: int = 1,
+        format: OutputFormat = 'png',
+        strength: float = 8.0,
+        directx: bool = False,
+        tile_size: int = 128,
+        max_memory_mb: float = 512
+    ):
         """
         Enhance texture for PBR (Physically Based Rendering)
         Generates: diffuse, normal, specular, roughness, metallic
+        
+        The maps are derived from one PBRDerivation, so luminance, the blur
+        pyramids and gradients are computed once for all five. Each map is
+        handed to a writer thread as soon as it is derived, so encoding
+        and writing it overlaps with deriving the next.
+        
+        Args:
+            texture_path: Diffuse texture file
+            output_dir: Receives <map>.<format> per map
+            scale: Upscale the texture by this factor first (1: use as is)
+            format: Output format; see save_texture
+            strength: Normal map bumpiness; see normal_maps.encode_normals
+            directx: DirectX (green down) instead of OpenGL normals
+            tile_size: See upscale_texture
+            max_memory_mb: See upscale_texture
         """
         print("Enhancing for PBR workflow...")
+        start = time.perf_counter()
         
-        outputs = {
-            'diffuse': os.path.join(output_dir, 'diffuse.png'),
-            'normal': os.path.join(output_dir, 'normal.png'),
-            'specular': os.path.join(output_dir, 'specular.png'),
-            'roughness': os.path.join(output_dir, 'roughness.png'),
-            'metallic': os.path.join(output_dir, 'metallic.png')
-        }
+        image = load_texture(texture_path)
+        if scale > 1:
+            self._ensure_model()
+            bands = []
+            upscale_tiled(image, scale, self._upscale_tiles, bands.append, tile_size=tile_size,
+                          max_memory_mb=max_memory_mb, **self._tiling())
+            image = np.concatenate(bands)
+        os.makedirs(output_dir, exist_ok=True)
         
-        # Real implementation would use AI to generate proper PBR maps
+        derivation = PBRDerivation(image, strength, directx)
+        outputs = {}
+        compute_seconds = 0.0
+        with ThreadPoolExecutor(max_workers=1) as writer:
+            writes = []
+            for name in PBR_MAPS:
+                compute_start = time.perf_counter()
+                texture = derivation.derive(name)
+                compute_seconds += time.perf_counter() - compute_start
+                outputs[name] = os.path.join(output_dir, f'{name}.{format}')
+                # Only the albedo is colour; normal and material maps are data
+                writes.append(writer.submit(save_texture, texture, outputs[name], format,
+                                            srgb=name == 'diffuse'))
+            for write in writes:
+                write.result()
         
-        print("PBR texture set generated")
+        print(f"PBR texture set generated in {time.perf_counter() - start:.2f}s "
+              f"({compute_seconds:.2f}s deriving maps)")
         return outputs
         
-    def compare_before_after(self, original: str, upscaled: str):
-        """Create comparison image"""
+    def compare_before_after(self, original: str, upscaled: str, output_path: Optional[str] = None,
+                             strip_rows: int = 32):
+        """
+        Create comparison image
+        
+        Without output_path the side-by-side image is built in memory and
+        returned. With it, the comparison is streamed to a PNG in strips
+        and quality metrics are returned instead; see _compare_streaming.
+        """
+        if output_path is not None:
+            return self._compare_streaming(original, upscaled, output_path, strip_rows)
         print("Creating before/after comparison...")
         
         img1 = Image.open(original)
@@ -180,6 +940,207 @@ class TextureUpscaler:
         comparison.paste(img2, (img2.size[0], 0))
         
         return comparison
+        
+    def _compare_streaming(self, original: str, upscaled: str, output_path: str, strip_rows: int = 32) -> Dict:
+        """
+        Side-by-side comparison written in horizontal strips, with quality metrics
+        
+        The upscaled texture is read strip by strip (PNG incrementally) and
+        each strip is paired with the nearest-neighbour enlargement of the
+        matching original rows, then appended to a streamed PNG; the full
+        2w x h canvas never exists. Meanwhile the upscaled strips are
+        area-reduced back to the original size, and PSNR/SSIM of that
+        against the original measure how faithful the upscale is to its
+        input.
+        
+        Args:
+            original: Source texture (held whole; it is the small one)
+            upscaled: Upscaled texture
+            output_path: Comparison PNG, original on the left
+            strip_rows: Rows of the upscaled texture per strip
+            
+        Returns:
+            output, width, height, and psnr, ssim, mse of the reduced upscale vs the original
+        """
+        print("Creating before/after comparison...")
+        before = to_rgb(load_texture(original))
+        size = texture_size(upscaled)
+        if size is None:
+            raise ValueError(f"Cannot read texture {upscaled}")
+        width, height = size
+        # Output pixel -> nearest original pixel
+        rows = np.arange(height) * before.shape[0] // height
+        columns = np.arange(width) * before.shape[1] // width
+        reducer = AreaReducer(width, height, before.shape[1], before.shape[0], 3)
+        
+        with PNGStreamWriter(output_path, width * 2, height, 3) as writer:
+            start = 0
+            for strip in texture_strips(upscaled, strip_rows):
+                after = to_rgb(strip)
+                left = before[rows[start:start + len(strip)]][:, columns]
+                writer.write_rows(np.concatenate([left, after], axis=1))
+                reducer.update(after)
+                start += len(strip)
+        
+        result = {'output': output_path, 'width': width * 2, 'height': height,
+                  **_consistency(reducer, before, strip_rows)}
+        print(f"Comparison saved to {output_path} (PSNR {result['psnr']} dB, SSIM {result['ssim']})")
+        return result
+        
+    def measure_quality(self, upscaled: str, reference: Optional[str] = None, original: Optional[str] = None,
+                        strip_rows: int = 32) -> Dict[str, float]:
+        """
+        PSNR/SSIM of an upscaled texture, streamed in strips
+        
+        Against a full-size reference (e.g. the ground truth an input was
+        downscaled from) both files are read in lockstep; otherwise the
+        upscale is area-reduced and compared with its original.
+        
+        Args:
+            upscaled: Upscaled texture
+            reference: Full-size ground truth, same size as upscaled
+            original: Source texture, used when there is no reference
+            strip_rows: Rows per strip
+        """
+        size = texture_size(upscaled)
+        if size is None:
+            raise ValueError(f"Cannot read texture {upscaled}")
+        if reference is not None:
+            if texture_size(reference) != size:
+                raise ValueError(f"{upscaled} and {reference} differ in size")
+            metrics = QualityMetrics()
+            for strip, truth in zip(texture_strips(upscaled, strip_rows), texture_strips(reference, strip_rows)):
+                metrics.update(to_rgb(strip), to_rgb(truth))
+            return metrics.result()
+        if original is None:
+            raise ValueError("measure_quality needs a reference or the original texture")
+        before = to_rgb(load_texture(original))
+        reducer = AreaReducer(size[0], size[1], before.shape[1], before.shape[0], 3)
+        for strip in texture_strips(upscaled, strip_rows):
+            reducer.update(to_rgb(strip))
+        return _consistency(reducer, before, strip_rows)
+        
+    def gate_quality(
+        self,
+        textures: List[Tuple[str, str]],
+        min_psnr: float = 30.0,
+        min_ssim: float = 0.9,
+        references: bool = False,
+        workers: Optional[int] = None
+    ) -> Dict:
+        """
+        Check many upscales against PSNR/SSIM thresholds
+        
+        Args:
+            textures: (upscaled, original) pairs, or (upscaled, reference) with references=True
+            min_psnr: Lowest passing PSNR in dB
+            min_ssim: Lowest passing SSIM
+            references: Second paths are full-size references, not originals
+            workers: Worker processes (default: all cores)
+            
+        Returns:
+            checked, passed, failed (upscaled path -> metrics or error), metrics per path
+        """
+        print(f"Quality gate: {len(textures)} textures (PSNR >= {min_psnr}, SSIM >= {min_ssim})")
+        tasks = [(upscaled, other, references) for upscaled, other in textures]
+        workers = max(1, min(workers or os.cpu_count() or 1, len(tasks) or 1))
+        if workers == 1:
+            results = list(map(_quality_job, tasks))
+        else:
+            with Pool(workers) as pool:
+                results = list(pool.imap_unordered(_quality_job, tasks, chunksize=8))
+        
+        metrics, failed = {}, {}
+        for upscaled, result, error in results:
+            if error:
+                failed[upscaled] = {'error': error}
+                continue
+            metrics[upscaled] = result
+            if result['psnr'] < min_psnr or result['ssim'] < min_ssim:
+                failed[upscaled] = result
+        print(f"Quality gate: {len(textures) - len(failed)}/{len(textures)} passed")
+        return {'checked': len(textures), 'passed': len(textures) - len(failed), 'failed': failed,
+                'metrics': metrics}
+
+
+# Per-process upscalers for _upscale_job, by (model, weights, quantize, batch size)
+_worker_upscalers: Dict[Tuple, TextureUpscaler] = {}
+
+
+def _save_upscaled(image: np.ndarray, output_path: str, format: OutputFormat) -> Optional[str]:
+    """Write one upscaled texture, creating its directory; returns the error, if any"""
+    try:
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        save_texture(image, output_path, format)
+        return None
+    except (OSError, ValueError) as e:
+        return str(e)
+
+
+def _upscale_job(task: Tuple) -> List[Tuple[str, Optional[str], float]]:
+    """Worker: upscale a group of textures; returns (input path, error or None, seconds) per texture"""
+    model, textures, scale, tile_size, max_memory_mb, threads, format, atlas = task
+    upscaler = _worker_upscalers.get(model)
+    if upscaler is None:
+        name, weights, quantize, batch_size = model
+        upscaler = _worker_upscalers[model] = TextureUpscaler(name, weights, quantize, batch_size, threads)
+    start = time.perf_counter()
+    try:
+        # Never write through an old hard link into a duplicate's output
+        for _, output_file in textures:
+            if os.path.lexists(output_file):
+                os.remove(output_file)
+        if len(textures) == 1:
+            input_file, output_file = textures[0]
+            upscaler.upscale_texture(input_file, output_file, scale, format, tile_size=tile_size,
+                                     max_memory_mb=max_memory_mb)
+            results = [(input_file, None)]
+        else:
+            results = upscaler.upscale_textures(textures, scale, tile_size, max_memory_mb, format, atlas)
+    except (OSError, ValueError, MemoryError) as e:
+        results = [(input_file, str(e)) for input_file, _ in textures]
+    seconds = (time.perf_counter() - start) / len(textures)
+    return [(input_file, error, seconds) for input_file, error in results]
+
+
+def _fingerprint_job(path: str) -> Tuple[Optional[str], Optional[np.ndarray]]:
+    """Worker: pixel digest and hash thumbnail of a texture, or (None, None) if it cannot be decoded"""
+    try:
+        return fingerprint(load_texture(path))
+    except (OSError, ValueError, MemoryError, struct.error):
+        return None, None
+
+
+def _duplicate(source: str, destination: str, link: bool):
+    if link:
+        try:
+            os.link(source, destination)
+            return
+        except OSError:
+            pass
+    shutil.copyfile(source, destination)
+
+
+def _consistency(reducer: AreaReducer, before: np.ndarray, strip_rows: int) -> Dict[str, float]:
+    """PSNR/SSIM of an area-reduced upscale against the original it came from"""
+    metrics = QualityMetrics()
+    for start in range(0, before.shape[0], strip_rows):
+        reduced = np.rint(reducer.result(start, start + strip_rows)).astype(np.uint8)
+        metrics.update(reduced, before[start:start + strip_rows])
+    return metrics.result()
+
+
+def _quality_job(task: Tuple) -> Tuple[str, Optional[Dict], Optional[str]]:
+    """Worker: (upscaled path, metrics or None, error or None)"""
+    upscaled, other, references = task
+    try:
+        if references:
+            return upscaled, TextureUpscaler(LANCZOS).measure_quality(upscaled, reference=other), None
+        return upscaled, TextureUpscaler(LANCZOS).measure_quality(upscaled, original=other), None
+    except (OSError, ValueError, MemoryError) as e:
+        return upscaled, None, str(e)
 
 
 # Example usage
@@ -190,8 +1151,9 @@ if __name__ == "__main__":
     # Upscale single texture to 4K
     upscaler.upscale_texture(
         "old_textures/ground_256x256.blp",
-        "new_textures/ground_4k.png",
-        scale=16  # 256 * 16 = 4096 (4K)
+        "new_textures/ground_4k.dds",
+        scale=16,  # 256 * 16 = 4096 (4K)
+        format="dds"
     )
     
     # Batch upscale entire directory
@@ -206,3 +1168,10 @@ if __name__ == "__main__":
         "texture.png",
         "pbr_output/"
     )
+    
+    # Stream an 8K before/after comparison and check the upscale's fidelity
+    upscaler.compare_before_after(
+        "old_textures/ground_256x256.blp",
+        "new_textures/ground_4k.dds",
+        output_path="compare/ground.png"
+    )
@@ -0,0 +1,167 @@
+"""
+Tiled Upscaling
+Runs an upscaler over overlapping tiles and blends the seams, emitting the
+output one row band at a time so peak memory stays bounded
+"""
+
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+# Bytes of working memory assumed per output pixel channel of a tile
+# (input, output and intermediate float copies of the backend); backends
+# with larger activations pass their own bytes_per_pixel
+TILE_BYTES_PER_VALUE = 12
+
+# Finished rows are converted to uint8 and written this many at a time
+EMIT_ROWS = 64
+
+# upscale(tiles, scale) -> one (h * scale, w * scale, channels) array per tile
+UpscaleFn = Callable[[List[np.ndarray], int], List[np.ndarray]]
+
+
+def _spans(length: int, tile: int) -> List[Tuple[int, int]]:
+    return [(start, min(start + tile, length)) for start in range(0, length, tile)]
+
+
+def _ramp(length: int, start: int, end: int, core_start: int, core_end: int, overlap: int, scale: int) -> np.ndarray:
+    """
+    Blend weights along one axis of a tile's output span
+
+    Interior edges fade linearly over 2 * overlap input pixels centred on
+    the core boundary; the neighbouring tile fades the opposite way over
+    the same pixels, so weights sum to exactly 1 everywhere.
+    """
+    x = (np.arange(start * scale, end * scale) + 0.5) / scale
+    weight = np.ones(len(x), np.float32)
+    if overlap and core_start > 0:
+        weight *= np.clip((x - (core_start - overlap)) / (2 * overlap), 0, 1)
+    if overlap and core_end < length:
+        weight *= np.clip(((core_end + overlap) - x) / (2 * overlap), 0, 1)
+    return weight
+
+
+def tile_memory(channels: int, scale: int, tile: int, overlap: int, pad: int,
+                bytes_per_pixel: Optional[int] = None) -> int:
+    """Working bytes of one tile in the backend"""
+    pixels = ((tile + 2 * (overlap + pad)) * scale) ** 2
+    return pixels * (bytes_per_pixel or TILE_BYTES_PER_VALUE * channels)
+
+
+def estimate_memory(width: int, channels: int, scale: int, tile: int, overlap: int, pad: int,
+                    batch_size: int = 1, bytes_per_pixel: Optional[int] = None) -> int:
+    """Peak bytes: the float32 band accumulator, one batch of tiles and one emitted slice"""
+    band = width * scale * (tile + 2 * overlap) * scale * channels * 4
+    emit = width * scale * EMIT_ROWS * channels * 9
+    return band + batch_size * tile_memory(channels, scale, tile, overlap, pad, bytes_per_pixel) + emit
+
+
+def fit_tile_size(width: int, channels: int, scale: int, tile: int, overlap: int, pad: int,
+                  max_memory_mb: float, bytes_per_pixel: Optional[int] = None) -> int:
+    """Largest tile size (at most `tile`, a multiple of 8) whose bands fit in max_memory_mb"""
+    limit = max_memory_mb * 1024 * 1024
+
+    def needed(size: int) -> int:
+        return estimate_memory(width, channels, scale, size, overlap, pad, bytes_per_pixel=bytes_per_pixel)
+
+    size = max(tile, 2 * overlap, 8)
+    while size > max(2 * overlap, 8) and needed(size) > limit:
+        size = max(2 * overlap, 8, (size // 2) // 8 * 8)
+    if needed(size) > limit:
+        raise ValueError(f"max_memory_mb={max_memory_mb} is too small for a {width * scale}px wide output "
+                         f"(needs {needed(size) / 2**20:.0f} MB)")
+    return size
+
+
+def fit_batch_size(width: int, channels: int, scale: int, tile: int, overlap: int, pad: int,
+                   max_memory_mb: float, batch_size: int, bytes_per_pixel: Optional[int] = None) -> int:
+    """Most tiles per upscale call (at most batch_size, at least 1) that fit beside the band"""
+    spare = max_memory_mb * 1024 * 1024 - estimate_memory(width, channels, scale, tile, overlap, pad, 0)
+    per_tile = tile_memory(channels, scale, tile, overlap, pad, bytes_per_pixel)
+    return max(1, min(batch_size, int(spare // per_tile)))
+
+
+def upscale_tiled(
+    image: np.ndarray,
+    scale: int,
+    upscale: UpscaleFn,
+    write_rows: Callable[[np.ndarray], None],
+    tile_size: int = 128,
+    overlap: int = 8,
+    pad: int = 4,
+    max_memory_mb: float = 512,
+    batch_size: int = 1,
+    bytes_per_pixel: Optional[int] = None
+) -> Tuple[int, int]:
+    """
+    Upscale `image` tile by tile, streaming finished output rows
+
+    Each tile is a core of tile_size input pixels, widened by `overlap` on
+    interior sides for blending and by `pad` more for context that is
+    cropped off after upscaling. Tiles of one row band accumulate into a
+    float32 band buffer; rows no longer reached by the next band's overlap
+    are handed to write_rows() as uint8, and the rest carry over. Tiles of
+    a band go to upscale() up to batch_size at a time, so a model backend
+    runs one forward pass per batch; the tile size is fitted to the memory
+    cap first, then the batch size.
+
+    Args:
+        image: (height, width, channels) uint8
+        scale: Integer upscale factor
+        upscale: upscale(tiles, scale) -> list of (h * scale, w * scale, channels) arrays
+        write_rows: Receives consecutive (rows, width * scale, channels) uint8 bands
+        tile_size: Core tile edge in input pixels (reduced to fit max_memory_mb)
+        overlap: Input pixels blended across each seam
+        pad: Extra input context per side, cropped after upscaling
+        max_memory_mb: Cap for one band buffer plus one batch's working set
+        batch_size: Most tiles per upscale() call
+        bytes_per_pixel: Backend working bytes per output pixel of a tile
+
+    Returns:
+        (tile size, batch size) used
+    """
+    height, width, channels = image.shape
+    overlap = min(overlap, tile_size // 2)
+    tile = fit_tile_size(width, channels, scale, tile_size, overlap, pad, max_memory_mb, bytes_per_pixel)
+    batch_size = fit_batch_size(width, channels, scale, tile, overlap, pad, max_memory_mb, batch_size,
+                                bytes_per_pixel)
+    out_width = width * scale
+
+    # One preallocated band; rows inside the next band's blend zone are
+    # moved to the top after each band instead of reallocating
+    band = np.zeros(((tile + 2 * overlap) * scale, out_width, channels), np.float32)
+    band_start = 0  # output row of band[0]
+    for core_y0, core_y1 in _spans(height, tile):
+        y0, y1 = max(0, core_y0 - overlap), min(height, core_y1 + overlap)
+        used = y1 * scale - band_start
+        wy = _ramp(height, y0, y1, core_y0, core_y1, overlap, scale)[:, None, None]
+
+        py0, py1 = max(0, y0 - pad), min(height, y1 + pad)
+        columns = _spans(width, tile)
+        for batch_start in range(0, len(columns), batch_size):
+            batch = []
+            for core_x0, core_x1 in columns[batch_start:batch_start + batch_size]:
+                x0, x1 = max(0, core_x0 - overlap), min(width, core_x1 + overlap)
+                px0, px1 = max(0, x0 - pad), min(width, x1 + pad)
+                batch.append((core_x0, core_x1, x0, x1, px0, px1))
+            results = upscale([image[py0:py1, px0:px1] for *_, px0, px1 in batch], scale)
+
+            for (core_x0, core_x1, x0, x1, px0, _), result in zip(batch, results):
+                result = result.reshape(result.shape[0], result.shape[1], channels)
+                weighted = result[(y0 - py0) * scale:(y1 - py0) * scale,
+                                  (x0 - px0) * scale:(x1 - px0) * scale].astype(np.float32)
+                weighted *= wy
+                weighted *= _ramp(width, x0, x1, core_x0, core_x1, overlap, scale)[None, :, None]
+                band[y0 * scale - band_start:used, x0 * scale:x1 * scale] += weighted
+                del result, weighted
+            del results
+
+        # Rows above the next band's blend zone are final
+        done = (core_y1 - overlap if core_y1 < height else height) * scale - band_start
+        for start in range(0, done, EMIT_ROWS):
+            rows = band[start:min(done, start + EMIT_ROWS)] + 0.5
+            write_rows(np.clip(rows, 0, 255, out=rows).astype(np.uint8))
+        band[:used - done] = band[done:used].copy()
+        band[used - done:] = 0
+        band_start += done
+    return tile, batch_size
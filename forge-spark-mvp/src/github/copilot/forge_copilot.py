@@ -6,6 +6,70 @@ Real AI-powered code completion using free Hugging Face models
 from typing import List, Dict, Optional
 import time
 
+from .perf_analyzer import PerformanceAnalyzer, run_benchmarks
+
+
+def find_bugs(code: str) -> List[Dict]:
+    """
+    Detect potential bugs in code (synchronous, usable from worker processes)
+    
+    Returns:
+        List of detected issues with fixes
+    """
+    bugs = []
+    
+    lines = code.split('\n')
+    
+    for i, line in enumerate(lines):
+        # Example bug detection patterns
+        if "== None" in line:
+            bugs.append({
+                'line': i + 1,
+                'rule': 'compare-to-none',
+                'severity': 'warning',
+                'message': 'Use "is None" instead of "== None"',
+                'fix': line.replace('== None', 'is None')
+            })
+            
+        if "except:" in line and "pass" in lines[i+1] if i+1 < len(lines) else False:
+            bugs.append({
+                'line': i + 1,
+                'rule': 'bare-except-pass',
+                'severity': 'error',
+                'message': 'Empty except block - specify exception type',
+                'fix': 'except Exception as e:\n    # Handle error'
+            })
+            
+    return bugs
+
+
+def find_refactorings(code: str) -> List[Dict]:
+    """
+    Suggest code refactoring improvements (synchronous)
+    """
+    suggestions = []
+    
+    lines = code.split('\n')
+    
+    # Example refactoring patterns
+    if len(lines) > 50:
+        suggestions.append({
+            'type': 'function_too_long',
+            'message': 'Function is too long (>50 lines). Consider breaking into smaller functions.',
+            'priority': 'medium'
+        })
+        
+    if "for " in code and "append(" in code:
+        suggestions.append({
+            'type': 'use_list_comprehension',
+            'message': 'Consider using list comprehension instead of loop with append',
+            'example': '[x for x in items]',
+            'priority': 'low'
+        })
+        
+    return suggestions
+
+
 class ForgeCopilot:
     """
     FREE GitHub Copilot Alternative
@@ -17,6 +81,7 @@ class ForgeCopilot:
     - Code explanation
     - Refactoring suggestions
     - Test generation
+    - Performance analysis
     """
     
     def __init__(self, model_name: str = "bigcode/starcoder"):
@@ -128,29 +193,7 @@ class ForgeCopilot:
         Returns:
             List of detected issues with fixes
         """
-        bugs = []
-        
-        lines = code.split('\n')
-        
-        for i, line in enumerate(lines):
-            # Example bug detection patterns
-            if "== None" in line:
-                bugs.append({
-                    'line': i + 1,
-                    'severity': 'warning',
-                    'message': 'Use "is None" instead of "== None"',
-                    'fix': line.replace('== None', 'is None')
-                })
-                
-            if "except:" in line and "pass" in lines[i+1] if i+1 < len(lines) else False:
-                bugs.append({
-                    'line': i + 1,
-                    'severity': 'error',
-                    'message': 'Empty except block - specify exception type',
-                    'fix': 'except Exception as e:\n    # Handle error'
-                })
-                
-        return bugs
+        return find_bugs(code)
         
     async def explain_code(self, code: str, language: str = "python") -> str:
         """
@@ -171,27 +214,7 @@ Detailed explanation would be generated by AI model.
         """
         Suggest code refactoring improvements
         """
-        suggestions = []
-        
-        lines = code.split('\n')
-        
-        # Example refactoring patterns
-        if len(lines) > 50:
-            suggestions.append({
-                'type': 'function_too_long',
-                'message': 'Function is too long (>50 lines). Consider breaking into smaller functions.',
-                'priority': 'medium'
-            })
-            
-        if "for " in code and "append(" in code:
-            suggestions.append({
-                'type': 'use_list_comprehension',
-                'message': 'Consider using list comprehension instead of loop with append',
-                'example': '[x for x in items]',
-                'priority': 'low'
-            })
-            
-        return suggestions
+        return find_refactorings(code)
         
     async def generate_tests(self, code: str, language: str = "python") -> str:
         """
@@ -223,20 +246,40 @@ if __name__ == '__main__':
             
         return "# Generated tests"
         
-    async def optimize_code(self, code: str, language: str = "python") -> Dict:
+    async def optimize_code(self, code: str, language: str = "python", benchmark: bool = False) -> Dict:
         """
         Suggest performance optimizations
-        """
-        optimizations = {
-            'time_complexity': 'O(n)',
-            'space_complexity': 'O(1)',
-            'suggestions': [
-                'Use generator instead of list for large datasets',
-                'Cache repeated calculations',
-                'Use built-in functions when possible'
-            ]
-        }
         
+        Python code is analyzed statically (loop nesting, quadratic patterns,
+        hot-loop attribute lookups, needless list materialization). With
+        benchmark=True, functions marked `# forge-copilot: benchmark` are timed
+        in a separate process.
+        """
+        if language != "python":
+            return {
+                'time_complexity': 'unknown',
+                'space_complexity': 'unknown',
+                'findings': [],
+                'suggestions': [
+                    'Use generator instead of list for large datasets',
+                    'Cache repeated calculations',
+                    'Use built-in functions when possible'
+                ]
+            }
+        
+        optimizations = PerformanceAnalyzer().analyze(code)
+        
+        # One suggestion per kind of finding, worst first
+        suggestions = []
+        for finding in optimizations['findings']:
+            suggestion = finding.get('suggestion')
+            if suggestion and suggestion not in suggestions:
+                suggestions.append(suggestion)
+        optimizations['suggestions'] = suggestions
+        
+        if benchmark:
+            optimizations['benchmarks'] = run_benchmarks(code)
+            
         return optimizations
         
     def get_statistics(self) -> Dict:
@@ -0,0 +1,498 @@
+"""
+Performance Analyzer - static complexity and hot-loop analysis
+Backs ForgeCopilot.optimize_code with real findings instead of canned advice
+"""
+
+import ast
+import json
+import subprocess
+import sys
+from typing import Dict, List, Optional, Set
+
+# Comment that marks a zero-argument function for the micro-benchmark harness
+BENCHMARK_MARKER = "forge-copilot: benchmark"
+
+# Builtins that only iterate their argument once - a list argument is wasted memory
+_CONSUMERS = {'sum', 'any', 'all', 'min', 'max', 'set', 'frozenset', 'tuple', 'enumerate'}
+
+_LOOP_NODES = (ast.For, ast.AsyncFor, ast.While)
+
+
+def _cost(exponent: int) -> str:
+    """Format a polynomial cost class"""
+    if exponent <= 0:
+        return 'O(1)'
+    if exponent == 1:
+        return 'O(n)'
+    return f'O(n^{exponent})'
+
+
+def _cost_rank(cost: str) -> int:
+    """Sortable rank of a cost class (exponential ranks above any polynomial)"""
+    if cost == 'O(2^n)':
+        return 100
+    if cost == 'O(n)':
+        return 1
+    if cost.startswith('O(n^'):
+        return int(cost[4:-1])
+    return 0
+
+
+def _dotted_name(node: ast.AST) -> Optional[str]:
+    """Return 'a.b.c' for a pure attribute chain rooted at a name"""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name) or not parts:
+        return None
+    parts.append(node.id)
+    return '.'.join(reversed(parts))
+
+
+def _decorator_name(node: ast.AST) -> str:
+    """Name of a decorator, with or without call arguments"""
+    if isinstance(node, ast.Call):
+        node = node.func
+    if isinstance(node, ast.Name):
+        return node.id
+    return _dotted_name(node) or ''
+
+
+def _walk_loop_body(nodes: List[ast.AST]):
+    """Like ast.walk over a loop body, but without descending into inner loops"""
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        yield node
+        if isinstance(node, _LOOP_NODES):
+            continue
+        stack.extend(ast.iter_child_nodes(node))
+
+
+def _assigned_names(nodes: List[ast.AST]) -> Set[str]:
+    """Names (re)bound anywhere inside the given statements"""
+    names = set()
+    for stmt in nodes:
+        for node in ast.walk(stmt):
+            if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+                names.add(node.id)
+    return names
+
+
+class _Scope:
+    """Value kinds known for the names of one function (or module) body"""
+
+    def __init__(self):
+        self.lists = set()
+        self.strings = set()
+
+
+class PerformanceAnalyzer(ast.NodeVisitor):
+    """
+    Static performance analyzer for Python source
+
+    Detects:
+    - Deep loop nesting (O(n^k) hot spots)
+    - Quadratic patterns: `in` on a list, string `+=`, pop(0)/insert(0) inside loops
+    - Repeated attribute lookups in hot loops
+    - Lists materialized where a generator would do
+    - Exponential self-recursion without memoization
+
+    Every finding carries a location and an estimated cost class.
+    """
+
+    def __init__(self, max_findings: int = 200):
+        self.max_findings = max_findings
+        self._reset()
+
+    def _reset(self):
+        self.findings = []
+        self.max_depth = 0
+        self.allocates = False
+        self._depth = 0
+        self._scopes = [_Scope()]
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def analyze(self, code: str) -> Dict:
+        """
+        Analyze Python source code
+
+        Returns:
+            Dict with estimated complexity, max loop depth and findings
+        """
+        self._reset()
+        try:
+            tree = ast.parse(code)
+        except SyntaxError as e:
+            return {
+                'time_complexity': 'unknown',
+                'space_complexity': 'unknown',
+                'max_loop_depth': 0,
+                'findings': [{
+                    'kind': 'syntax_error',
+                    'line': e.lineno or 0,
+                    'col': e.offset or 0,
+                    'cost': 'unknown',
+                    'message': f'Cannot analyze: {e.msg}'
+                }]
+            }
+
+        self.visit(tree)
+
+        findings = sorted(self.findings, key=lambda f: (-_cost_rank(f['cost']), f['line'], f['col']))
+        findings = findings[:self.max_findings]
+
+        worst = max([_cost_rank(f['cost']) for f in findings] + [self.max_depth])
+        time_complexity = 'O(2^n)' if worst >= 100 else _cost(worst)
+
+        return {
+            'time_complexity': time_complexity,
+            'space_complexity': 'O(n)' if self.allocates else 'O(1)',
+            'max_loop_depth': self.max_depth,
+            'findings': findings
+        }
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _add(self, node: ast.AST, kind: str, cost: str, message: str, suggestion: str):
+        self.findings.append({
+            'kind': kind,
+            'line': node.lineno,
+            'col': node.col_offset,
+            'end_line': getattr(node, 'end_lineno', node.lineno),
+            'cost': cost,
+            'message': message,
+            'suggestion': suggestion
+        })
+
+    @property
+    def _scope(self) -> _Scope:
+        return self._scopes[-1]
+
+    def _is_list_expr(self, node: ast.AST) -> bool:
+        if isinstance(node, (ast.List, ast.ListComp)):
+            return True
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            return node.func.id in ('list', 'sorted')
+        return isinstance(node, ast.Name) and node.id in self._scope.lists
+
+    def _is_str_expr(self, node: ast.AST) -> bool:
+        if isinstance(node, ast.Constant):
+            return isinstance(node.value, str)
+        if isinstance(node, ast.JoinedStr):
+            return True
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            return node.func.id in ('str', 'repr', 'format')
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+            return self._is_str_expr(node.left) or self._is_str_expr(node.right)
+        return isinstance(node, ast.Name) and node.id in self._scope.strings
+
+    def _track_binding(self, target: ast.AST, value: ast.AST):
+        if not isinstance(target, ast.Name):
+            return
+        scope = self._scope
+        scope.lists.discard(target.id)
+        scope.strings.discard(target.id)
+        if self._is_list_expr(value):
+            scope.lists.add(target.id)
+        elif self._is_str_expr(value):
+            scope.strings.add(target.id)
+
+    def _enter_loop(self, node: ast.AST, body: List[ast.AST]):
+        self._depth += 1
+        self.max_depth = max(self.max_depth, self._depth)
+        if self._depth >= 2 and isinstance(node, _LOOP_NODES):
+            self._add(
+                node, 'nested_loop', _cost(self._depth),
+                f'Loop nested {self._depth} levels deep',
+                'Precompute a dict/set index or restructure to avoid iterating the inner collection per outer item'
+            )
+        self._check_hot_attributes(body)
+
+    def _check_hot_attributes(self, body: List[ast.AST]):
+        """Report attribute chains looked up on every iteration of a loop"""
+        rebound = _assigned_names(body)
+        counts = {}
+        first = {}
+        # Inner loops are checked on their own
+        for child in _walk_loop_body(body):
+            if isinstance(child, ast.Attribute) and isinstance(child.ctx, ast.Load):
+                name = _dotted_name(child)
+                if not name or name.split('.', 1)[0] in rebound:
+                    continue
+                counts[name] = counts.get(name, 0) + 1
+                if name not in first or child.lineno < first[name].lineno:
+                    first[name] = child
+
+        # Only keep the longest chains: `self.items.append` subsumes `self.items`
+        for name, count in sorted(counts.items()):
+            if any(other.startswith(name + '.') for other in counts):
+                continue
+            if name.count('.') < 2 and count < 2:
+                continue
+            local = name.rsplit('.', 1)[-1]
+            self._add(
+                first[name], 'hot_attribute_lookup', _cost(self._depth),
+                f'`{name}` is resolved {count}x per loop iteration ({name.count(".")} attribute lookups each)',
+                f'Hoist it before the loop: `{local} = {name}`'
+            )
+
+    # ------------------------------------------------------------------
+    # Visitors
+    # ------------------------------------------------------------------
+
+    def _visit_function(self, node):
+        self._scopes.append(_Scope())
+        saved_depth, self._depth = self._depth, 0
+        self.generic_visit(node)
+        self._depth = saved_depth
+        self._scopes.pop()
+        self._check_recursion(node)
+
+    visit_FunctionDef = _visit_function
+    visit_AsyncFunctionDef = _visit_function
+
+    def _check_recursion(self, node):
+        if any(_decorator_name(d).endswith('cache') for d in node.decorator_list):
+            return
+        for stmt in ast.walk(node):
+            if not isinstance(stmt, ast.Return) or stmt.value is None:
+                continue
+            calls = [
+                c for c in ast.walk(stmt.value)
+                if isinstance(c, ast.Call) and isinstance(c.func, ast.Name) and c.func.id == node.name
+            ]
+            if len(calls) >= 2:
+                self._add(
+                    node, 'exponential_recursion', 'O(2^n)',
+                    f'`{node.name}` calls itself {len(calls)}x per invocation without memoization',
+                    'Decorate with @functools.lru_cache or rewrite iteratively'
+                )
+                return
+
+    def _visit_loop(self, node):
+        if isinstance(node, (ast.For, ast.AsyncFor)):
+            self.visit(node.iter)
+            self._check_materialized_iter(node.iter)
+            self.visit(node.target)
+        else:
+            self.visit(node.test)
+        self._enter_loop(node, node.body)
+        for stmt in node.body:
+            self.visit(stmt)
+        self._depth -= 1
+        for stmt in node.orelse:
+            self.visit(stmt)
+
+    visit_For = _visit_loop
+    visit_AsyncFor = _visit_loop
+    visit_While = _visit_loop
+
+    def _visit_comprehension(self, node):
+        if not isinstance(node, ast.GeneratorExp):
+            self.allocates = True
+        # The first iterable is evaluated once, outside the comprehension loop
+        self.visit(node.generators[0].iter)
+        entered = 0
+        for i, gen in enumerate(node.generators):
+            if i:
+                self.visit(gen.iter)
+            self._depth += 1
+            entered += 1
+            self.max_depth = max(self.max_depth, self._depth)
+            if self._depth >= 2 and i:
+                self._add(
+                    gen.iter, 'nested_loop', _cost(self._depth),
+                    f'Comprehension nested {self._depth} levels deep',
+                    'Precompute a lookup table instead of iterating per item'
+                )
+            for cond in gen.ifs:
+                self.visit(cond)
+        if isinstance(node, ast.DictComp):
+            self.visit(node.key)
+            self.visit(node.value)
+        else:
+            self.visit(node.elt)
+        self._depth -= entered
+
+    visit_ListComp = _visit_comprehension
+    visit_SetComp = _visit_comprehension
+    visit_DictComp = _visit_comprehension
+    visit_GeneratorExp = _visit_comprehension
+
+    def visit_Assign(self, node):
+        self.generic_visit(node)
+        value = node.value
+        for target in node.targets:
+            # `s = s + part` is the same quadratic pattern as `s += part`
+            if (self._depth and isinstance(target, ast.Name) and isinstance(value, ast.BinOp)
+                    and isinstance(value.op, ast.Add) and isinstance(value.left, ast.Name)
+                    and value.left.id == target.id and self._is_str_expr(value)):
+                self._report_string_concat(node)
+            self._track_binding(target, value)
+
+    def visit_AnnAssign(self, node):
+        self.generic_visit(node)
+        if node.value is not None:
+            self._track_binding(node.target, node.value)
+
+    def visit_AugAssign(self, node):
+        self.generic_visit(node)
+        if self._depth == 0 or not isinstance(node.op, ast.Add):
+            return
+        target = node.target
+        is_str = (
+            (isinstance(target, ast.Name) and target.id in self._scope.strings)
+            or self._is_str_expr(node.value)
+        )
+        if is_str:
+            self._report_string_concat(node)
+        elif isinstance(target, ast.Name) and target.id in self._scope.lists and self._is_list_expr(node.value):
+            self.allocates = True
+
+    def _report_string_concat(self, node: ast.AST):
+        self._add(
+            node, 'string_concat_in_loop', _cost(self._depth + 1),
+            'String concatenation inside a loop copies the whole string each iteration',
+            'Collect parts in a list and "".join() them after the loop'
+        )
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        if self._depth == 0:
+            return
+        for op, right in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.In, ast.NotIn)) and self._is_list_expr(right):
+                self._add(
+                    node, 'list_membership_in_loop', _cost(self._depth + 1),
+                    'Membership test on a list inside a loop is a linear scan per iteration',
+                    'Build a set() once before the loop and test against it'
+                )
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        func = node.func
+        if isinstance(func, ast.Attribute) and func.attr == 'append':
+            self.allocates = True
+
+        # pop(0) / insert(0, x) shift every element of a list
+        if (self._depth and isinstance(func, ast.Attribute) and func.attr in ('pop', 'insert')
+                and node.args and isinstance(node.args[0], ast.Constant) and node.args[0].value == 0):
+            self._add(
+                node, 'list_shift_in_loop', _cost(self._depth + 1),
+                f'list.{func.attr}(0) inside a loop shifts every element',
+                'Use collections.deque with popleft()/appendleft()'
+            )
+
+        if (isinstance(func, ast.Name) and func.id in _CONSUMERS
+                and len(node.args) == 1 and isinstance(node.args[0], ast.ListComp)):
+            self._add(
+                node.args[0], 'list_materialization', 'O(n)',
+                f'{func.id}() over a list comprehension builds a throwaway list',
+                f'Pass a generator expression: {func.id}(x for x in ...)'
+            )
+
+    def _check_materialized_iter(self, node: ast.AST):
+        """`for x in [...]` / `for x in list(...)` when the list is only iterated"""
+        if isinstance(node, ast.ListComp):
+            self._add(
+                node, 'list_materialization', 'O(n)',
+                'Loop iterates a list comprehension that is built only to be consumed',
+                'Iterate a generator expression or the source iterable directly'
+            )
+        elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                and node.func.id == 'list' and len(node.args) == 1
+                and not isinstance(node.args[0], (ast.Name, ast.Attribute))):
+            self._add(
+                node, 'list_materialization', 'O(n)',
+                'list(...) copies an iterable only to loop over it once',
+                'Iterate the iterable directly'
+            )
+
+
+def find_benchmark_targets(code: str) -> List[str]:
+    """Names of top-level zero-argument functions marked for benchmarking"""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+
+    lines = code.split('\n')
+    targets = []
+    for node in tree.body:
+        if not isinstance(node, ast.FunctionDef):
+            continue
+        args = node.args
+        if args.args or args.posonlyargs or args.kwonlyargs or args.vararg or args.kwarg:
+            continue
+        first = min([d.lineno for d in node.decorator_list] + [node.lineno])
+        marked_lines = lines[max(first - 2, 0):node.lineno]
+        if any(BENCHMARK_MARKER in line for line in marked_lines):
+            targets.append(node.name)
+    return targets
+
+
+# Prefix of the harness line that carries the results, so output printed by
+# the benchmarked code is never parsed as results
+_RESULT_MARKER = '__forge_benchmark_results__ '
+
+# Runs in a fresh interpreter so user code never executes inside the server;
+# its prints go to stderr while it runs
+_HARNESS = r'''
+import json, sys, timeit
+source = sys.stdin.read()
+names = json.loads(sys.argv[1])
+stdout, sys.stdout = sys.stdout, sys.stderr
+namespace = {"__name__": "__forge_benchmark__"}
+exec(compile(source, "<benchmark>", "exec"), namespace)
+results = []
+for name in names:
+    timer = timeit.Timer(namespace[name])
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=5, number=number))
+    results.append({"function": name, "loops": number, "best_us": best / number * 1e6})
+stdout.write("\n" + sys.argv[2] + json.dumps(results) + "\n")
+'''
+
+
+def run_benchmarks(code: str, timeout: float = 30.0) -> List[Dict]:
+    """
+    Micro-benchmark every function marked with `# forge-copilot: benchmark`
+
+    The code runs in a separate Python process with a timeout.
+
+    Returns:
+        List of {'function', 'loops', 'best_us'} dicts (or a single error entry)
+    """
+    targets = find_benchmark_targets(code)
+    if not targets:
+        return []
+
+    try:
+        proc = subprocess.run(
+            [sys.executable, '-I', '-c', _HARNESS, json.dumps(targets), _RESULT_MARKER],
+            input=code,
+            capture_output=True,
+            text=True,
+            timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        return [{'error': f'Benchmark timed out after {timeout}s'}]
+
+    if proc.returncode != 0:
+        lines = proc.stderr.strip().split('\n')
+        return [{'error': lines[-1] if lines else 'Benchmark failed'}]
+    # Writes straight to fd 1 can still land in stdout: take the last marked line
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(_RESULT_MARKER):
+            try:
+                return json.loads(line[len(_RESULT_MARKER):])
+            except ValueError as e:
+                return [{'error': f'Unreadable benchmark results: {e}'}]
+    return [{'error': 'Benchmark produced no results'}]
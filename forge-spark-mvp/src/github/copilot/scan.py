@@ -0,0 +1,353 @@
+"""
+Forge Copilot Scan - whole-repository analysis from the command line
+
+Usage:
+    forge-copilot scan <dir> [--format sarif|jsonl] [--output FILE] [--jobs N]
+
+Runs the detect_bugs / suggest_refactoring rules over every source file in a
+process pool and streams the results as SARIF 2.1.0 or JSON Lines. Results are
+cached per file (keyed by size + mtime + rules version) in a SQLite database
+under the user cache directory, so incremental runs only re-analyze files that
+changed.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from multiprocessing import Pool
+from typing import Dict, List, Optional, TextIO, Tuple
+
+from .forge_copilot import find_bugs, find_refactorings
+
+# Bump whenever find_bugs / find_refactorings change so cached results are discarded
+RULES_VERSION = "1"
+
+# One SQLite cache per scanned directory, kept out of the scanned tree
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("FORGE_SPARK_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "forge-spark")),
+    "copilot-scan"
+)
+
+SKIP_DIRS = {'.git', '.hg', '.svn', '__pycache__', 'node_modules', 'venv', '.venv', 'env', '.tox', 'build', 'dist'}
+
+# Small files are grouped so per-task IPC overhead is amortized
+BATCH_BYTES = 256 * 1024
+BATCH_FILES = 64
+
+SEVERITY_TO_SARIF = {'error': 'error', 'warning': 'warning', 'high': 'error', 'medium': 'warning', 'low': 'note'}
+
+RULES = {
+    'compare-to-none': 'Comparison to None should use "is"',
+    'bare-except-pass': 'Exception swallowed by an empty except block',
+    'function_too_long': 'File or function is too long',
+    'use_list_comprehension': 'Loop with append could be a list comprehension',
+}
+
+# (path, size, mtime_ns)
+FileEntry = Tuple[str, int, int]
+
+
+def walk_sources(root: str, extensions: Tuple[str, ...]) -> List[FileEntry]:
+    """Collect source files under root with a single scandir walk"""
+    entries = []
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SKIP_DIRS and not entry.name.startswith('.'):
+                            stack.append(entry.path)
+                    elif entry.name.endswith(extensions) and entry.is_file(follow_symlinks=False):
+                        st = entry.stat(follow_symlinks=False)
+                        entries.append((entry.path, st.st_size, st.st_mtime_ns))
+        except OSError as e:
+            print(f"Skipping {directory}: {e}", file=sys.stderr)
+    return entries
+
+
+def default_cache_path(root: str, cache_dir: str = DEFAULT_CACHE_DIR) -> str:
+    """Cache file for a scanned directory, named by a hash of its absolute path"""
+    os.makedirs(cache_dir, exist_ok=True)
+    digest = hashlib.sha1(os.path.abspath(root).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{digest}.sqlite")
+
+
+def analyze_source(code: str) -> List[Dict]:
+    """Run all rules over one file's source"""
+    findings = []
+    for bug in find_bugs(code):
+        findings.append({
+            'rule': bug['rule'],
+            'line': bug['line'],
+            'severity': bug['severity'],
+            'message': bug['message']
+        })
+    for suggestion in find_refactorings(code):
+        findings.append({
+            'rule': suggestion['type'],
+            'line': 1,
+            'severity': suggestion['priority'],
+            'message': suggestion['message']
+        })
+    return findings
+
+
+def _analyze_batch(batch: List[FileEntry]) -> List[Tuple[FileEntry, List[Dict]]]:
+    """Worker: analyze a batch of files"""
+    results = []
+    for entry in batch:
+        try:
+            with open(entry[0], 'r', encoding='utf-8', errors='replace') as f:
+                code = f.read()
+            findings = analyze_source(code)
+        except OSError as e:
+            findings = [{'rule': 'read-error', 'line': 1, 'severity': 'error', 'message': str(e)}]
+        results.append((entry, findings))
+    return results
+
+
+def make_batches(entries: List[FileEntry]) -> List[List[FileEntry]]:
+    """
+    Largest-first batches for dynamic scheduling
+
+    Big files become single-file tasks at the front of the queue and small
+    files are packed into batches at the back. Idle workers pull the next task
+    as soon as they finish, so a few huge files never leave cores idle at the
+    end of the run.
+    """
+    batches = []
+    current = []
+    current_bytes = 0
+    for entry in sorted(entries, key=lambda e: e[1], reverse=True):
+        current.append(entry)
+        current_bytes += entry[1]
+        if current_bytes >= BATCH_BYTES or len(current) >= BATCH_FILES:
+            batches.append(current)
+            current = []
+            current_bytes = 0
+    if current:
+        batches.append(current)
+    return batches
+
+
+class ScanCache:
+    """Persistent per-file result cache"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, rules TEXT, findings TEXT)"
+        )
+        self._pending = []
+
+    def load(self) -> Dict[str, Tuple[int, int, str]]:
+        """All cached entries for the current rules version"""
+        rows = self.db.execute(
+            "SELECT path, size, mtime_ns, findings FROM results WHERE rules = ?", (RULES_VERSION,)
+        )
+        return {path: (size, mtime_ns, findings) for path, size, mtime_ns, findings in rows}
+
+    def put(self, entry: FileEntry, findings: List[Dict]):
+        self._pending.append((entry[0], entry[1], entry[2], RULES_VERSION, json.dumps(findings)))
+        if len(self._pending) >= 5000:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            with self.db:
+                self.db.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", self._pending)
+            self._pending = []
+
+    def prune(self, root: str, seen: set):
+        """Delete entries under root for files the current walk did not find"""
+        self.flush()
+        prefix = os.path.join(root, '')
+        stale = [(path,) for path, in self.db.execute("SELECT path FROM results")
+                 if path.startswith(prefix) and path not in seen]
+        if stale:
+            with self.db:
+                self.db.executemany("DELETE FROM results WHERE path = ?", stale)
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+
+class JSONLWriter:
+    """One JSON object per finding"""
+
+    def __init__(self, out: TextIO):
+        self.out = out
+
+    def write(self, path: str, findings: List[Dict]):
+        for finding in findings:
+            self.out.write(json.dumps(dict(finding, path=path)) + '\n')
+
+    def close(self):
+        self.out.flush()
+
+
+class SARIFWriter:
+    """Streams a SARIF 2.1.0 log without holding all results in memory"""
+
+    def __init__(self, out: TextIO, root: str):
+        self.out = out
+        self.root = root
+        self.first = True
+        driver = {
+            'name': 'forge-copilot',
+            'informationUri': 'https://github.com/SpidermanTotro/AgentFoundry-instantly',
+            'rules': [{'id': rule, 'shortDescription': {'text': text}} for rule, text in RULES.items()]
+        }
+        header = json.dumps({
+            'version': '2.1.0',
+            '$schema': 'https://json.schemastore.org/sarif-2.1.0.json',
+            'runs': [{'tool': {'driver': driver}, 'results': []}]
+        })
+        # Split the empty results array open so results can be streamed into it
+        self._footer = header[header.rindex('[]') + 2:]
+        out.write(header[:header.rindex('[]') + 1])
+
+    def write(self, path: str, findings: List[Dict]):
+        uri = os.path.relpath(path, self.root).replace(os.sep, '/')
+        for finding in findings:
+            result = {
+                'ruleId': finding['rule'],
+                'level': SEVERITY_TO_SARIF.get(finding['severity'], 'note'),
+                'message': {'text': finding['message']},
+                'locations': [{
+                    'physicalLocation': {
+                        'artifactLocation': {'uri': uri},
+                        'region': {'startLine': finding['line']}
+                    }
+                }]
+            }
+            self.out.write(('' if self.first else ',') + '\n' + json.dumps(result))
+            self.first = False
+
+    def close(self):
+        self.out.write('\n]' + self._footer + '\n')
+        self.out.flush()
+
+
+def scan(
+    root: str,
+    writer,
+    jobs: Optional[int] = None,
+    cache_path: Optional[str] = None,
+    extensions: Tuple[str, ...] = ('.py',)
+) -> Dict:
+    """
+    Analyze every source file under root
+
+    Args:
+        root: Directory to scan
+        writer: JSONLWriter or SARIFWriter receiving results as they arrive
+        jobs: Worker processes (default: all cores)
+        cache_path: SQLite cache file, or None to disable caching
+        extensions: File suffixes to analyze
+
+    Returns:
+        Scan statistics
+    """
+    start = time.perf_counter()
+    entries = walk_sources(root, extensions)
+
+    cache = ScanCache(cache_path) if cache_path else None
+    cached = cache.load() if cache else {}
+
+    misses = []
+    findings_total = 0
+    for entry in entries:
+        hit = cached.get(entry[0])
+        if hit and hit[0] == entry[1] and hit[1] == entry[2]:
+            findings = json.loads(hit[2])
+            findings_total += len(findings)
+            writer.write(entry[0], findings)
+        else:
+            misses.append(entry)
+
+    if misses:
+        batches = make_batches(misses)
+        jobs = max(1, min(jobs or os.cpu_count() or 1, len(batches)))
+        if jobs == 1:
+            results = map(_analyze_batch, batches)
+            pool = None
+        else:
+            pool = Pool(jobs)
+            results = pool.imap_unordered(_analyze_batch, batches)
+        try:
+            for batch_results in results:
+                for entry, findings in batch_results:
+                    findings_total += len(findings)
+                    writer.write(entry[0], findings)
+                    if cache:
+                        cache.put(entry, findings)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+    writer.close()
+    if cache:
+        cache.prune(root, {entry[0] for entry in entries})
+        cache.close()
+
+    return {
+        'files': len(entries),
+        'analyzed': len(misses),
+        'cached': len(entries) - len(misses),
+        'findings': findings_total,
+        'seconds': round(time.perf_counter() - start, 3)
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='forge-copilot', description='Forge Copilot command-line tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    scan_cmd = commands.add_parser('scan', help='Analyze every source file in a directory')
+    scan_cmd.add_argument('dir', help='Directory to scan')
+    scan_cmd.add_argument('--format', choices=['sarif', 'jsonl'], default='sarif')
+    scan_cmd.add_argument('--output', '-o', help='Output file (default: stdout)')
+    scan_cmd.add_argument('--jobs', '-j', type=int, default=None, help='Worker processes (default: all cores)')
+    scan_cmd.add_argument('--cache', help=f'Cache file (default: one per directory in {DEFAULT_CACHE_DIR})')
+    scan_cmd.add_argument('--no-cache', action='store_true', help='Analyze every file, ignore the cache')
+    scan_cmd.add_argument('--ext', action='append', help='File extension to include (repeatable, default: .py)')
+
+    args = parser.parse_args(argv)
+
+    root = os.path.abspath(args.dir)
+    if not os.path.isdir(root):
+        parser.error(f"not a directory: {args.dir}")
+
+    cache_path = None if args.no_cache else (args.cache or default_cache_path(root))
+    # "--ext py" means ".py", not any name ending in "py"
+    extensions = tuple('.' + ext.lstrip('.') for ext in args.ext) if args.ext else ('.py',)
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        writer = SARIFWriter(out, root) if args.format == 'sarif' else JSONLWriter(out)
+        stats = scan(root, writer, jobs=args.jobs, cache_path=cache_path, extensions=extensions)
+    finally:
+        if args.output:
+            out.close()
+
+    print(
+        f"Scanned {stats['files']} files ({stats['analyzed']} analyzed, {stats['cached']} cached), "
+        f"{stats['findings']} findings in {stats['seconds']}s",
+        file=sys.stderr
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
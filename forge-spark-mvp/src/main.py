@@ -34,6 +34,7 @@ class CompletionRequest(BaseModel):
 class ChatRequest(BaseModel):
     message: str
     context: Optional[str] = None
+    session_id: Optional[str] = None
 
 # Health check endpoint
 @app.get("/")
@@ -105,23 +106,44 @@ async def chat(request: ChatRequest):
     POST /api/chat
     {
         "message": "How do I create a REST API in Python?",
-        "context": "Using FastAPI framework"
+        "context": "Using FastAPI framework",
+        "session_id": "my-session"
     }
     ```
+    
+    With a session_id the server remembers earlier turns, so follow-up
+    requests only need to send the new message.
     """
     try:
         response = await ai_engine.chat(
             message=request.message,
-            context=request.context
+            context=request.context,
+            session_id=request.session_id
         )
         
         return {
             "response": response,
-            "model": ai_engine.current_model
+            "model": ai_engine.current_model,
+            "session_id": request.session_id
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/chat/sessions/{session_id}")
+async def get_chat_session(session_id: str):
+    """Inspect a chat session (turn count, token usage, summary)"""
+    session = ai_engine.conversations.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session.to_dict()
+
+@app.delete("/api/chat/sessions/{session_id}")
+async def delete_chat_session(session_id: str):
+    """End a chat session and free its memory"""
+    if not ai_engine.end_session(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"status": "deleted", "session_id": session_id}
+
 @app.websocket("/ws/completion")
 async def websocket_completion(websocket: WebSocket):
     """WebSocket endpoint for real-time code completion"""
@@ -17,7 +17,7 @@ from .ai_engine import AIEngine
 from .code_completion import CodeCompletionService
 
 # Import game RE tools
-from .game_re.extractors.mpq_extractor import MPQExtractor
+from .game_re.extractors.mpq_index import MPQIndex
 from .game_re.extractors.casc_extractor import CASCExtractor
 from .game_re.upscalers.texture_upscaler import TextureUpscaler
 from .game_re.converters.model_converter import ModelConverter
@@ -71,6 +71,10 @@ class TextureUpscaleRequest(BaseModel):
     input_path: str
     output_path: str
     scale: int = 4
+    tile_size: int = 128
+    max_memory_mb: float = 512
+    format: str = "png"  # png, jpg, dds, blp
+    compression: Optional[str] = None  # dds: bc1/bc3/bc7, blp: bc1/bc3
 
 class ModelConvertRequest(BaseModel):
     input_path: str
@@ -101,8 +105,8 @@ async def root():
         },
         "endpoints": {
             "core": ["/docs", "/health", "/api/completion", "/api/chat"],
-            "copilot": ["/api/copilot/complete", "/api/copilot/explain", "/api/copilot/tests"],
-            "game_re": ["/api/game/extract-mpq", "/api/game/upscale-texture", "/api/game/convert-model"],
+            "copilot": ["/api/copilot/complete", "/api/copilot/explain", "/api/copilot/tests", "/api/copilot/optimize"],
+            "game_re": ["/api/game/extract-mpq", "/api/game/search-mpq", "/api/game/upscale-texture", "/api/game/convert-model"],
             "reverse_eng": ["/api/re/disassemble", "/api/re/analyze"],
             "workspace": ["/api/workspace/slides", "/api/workspace/docs", "/api/workspace/sheets"]
         }
@@ -188,50 +192,109 @@ async def copilot_refactor(request: dict):
     )
     return {"suggestions": suggestions}
 
+@app.post("/api/copilot/optimize")
+async def copilot_optimize(request: dict):
+    """Analyze code for performance problems (static analysis only)"""
+    return await copilot.optimize_code(
+        request.get("code", ""),
+        request.get("language", "python")
+    )
+
 # ============================================================================
 # GAME REVERSE ENGINEERING
 # ============================================================================
 
+def _mpq_index(request: dict) -> MPQIndex:
+    """Index over `mpq_paths` (load order, patches last) or a single `mpq_path`"""
+    mpq_paths = request.get("mpq_paths") or [request.get("mpq_path")]
+    return MPQIndex.open(mpq_paths, request.get("listfiles", []))
+
 @app.post("/api/game/extract-mpq")
 async def extract_mpq(request: dict):
     """
     Extract Blizzard MPQ archive
     Supports: WoW, StarCraft, Diablo, Warcraft 3
+    
+    Optional: `mpq_paths` for a base archive plus patches, `pattern` (glob)
+    and/or `regex` to extract only matching files, extra `listfiles`
     """
-    mpq_path = request.get("mpq_path")
     output_dir = request.get("output_dir", "output/mpq/")
     
     try:
-        extractor = MPQExtractor(mpq_path)
-        extractor.open()
-        files = extractor.list_files()
-        extractor.extract_all(output_dir)
-        extractor.close()
+        index = _mpq_index(request)
+        names = None
+        if request.get("pattern") or request.get("regex"):
+            names = [entry["filename"] for entry in index.query(request.get("pattern"), request.get("regex"))]
+        summary = index.extract(output_dir, names=names, workers=request.get("workers"))
         
         return {
             "status": "success",
-            "files_extracted": len(files),
+            "files_extracted": summary["files"] - summary["failed"],
+            "files_failed": summary["failed"],
+            "mb_per_second": summary["mb_per_second"],
             "output_dir": output_dir
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/game/search-mpq")
+async def search_mpq(request: dict):
+    """
+    List files in MPQ archives matching a glob `pattern` and/or `regex`
+    (no extraction)
+    """
+    try:
+        limit = request.get("limit", 1000)
+        matches = _mpq_index(request).query(request.get("pattern"), request.get("regex"))
+        
+        return {
+            "total": len(matches),
+            "files": matches[:limit]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/api/game/extract-casc")
 async def extract_casc(request: dict):
     """
     Extract CASC storage (Modern WoW)
+    
+    Files are named through `listfiles` (community 'fdid;path' CSVs). With
+    `output_dir`, every file matching `kinds` (models/textures/sounds),
+    `extensions`, `prefix` and `pattern` is extracted in one parallel pass
+    (files with identical contents are decoded once and hard-linked, or
+    copied with `"link": false`); without it, matches are only listed.
     """
     game_path = request.get("game_path")
     
     try:
-        extractor = CASCExtractor(game_path)
-        extractor.initialize()
-        files = extractor.list_files()
+        with CASCExtractor(game_path, listfiles=request.get("listfiles", []),
+                           locale=request.get("locale", "enUS")) as extractor:
+            if not request.get("output_dir"):
+                files = extractor.index.query(request.get("pattern"), request.get("extensions"), request.get("prefix"))
+                return {
+                    "status": "success",
+                    "files_found": len(files),
+                    "preview": [entry["filename"] for entry in files[:10]]
+                }
+            
+            summary = extractor.extract_all(
+                request["output_dir"],
+                kinds=request.get("kinds"),
+                pattern=request.get("pattern"),
+                extensions=request.get("extensions"),
+                prefix=request.get("prefix"),
+                workers=request.get("workers"),
+                link=request.get("link", True)
+            )
         
         return {
             "status": "success",
-            "files_found": len(files),
-            "preview": files[:10]
+            "files_extracted": summary["files"] - summary["failed"],
+            "files_failed": summary["failed"],
+            "bytes_deduplicated": summary["bytes_deduplicated"],
+            "mb_per_second": summary["mb_per_second"],
+            "output_dir": request["output_dir"]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -246,7 +309,11 @@ async def upscale_texture(request: TextureUpscaleRequest):
         output = texture_upscaler.upscale_texture(
             request.input_path,
             request.output_path,
-            scale=request.scale
+            scale=request.scale,
+            format=request.format,
+            tile_size=request.tile_size,
+            max_memory_mb=request.max_memory_mb,
+            compression=request.compression
         )
         
         return {
@@ -0,0 +1,140 @@
+"""
+Tokenization Service - fast-tokenizer encode/decode shared by all request paths
+Guarantees the Rust (tokenizers) backend, batches encode/decode calls queued
+by concurrent requests, and memoizes token counts of recently seen strings
+"""
+
+import asyncio
+from functools import lru_cache
+from typing import List, Optional, Sequence
+
+from transformers import AutoTokenizer, PreTrainedTokenizerBase, PreTrainedTokenizerFast
+
+
+def ensure_fast_tokenizer(tokenizer: PreTrainedTokenizerBase) -> PreTrainedTokenizerFast:
+    """Return a Rust-backed tokenizer, converting a slow (pure Python) one if needed"""
+    if tokenizer.is_fast:
+        return tokenizer
+
+    from transformers.convert_slow_tokenizer import convert_slow_tokenizer
+
+    fast = PreTrainedTokenizerFast(
+        tokenizer_object=convert_slow_tokenizer(tokenizer),
+        bos_token=tokenizer.bos_token,
+        eos_token=tokenizer.eos_token,
+        unk_token=tokenizer.unk_token,
+        pad_token=tokenizer.pad_token,
+    )
+    return fast
+
+
+class _Batcher:
+    """
+    Collects calls made within `window` seconds and runs them as one batch
+
+    Requests that arrive while the event loop is busy (e.g. during a model
+    forward pass) are all flushed together on the next loop iteration.
+    """
+
+    def __init__(self, run_batch, max_batch: int, window: float):
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.window = window
+        self._items = []
+        self._futures = []
+        self._handle = None
+
+    def submit(self, item) -> "asyncio.Future":
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._items.append(item)
+        self._futures.append(future)
+        if len(self._items) >= self.max_batch:
+            self._flush()
+        elif self._handle is None:
+            self._handle = loop.call_later(self.window, self._flush)
+        return future
+
+    def _flush(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        items, futures = self._items, self._futures
+        self._items, self._futures = [], []
+        if not items:
+            return
+        try:
+            results = self.run_batch(items)
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, result in zip(futures, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class TokenizationService:
+    """
+    Encode/decode front-end for a Hugging Face fast tokenizer
+
+    - encode()/decode() for synchronous callers
+    - encode_async()/decode_async() batch concurrent requests into a single
+      Rust call (which also parallelizes across the batch)
+    - count_tokens() is memoized for recently seen strings
+    """
+
+    def __init__(
+        self,
+        tokenizer: PreTrainedTokenizerBase,
+        count_cache_size: int = 4096,
+        max_batch: int = 64,
+        batch_window: float = 0.001
+    ):
+        self.tokenizer = ensure_fast_tokenizer(tokenizer)
+        self._encode_batcher = _Batcher(self.encode_batch, max_batch, batch_window)
+        self._decode_batcher = _Batcher(self.decode_batch, max_batch, batch_window)
+        self._count = lru_cache(maxsize=count_cache_size)(self._count_uncached)
+
+    @classmethod
+    def from_pretrained(cls, model_name: str, cache_dir: Optional[str] = None, **kwargs) -> "TokenizationService":
+        tokenizer = AutoTokenizer.from_pretrained(model_name, cache_dir=cache_dir, use_fast=True)
+        return cls(tokenizer, **kwargs)
+
+    # ------------------------------------------------------------------
+    # Synchronous API
+    # ------------------------------------------------------------------
+
+    def encode(self, text: str, add_special_tokens: bool = True) -> List[int]:
+        """Token ids of a prompt; add_special_tokens=False for text appended to an encoded prompt"""
+        return self.tokenizer(text, add_special_tokens=add_special_tokens).input_ids
+
+    def encode_batch(self, texts: List[str]) -> List[List[int]]:
+        return self.tokenizer(texts).input_ids
+
+    def decode(self, token_ids: Sequence[int]) -> str:
+        return self.tokenizer.decode(token_ids, skip_special_tokens=True)
+
+    def decode_batch(self, sequences: List[Sequence[int]]) -> List[str]:
+        return self.tokenizer.batch_decode(sequences, skip_special_tokens=True)
+
+    def count_tokens(self, text: str) -> int:
+        """Token count of a string, memoized for recently seen strings"""
+        return self._count(text)
+
+    def _count_uncached(self, text: str) -> int:
+        return len(self.tokenizer(text, add_special_tokens=False).input_ids)
+
+    def cache_info(self):
+        return self._count.cache_info()
+
+    # ------------------------------------------------------------------
+    # Batched async API
+    # ------------------------------------------------------------------
+
+    async def encode_async(self, text: str) -> List[int]:
+        return await self._encode_batcher.submit(text)
+
+    async def decode_async(self, token_ids: Sequence[int]) -> str:
+        return await self._decode_batcher.submit(token_ids)
@@ -0,0 +1,10 @@
+"""
+Forge Spark tests
+Run from the forge-spark-mvp directory: `python -m pytest tests`
+"""
+
+import os
+import sys
+
+# The src package is imported from the forge-spark-mvp directory, as the app and benchmarks do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,56 @@
+"""
+MPQIndex merging: later archives win, also for names only an earlier archive lists
+"""
+
+import importlib
+import struct
+
+# game-re is not a valid identifier, so the package is imported by name
+_EXTRACTORS = "src.game-re.extractors"
+mpq_crypto = importlib.import_module(f"{_EXTRACTORS}.mpq_crypto")
+mpq_extractor = importlib.import_module(f"{_EXTRACTORS}.mpq_extractor")
+MPQIndex = importlib.import_module(f"{_EXTRACTORS}.mpq_index").MPQIndex
+MPQWriter = importlib.import_module(f"{_EXTRACTORS}.mpq_writer").MPQWriter
+
+
+def write_archive(path: str, files: dict, listfile: bool = True):
+    with MPQWriter(path, workers=1, listfile=listfile) as writer:
+        for name, data in files.items():
+            writer.add_file(name, data)
+
+
+def mark_deleted(path: str, block: int):
+    """Turn one block of an archive into a delete marker (MPQWriter never writes them)"""
+    with open(path, 'r+b') as f:
+        header = struct.unpack('<4sIIHHIIII', f.read(32))
+        block_offset, block_entries = header[6], header[8]
+        key = mpq_crypto.table_key('(block table)')
+        f.seek(block_offset)
+        table = mpq_crypto.decrypt_table(f.read(block_entries * 16), key)
+        table[block * 4 + 3] = mpq_extractor.MPQ_FILE_EXISTS | mpq_extractor.MPQ_FILE_DELETE_MARKER
+        f.seek(block_offset)
+        f.write(mpq_crypto.encrypt_table(table, key))
+
+
+def test_unlisted_patch_overrides_and_deletes(tmp_path):
+    base, patch = str(tmp_path / "base.mpq"), str(tmp_path / "patch.mpq")
+    write_archive(base, {"Data\\Kept.txt": b"base", "Data\\Patched.txt": b"base", "Data\\Removed.txt": b"base"})
+    # Neither patch entry is in a listfile
+    write_archive(patch, {"Data\\Patched.txt": b"patch", "Data\\Removed.txt": b""}, listfile=False)
+    mark_deleted(patch, 1)
+
+    index = MPQIndex.build([base, patch], cache_dir=None)
+    assert index.locate("Data\\Kept.txt")[0] == 0
+    assert index.locate("Data\\Patched.txt")[0] == 1
+    assert "Data\\Removed.txt" not in index
+
+
+def test_unlisted_patch_restores_a_deleted_file(tmp_path):
+    paths = [str(tmp_path / f"{i}.mpq") for i in range(3)]
+    write_archive(paths[0], {"Data\\File.txt": b"base"})
+    write_archive(paths[1], {"Data\\File.txt": b""}, listfile=False)
+    mark_deleted(paths[1], 0)
+    write_archive(paths[2], {"Data\\File.txt": b"restored"}, listfile=False)
+
+    index = MPQIndex.build(paths, cache_dir=None)
+    assert index.locate("Data\\File.txt")[0] == 2
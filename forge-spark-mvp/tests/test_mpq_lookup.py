@@ -0,0 +1,61 @@
+"""
+MPQExtractor hash table lookup follows Storm's probe: from the name's home slot,
+first matching entry wins, and an empty slot ends the search
+"""
+
+import importlib
+from array import array
+
+# game-re is not a valid identifier, so the package is imported by name
+mpq_extractor = importlib.import_module("src.game-re.extractors.mpq_extractor")
+mpq_crypto = importlib.import_module("src.game-re.extractors.mpq_crypto")
+
+NAME = "war3map.j"
+SIZE = 16
+EMPTY = mpq_extractor.HASH_ENTRY_EMPTY
+DELETED = mpq_extractor.HASH_ENTRY_DELETED
+
+
+def make_archive(slots: dict) -> "mpq_extractor.MPQExtractor":
+    """Extractor over a SIZE-slot hash table: {slot: block} entries for NAME, other slots empty"""
+    hash_a = mpq_crypto.hash_string(NAME, mpq_crypto.HASH_NAME_A)
+    hash_b = mpq_crypto.hash_string(NAME, mpq_crypto.HASH_NAME_B)
+    archive = mpq_extractor.MPQExtractor("unused.mpq", cache_dir=None)
+    archive.hash_table = array('I', [EMPTY] * (SIZE * 4))
+    for slot, block in slots.items():
+        archive.hash_table[slot * 4:slot * 4 + 4] = array('I', [hash_a, hash_b, 0, block])
+    archive.block_table = array('I', [0] * (8 * 4))
+    archive._build_lookup()
+    return archive
+
+
+def home() -> int:
+    return mpq_crypto.hash_string(NAME, mpq_crypto.HASH_TABLE_OFFSET) % SIZE
+
+
+def test_first_entry_in_probe_order_wins():
+    start = home()
+    archive = make_archive({start: DELETED, (start + 2) % SIZE: 5, (start + 1) % SIZE: 3})
+    assert archive.find_block(NAME) == 3
+
+
+def test_probe_wraps_around_the_table():
+    start = home()
+    # The decoy sits at a lower index but later in probe order
+    before = (start - 1) % SIZE
+    slots = {start: 4, before: 6}
+    for slot in range(SIZE):
+        if slot not in slots:
+            slots[slot] = DELETED
+    assert make_archive(slots).find_block(NAME) == 4
+
+
+def test_entry_behind_an_empty_slot_is_unreachable():
+    start = home()
+    assert make_archive({(start + 2) % SIZE: 1}).find_block(NAME) is None
+
+
+def test_deleted_slots_do_not_end_the_probe():
+    start = home()
+    archive = make_archive({start: DELETED, (start + 1) % SIZE: DELETED, (start + 2) % SIZE: 2})
+    assert archive.find_block(NAME) == 2